@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from .interfaces.broker_interface import IBroker
+
+
+# Broker used by the modules that are not given one explicitly
+_default_broker: IBroker | None = None
+
+
+def get_default_broker() -> IBroker:
+    """
+    Returns the broker shared by the modules that are created without an explicit broker. Unless another one has
+    been set with set_default_broker, it is a MT5Broker (created on first use).
+
+    Returns:
+        IBroker: The default broker.
+    """
+    global _default_broker
+    if _default_broker is None:
+        from .brokers.mt5_broker import MT5Broker
+        _default_broker = MT5Broker()
+    return _default_broker
+
+
+def set_default_broker(broker: IBroker) -> None:
+    """
+    Sets the broker shared by the modules that are created without an explicit broker (e.g. a SimulatedBroker to
+    run the framework without a MT5 terminal). It must be set before creating the modules.
+
+    Args:
+        broker (IBroker): The default broker.
+    """
+    global _default_broker
+    _default_broker = broker
@@ -0,0 +1,92 @@
+class BrokerConstants():
+    """
+    Constants of the MT5 API used by the framework, with the same names and values as the MetaTrader5 package.
+
+    Every broker exposes them as attributes, so the modules use `broker.TIMEFRAME_M1` where they used to use
+    `mt5.TIMEFRAME_M1`, without importing the MetaTrader5 package.
+    """
+    # Timeframes
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M2 = 2
+    TIMEFRAME_M3 = 3
+    TIMEFRAME_M4 = 4
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M6 = 6
+    TIMEFRAME_M10 = 10
+    TIMEFRAME_M12 = 12
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M20 = 20
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 1 | 0x4000
+    TIMEFRAME_H2 = 2 | 0x4000
+    TIMEFRAME_H3 = 3 | 0x4000
+    TIMEFRAME_H4 = 4 | 0x4000
+    TIMEFRAME_H6 = 6 | 0x4000
+    TIMEFRAME_H8 = 8 | 0x4000
+    TIMEFRAME_H12 = 12 | 0x4000
+    TIMEFRAME_D1 = 24 | 0x4000
+    TIMEFRAME_W1 = 1 | 0x8000
+    TIMEFRAME_MN1 = 1 | 0xC000
+
+    # Timeframes of the framework (see Utils.TIMEFRAME_SECONDS) and their MT5 constant
+    TIMEFRAMES = {
+        '1min': TIMEFRAME_M1, '2min': TIMEFRAME_M2, '3min': TIMEFRAME_M3, '4min': TIMEFRAME_M4,
+        '5min': TIMEFRAME_M5, '6min': TIMEFRAME_M6, '10min': TIMEFRAME_M10, '12min': TIMEFRAME_M12,
+        '15min': TIMEFRAME_M15, '20min': TIMEFRAME_M20, '30min': TIMEFRAME_M30, '1h': TIMEFRAME_H1,
+        '2h': TIMEFRAME_H2, '3h': TIMEFRAME_H3, '4h': TIMEFRAME_H4, '6h': TIMEFRAME_H6, '8h': TIMEFRAME_H8,
+        '12h': TIMEFRAME_H12, '1d': TIMEFRAME_D1, '1w': TIMEFRAME_W1, '1M': TIMEFRAME_MN1,
+    }
+
+    # Order types
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TYPE_BUY_LIMIT = 2
+    ORDER_TYPE_SELL_LIMIT = 3
+    ORDER_TYPE_BUY_STOP = 4
+    ORDER_TYPE_SELL_STOP = 5
+
+    # Position types
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+
+    # Order filling and expiration
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    ORDER_TIME_GTC = 0
+
+    # Trade request actions
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_PENDING = 5
+    TRADE_ACTION_SLTP = 6
+    TRADE_ACTION_MODIFY = 7
+    TRADE_ACTION_REMOVE = 8
+
+    # Trade server return codes
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_REJECT = 10006
+    TRADE_RETCODE_PLACED = 10008
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_DONE_PARTIAL = 10010
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_PRICE = 10015
+    TRADE_RETCODE_NO_MONEY = 10019
+    TRADE_RETCODE_PRICE_CHANGED = 10020
+    TRADE_RETCODE_PRICE_OFF = 10021
+    TRADE_RETCODE_TOO_MANY_REQUESTS = 10024
+    TRADE_RETCODE_POSITION_CLOSED = 10036
+
+    # Account trade modes
+    ACCOUNT_TRADE_MODE_DEMO = 0
+    ACCOUNT_TRADE_MODE_CONTEST = 1
+    ACCOUNT_TRADE_MODE_REAL = 2
+
+    # Account margin modes (netting: one position per symbol, hedging: one position per filled order)
+    ACCOUNT_MARGIN_MODE_RETAIL_NETTING = 0
+    ACCOUNT_MARGIN_MODE_EXCHANGE = 1
+    ACCOUNT_MARGIN_MODE_RETAIL_HEDGING = 2
+
+    # Deal types
+    DEAL_TYPE_BUY = 0
+    DEAL_TYPE_SELL = 1
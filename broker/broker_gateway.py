@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Connection, Listener
+from typing import Dict, List, Set, Tuple
+
+from dotenv import load_dotenv, find_dotenv
+
+from utils.logger import get_logger
+from .interfaces.broker_interface import IBroker
+
+
+logger = get_logger("broker_gateway")
+
+
+# Calls the clients can make (initialize and shutdown belong to the gateway: they would affect every client)
+GATEWAY_METHODS = frozenset({
+    'last_error', 'terminal_info', 'account_info', 'symbols_get', 'symbol_info', 'symbol_info_tick', 'symbol_select',
+    'copy_rates_from_pos', 'positions_get', 'orders_get', 'history_deals_get', 'order_send',
+})
+
+# Read-only calls: identical calls in flight at the same time are made once and the result is sent to every caller
+COALESCED_METHODS = frozenset({
+    'terminal_info', 'account_info', 'symbols_get', 'symbol_info', 'symbol_info_tick', 'copy_rates_from_pos',
+    'positions_get', 'orders_get', 'history_deals_get',
+})
+
+# Requests that are not broker calls
+BATCH, SUBSCRIBE, UNSUBSCRIBE = "_batch", "_subscribe", "_unsubscribe"
+
+# Messages sent to the clients: the reply to a request, and the updates of their subscriptions
+REPLY, TICK, BAR = "REPLY", "TICK", "BAR"
+
+DEFAULT_GATEWAY_ADDRESS = ("127.0.0.1", 18812)
+
+
+def gateway_authkey() -> bytes:
+    """
+    Returns the key that authenticates the clients of the gateway: the MT5_GATEWAY_KEY environment variable, or the
+    one in the .env file. The gateway and its clients exchange pickled objects, so there is no default key: a
+    process that knew it could run code in the gateway or send trades.
+
+    Raises:
+        Exception: If MT5_GATEWAY_KEY is not set.
+    """
+    load_dotenv(find_dotenv())
+    key = os.getenv("MT5_GATEWAY_KEY")
+    if not key:
+        logger.error("MT5_GATEWAY_KEY is not set: the broker gateway and its clients need a shared key (.env)")
+        raise Exception("ERROR: MT5_GATEWAY_KEY is not set")
+    return key.encode()
+
+
+class _Client():
+    # A connected strategy process: its connection, and a lock so the replies and updates are not interleaved
+
+    def __init__(self, connection: Connection, number: int):
+        self.connection = connection
+        self.number = number
+        self.lock = threading.Lock()
+        self.connected = True
+
+    def send(self, message: tuple) -> None:
+        if not self.connected:
+            return
+        try:
+            with self.lock:
+                self.connection.send(message)
+        except (OSError, EOFError, BrokenPipeError):
+            self.connected = False
+
+
+class BrokerGateway():
+
+    def __init__(self, broker: IBroker, address: Tuple[str, int] = DEFAULT_GATEWAY_ADDRESS,
+                 authkey: bytes | None = None, workers: int = 1, tick_interval: float = 0.05,
+                 bar_interval: float = 0.5):
+        """
+        Service that owns the connection to the terminal and serves the broker calls of several strategy processes
+        (see GatewayBroker) over a local socket, so running many strategies does not mean many terminal
+        connections.
+
+        Every client request is handled by the gateway threads, so a strategy only waits for its own calls:
+        - Identical read-only calls in flight at the same time (e.g. the rates or the tick of the same symbol
+          requested by several strategies) are made once, and the result is sent to every caller.
+        - A batch of calls (e.g. the symbol info of many symbols) takes a single round trip.
+        - The clients can subscribe to the ticks of a symbol or the closed bars of a symbol and timeframe: the
+          gateway polls each of them once for all the subscribers and pushes every new one to them.
+
+        Args:
+            broker (IBroker): The broker, already initialized (e.g. by a PlatformConnector).
+            address (Tuple[str, int]): The local address where the gateway listens.
+            authkey (bytes | None): The key the clients must know (see gateway_authkey if None).
+            workers (int): The threads that call the broker. The MT5 package is one connection per process and must
+                not be called from several threads at once, so 1 (the default) sends the calls to the terminal one
+                at a time: a slow call of one client delays the calls of the others queued after it (the identical
+                read-only calls are still made once for all of them). More threads only help with brokers that can
+                serve concurrent calls (e.g. one worker per client with a SimulatedBroker).
+            tick_interval (float): The polling interval (seconds) of the subscribed ticks.
+            bar_interval (float): The polling interval (seconds) of the subscribed bars.
+        """
+        self.broker = broker
+        self.address = address
+        self.authkey = authkey if authkey is not None else gateway_authkey()
+        self.workers = workers
+        self.tick_interval = tick_interval
+        self.bar_interval = bar_interval
+
+        self._executor: ThreadPoolExecutor | None = None
+        self._listener: Listener | None = None
+        self._threads: List[threading.Thread] = []
+        self._running: bool = False
+
+        # Calls in flight by (method, args, kwargs)
+        self._in_flight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+        # Subscribers of the ticks of every symbol and of the bars of every (symbol, timeframe), and the time of the
+        # latest tick (time_msc) or closed bar pushed
+        self._tick_subscribers: Dict[str, Set[_Client]] = {}
+        self._bar_subscribers: Dict[Tuple[str, int], Set[_Client]] = {}
+        self._last_pushed: Dict[tuple, int] = {}
+
+        self._clients: Set[_Client] = set()
+        self._next_client: int = 0
+
+        # Requests received, broker calls made, requests served by a call in flight, and updates pushed
+        self.stats: Dict[str, int] = {'requests': 0, 'broker_calls': 0, 'coalesced': 0, 'pushes': 0}
+
+    def start(self) -> None:
+        """
+        Starts listening for clients and polling the subscriptions in background threads.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="GatewayCall")
+        self._listener = Listener(self.address, authkey=self.authkey)
+        # The actual address (the port may have been chosen by the system)
+        self.address = self._listener.address
+        self._running = True
+        for target, name in ((self._accept_forever, "GatewayAccept"), (self._poll_subscriptions_forever, "GatewayPoll")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Broker gateway listening on %s:%s", self.address[0], self.address[1])
+
+    def serve_forever(self) -> None:
+        """
+        Starts the gateway and serves the clients until the process is interrupted.
+        """
+        self.start()
+        try:
+            while self._running:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for client in list(self._clients):
+            client.connected = False
+            client.connection.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Broker gateway stopped")
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------------------------------------------------
+    def _accept_forever(self) -> None:
+        while self._running:
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if self._running:
+                    logger.warning("Rejected a gateway client: %r", e)
+                    continue
+                return
+
+            client = _Client(connection, self._next_client)
+            self._next_client += 1
+            with self._lock:
+                self._clients.add(client)
+            threading.Thread(target=self._serve_client, args=(client,), name=f"GatewayClient-{client.number}",
+                             daemon=True).start()
+            logger.info("Gateway client %s connected", client.number)
+
+    def _serve_client(self, client: _Client) -> None:
+        try:
+            while self._running:
+                request_id, method, args, kwargs = client.connection.recv()
+                self.stats['requests'] += 1
+                self._handle_request(client, request_id, method, args, kwargs)
+        except (EOFError, OSError):
+            pass
+        finally:
+            client.connected = False
+            with self._lock:
+                self._clients.discard(client)
+                for subscribers in list(self._tick_subscribers.values()) + list(self._bar_subscribers.values()):
+                    subscribers.discard(client)
+            client.connection.close()
+            logger.info("Gateway client %s disconnected", client.number)
+
+    def _handle_request(self, client: _Client, request_id: int, method: str, args: tuple, kwargs: dict) -> None:
+        if method == BATCH:
+            self._handle_batch(client, request_id, args[0])
+        elif method in (SUBSCRIBE, UNSUBSCRIBE):
+            self._handle_subscription(client, method, *args)
+            client.send((REPLY, request_id, True, None))
+        elif method in GATEWAY_METHODS:
+            future = self._submit(method, args, kwargs)
+            future.add_done_callback(lambda done: client.send((REPLY, request_id) + done.result()))
+        else:
+            client.send((REPLY, request_id, None, (-2, f"Gateway: {method} is not available")))
+
+    def _handle_batch(self, client: _Client, request_id: int, calls: List[Tuple[str, tuple, dict]]) -> None:
+        # One reply with the result of every call, once all of them are done
+        futures = [self._submit(method, args, kwargs) if method in GATEWAY_METHODS else None
+                   for method, args, kwargs in calls]
+        pending = [len(futures)]
+        lock = threading.Lock()
+
+        def reply() -> None:
+            results = [future.result() if future is not None else (None, (-2, "Gateway: not available"))
+                       for future in futures]
+            client.send((REPLY, request_id, results, None))
+
+        def on_done(_) -> None:
+            with lock:
+                pending[0] -= 1
+                if pending[0] > 0:
+                    return
+            reply()
+
+        if not futures:
+            reply()
+        for future in futures:
+            if future is None:
+                on_done(None)
+            else:
+                future.add_done_callback(on_done)
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Broker calls
+    # ------------------------------------------------------------------------------------------------------------
+    def _submit(self, method: str, args: tuple, kwargs: dict) -> Future:
+        """
+        Schedules a broker call, or returns the identical call in flight if it is read-only. The future gives the
+        result and the error of the broker (None if the call succeeded).
+        """
+        if method not in COALESCED_METHODS:
+            return self._executor.submit(self._invoke, method, args, kwargs)
+
+        key = (method, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future
+            future = self._executor.submit(self._invoke, method, args, kwargs)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key: tuple) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _invoke(self, method: str, args: tuple, kwargs: dict) -> Tuple[object, tuple | None]:
+        self.stats['broker_calls'] += 1
+        try:
+            result = getattr(self.broker, method)(*args, **kwargs)
+        except Exception as e:
+            logger.error("Gateway call %s%s failed: %r", method, args, e)
+            return None, (-1, f"Gateway: {e!r}")
+        # The error of a failed call travels with its result (last_error would be the one of another call)
+        error = self.broker.last_error() if result is None or result is False else None
+        return result, error
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------------------------------------------------
+    def _handle_subscription(self, client: _Client, method: str, kind: str, symbol: str,
+                             timeframe: int | None = None) -> None:
+        with self._lock:
+            if kind == TICK:
+                subscribers = self._tick_subscribers.setdefault(symbol, set())
+            else:
+                subscribers = self._bar_subscribers.setdefault((symbol, timeframe), set())
+            if method == SUBSCRIBE:
+                subscribers.add(client)
+            else:
+                subscribers.discard(client)
+
+    def _poll_subscriptions_forever(self) -> None:
+        next_bar_poll = 0.0
+        while self._running:
+            time.sleep(self.tick_interval)
+            with self._lock:
+                ticks = [(symbol, list(clients)) for symbol, clients in self._tick_subscribers.items() if clients]
+                bars = [(key, list(clients)) for key, clients in self._bar_subscribers.items() if clients]
+
+            for symbol, clients in ticks:
+                future = self._submit('symbol_info_tick', (symbol,), {})
+                future.add_done_callback(lambda done, symbol=symbol, clients=clients: self._push_tick(symbol, clients, done))
+
+            now = time.monotonic()
+            if bars and now >= next_bar_poll:
+                next_bar_poll = now + self.bar_interval
+                for (symbol, timeframe), clients in bars:
+                    future = self._submit('copy_rates_from_pos', (symbol, timeframe, 1, 1), {})
+                    future.add_done_callback(lambda done, symbol=symbol, timeframe=timeframe, clients=clients:
+                                             self._push_bar(symbol, timeframe, clients, done))
+
+    def _push_tick(self, symbol: str, clients: List[_Client], done: Future) -> None:
+        tick, _ = done.result()
+        if tick is None or tick.time_msc <= self._last_pushed.get((TICK, symbol), -1):
+            return
+        self._last_pushed[(TICK, symbol)] = tick.time_msc
+        for client in clients:
+            client.send((TICK, symbol, tick))
+        self.stats['pushes'] += len(clients)
+
+    def _push_bar(self, symbol: str, timeframe: int, clients: List[_Client], done: Future) -> None:
+        rates, _ = done.result()
+        if rates is None or len(rates) == 0 or rates['time'][-1] <= self._last_pushed.get((BAR, symbol, timeframe), -1):
+            return
+        self._last_pushed[(BAR, symbol, timeframe)] = int(rates['time'][-1])
+        for client in clients:
+            client.send((BAR, symbol, timeframe, rates))
+        self.stats['pushes'] += len(clients)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import itertools
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+from ..broker_constants import BrokerConstants
+from ..broker_gateway import (BAR, BATCH, DEFAULT_GATEWAY_ADDRESS, REPLY, SUBSCRIBE, TICK, UNSUBSCRIBE,
+                              gateway_authkey)
+from ..interfaces.broker_interface import IBroker
+
+
+logger = get_logger("broker_gateway")
+
+
+class GatewayBroker(BrokerConstants, IBroker):
+
+    def __init__(self, address: Tuple[str, int] = DEFAULT_GATEWAY_ADDRESS, authkey: bytes | None = None,
+                 timeout: float | None = 30.0):
+        """
+        Broker of a strategy process that makes its calls through a BrokerGateway, which owns the terminal
+        connection. The calls can be made from several threads at once: every request carries an id and waits
+        only for its own reply.
+
+        The gateway is already connected to the terminal: initialize only checks that the gateway answers, and
+        shutdown only closes the connection to the gateway.
+
+        Args:
+            address (Tuple[str, int]): The address of the gateway.
+            authkey (bytes | None): The key of the gateway (see gateway_authkey if None).
+            timeout (float | None): How long (seconds) a call waits for its reply (None: forever). A call without a
+                reply in time fails like a broker call (None, and the error in last_error).
+        """
+        self.address = address
+        self.timeout = timeout
+        self._connection = Client(address, authkey=authkey if authkey is not None else gateway_authkey())
+        self._send_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+
+        # The error of the latest failed call of every thread (see last_error)
+        self._errors = threading.local()
+
+        # Callbacks of the subscriptions, by symbol (ticks) and by (symbol, timeframe) (bars)
+        self._tick_callbacks: Dict[str, List[Callable]] = {}
+        self._bar_callbacks: Dict[Tuple[str, int], List[Callable]] = {}
+
+        self._reader = threading.Thread(target=self._read_forever, name="GatewayReader", daemon=True)
+        self._reader.start()
+
+    def _read_forever(self) -> None:
+        try:
+            while True:
+                message = self._connection.recv()
+                kind = message[0]
+                if kind == REPLY:
+                    _, request_id, result, error = message
+                    future = self._pending.pop(request_id, None)
+                    if future is not None:
+                        future.set_result((result, error))
+                elif kind == TICK:
+                    for callback in self._tick_callbacks.get(message[1], ()):
+                        callback(message[1], message[2])
+                elif kind == BAR:
+                    for callback in self._bar_callbacks.get((message[1], message[2]), ()):
+                        callback(message[1], message[2], message[3])
+        except (EOFError, OSError):
+            pass
+        finally:
+            # The calls waiting for a reply fail instead of waiting forever
+            for future in list(self._pending.values()):
+                if not future.done():
+                    future.set_result((None, (-10004, "Gateway: connection closed")))
+            self._pending.clear()
+
+    def _request(self, method: str, *args, **kwargs):
+        request_id = next(self._request_ids)
+        future = Future()
+        self._pending[request_id] = future
+        try:
+            with self._send_lock:
+                self._connection.send((request_id, method, args, kwargs))
+        except (OSError, EOFError) as e:
+            self._pending.pop(request_id, None)
+            logger.error("Can't reach the broker gateway for %s: %r", method, e)
+            return None, (-10004, "Gateway: connection closed")
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            # A late reply finds no pending request and is dropped
+            self._pending.pop(request_id, None)
+            logger.error("The broker gateway did not answer %s in %s seconds", method, self.timeout)
+            return None, (-10005, "Gateway: timeout")
+
+    def _call(self, method: str, *args, **kwargs):
+        result, error = self._request(method, *args, **kwargs)
+        self._errors.last = error if error is not None else (1, "Success")
+        return result
+
+    def call_batch(self, calls: Iterable[Tuple[str, tuple]]) -> list:
+        """
+        Makes several calls in a single round trip to the gateway (e.g. [('symbol_info', ('EURUSD',)), ...]).
+
+        Returns:
+            list: The result of every call, in order (None for the calls that failed).
+        """
+        results, _ = self._request(BATCH, [(method, tuple(args), {}) for method, args in calls])
+        if results is None:
+            return []
+        return [result for result, _ in results]
+
+    def symbols_info(self, symbols: Iterable[str]) -> Dict[str, object]:
+        """
+        Returns the symbol info of several symbols with a single round trip to the gateway.
+        """
+        symbols = list(symbols)
+        return dict(zip(symbols, self.call_batch(('symbol_info', (symbol,)) for symbol in symbols)))
+
+    def subscribe_ticks(self, symbol: str, callback: Callable[[str, object], None]) -> None:
+        """
+        Receives every new tick of a symbol polled by the gateway: callback(symbol, tick) is called in the reader
+        thread of the connection, so it must return quickly (e.g. put the tick in a queue).
+        """
+        self._tick_callbacks.setdefault(symbol, []).append(callback)
+        self._request(SUBSCRIBE, TICK, symbol)
+
+    def subscribe_bars(self, symbol: str, timeframe: int, callback: Callable[[str, int, np.ndarray], None]) -> None:
+        """
+        Receives every new closed bar of a symbol and timeframe (MT5 constant) polled by the gateway:
+        callback(symbol, timeframe, rates) is called in the reader thread, with the rates of the bar as returned by
+        copy_rates_from_pos.
+        """
+        self._bar_callbacks.setdefault((symbol, timeframe), []).append(callback)
+        self._request(SUBSCRIBE, BAR, symbol, timeframe)
+
+    def unsubscribe(self, symbol: str, timeframe: int | None = None) -> None:
+        """
+        Stops the updates of the ticks of a symbol, or of its bars of a timeframe if one is given.
+        """
+        if timeframe is None:
+            self._tick_callbacks.pop(symbol, None)
+            self._request(UNSUBSCRIBE, TICK, symbol)
+        else:
+            self._bar_callbacks.pop((symbol, timeframe), None)
+            self._request(UNSUBSCRIBE, BAR, symbol, timeframe)
+
+    def initialize(self, **kwargs) -> bool:
+        return self._call('terminal_info') is not None
+
+    def shutdown(self) -> None:
+        self._connection.close()
+
+    def last_error(self) -> tuple:
+        return getattr(self._errors, 'last', (1, "Success"))
+
+    def terminal_info(self):
+        return self._call('terminal_info')
+
+    def account_info(self):
+        return self._call('account_info')
+
+    def symbols_get(self) -> tuple | None:
+        return self._call('symbols_get')
+
+    def symbol_info(self, symbol: str):
+        return self._call('symbol_info', symbol)
+
+    def symbol_info_tick(self, symbol: str):
+        return self._call('symbol_info_tick', symbol)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return self._call('symbol_select', symbol, enable)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        return self._call('copy_rates_from_pos', symbol, timeframe, start_pos, count)
+
+    def positions_get(self, symbol: str | None = None, ticket: int | None = None) -> tuple | None:
+        return self._call('positions_get', symbol=symbol, ticket=ticket)
+
+    def orders_get(self, symbol: str | None = None) -> tuple | None:
+        return self._call('orders_get', symbol=symbol)
+
+    def history_deals_get(self, ticket: int | None = None, position: int | None = None) -> tuple | None:
+        return self._call('history_deals_get', ticket=ticket, position=position)
+
+    def order_send(self, request: dict):
+        return self._call('order_send', request)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from utils.metrics import MetricsRegistry
+from ..interfaces.broker_interface import IBroker
+from ..broker_constants import BrokerConstants
+
+
+class InstrumentedBroker(BrokerConstants, IBroker):
+
+    def __init__(self, broker: IBroker, metrics: MetricsRegistry):
+        """
+        Proxy of a broker that counts the calls and the time spent in every function of the MT5 API
+        (broker_calls_total and broker_call_duration_seconds, labelled by function), to see the pressure the
+        framework puts on the terminal.
+
+        Args:
+            broker (IBroker): The instrumented broker.
+            metrics (MetricsRegistry): The registry of the metrics.
+        """
+        self.broker = broker
+        self.metrics = metrics
+        self._timers = {}
+
+    def __getattr__(self, name: str):
+        # Anything else (e.g. the clock of a SimulatedBroker) goes to the instrumented broker
+        return getattr(self.broker, name)
+
+    def _call(self, function: str, *args, **kwargs):
+        timer = self._timers.get(function)
+        if timer is None:
+            timer = self._timers[function] = self.metrics.timer(
+                "broker_call_duration_seconds", "Calls to the broker API and time spent in them.",
+                labels={'function': function})
+        start = time.perf_counter()
+        try:
+            return getattr(self.broker, function)(*args, **kwargs)
+        finally:
+            timer.observe(time.perf_counter() - start)
+
+    def initialize(self, **kwargs) -> bool:
+        return self._call('initialize', **kwargs)
+
+    def shutdown(self) -> None:
+        self._call('shutdown')
+
+    def last_error(self) -> tuple:
+        return self.broker.last_error()
+
+    def terminal_info(self):
+        return self._call('terminal_info')
+
+    def account_info(self):
+        return self._call('account_info')
+
+    def symbols_get(self) -> tuple | None:
+        return self._call('symbols_get')
+
+    def symbol_info(self, symbol: str):
+        return self._call('symbol_info', symbol)
+
+    def symbol_info_tick(self, symbol: str):
+        return self._call('symbol_info_tick', symbol)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return self._call('symbol_select', symbol, enable)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        return self._call('copy_rates_from_pos', symbol, timeframe, start_pos, count)
+
+    def positions_get(self, symbol: str | None = None, ticket: int | None = None) -> tuple | None:
+        return self._call('positions_get', symbol=symbol, ticket=ticket)
+
+    def orders_get(self, symbol: str | None = None) -> tuple | None:
+        return self._call('orders_get', symbol=symbol)
+
+    def history_deals_get(self, ticket: int | None = None, position: int | None = None) -> tuple | None:
+        return self._call('history_deals_get', ticket=ticket, position=position)
+
+    def order_send(self, request: dict):
+        return self._call('order_send', request)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import numpy as np
+
+from ..interfaces.broker_interface import IBroker
+from ..broker_constants import BrokerConstants
+
+
+class MT5Broker(BrokerConstants, IBroker):
+
+    def __init__(self):
+        """
+        Adapter of the MetaTrader5 package (Windows only).
+
+        The package is imported when the adapter is created, so the rest of the framework can be imported (and run
+        with another broker) on hosts where it is not installed.
+
+        Raises:
+            ImportError: If the MetaTrader5 package is not installed.
+        """
+        import MetaTrader5 as mt5
+        self._mt5 = mt5
+
+    def initialize(self, **kwargs) -> bool:
+        return self._mt5.initialize(**kwargs)
+
+    def shutdown(self) -> None:
+        self._mt5.shutdown()
+
+    def last_error(self) -> tuple:
+        return self._mt5.last_error()
+
+    def terminal_info(self):
+        return self._mt5.terminal_info()
+
+    def account_info(self):
+        return self._mt5.account_info()
+
+    def symbols_get(self) -> tuple | None:
+        return self._mt5.symbols_get()
+
+    def symbol_info(self, symbol: str):
+        return self._mt5.symbol_info(symbol)
+
+    def symbol_info_tick(self, symbol: str):
+        return self._mt5.symbol_info_tick(symbol)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return self._mt5.symbol_select(symbol, enable)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        return self._mt5.copy_rates_from_pos(symbol, timeframe, start_pos, count)
+
+    def positions_get(self, symbol: str | None = None, ticket: int | None = None) -> tuple | None:
+        if ticket is not None:
+            return self._mt5.positions_get(ticket=ticket)
+        if symbol is not None:
+            return self._mt5.positions_get(symbol=symbol)
+        return self._mt5.positions_get()
+
+    def orders_get(self, symbol: str | None = None) -> tuple | None:
+        if symbol is not None:
+            return self._mt5.orders_get(symbol=symbol)
+        return self._mt5.orders_get()
+
+    def history_deals_get(self, ticket: int | None = None, position: int | None = None) -> tuple | None:
+        if ticket is not None:
+            return self._mt5.history_deals_get(ticket=ticket)
+        return self._mt5.history_deals_get(position=position)
+
+    def order_send(self, request: dict):
+        return self._mt5.order_send(request)
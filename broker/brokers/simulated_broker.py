@@ -0,0 +1,514 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, Iterable
+
+import numpy as np
+
+from data_provider.bar_buffer import MT5_RATES_DTYPE, bars_to_mt5_rates, load_bar_history
+from data_provider.bar_store import BarStore
+from ..interfaces.broker_interface import IBroker
+from ..broker_constants import BrokerConstants
+
+
+# Same fields (subset) as the structures returned by the MetaTrader5 package
+TerminalInfo = namedtuple('TerminalInfo', 'connected trade_allowed name company')
+AccountInfo = namedtuple('AccountInfo', 'login trade_mode leverage margin_mode balance profit equity margin '
+                                        'margin_free currency name server company')
+SymbolInfo = namedtuple('SymbolInfo', 'name visible digits point spread trade_tick_size trade_contract_size '
+                                      'volume_min volume_max volume_step currency_base currency_profit '
+                                      'currency_margin bid ask')
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+TradePosition = namedtuple('TradePosition', 'ticket time type magic identifier volume price_open sl tp '
+                                            'price_current profit symbol comment')
+TradeOrder = namedtuple('TradeOrder', 'ticket time_setup type magic volume_current price_open sl tp symbol comment')
+TradeDeal = namedtuple('TradeDeal', 'ticket order time type magic position_id volume price symbol comment')
+OrderSendResult = namedtuple('OrderSendResult', 'retcode deal order volume price bid ask comment request')
+
+
+class SimulatedBroker(BrokerConstants, IBroker):
+
+    def __init__(self, bars: Dict[str, np.ndarray], timeframe: str, symbol_specs: Dict[str, dict] | None = None,
+                 balance: float = 10000.0, account_currency: str = "USD", leverage: int = 100,
+                 start_time: int | None = None, speed: float | None = None,
+                 latency: float | Dict[str, float] = 0.0, jitter: float = 0.0, seed: int = 0):
+        """
+        Deterministic in-process broker that replays historical bars through the MT5 API, so the whole framework
+        (live DataProvider, sizers, portfolio, order execution) runs without a terminal.
+
+        The broker has its own server clock. The bar being formed at the server time is position 0 of
+        copy_rates_from_pos (returned complete: the framework only reads closed bars) and the ticks are built
+        from its open price and spread. The clock is moved with advance/set_time/step, or follows the wall clock
+        (times `speed`) if a speed is given. Every time the clock moves, the bars closed in between are used to
+        trigger the pending orders and the SL/TP of the open positions (SL first if both are hit in the same bar).
+
+        Market orders are filled at the current bid/ask, pending orders and SL/TP at their price. The account is
+        a hedging account: every market order opens a new position unless it refers to a position to close. Every
+        fill (including the pending orders and SL/TP) is recorded as a deal of its position (history_deals_get).
+
+        Every call waits for the configured latency (plus a uniform random jitter drawn from a seeded generator),
+        to load-test and profile the framework with realistic broker round trips.
+
+        Args:
+            bars (Dict[str, np.ndarray]): The bars of every symbol as BAR_DTYPE arrays.
+            timeframe (str): The timeframe of the bars (e.g. '1min'). Only this timeframe can be requested.
+            symbol_specs (Dict[str, dict] | None): Overrides of the symbol info fields per symbol (e.g. digits,
+                trade_contract_size, volume_min, currency_profit). 6-letter symbols default to forex specs.
+            balance (float): The initial balance of the account.
+            account_currency (str): The currency of the account.
+            leverage (int): The leverage of the account.
+            start_time (int | None): The initial server time as epoch seconds (default: the opening time of the
+                first bar of the history, i.e. there are no closed bars yet).
+            speed (float | None): If given, the server clock follows the wall clock multiplied by this factor.
+            latency (float | Dict[str, float]): Delay (seconds) of every call, or per method name (with an
+                optional 'default' key).
+            jitter (float): Maximum random delay (seconds) added to the latency.
+            seed (int): Seed of the jitter generator.
+        """
+        if timeframe not in self.TIMEFRAMES:
+            raise Exception(f"ERROR: Timeframe {timeframe} is not supported by the simulated broker")
+
+        self.timeframe = timeframe
+        self._mt5_timeframe = self.TIMEFRAMES[timeframe]
+        self._rates: Dict[str, np.ndarray] = {symbol: bars_to_mt5_rates(symbol_bars) for symbol, symbol_bars in bars.items()}
+        self._times: Dict[str, np.ndarray] = {symbol: rates['time'] for symbol, rates in self._rates.items()}
+        self._symbol_specs: Dict[str, dict] = {symbol: self._default_symbol_spec(symbol, account_currency)
+                                               for symbol in self._rates}
+        for symbol, spec in (symbol_specs or {}).items():
+            if symbol in self._symbol_specs:
+                self._symbol_specs[symbol].update(spec)
+
+        # Account
+        self.account_currency = account_currency
+        self.leverage = leverage
+        self.balance = balance
+
+        # Trading state
+        self._positions: Dict[int, TradePosition] = {}
+        self._orders: Dict[int, TradeOrder] = {}
+        self._deals: Dict[int, TradeDeal] = {}
+        self._next_ticket: int = 1
+        self._last_error: tuple = (1, "Success")
+
+        # The calls can come from several threads at once (e.g. the order executor): the trading state is only
+        # read and changed under this lock, after the latency of the call
+        self._state_lock = threading.RLock()
+
+        # Server clock (the index of the bar being formed is cached per symbol)
+        all_times = [times for times in self._times.values() if len(times) > 0]
+        self._timeline: np.ndarray = np.unique(np.concatenate(all_times)) if all_times else np.empty(0, dtype=np.int64)
+        first_time = int(self._timeline[0]) if len(self._timeline) > 0 else 0
+        self._server_time: int = start_time if start_time is not None else first_time
+        self._forming: Dict[str, int] = {symbol: self._bar_index(symbol, self._server_time) for symbol in self._rates}
+        self.speed = speed
+        self._wall_start: float = time.monotonic()
+        self._server_start: int = self._server_time
+
+        # Latency injection
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+        # Number of calls per method (to profile how many broker round trips the framework makes)
+        self.call_counts: Dict[str, int] = {}
+
+    @classmethod
+    def from_history_files(cls, data_dir: str, symbol_list: Iterable[str], timeframe: str,
+                           start_date: datetime | None = None, end_date: datetime | None = None,
+                           **kwargs) -> SimulatedBroker:
+        """
+        Creates a SimulatedBroker from the history files used by the HistoricalDataProvider
+        ("{data_dir}/{symbol}_{timeframe}.parquet" or ".csv"). The rest of the arguments are passed to the
+        constructor.
+        """
+        bars = {symbol: load_bar_history(data_dir, symbol, timeframe, start_date, end_date) for symbol in symbol_list}
+        return cls(bars=bars, timeframe=timeframe, **kwargs)
+
+    @classmethod
+    def from_bar_store(cls, bar_store: BarStore, symbol_list: Iterable[str], timeframe: str,
+                       start_date: datetime | None = None, end_date: datetime | None = None,
+                       **kwargs) -> SimulatedBroker:
+        """
+        Creates a SimulatedBroker from the bars of a BarStore. The rest of the arguments are passed to the
+        constructor.
+        """
+        bars = {symbol: bar_store.read(symbol, timeframe, start_date, end_date) for symbol in symbol_list}
+        return cls(bars=bars, timeframe=timeframe, **kwargs)
+
+    @staticmethod
+    def _default_symbol_spec(symbol: str, account_currency: str) -> dict:
+        if len(symbol) == 6 and symbol.isalpha():
+            digits = 3 if symbol[3:] == "JPY" else 5
+            return {'digits': digits, 'point': 10 ** -digits, 'trade_tick_size': 10 ** -digits,
+                    'trade_contract_size': 100000.0, 'volume_min': 0.01, 'volume_max': 100.0, 'volume_step': 0.01,
+                    'currency_base': symbol[:3], 'currency_profit': symbol[3:], 'currency_margin': symbol[:3]}
+
+        return {'digits': 2, 'point': 0.01, 'trade_tick_size': 0.01, 'trade_contract_size': 1.0, 'volume_min': 0.01,
+                'volume_max': 100.0, 'volume_step': 0.01, 'currency_base': account_currency,
+                'currency_profit': account_currency, 'currency_margin': account_currency}
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Server clock
+    # ------------------------------------------------------------------------------------------------------------
+    @property
+    def server_time(self) -> int:
+        self._sync_clock()
+        return self._server_time
+
+    def _bar_index(self, symbol: str, server_time: int) -> int:
+        # Index of the bar being formed at the given time (-1 if the history has not started yet)
+        return int(np.searchsorted(self._times[symbol], server_time, side='right')) - 1
+
+    def _sync_clock(self) -> None:
+        if self.speed is not None:
+            target = self._server_start + int((time.monotonic() - self._wall_start) * self.speed)
+            if target > self._server_time:
+                self._move_clock(target)
+
+    def set_time(self, server_time: int) -> None:
+        """
+        Moves the server clock forward to the given time (epoch seconds).
+        """
+        if server_time > self._server_time:
+            self._move_clock(server_time)
+
+    def advance(self, seconds: int) -> None:
+        """
+        Moves the server clock forward the given number of seconds.
+        """
+        self.set_time(self._server_time + seconds)
+
+    def step(self) -> bool:
+        """
+        Moves the server clock to the opening time of the next bar of any symbol.
+
+        Returns:
+            bool: False if there are no more bars in the history.
+        """
+        next_index = int(np.searchsorted(self._timeline, self._server_time, side='right'))
+        if next_index >= len(self._timeline):
+            return False
+        self._move_clock(int(self._timeline[next_index]))
+        return True
+
+    def has_more_data(self) -> bool:
+        return len(self._timeline) > 0 and self._server_time < int(self._timeline[-1])
+
+    def _move_clock(self, server_time: int) -> None:
+        with self._state_lock:
+            if server_time <= self._server_time:
+                return
+            self._server_time = server_time
+            for symbol in self._rates:
+                forming = self._bar_index(symbol, server_time)
+                # Bars closed since the last move: trigger the pending orders and the SL/TP with their range
+                for index in range(max(self._forming[symbol], 0), forming):
+                    self._process_closed_bar(symbol, self._rates[symbol][index])
+                self._forming[symbol] = forming
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Latency injection
+    # ------------------------------------------------------------------------------------------------------------
+    def _call(self, method: str) -> None:
+        self.call_counts[method] = self.call_counts.get(method, 0) + 1
+
+        if isinstance(self.latency, dict):
+            delay = self.latency.get(method, self.latency.get('default', 0.0))
+        else:
+            delay = self.latency
+        if self.jitter > 0.0:
+            delay += self._random.uniform(0.0, self.jitter)
+        if delay > 0.0:
+            time.sleep(delay)
+
+        self._sync_clock()
+        self._last_error = (1, "Success")
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Market data
+    # ------------------------------------------------------------------------------------------------------------
+    def _prices(self, symbol: str) -> tuple | None:
+        # Bid and ask of the symbol at the server time (first tick of the bar being formed)
+        forming = self._forming[symbol]
+        if forming < 0:
+            return None
+        rate = self._rates[symbol][forming]
+        bid = float(rate['open'])
+        return bid, bid + int(rate['spread']) * self._symbol_specs[symbol]['point']
+
+    def initialize(self, **kwargs) -> bool:
+        self._call('initialize')
+        return True
+
+    def shutdown(self) -> None:
+        self._call('shutdown')
+
+    def last_error(self) -> tuple:
+        return self._last_error
+
+    def terminal_info(self):
+        self._call('terminal_info')
+        return TerminalInfo(connected=True, trade_allowed=True, name="SimulatedBroker", company="SimulatedBroker")
+
+    def symbols_get(self) -> tuple | None:
+        self._call('symbols_get')
+        return tuple(self._symbol_info(symbol) for symbol in self._rates)
+
+    def symbol_info(self, symbol: str):
+        self._call('symbol_info')
+        if symbol not in self._rates:
+            self._last_error = (-4, "Terminal: Not found")
+            return None
+        return self._symbol_info(symbol)
+
+    def _symbol_info(self, symbol: str) -> SymbolInfo:
+        spec = self._symbol_specs[symbol]
+        prices = self._prices(symbol)
+        bid, ask = prices if prices is not None else (0.0, 0.0)
+        spread = int(round((ask - bid) / spec['point']))
+        return SymbolInfo(name=symbol, visible=True, spread=spread, bid=bid, ask=ask, **spec)
+
+    def symbol_info_tick(self, symbol: str):
+        self._call('symbol_info_tick')
+        prices = self._prices(symbol) if symbol in self._rates else None
+        if prices is None:
+            self._last_error = (-4, "Terminal: Not found")
+            return None
+        return Tick(time=self._server_time, bid=prices[0], ask=prices[1], last=0.0, volume=0,
+                    time_msc=self._server_time * 1000, flags=0, volume_real=0.0)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        self._call('symbol_select')
+        return symbol in self._rates
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        self._call('copy_rates_from_pos')
+        if symbol not in self._rates or timeframe != self._mt5_timeframe:
+            self._last_error = (-2, "Terminal: Invalid params")
+            return None
+
+        end = self._forming[symbol] + 1 - start_pos
+        if end <= 0:
+            return np.empty(0, dtype=MT5_RATES_DTYPE)
+        return self._rates[symbol][max(0, end - count):end].copy()
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Account and trading
+    # ------------------------------------------------------------------------------------------------------------
+    def _to_account_currency(self, amount: float, currency: str) -> float:
+        # Direct pair only (the simulator has no conversion graph); without a pair the amount is not converted
+        if currency == self.account_currency:
+            return amount
+        direct = currency + self.account_currency
+        inverse = self.account_currency + currency
+        if direct in self._rates and self._prices(direct) is not None:
+            return amount * self._prices(direct)[0]
+        if inverse in self._rates and self._prices(inverse) is not None:
+            return amount / self._prices(inverse)[0]
+        return amount
+
+    def _position_profit(self, position: TradePosition, close_price: float, volume: float) -> float:
+        spec = self._symbol_specs[position.symbol]
+        direction = 1.0 if position.type == self.POSITION_TYPE_BUY else -1.0
+        profit = direction * (close_price - position.price_open) * volume * spec['trade_contract_size']
+        return self._to_account_currency(profit, spec['currency_profit'])
+
+    def _position_margin(self, symbol: str, volume: float, price: float) -> float:
+        spec = self._symbol_specs[symbol]
+        margin = volume * spec['trade_contract_size'] * price / self.leverage
+        return self._to_account_currency(margin, spec['currency_profit'])
+
+    def _close_price(self, position: TradePosition) -> float:
+        bid, ask = self._prices(position.symbol)
+        return bid if position.type == self.POSITION_TYPE_BUY else ask
+
+    def account_info(self):
+        self._call('account_info')
+        return self._account_info()
+
+    def _account_info(self):
+        profit = 0.0
+        margin = 0.0
+        with self._state_lock:
+            for position in self._positions.values():
+                profit += self._position_profit(position, self._close_price(position), position.volume)
+                margin += self._position_margin(position.symbol, position.volume, position.price_open)
+        equity = self.balance + profit
+        return AccountInfo(login=0, trade_mode=self.ACCOUNT_TRADE_MODE_DEMO, leverage=self.leverage,
+                           margin_mode=self.ACCOUNT_MARGIN_MODE_RETAIL_HEDGING, balance=self.balance, profit=profit,
+                           equity=equity, margin=margin, margin_free=equity - margin, currency=self.account_currency,
+                           name="Simulated account", server="SimulatedBroker", company="SimulatedBroker")
+
+    def positions_get(self, symbol: str | None = None, ticket: int | None = None) -> tuple | None:
+        self._call('positions_get')
+        positions = []
+        with self._state_lock:
+            open_positions = list(self._positions.values())
+        for position in open_positions:
+            if (symbol is None or position.symbol == symbol) and (ticket is None or position.ticket == ticket):
+                price = self._close_price(position)
+                positions.append(position._replace(price_current=price,
+                                                   profit=self._position_profit(position, price, position.volume)))
+        return tuple(positions)
+
+    def orders_get(self, symbol: str | None = None) -> tuple | None:
+        self._call('orders_get')
+        with self._state_lock:
+            return tuple(order for order in self._orders.values() if symbol is None or order.symbol == symbol)
+
+    def history_deals_get(self, ticket: int | None = None, position: int | None = None) -> tuple | None:
+        self._call('history_deals_get')
+        with self._state_lock:
+            if ticket is not None:
+                deal = self._deals.get(ticket)
+                return (deal,) if deal is not None else ()
+            return tuple(deal for deal in self._deals.values() if position is None or deal.position_id == position)
+
+    def _new_ticket(self) -> int:
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _new_deal(self, order: int, position: TradePosition, buy: bool, volume: float, price: float) -> int:
+        ticket = self._new_ticket()
+        self._deals[ticket] = TradeDeal(ticket=ticket, order=order, time=self._server_time,
+                                        type=self.DEAL_TYPE_BUY if buy else self.DEAL_TYPE_SELL, magic=position.magic,
+                                        position_id=position.ticket, volume=volume, price=price,
+                                        symbol=position.symbol, comment=position.comment)
+        return ticket
+
+    def _result(self, request: dict, retcode: int, comment: str, deal: int = 0, order: int = 0, volume: float = 0.0,
+                price: float = 0.0) -> OrderSendResult:
+        prices = self._prices(request.get('symbol', '')) if request.get('symbol') in self._rates else None
+        bid, ask = prices if prices is not None else (0.0, 0.0)
+        return OrderSendResult(retcode=retcode, deal=deal, order=order, volume=volume, price=price, bid=bid, ask=ask,
+                               comment=comment, request=request)
+
+    def _valid_volume(self, symbol: str, volume: float) -> bool:
+        spec = self._symbol_specs[symbol]
+        steps = volume / spec['volume_step']
+        return spec['volume_min'] <= volume <= spec['volume_max'] and abs(steps - round(steps)) < 1e-6
+
+    def order_send(self, request: dict):
+        self._call('order_send')
+        with self._state_lock:
+            return self._process_request(request)
+
+    def _process_request(self, request: dict):
+        action = request.get('action')
+        symbol = request.get('symbol')
+
+        if action == self.TRADE_ACTION_SLTP:
+            position = self._positions.get(request.get('position'))
+            if position is None:
+                return self._result(request, self.TRADE_RETCODE_POSITION_CLOSED, "Position doesn't exist")
+            self._positions[position.ticket] = position._replace(sl=request.get('sl', 0.0), tp=request.get('tp', 0.0))
+            return self._result(request, self.TRADE_RETCODE_DONE, "Request executed")
+
+        if action == self.TRADE_ACTION_REMOVE:
+            if self._orders.pop(request.get('order'), None) is None:
+                return self._result(request, self.TRADE_RETCODE_INVALID, "Order doesn't exist")
+            return self._result(request, self.TRADE_RETCODE_DONE, "Request executed", order=request.get('order'))
+
+        if symbol not in self._rates or self._prices(symbol) is None:
+            return self._result(request, self.TRADE_RETCODE_INVALID, "Invalid request: unknown symbol or no prices")
+
+        volume = float(request.get('volume', 0.0))
+        if not self._valid_volume(symbol, volume):
+            return self._result(request, self.TRADE_RETCODE_INVALID_VOLUME, "Invalid volume")
+
+        order_type = request.get('type')
+        if action == self.TRADE_ACTION_DEAL and order_type in (self.ORDER_TYPE_BUY, self.ORDER_TYPE_SELL):
+            bid, ask = self._prices(symbol)
+            price = ask if order_type == self.ORDER_TYPE_BUY else bid
+
+            if request.get('position'):
+                return self._close_position(request, request['position'], order_type, volume, price)
+
+            if self._position_margin(symbol, volume, price) > self._account_info().margin_free:
+                return self._result(request, self.TRADE_RETCODE_NO_MONEY, "No money")
+
+            ticket = self._open_position(symbol, order_type, volume, price, request)
+            deal = self._new_deal(ticket, self._positions[ticket], order_type == self.ORDER_TYPE_BUY, volume, price)
+            return self._result(request, self.TRADE_RETCODE_DONE, "Request executed", deal=deal,
+                                order=ticket, volume=volume, price=price)
+
+        if action == self.TRADE_ACTION_PENDING and order_type in (self.ORDER_TYPE_BUY_LIMIT, self.ORDER_TYPE_SELL_LIMIT,
+                                                                  self.ORDER_TYPE_BUY_STOP, self.ORDER_TYPE_SELL_STOP):
+            ticket = self._new_ticket()
+            self._orders[ticket] = TradeOrder(ticket=ticket, time_setup=self._server_time, type=order_type,
+                                              magic=request.get('magic', 0), volume_current=volume,
+                                              price_open=float(request.get('price', 0.0)), sl=request.get('sl', 0.0),
+                                              tp=request.get('tp', 0.0), symbol=symbol,
+                                              comment=request.get('comment', ''))
+            return self._result(request, self.TRADE_RETCODE_PLACED, "Order placed", order=ticket, volume=volume,
+                                price=float(request.get('price', 0.0)))
+
+        return self._result(request, self.TRADE_RETCODE_INVALID, "Invalid request")
+
+    def _open_position(self, symbol: str, order_type: int, volume: float, price: float, request: dict) -> int:
+        ticket = self._new_ticket()
+        position_type = self.POSITION_TYPE_BUY if order_type in (self.ORDER_TYPE_BUY, self.ORDER_TYPE_BUY_LIMIT,
+                                                                   self.ORDER_TYPE_BUY_STOP) else self.POSITION_TYPE_SELL
+        self._positions[ticket] = TradePosition(ticket=ticket, time=self._server_time, type=position_type,
+                                                magic=request.get('magic', 0), identifier=ticket, volume=volume,
+                                                price_open=price, sl=request.get('sl', 0.0), tp=request.get('tp', 0.0),
+                                                price_current=price, profit=0.0, symbol=symbol,
+                                                comment=request.get('comment', ''))
+        return ticket
+
+    def _close_position(self, request: dict, ticket: int, order_type: int, volume: float, price: float):
+        position = self._positions.get(ticket)
+        if position is None:
+            return self._result(request, self.TRADE_RETCODE_POSITION_CLOSED, "Position doesn't exist")
+        closing_type = self.ORDER_TYPE_SELL if position.type == self.POSITION_TYPE_BUY else self.ORDER_TYPE_BUY
+        if order_type != closing_type or volume > position.volume + 1e-9:
+            return self._result(request, self.TRADE_RETCODE_INVALID, "Invalid close request")
+
+        self._reduce_position(position, volume, price)
+        deal = self._new_deal(ticket, position, order_type == self.ORDER_TYPE_BUY, volume, price)
+        return self._result(request, self.TRADE_RETCODE_DONE, "Request executed", deal=deal,
+                            order=ticket, volume=volume, price=price)
+
+    def _reduce_position(self, position: TradePosition, volume: float, price: float) -> None:
+        self.balance += self._position_profit(position, price, volume)
+        remaining = round(position.volume - volume, 8)
+        if remaining > 0.0:
+            self._positions[position.ticket] = position._replace(volume=remaining)
+        else:
+            del self._positions[position.ticket]
+
+    def _process_closed_bar(self, symbol: str, rate: np.void) -> None:
+        point = self._symbol_specs[symbol]['point']
+        low, high = float(rate['low']), float(rate['high'])
+        ask_low, ask_high = low + int(rate['spread']) * point, high + int(rate['spread']) * point
+
+        for order in [order for order in self._orders.values() if order.symbol == symbol]:
+            triggered = ((order.type == self.ORDER_TYPE_BUY_LIMIT and ask_low <= order.price_open) or
+                         (order.type == self.ORDER_TYPE_BUY_STOP and ask_high >= order.price_open) or
+                         (order.type == self.ORDER_TYPE_SELL_LIMIT and high >= order.price_open) or
+                         (order.type == self.ORDER_TYPE_SELL_STOP and low <= order.price_open))
+            if triggered:
+                del self._orders[order.ticket]
+                ticket = self._open_position(symbol, order.type, order.volume_current, order.price_open,
+                                             {'magic': order.magic, 'sl': order.sl, 'tp': order.tp,
+                                              'comment': order.comment})
+                self._new_deal(order.ticket, self._positions[ticket],
+                               order.type in (self.ORDER_TYPE_BUY_LIMIT, self.ORDER_TYPE_BUY_STOP),
+                               order.volume_current, order.price_open)
+
+        for position in [position for position in self._positions.values() if position.symbol == symbol]:
+            if position.type == self.POSITION_TYPE_BUY:
+                hit_sl = position.sl > 0.0 and low <= position.sl
+                hit_tp = position.tp > 0.0 and high >= position.tp
+            else:
+                hit_sl = position.sl > 0.0 and ask_high >= position.sl
+                hit_tp = position.tp > 0.0 and ask_low <= position.tp
+            if hit_sl or hit_tp:
+                price = position.sl if hit_sl else position.tp
+                self._reduce_position(position, position.volume, price)
+                self._new_deal(0, position, position.type == self.POSITION_TYPE_SELL, position.volume, price)
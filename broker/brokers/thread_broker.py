@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ..interfaces.broker_interface import IBroker
+from ..broker_constants import BrokerConstants
+
+
+class ThreadBroker(BrokerConstants, IBroker):
+
+    def __init__(self, broker: IBroker):
+        """
+        Proxy of a broker that makes every call of the MT5 API from one dedicated thread, whatever the thread of the
+        caller (the MetaTrader5 module must not be called from several threads at once). The caller waits for the
+        result as with the broker itself; a call made from the broker thread (e.g. a function run in `executor`)
+        goes straight to the broker.
+
+        Args:
+            broker (IBroker): The broker.
+        """
+        self.broker = broker
+        # The executor of the broker thread: the functions submitted to it can call the broker directly
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="BrokerCall")
+        self._thread_id: int = self.executor.submit(threading.get_ident).result()
+
+    def __getattr__(self, name: str):
+        # Anything else (e.g. the clock of a SimulatedBroker) goes to the broker
+        return getattr(self.broker, name)
+
+    def _call(self, function: str, *args, **kwargs):
+        if threading.get_ident() == self._thread_id:
+            return getattr(self.broker, function)(*args, **kwargs)
+        return self.executor.submit(getattr(self.broker, function), *args, **kwargs).result()
+
+    def initialize(self, **kwargs) -> bool:
+        return self._call('initialize', **kwargs)
+
+    def shutdown(self) -> None:
+        self._call('shutdown')
+
+    def last_error(self) -> tuple:
+        return self._call('last_error')
+
+    def terminal_info(self):
+        return self._call('terminal_info')
+
+    def account_info(self):
+        return self._call('account_info')
+
+    def symbols_get(self) -> tuple | None:
+        return self._call('symbols_get')
+
+    def symbol_info(self, symbol: str):
+        return self._call('symbol_info', symbol)
+
+    def symbol_info_tick(self, symbol: str):
+        return self._call('symbol_info_tick', symbol)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return self._call('symbol_select', symbol, enable)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        return self._call('copy_rates_from_pos', symbol, timeframe, start_pos, count)
+
+    def positions_get(self, symbol: str | None = None, ticket: int | None = None) -> tuple | None:
+        return self._call('positions_get', symbol=symbol, ticket=ticket)
+
+    def orders_get(self, symbol: str | None = None) -> tuple | None:
+        return self._call('orders_get', symbol=symbol)
+
+    def history_deals_get(self, ticket: int | None = None, position: int | None = None) -> tuple | None:
+        return self._call('history_deals_get', ticket=ticket, position=position)
+
+    def order_send(self, request: dict):
+        return self._call('order_send', request)
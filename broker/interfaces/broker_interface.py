@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Protocol
+
+import numpy as np
+
+
+class IBroker(Protocol):
+    """
+    Calls of the MT5 API used by the framework. The implementations return the same structures as the MetaTrader5
+    package (named tuples with the same fields, numpy structured arrays for the rates), and expose the constants of
+    BrokerConstants as attributes.
+    """
+
+    def initialize(self, **kwargs) -> bool:
+        ...
+
+    def shutdown(self) -> None:
+        ...
+
+    def last_error(self) -> tuple:
+        ...
+
+    def terminal_info(self):
+        ...
+
+    def account_info(self):
+        ...
+
+    def symbols_get(self) -> tuple | None:
+        ...
+
+    def symbol_info(self, symbol: str):
+        ...
+
+    def symbol_info_tick(self, symbol: str):
+        ...
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        ...
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        ...
+
+    def positions_get(self, symbol: str | None = None, ticket: int | None = None) -> tuple | None:
+        ...
+
+    def orders_get(self, symbol: str | None = None) -> tuple | None:
+        ...
+
+    def history_deals_get(self, ticket: int | None = None, position: int | None = None) -> tuple | None:
+        ...
+
+    def order_send(self, request: dict):
+        ...
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from broker.brokers.thread_broker import ThreadBroker
+from broker.interfaces.broker_interface import IBroker
+from utils.metrics import Counter
+from .bar_store import BarStore
+from .data_provider import DataProvider
+from .poll_scheduler import PollScheduler
+
+
+class AsyncDataProvider(DataProvider):
+
+    def __init__(self, events_queue: Queue, symbol_list: list, timeframe: str, buffer_capacity: int = 1000,
+                 poll_scheduler: PollScheduler | None = None, broker: IBroker | None = None,
+                 stream_ticks: bool = False, stream_timeframes: Iterable[str] | None = None,
+                 tick_interval: float = 0.01, bar_store: BarStore | None = None, poll_interval: float = 0.01,
+                 broker_workers: int | None = None, resample_timeframes: Iterable[str] | None = None):
+        """
+        DataProvider for the asyncio mode (see AsyncTradingDirector): every symbol is polled by its own task on the
+        event loop, and the broker calls of the polls (the MT5 API is blocking) and the writes to the bar store run
+        in the broker thread, awaited by the task. A slow call for one symbol delays the broker calls queued after
+        it, but not the event loop: the events already queued are still handled while it is in progress.
+
+        With a ThreadBroker (see trading_app) its broker thread is used, so the polls share one thread with the
+        broker calls of the rest of the framework (sizing, risk checks, orders), which wait for it synchronously.
+
+        The polling is the same as in the DataProvider (closed bars with an optional poll scheduler, or ticks in
+        streaming mode), but every symbol sleeps until its own next check instead of sharing one polling loop.
+
+        Args:
+            events_queue (Queue): The queue where the DataEvents are put (an AsyncEventQueue).
+            symbol_list (list): The symbols.
+            timeframe (str): The main timeframe.
+            buffer_capacity (int): The number of closed bars cached per symbol.
+            poll_scheduler (PollScheduler | None): Decides when every symbol is polled (every `poll_interval`
+                seconds if None).
+            broker (IBroker | None): The broker (the default broker if None).
+            stream_ticks (bool): True to build the bars from the ticks (streaming mode).
+            stream_timeframes (Iterable[str] | None): The timeframes built in streaming mode (all of them if None).
+            tick_interval (float): The polling interval (seconds) of the ticks in streaming mode.
+            bar_store (BarStore | None): Local store of the bars of the polled timeframe (see DataProvider).
+            poll_interval (float): The polling interval (seconds) of the closed bars without a poll scheduler.
+            broker_workers (int | None): The threads of the broker calls when the broker is not a ThreadBroker
+                (1 if None: the MetaTrader5 module must not be called from several threads at once). Ignored with a
+                ThreadBroker, which has its own thread.
+            resample_timeframes (Iterable[str] | None): The timeframes built from the polled M1 bars (see
+                DataProvider).
+        """
+        super().__init__(events_queue=events_queue, symbol_list=symbol_list, timeframe=timeframe,
+                         buffer_capacity=buffer_capacity, poll_scheduler=poll_scheduler, broker=broker,
+                         stream_ticks=stream_ticks, stream_timeframes=stream_timeframes, tick_interval=tick_interval,
+                         bar_store=bar_store, resample_timeframes=resample_timeframes)
+        self.poll_interval: float = poll_interval
+        self.broker_workers: int = broker_workers if broker_workers is not None else 1
+        self._executor: ThreadPoolExecutor | None = None
+        # The new bars of every symbol waiting to be written to the bar store from the broker thread
+        self._bars_to_store: Dict[str, List[np.ndarray]] = {symbol: [] for symbol in self.symbols}
+
+        # Counters of the polls (data checks and polls without a new bar), set by the AsyncTradingDirector
+        self.poll_counters: tuple[Counter, Counter] | None = None
+
+    async def run(self) -> None:
+        """
+        Polls every symbol in its own task until cancelled.
+        """
+        own_executor = not isinstance(self.broker, ThreadBroker)
+        if own_executor:
+            self._executor = ThreadPoolExecutor(max_workers=self.broker_workers, thread_name_prefix="BrokerCall")
+        else:
+            self._executor = self.broker.executor
+        poll = self._stream_symbol_forever if self.tick_aggregator is not None else self._poll_symbol_forever
+        tasks: List[asyncio.Task] = [asyncio.create_task(poll(symbol), name=f"poll-{symbol}")
+                                     for symbol in self.symbols]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # A blocked broker call can not be interrupted: its thread is left to finish on its own
+            if own_executor:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _call_broker(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _store_bar(self, symbol: str, bars: np.ndarray) -> None:
+        # Called on the event loop while a poll is processed: the bar is written later from the broker thread
+        self._bars_to_store[symbol].append(bars)
+
+    async def _flush_bar_store(self, symbol: str) -> None:
+        pending = self._bars_to_store[symbol]
+        while pending:
+            await self._call_broker(super()._store_bar, symbol, pending.pop(0))
+
+    def _count_poll(self, empty: bool) -> None:
+        if self.poll_counters is not None:
+            self.poll_counters[0].value += 1
+            if empty:
+                self.poll_counters[1].value += 1
+
+    async def _poll_symbol_forever(self, symbol: str) -> None:
+        while True:
+            if self.poll_scheduler is not None:
+                delay = self.poll_scheduler.seconds_until_symbol_check(symbol)
+            else:
+                delay = self.poll_interval
+            await asyncio.sleep(delay)
+
+            bar_time = self._process_latest_bar(symbol, await self._call_broker(self._fetch_latest_bar, symbol))
+            await self._flush_bar_store(symbol)
+            self._count_poll(empty=not bar_time)
+            if self.poll_scheduler is not None:
+                self.poll_scheduler.record_poll(symbol, bar_time)
+
+    async def _stream_symbol_forever(self, symbol: str) -> None:
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            closed_bars = self._process_tick(symbol, await self._call_broker(self._fetch_tick, symbol))
+            await self._flush_bar_store(symbol)
+            self._count_poll(empty=closed_bars == 0)
+
+    def check_for_new_data(self) -> None:
+        """
+        The asyncio mode has no polling loop: the symbols are polled by the tasks of run.
+        """
+        raise Exception("AsyncDataProvider polls in its own tasks: use it with an AsyncTradingDirector")
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from events.events import Bar
+from utils.logger import get_logger
+
+
+logger = get_logger("data_provider")
+
+
+# Layout of a closed bar (same fields the DataProvider exposes, time as epoch seconds)
+BAR_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tickvol', '<u8'),
+    ('vol', '<u8'),
+    ('spread', '<i4'),
+])
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'tickvol', 'vol', 'spread']
+
+# Layout of the structured arrays returned by mt5.copy_rates_*
+MT5_RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+
+def bars_from_mt5_rates(rates: np.ndarray) -> np.ndarray:
+    """
+    Converts the structured array returned by mt5.copy_rates_* to the BAR_DTYPE layout.
+
+    Args:
+        rates (np.ndarray): The MT5 rates (fields time, open, high, low, close, tick_volume, spread, real_volume).
+
+    Returns:
+        np.ndarray: The bars as a BAR_DTYPE array.
+    """
+    bars = np.empty(len(rates), dtype=BAR_DTYPE)
+    bars['time'] = rates['time']
+    bars['open'] = rates['open']
+    bars['high'] = rates['high']
+    bars['low'] = rates['low']
+    bars['close'] = rates['close']
+    bars['tickvol'] = rates['tick_volume']
+    bars['vol'] = rates['real_volume']
+    bars['spread'] = rates['spread']
+    return bars
+
+
+def bars_to_mt5_rates(bars: np.ndarray) -> np.ndarray:
+    """
+    Converts a BAR_DTYPE array to the layout returned by mt5.copy_rates_* (inverse of bars_from_mt5_rates).
+
+    Args:
+        bars (np.ndarray): The bars as a BAR_DTYPE array.
+
+    Returns:
+        np.ndarray: The bars as a MT5_RATES_DTYPE array.
+    """
+    rates = np.empty(len(bars), dtype=MT5_RATES_DTYPE)
+    rates['time'] = bars['time']
+    rates['open'] = bars['open']
+    rates['high'] = bars['high']
+    rates['low'] = bars['low']
+    rates['close'] = bars['close']
+    rates['tick_volume'] = bars['tickvol']
+    rates['spread'] = bars['spread']
+    rates['real_volume'] = bars['vol']
+    return rates
+
+
+def load_bar_history(data_dir: str, symbol: str, timeframe: str, start_date: datetime | None = None,
+                     end_date: datetime | None = None) -> np.ndarray:
+    """
+    Loads the history file of a symbol: "{data_dir}/{symbol}_{timeframe}.parquet" or
+    "{data_dir}/{symbol}_{timeframe}.csv".
+
+    The file must contain a 'time' column (epoch seconds or a parseable datetime) and the OHLC columns. The MT5
+    column names 'tick_volume' and 'real_volume' are accepted as well as 'tickvol' and 'vol'.
+
+    Args:
+        data_dir (str): The directory that contains the history files.
+        symbol (str): The symbol to load.
+        timeframe (str): The timeframe of the bars (e.g. '1min').
+        start_date (datetime | None): Bars opened before this date are skipped.
+        end_date (datetime | None): Bars opened after this date are skipped.
+
+    Returns:
+        np.ndarray: The bars as a BAR_DTYPE array, oldest first (empty if there is no history file).
+    """
+    base_path = os.path.join(data_dir, f"{symbol}_{timeframe}")
+
+    if os.path.exists(f"{base_path}.parquet"):
+        bars = pd.read_parquet(f"{base_path}.parquet")
+    elif os.path.exists(f"{base_path}.csv"):
+        bars = pd.read_csv(f"{base_path}.csv")
+    else:
+        logger.warning("No history file found for %s %s in %s", symbol, timeframe, data_dir)
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    bars = bars.rename(columns={'tick_volume': 'tickvol', 'real_volume': 'vol'})
+    for column in ('tickvol', 'vol', 'spread'):
+        if column not in bars.columns:
+            bars[column] = 0
+
+    # Convert the time column to epoch seconds
+    if pd.api.types.is_numeric_dtype(bars['time']):
+        times = bars['time'].to_numpy(dtype=np.int64)
+    else:
+        times = pd.to_datetime(bars['time']).to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+    records = np.empty(len(bars), dtype=BAR_DTYPE)
+    records['time'] = times
+    for column in BAR_COLUMNS:
+        records[column] = bars[column].to_numpy()
+
+    # Sort the bars and apply the date filters
+    records = records[np.argsort(times, kind='stable')]
+    mask = np.ones(len(records), dtype=bool)
+    if start_date is not None:
+        mask &= records['time'] >= int(pd.Timestamp(start_date).timestamp())
+    if end_date is not None:
+        mask &= records['time'] <= int(pd.Timestamp(end_date).timestamp())
+
+    return records[mask]
+
+
+def bars_to_dataframe(bars: np.ndarray) -> pd.DataFrame:
+    """
+    Builds the DataFrame returned by DataProvider.get_latest_closed_bars from a BAR_DTYPE array.
+
+    Args:
+        bars (np.ndarray): The bars as a BAR_DTYPE array.
+
+    Returns:
+        pd.DataFrame: The bars indexed by their opening time, with the columns in BAR_COLUMNS.
+    """
+    index = pd.DatetimeIndex(bars['time'].astype('datetime64[s]').astype('datetime64[ns]'), name='time')
+    return pd.DataFrame({column: bars[column] for column in BAR_COLUMNS}, index=index)
+
+
+def bar_to_series(bar: np.void) -> pd.Series:
+    """
+    Builds the Series returned by DataProvider.get_latest_closed_bar from a single BAR_DTYPE record.
+
+    Args:
+        bar (np.void): The bar as a BAR_DTYPE record.
+
+    Returns:
+        pd.Series: The bar values named by the bar opening time, with the index in BAR_COLUMNS.
+    """
+    return pd.Series(np.array([bar[column] for column in BAR_COLUMNS], dtype=np.float64), index=BAR_COLUMNS,
+                     name=pd.Timestamp(int(bar['time']), unit='s'))
+
+
+def bar_from_record(bar: np.void) -> Bar:
+    """
+    Builds the Bar carried by a DataEvent from a single BAR_DTYPE record.
+
+    Args:
+        bar (np.void): The bar as a BAR_DTYPE record.
+
+    Returns:
+        Bar: The bar with plain Python values (the Bar fields follow the BAR_DTYPE order).
+    """
+    return Bar(*bar.item())
+
+
+class BarBuffer():
+
+    def __init__(self, capacity: int):
+        """
+        Fixed-capacity buffer with the most recent closed bars of a symbol, oldest first.
+
+        The bars live in a contiguous BAR_DTYPE array of twice the capacity: new bars are written after the last
+        one and the window is moved back to the start of the array when it reaches the end, so the latest N bars
+        are always a contiguous slice (no copy) and appending is amortized O(1).
+
+        Args:
+            capacity (int): The maximum number of bars kept in the buffer.
+        """
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=BAR_DTYPE)
+        self._start: int = 0
+        self._end: int = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def first_time(self) -> int:
+        return int(self._data['time'][self._start])
+
+    @property
+    def last_time(self) -> int:
+        return int(self._data['time'][self._end - 1])
+
+    def clear(self) -> None:
+        self._start = 0
+        self._end = 0
+
+    def append(self, bars: np.ndarray) -> None:
+        """
+        Appends bars newer than the latest one in the buffer, dropping the oldest ones beyond the capacity.
+
+        Args:
+            bars (np.ndarray): The new bars as a BAR_DTYPE array, oldest first.
+        """
+        bars = bars[-self.capacity:]
+        if self._end + len(bars) > len(self._data):
+            # Move the bars that are kept to the start of the array
+            kept = min(len(self), self.capacity - len(bars))
+            self._data[:kept] = self._data[self._end - kept:self._end]
+            self._start, self._end = 0, kept
+
+        self._data[self._end:self._end + len(bars)] = bars
+        self._end += len(bars)
+        self._start = max(self._start, self._end - self.capacity)
+
+    def prepend(self, bars: np.ndarray) -> None:
+        """
+        Adds bars older than the first one in the buffer, as long as there is capacity left.
+
+        Args:
+            bars (np.ndarray): The older bars as a BAR_DTYPE array, oldest first.
+        """
+        free = self.capacity - len(self)
+        if free <= 0 or len(bars) == 0:
+            return
+
+        bars = bars[-free:]
+        combined = np.concatenate((bars, self._data[self._start:self._end]))
+        self._data[:len(combined)] = combined
+        self._start, self._end = 0, len(combined)
+
+    def latest(self, num_bars: int) -> np.ndarray:
+        """
+        Returns a view of the latest `num_bars` bars (or all of them if there are fewer), oldest first.
+        """
+        return self._data[max(self._start, self._end - num_bars):self._end]
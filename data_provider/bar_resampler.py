@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from events.events import Bar
+from utils.logger import get_logger
+from utils.utils import Utils
+from .bar_buffer import BAR_DTYPE
+
+
+logger = get_logger("data_provider")
+
+
+# Timeframe of the bars that are resampled
+SOURCE_TIMEFRAME = '1min'
+
+# Fields of the bar being formed (a list, updated in place on every M1 bar)
+_TIME, _OPEN, _HIGH, _LOW, _CLOSE, _TICKVOL, _VOL, _SPREAD, _CLOSE_TIME = range(9)
+
+
+def _check_timeframe(timeframe: str) -> None:
+    if (timeframe != '1M' and timeframe not in Utils.TIMEFRAME_SECONDS) or timeframe == SOURCE_TIMEFRAME:
+        logger.error("Timeframe %s can not be resampled from %s bars", timeframe, SOURCE_TIMEFRAME)
+        raise Exception(f"Timeframe {timeframe} can not be resampled from {SOURCE_TIMEFRAME} bars")
+
+
+def bar_open_times(times: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    Vectorized Utils.bar_open_time: returns the opening time of the bar of the timeframe that contains every time.
+
+    Args:
+        times (np.ndarray): Times as epoch seconds (MT5 server time).
+        timeframe (str): The timeframe (e.g. '1h', '1d', '1M').
+
+    Returns:
+        np.ndarray: The opening times as epoch seconds (int64).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if timeframe == '1M':
+        return times.astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+    if timeframe == '1w':
+        # The epoch is a Thursday: the first Sunday is 3 days later
+        return times - (times - 3 * 86400) % Utils.TIMEFRAME_SECONDS['1w']
+    return times - times % Utils.TIMEFRAME_SECONDS[timeframe]
+
+
+def _bar_close_times(open_times: np.ndarray, timeframe: str) -> np.ndarray:
+    if timeframe == '1M':
+        months = open_times.astype('datetime64[s]').astype('datetime64[M]') + 1
+        return months.astype('datetime64[s]').astype(np.int64)
+    return open_times + Utils.TIMEFRAME_SECONDS[timeframe]
+
+
+def _group_bars(bars: np.ndarray, timeframe: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Groups consecutive M1 bars by the bar of the timeframe that contains them.
+
+    Returns:
+        Tuple: The opening time of every group, the position of its first and last M1 bar, and whether it is
+            closed (it is not the last group, or its last M1 bar closes at the closing time of the group).
+    """
+    groups = bar_open_times(bars['time'], timeframe)
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    ends = np.concatenate((starts[1:], [len(bars)])) - 1
+
+    closed = np.ones(len(starts), dtype=bool)
+    last_close = Utils.next_bar_time(int(bars['time'][-1]), SOURCE_TIMEFRAME)
+    closed[-1] = last_close >= _bar_close_times(groups[-1:], timeframe)[0]
+    return groups[starts], starts, ends, closed
+
+
+def resample_bars(bars: np.ndarray, timeframe: str, include_partial: bool = False) -> np.ndarray:
+    """
+    Builds the bars of a higher timeframe from M1 bars in one pass (for backtests and history): open of the first
+    M1 bar, highest high, lowest low, close of the last M1 bar, sum of the volumes and minimum spread.
+
+    The result is the same as adding the M1 bars one by one to a BarResampler: a bar is closed by its last M1 bar
+    (the one that closes at its closing time) or by the first M1 bar past it. The first bar only covers the M1
+    bars given (it may have started before them).
+
+    Args:
+        bars (np.ndarray): The M1 bars as a BAR_DTYPE array, oldest first, without duplicates.
+        timeframe (str): The target timeframe (e.g. '5min', '1h', '1d').
+        include_partial (bool): True to include the last bar if it is not closed yet (the partial bar).
+
+    Returns:
+        np.ndarray: The bars of the timeframe as a BAR_DTYPE array, oldest first.
+    """
+    _check_timeframe(timeframe)
+    if len(bars) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    open_times, starts, ends, closed = _group_bars(bars, timeframe)
+    resampled = np.empty(len(starts), dtype=BAR_DTYPE)
+    resampled['time'] = open_times
+    resampled['open'] = bars['open'][starts]
+    resampled['high'] = np.maximum.reduceat(bars['high'], starts)
+    resampled['low'] = np.minimum.reduceat(bars['low'], starts)
+    resampled['close'] = bars['close'][ends]
+    resampled['tickvol'] = np.add.reduceat(bars['tickvol'], starts)
+    resampled['vol'] = np.add.reduceat(bars['vol'], starts)
+    resampled['spread'] = np.minimum.reduceat(bars['spread'], starts)
+
+    if not include_partial and not closed[-1]:
+        return resampled[:-1]
+    return resampled
+
+
+def closing_positions(bars: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    Returns, for every closed bar of resample_bars(bars, timeframe), the position of the M1 bar that closes it (its
+    last M1 bar, or the first M1 bar past it), so a replay can emit every resampled bar right after that M1 bar.
+    """
+    _check_timeframe(timeframe)
+    if len(bars) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    open_times, starts, ends, closed = _group_bars(bars, timeframe)
+    closes_itself = bars['time'][ends] + Utils.TIMEFRAME_SECONDS[SOURCE_TIMEFRAME] >= _bar_close_times(open_times, timeframe)
+    positions = np.where(closes_itself, ends, ends + 1)
+    return positions if closed[-1] else positions[:-1]
+
+
+class BarResampler():
+
+    def __init__(self, timeframes: Iterable[str]):
+        """
+        Builds the bars of several higher timeframes (e.g. '5min', '1h', '1d') from the M1 bars of every symbol as
+        they close, so one M1 feed per symbol serves the strategies of every timeframe. The bars are the same ones
+        that resample_bars builds from the same M1 bars.
+
+        A bar is closed by its last M1 bar (the one that closes at its closing time), or by the first M1 bar past
+        it if that one is missing (e.g. a minute without ticks). The first bar of every symbol only covers the M1
+        bars added: use seed to start it from the history.
+
+        Args:
+            timeframes (Iterable[str]): The timeframes to build.
+        """
+        self.timeframes: List[str] = list(timeframes)
+        for timeframe in self.timeframes:
+            _check_timeframe(timeframe)
+
+        # symbol -> the bar being formed in every timeframe (in the order of self.timeframes), None if there is none
+        self._bars: Dict[str, List[list | None]] = {}
+        self._last_time: Dict[str, int] = {}
+
+    def seed(self, symbol: str, bars: np.ndarray) -> None:
+        """
+        Starts the bars being formed of a symbol from its latest M1 bars (BAR_DTYPE array, oldest first), as if
+        they had been added one by one, without returning the bars they close. The bars given should cover the
+        current bar of the longest timeframe.
+        """
+        if len(bars) == 0:
+            return
+
+        forming: List[list | None] = []
+        for timeframe in self.timeframes:
+            # Only the M1 bars of the latest bar of the timeframe matter
+            start = int(np.searchsorted(bars['time'], Utils.bar_open_time(int(bars['time'][-1]), timeframe)))
+            partial = resample_bars(bars[start:], timeframe, include_partial=True)[-1]
+            close_time = Utils.next_bar_time(int(partial['time']), timeframe)
+            if Utils.next_bar_time(int(bars['time'][-1]), SOURCE_TIMEFRAME) >= close_time:
+                forming.append(None)
+            else:
+                forming.append([int(partial['time']), float(partial['open']), float(partial['high']),
+                                float(partial['low']), float(partial['close']), int(partial['tickvol']),
+                                int(partial['vol']), int(partial['spread']), close_time])
+        self._bars[symbol] = forming
+        self._last_time[symbol] = int(bars['time'][-1])
+
+    def add_bar(self, symbol: str, bar: Bar) -> List[Tuple[str, Bar]]:
+        """
+        Adds a closed M1 bar of a symbol. Bars that are not newer than the last one of the symbol are ignored.
+
+        Args:
+            symbol (str): The symbol of the bar.
+            bar (Bar): The M1 bar.
+
+        Returns:
+            List[Tuple[str, Bar]]: The (timeframe, bar) closed by this M1 bar, in the order of the timeframes.
+        """
+        if bar.time <= self._last_time.get(symbol, -1):
+            return []
+        self._last_time[symbol] = bar.time
+        bar_close = Utils.next_bar_time(bar.time, SOURCE_TIMEFRAME)
+
+        forming = self._bars.get(symbol)
+        if forming is None:
+            forming = self._bars[symbol] = [None] * len(self.timeframes)
+
+        closed = []
+        for i, timeframe in enumerate(self.timeframes):
+            current = forming[i]
+            if current is not None and bar.time < current[_CLOSE_TIME]:
+                if bar.high > current[_HIGH]:
+                    current[_HIGH] = bar.high
+                if bar.low < current[_LOW]:
+                    current[_LOW] = bar.low
+                current[_CLOSE] = bar.close
+                current[_TICKVOL] += bar.tickvol
+                current[_VOL] += bar.vol
+                if bar.spread < current[_SPREAD]:
+                    current[_SPREAD] = bar.spread
+            else:
+                if current is not None:
+                    # A bar whose last M1 bar is missing is closed by the first M1 bar past it
+                    closed.append((timeframe, Bar(*current[:_CLOSE_TIME])))
+                open_time = Utils.bar_open_time(bar.time, timeframe)
+                current = forming[i] = [open_time, bar.open, bar.high, bar.low, bar.close, bar.tickvol, bar.vol,
+                                        bar.spread, Utils.next_bar_time(open_time, timeframe)]
+
+            if bar_close >= current[_CLOSE_TIME]:
+                closed.append((timeframe, Bar(*current[:_CLOSE_TIME])))
+                forming[i] = None
+        return closed
+
+    def last_time(self, symbol: str) -> int | None:
+        """
+        Returns the opening time of the latest M1 bar added (or seeded) for a symbol, or None if there is none.
+        """
+        return self._last_time.get(symbol)
+
+    def partial_bar(self, symbol: str, timeframe: str) -> Bar | None:
+        """
+        Returns the bar of a symbol and timeframe that is being formed (updated with every M1 bar), or None if
+        there is none.
+        """
+        forming = self._bars.get(symbol)
+        if forming is None:
+            return None
+        current = forming[self.timeframes.index(timeframe)]
+        return Bar(*current[:_CLOSE_TIME]) if current is not None else None
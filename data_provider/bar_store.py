@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from broker.interfaces.broker_interface import IBroker
+from utils.logger import get_logger
+from utils.utils import Utils
+from .bar_buffer import BAR_DTYPE, bars_from_mt5_rates, load_bar_history
+
+
+logger = get_logger("data_provider")
+
+
+class BarStore():
+
+    # Version of the file layout (written in the store metadata together with the bar layout)
+    FORMAT_VERSION = 1
+
+    def __init__(self, root_dir: str):
+        """
+        Local store of closed bars on disk, one file per symbol and timeframe ("{root_dir}/{symbol}/{timeframe}.bars")
+        with the bars as raw BAR_DTYPE records, oldest first. The files are read through read-only memory maps, so
+        opening years of M1 history takes no parsing and no heap: the bars are paged in from the page cache when
+        they are used (and every column is a zero-copy view, e.g. read(...)['close']).
+
+        The files only grow: new bars are appended at the end (append, backfill, import_history), and a reader
+        that opened a file earlier keeps seeing the bars that were there when it opened it. A partial record left
+        by an interrupted write is ignored.
+
+        Args:
+            root_dir (str): The directory of the store (created if it does not exist).
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self._check_format()
+
+        # Open memory maps (and the number of bars they cover) and last stored time of every symbol and timeframe
+        self._maps: Dict[Tuple[str, str], np.ndarray] = {}
+        self._last_time: Dict[Tuple[str, str], int | None] = {}
+        self._lock = threading.Lock()
+
+    def _check_format(self) -> None:
+        metadata = {'version': self.FORMAT_VERSION, 'dtype': BAR_DTYPE.descr}
+        path = os.path.join(self.root_dir, "bar_store.json")
+        if not os.path.exists(path):
+            with open(path, "w") as file:
+                json.dump(metadata, file)
+            return
+
+        with open(path) as file:
+            stored = json.load(file)
+        if stored.get('version') != self.FORMAT_VERSION or [tuple(field) for field in stored.get('dtype', [])] != BAR_DTYPE.descr:
+            logger.error("The bar store in %s has a different layout (format %s)", self.root_dir,
+                         stored.get('version'))
+            raise Exception(f"The bar store in {self.root_dir} has a different layout")
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root_dir, symbol, f"{timeframe}.bars")
+
+    def count(self, symbol: str, timeframe: str) -> int:
+        """
+        Returns the number of bars stored for a symbol and timeframe.
+        """
+        try:
+            return os.path.getsize(self.path(symbol, timeframe)) // BAR_DTYPE.itemsize
+        except OSError:
+            return 0
+
+    def last_time(self, symbol: str, timeframe: str) -> int | None:
+        """
+        Returns the opening time (epoch seconds) of the latest stored bar, or None if there are no bars.
+        """
+        key = (symbol, timeframe)
+        if key not in self._last_time:
+            count = self.count(symbol, timeframe)
+            if count == 0:
+                self._last_time[key] = None
+            else:
+                with open(self.path(symbol, timeframe), "rb") as file:
+                    file.seek((count - 1) * BAR_DTYPE.itemsize)
+                    self._last_time[key] = int(np.frombuffer(file.read(BAR_DTYPE.itemsize), dtype=BAR_DTYPE)['time'][0])
+        return self._last_time[key]
+
+    def read(self, symbol: str, timeframe: str, start_date: datetime | None = None,
+             end_date: datetime | None = None) -> np.ndarray:
+        """
+        Returns the stored bars of a symbol and timeframe as a read-only BAR_DTYPE array backed by the file (no
+        copy), optionally restricted to the bars opened between two dates.
+
+        Args:
+            symbol (str): The symbol.
+            timeframe (str): The timeframe (e.g. '1min').
+            start_date (datetime | None): Bars opened before this date are skipped.
+            end_date (datetime | None): Bars opened after this date are skipped.
+
+        Returns:
+            np.ndarray: The bars, oldest first (empty if there are none).
+        """
+        key = (symbol, timeframe)
+        count = self.count(symbol, timeframe)
+        if count == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        with self._lock:
+            bars = self._maps.get(key)
+            if bars is None or len(bars) != count:
+                # The file has grown since it was mapped: map it again (readers of the old map are not affected)
+                bars = np.memmap(self.path(symbol, timeframe), dtype=BAR_DTYPE, mode='r', shape=(count,))
+                self._maps[key] = bars
+
+        start = 0
+        end = len(bars)
+        times = bars['time']
+        if start_date is not None:
+            start = int(np.searchsorted(times, int(pd.Timestamp(start_date).timestamp()), side='left'))
+        if end_date is not None:
+            end = int(np.searchsorted(times, int(pd.Timestamp(end_date).timestamp()), side='right'))
+        return bars[start:end]
+
+    def append(self, symbol: str, timeframe: str, bars: np.ndarray) -> int:
+        """
+        Appends closed bars (BAR_DTYPE array, oldest first) to the store. The bars that are not newer than the
+        latest stored one are skipped.
+
+        Returns:
+            int: The number of bars written.
+        """
+        last_time = self.last_time(symbol, timeframe)
+        if last_time is not None:
+            bars = bars[bars['time'] > last_time]
+        if len(bars) == 0:
+            return 0
+
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as file:
+            # Drop a partial record left by an interrupted write, so the records stay aligned
+            size = file.tell()
+            if size % BAR_DTYPE.itemsize:
+                file.truncate(size - size % BAR_DTYPE.itemsize)
+            file.write(np.ascontiguousarray(bars, dtype=BAR_DTYPE).tobytes())
+
+        self._last_time[(symbol, timeframe)] = int(bars['time'][-1])
+        return len(bars)
+
+    def backfill(self, broker: IBroker, symbol: str, timeframe: str, num_bars: int = 100_000,
+                 chunk_size: int = 10_000) -> int:
+        """
+        Recovers from the broker the closed bars that are missing at the end of the store: the latest `num_bars`
+        bars if the store is empty, otherwise every bar since the latest stored one (at most `num_bars`), in
+        chunks of at most `chunk_size` bars with copy_rates_from_pos.
+
+        Args:
+            broker (IBroker): The broker.
+            symbol (str): The symbol.
+            timeframe (str): The timeframe (e.g. '1min').
+            num_bars (int): The maximum number of bars recovered.
+            chunk_size (int): The bars requested per call.
+
+        Returns:
+            int: The number of bars written.
+        """
+        mt5_timeframe = broker.TIMEFRAMES[timeframe]
+        last_time = self.last_time(symbol, timeframe)
+
+        if last_time is None:
+            rates = broker.copy_rates_from_pos(symbol, mt5_timeframe, 1, num_bars)
+            if rates is None or len(rates) == 0:
+                logger.error("Can't backfill %s %s - MT5 error: %s", symbol, timeframe, broker.last_error())
+                return 0
+            return self.append(symbol, timeframe, bars_from_mt5_rates(self._unique_rates(rates)))
+
+        # Walk back from the latest closed bar until the latest stored one is reached. The first request is small
+        # (usually only a few bars are missing) and the requests double up to chunk_size
+        chunks = []
+        position = 1
+        request = min(64, chunk_size)
+        while position <= num_bars:
+            rates = broker.copy_rates_from_pos(symbol, mt5_timeframe, position, min(request, num_bars - position + 1))
+            if rates is None or len(rates) == 0:
+                break
+            chunks.append(rates)
+            if rates['time'][0] <= last_time:
+                break
+            position += len(rates)
+            request = min(2 * request, chunk_size)
+
+        if not chunks:
+            return 0
+        # A bar closed during the walk shifts the positions, so consecutive chunks can overlap
+        rates = self._unique_rates(np.concatenate(chunks[::-1]))
+        return self.append(symbol, timeframe, bars_from_mt5_rates(rates))
+
+    @staticmethod
+    def _unique_rates(rates: np.ndarray) -> np.ndarray:
+        # The bars sorted by time without repeated times, as read() expects (searchsorted on the times)
+        _, index = np.unique(rates['time'], return_index=True)
+        return rates[index]
+
+    def import_history(self, data_dir: str, symbol: str, timeframe: str) -> int:
+        """
+        Appends the bars of a history file (see load_bar_history) that are newer than the latest stored bar.
+
+        Returns:
+            int: The number of bars written.
+        """
+        return self.append(symbol, timeframe, load_bar_history(data_dir, symbol, timeframe))
+
+    def load(self, symbol: str, timeframe: str, data_dir: str | None = None, start_date: datetime | None = None,
+             end_date: datetime | None = None) -> np.ndarray:
+        """
+        Returns the stored bars of a symbol and timeframe (see read). If there are none, the history file in
+        `data_dir` is imported first, so it is only parsed once.
+        """
+        if self.count(symbol, timeframe) == 0 and data_dir is not None:
+            self.import_history(data_dir, symbol, timeframe)
+        return self.read(symbol, timeframe, start_date, end_date)
+
+    def is_contiguous(self, symbol: str, timeframe: str, bar_time: int) -> bool:
+        """
+        Returns True if a bar opened at `bar_time` directly follows the latest stored bar (no bar missing in
+        between), or if the store has no bars of the symbol.
+        """
+        last_time = self.last_time(symbol, timeframe)
+        return last_time is None or bar_time <= Utils.next_bar_time(last_time, timeframe)
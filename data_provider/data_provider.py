@@ -1,123 +1,506 @@
-from datetime import datetime
+from __future__ import annotations
+
+import time
 from queue import Queue
-from typing import Dict
+from typing import Dict, Iterable, Tuple
 
-import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
 
-from events.events import DataEvent
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+from events.events import DataEvent, TraceContext, is_event_tracing_enabled, new_trace
+from utils.utils import Utils
+from utils.logger import get_logger
+from .poll_scheduler import PollScheduler
+from .bar_store import BarStore
+from .bar_resampler import SOURCE_TIMEFRAME, BarResampler
+from .bar_buffer import BAR_DTYPE, BarBuffer, bar_from_record, bar_to_series, bars_from_mt5_rates, bars_to_dataframe
+from .tick_bar_aggregator import TickBarAggregator
+
+
+logger = get_logger("data_provider")
 
 
 class DataProvider():
-    def __init__(self, events_queue: Queue, symbol_list: list, timeframe: str):
+    def __init__(self, events_queue: Queue, symbol_list: list, timeframe: str, buffer_capacity: int = 1000,
+                 poll_scheduler: PollScheduler | None = None, broker: IBroker | None = None,
+                 stream_ticks: bool = False, stream_timeframes: Iterable[str] | None = None,
+                 tick_interval: float = 0.01, bar_store: BarStore | None = None,
+                 resample_timeframes: Iterable[str] | None = None):
+        """
+        Provides the bars of MT5 to the framework and puts a DataEvent in the queue for every new closed bar.
+
+        By default the latest closed bar of every symbol is polled with copy_rates_from_pos. In streaming mode the
+        latest tick of every symbol is polled instead and the bars are built locally (see TickBarAggregator) in
+        every timeframe at once, so the DataEvents of all the timeframes are emitted on the first tick past the
+        bar boundary, without waiting for the terminal to close the bar. The bars are built from the polled
+        ticks: ticks that arrive faster than `tick_interval` are not seen, so the high/low and tick volume may
+        differ slightly from the terminal bars.
+
+        With `resample_timeframes` only the M1 bars are polled and the bars of the other timeframes are built from
+        them (see BarResampler), so the strategies of several timeframes share one copy_rates_from_pos call per
+        symbol. The DataEvent of a resampled bar is emitted right after the DataEvent of the M1 bar that closes it.
+
+        Args:
+            events_queue (Queue): The queue where the DataEvents are put.
+            symbol_list (list): The symbols.
+            timeframe (str): The main timeframe (bar buffer, and the polled timeframe outside streaming mode).
+            buffer_capacity (int): The number of closed bars cached per symbol.
+            poll_scheduler (PollScheduler | None): Decides which symbols are polled on each check (not used in
+                streaming mode).
+            broker (IBroker | None): The broker (the default broker if None).
+            stream_ticks (bool): True to build the bars from the ticks (streaming mode).
+            stream_timeframes (Iterable[str] | None): The timeframes built in streaming mode (all of them if None).
+            tick_interval (float): The polling interval (seconds) of the ticks in streaming mode.
+            bar_store (BarStore | None): Local store of the bars of the polled timeframe. It is backfilled from MT5
+                on start (only the missing bars), warms up the bar buffers, and every new closed bar is appended.
+            resample_timeframes (Iterable[str] | None): The timeframes built from the polled M1 bars (the polled
+                timeframe must be '1min'; not used in streaming mode, where every timeframe is built from the ticks).
+        """
         self.events_queue = events_queue
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
         self.symbols: list = symbol_list
         self.timeframe: str = timeframe
-        self.last_bar_datetime: Dict[str, datetime] = {symbol: datetime.min for symbol in self.symbols}
+
+        # Opening time (epoch seconds, MT5 server time) of the latest closed bar seen for every symbol
+        self.last_bar_time: Dict[str, int] = {symbol: 0 for symbol in self.symbols}
+
+        # MT5 constant of the polled timeframe, resolved once instead of on every poll
+        self._mt5_timeframe: int = self._map_timeframes(timeframe)
+
+        # Cache with the latest closed bars of every symbol in the polled timeframe. It is filled by
+        # check_for_new_data and serves get_latest_closed_bars, so consumers asking for overlapping windows
+        # of the same bars do not need a broker call each
+        self.buffer_capacity: int = buffer_capacity
+        self._bar_buffers: Dict[str, BarBuffer] = {symbol: BarBuffer(buffer_capacity) for symbol in self.symbols}
+
+        # Optional scheduler that decides which symbols are polled on each check (all of them if None)
+        self.poll_scheduler: PollScheduler | None = poll_scheduler if not stream_ticks else None
+        if self.poll_scheduler is not None and self.poll_scheduler.server_offset is None:
+            self._estimate_server_offset()
+
+        # Streaming mode: one tick feed per symbol builds the bars of every timeframe
+        self.tick_interval: float = tick_interval
+        self.tick_aggregator: TickBarAggregator | None = None
+        if stream_ticks:
+            timeframes = list(stream_timeframes) if stream_timeframes is not None else list(self.broker.TIMEFRAMES)
+            if timeframe not in timeframes:
+                timeframes.append(timeframe)
+            self.tick_aggregator = TickBarAggregator(timeframes)
+        self._points: Dict[str, float] = {}        # Point size of every streamed symbol (to express the spread in points)
+        self._server_offset: float | None = None    # Server clock - local clock, estimated from the streamed ticks
+
+        # Resampling: the bars of the other timeframes are built from the polled M1 bars and cached like them. The
+        # history older than the cached bars is still recovered from MT5 in their own timeframe (once)
+        self.bar_resampler: BarResampler | None = None
+        self._resampled_buffers: Dict[Tuple[str, str], BarBuffer] = {}
+        if resample_timeframes is not None and not stream_ticks:
+            if timeframe != SOURCE_TIMEFRAME:
+                logger.error("The bars can only be resampled from %s bars, not from %s bars", SOURCE_TIMEFRAME,
+                             timeframe)
+                raise Exception(f"The bars can only be resampled from {SOURCE_TIMEFRAME} bars")
+            self.bar_resampler = BarResampler([tf for tf in resample_timeframes if tf != timeframe])
+            self._resampled_buffers = {(symbol, tf): BarBuffer(buffer_capacity)
+                                       for symbol in self.symbols for tf in self.bar_resampler.timeframes}
+
+        self.bar_store: BarStore | None = bar_store
+        if self.bar_store is not None:
+            self._warm_up_from_bar_store()
+
+    def _fetch_closed_bars(self, symbol: str, timeframe: str, from_position: int, num_bars: int) -> np.ndarray | None:
+        """
+        Recovers closed bars from MT5 as a BAR_DTYPE array (oldest first), or None if MT5 returns nothing.
+        Position 1 is the latest closed bar.
+        """
+        bars_np_array = self.broker.copy_rates_from_pos(symbol, self._map_timeframes(timeframe), from_position, num_bars)
+        if bars_np_array is None:
+            return None
+        return bars_from_mt5_rates(bars_np_array)
+
+    def _bar_buffer(self, symbol: str, timeframe: str) -> BarBuffer | None:
+        """
+        Returns the buffer of the closed bars of a symbol in a cached timeframe (polled or resampled), or None.
+        """
+        if timeframe == self.timeframe:
+            return self._bar_buffers.get(symbol)
+        return self._resampled_buffers.get((symbol, timeframe))
+
+    def _get_buffered_bars(self, symbol: str, num_bars: int, timeframe: str | None = None) -> np.ndarray | None:
+        """
+        Serves the latest `num_bars` closed bars of a symbol in a cached timeframe (the polled one by default) from
+        its bar buffer, recovering from MT5 only the older bars that are not cached yet.
+        """
+        timeframe = timeframe if timeframe is not None else self.timeframe
+        buffer = self._bar_buffer(symbol, timeframe)
+        cached = len(buffer)
+
+        if cached == 0:
+            bars = self._fetch_closed_bars(symbol, timeframe, 1, num_bars)
+            if bars is None:
+                return None
+            buffer.append(bars)
+
+        elif cached < num_bars:
+            older_bars = self._fetch_closed_bars(symbol, timeframe, 1 + cached, num_bars - cached)
+            if older_bars is None:
+                return None
+
+            if np.any(older_bars['time'] >= buffer.first_time):
+                # A new bar has closed since the last check for new data (positions have shifted): full refresh
+                bars = self._fetch_closed_bars(symbol, timeframe, 1, num_bars)
+                if bars is None:
+                    return None
+                buffer.clear()
+                buffer.append(bars)
+            else:
+                buffer.prepend(older_bars)
+
+        return buffer.latest(num_bars)
+
+    def _warm_up_from_bar_store(self) -> None:
+        """
+        Recovers the bars missing in the bar store since the last run and fills the bar buffers with the latest
+        stored bars, so the strategies start with their history without downloading it again.
+        """
+        for symbol in self.symbols:
+            try:
+                self.bar_store.backfill(self.broker, symbol, self.timeframe)
+            except Exception as e:
+                logger.error("Can't backfill the bar store for %s %s, exception: %s", symbol, self.timeframe, e)
+            bars = self.bar_store.read(symbol, self.timeframe)
+            if len(bars) > 0:
+                self._bar_buffers[symbol].append(bars[-self.buffer_capacity:])
+
+    def _store_bar(self, symbol: str, bars: np.ndarray) -> None:
+        """
+        Appends a new closed bar (BAR_DTYPE array with one record) to the bar store. If some bars are missing
+        before it (e.g. the framework was stopped), they are recovered from MT5 together with it.
+        """
+        try:
+            if self.bar_store.is_contiguous(symbol, self.timeframe, int(bars['time'][0])):
+                self.bar_store.append(symbol, self.timeframe, bars)
+            else:
+                self.bar_store.backfill(self.broker, symbol, self.timeframe)
+        except Exception as e:
+            logger.error("Can't store the last bar of %s %s, exception: %s", symbol, self.timeframe, e)
+
+    def _append_to_bar_buffer(self, symbol: str, bars: np.ndarray, timeframe: str | None = None) -> None:
+        """
+        Adds a new closed bar (BAR_DTYPE array with one record) to the buffer of the symbol in a cached timeframe
+        (the polled one by default). If the bar does not follow the latest cached one, some bars may be missing in
+        between, so the cache is dropped and refilled on demand.
+        """
+        timeframe = timeframe if timeframe is not None else self.timeframe
+        buffer = self._bar_buffer(symbol, timeframe)
+        bar_time = int(bars['time'][-1])
+
+        if len(buffer) > 0:
+            if bar_time <= buffer.last_time:
+                return
+            if bar_time != Utils.next_bar_time(buffer.last_time, timeframe):
+                buffer.clear()
+
+        buffer.append(bars[-1:])
 
     def get_latest_closed_bar(self, symbol: str, timeframe: str):
-        tf = self._map_timeframes(timeframe)
-        from_position = 1
-        num_bars = 1
         # Catch last bar
         try:
-            bars_np_array = mt5.copy_rates_from_pos(symbol, tf, from_position, num_bars)
-            if bars_np_array is None:
-                print(f"Symbol {symbol} don't exist ot something is missing")
+            bars = self._fetch_closed_bars(symbol, timeframe, from_position=1, num_bars=1)
+            if bars is None:
+                logger.error("Symbol %s don't exist ot something is missing", symbol)
                 return pd.Series() # empty
 
-            bars = pd.DataFrame(bars_np_array)
-            # Convert to readable time col
-            bars['time'] = pd.to_datetime(bars['time'], unit='s')
-            bars.set_index('time', inplace=True)
-            bars.rename(columns={'tick_volume': 'tickvol', 'real_volume': 'vol'}, inplace=True)
-            bars = bars[['open', 'high', 'low', 'close', 'tickvol', 'vol', 'spread']]
         except Exception as e:
-            print(
-                f"Can't recover last bar for {symbol} {timeframe} - MT5 Error: {mt5.last_error()}, exception: {e}")
+            logger.error("Can't recover last bar for %s %s - MT5 Error: %s, exception: %s", symbol, timeframe,
+                         self.broker.last_error(), e)
 
         else:
-            if bars.empty:
+            if len(bars) == 0:
                 return pd.Series()
             else:
-                return bars.iloc[-1]
+                return bar_to_series(bars[-1])
 
     def get_latest_closed_bars(self, symbol: str, timeframe: str, num_bars: int = 1) -> pd.DataFrame:
-        tf = self._map_timeframes(timeframe)
-        from_position = 1
         bars_count = num_bars if num_bars > 0 else 1
         try:
-            bars_np_array = mt5.copy_rates_from_pos(symbol, tf, from_position, bars_count)
-            if bars_np_array is None:
-                print(f"Symbol {symbol} don't exist ot something is missing")
+            # The polled and resampled timeframes are served from the bar buffers, anything else goes straight to MT5
+            if self._bar_buffer(symbol, timeframe) is not None and bars_count <= self.buffer_capacity:
+                bars = self._get_buffered_bars(symbol, bars_count, timeframe)
+            else:
+                bars = self._fetch_closed_bars(symbol, timeframe, 1, bars_count)
+
+            if bars is None:
+                logger.error("Symbol %s don't exist ot something is missing", symbol)
                 return pd.DataFrame()
-            bars = pd.DataFrame(bars_np_array)
-            bars['time'] = pd.to_datetime(bars['time'], unit='s')
-            bars.set_index('time', inplace=True)
-            bars.rename(columns={'tick_volume': 'tickvol', 'real_volume': 'vol'}, inplace=True)
-            bars = bars[['open', 'high', 'low', 'close', 'tickvol', 'vol', 'spread']]
+            bars = bars_to_dataframe(bars)
 
         except Exception as e:
-            print(
-                f"Can't recover last bar for {symbol} {timeframe} - MT5 Error: {mt5.last_error()}, exception: {e}")
+            logger.error("Can't recover last bar for %s %s - MT5 Error: %s, exception: %s", symbol, timeframe,
+                         self.broker.last_error(), e)
         else:
             return bars
 
     def get_latest_tick(self, symbol: str) -> dict:
         try:
-            tick = mt5.symbol_info_tick(symbol)
+            tick = self.broker.symbol_info_tick(symbol)
             if tick is None:
-                print(
-                    f"Can't recover last tick for {symbol} - MT5 error: {mt5.last_error()}")
+                logger.error("Can't recover last tick for %s - MT5 error: %s", symbol, self.broker.last_error())
                 return {}
 
         except Exception as e:
-            print(
-                f"Something went wrong while recovering last tick for {symbol}. MT5 error: {mt5.last_error()}, exception: {e}")
+            logger.error("Something went wrong while recovering last tick for %s. MT5 error: %s, exception: %s",
+                         symbol, self.broker.last_error(), e)
 
         else:
+            # The tick also refreshes the rate used for the currency conversions of this symbol
+            Utils.get_currency_converter().update_from_tick(symbol, tick)
             return tick._asdict()
 
     def check_for_new_data(self) -> None:
-        for symbol in self.symbols:
-            latest_bar = self.get_latest_closed_bar(symbol, self.timeframe)
+        """
+        Polls the latest closed bar of the symbols and puts a DataEvent in the queue for each new one. With a poll
+        scheduler only the symbols that are due are polled, otherwise all of them.
 
-            if latest_bar is None:
-                continue
+        New bars are detected by comparing the raw epoch of the MT5 record with the latest one seen, so a poll
+        that finds no new bar does not build any pandas object.
+        """
+        if self.tick_aggregator is not None:
+            for symbol in self.symbols:
+                self._stream_symbol(symbol)
+            return
 
-            if not latest_bar.empty and latest_bar.name > self.last_bar_datetime[symbol]:
-                self.last_bar_datetime[symbol] = latest_bar.name
-                data_event = DataEvent(symbol=symbol, data=latest_bar)
-                self.events_queue.put(data_event)
+        if self.poll_scheduler is None:
+            for symbol in self.symbols:
+                self._poll_symbol(symbol)
+            return
 
+        for symbol in self.poll_scheduler.due_symbols():
+            self.poll_scheduler.record_poll(symbol, self._poll_symbol(symbol))
+
+    def seconds_until_next_check(self) -> float:
+        """
+        Returns how long (seconds) the caller can wait before the next call to check_for_new_data.
+        """
+        if self.tick_aggregator is not None:
+            return self.tick_interval
+        if self.poll_scheduler is None:
+            return 0.0
+        return self.poll_scheduler.seconds_until_next_check()
+
+    def _poll_symbol(self, symbol: str) -> int | None:
+        """
+        Polls the latest closed bar of a symbol and puts a DataEvent in the queue if it is new.
+
+        Returns:
+            int | None: The opening time of the new bar, 0 if there is no new bar, or None if MT5 returned no data.
+        """
+        return self._process_latest_bar(symbol, self._fetch_latest_bar(symbol))
+
+    def _fetch_latest_bar(self, symbol: str) -> np.ndarray | None:
+        """
+        Recovers the latest closed bar of a symbol from MT5 (the raw MT5 record), or None if MT5 returned no data.
+        This is the only part of a poll that calls the broker.
+        """
+        try:
+            bars_np_array = self.broker.copy_rates_from_pos(symbol, self._mt5_timeframe, 1, 1)
+        except Exception as e:
+            logger.error("Can't recover last bar for %s %s - MT5 Error: %s, exception: %s", symbol, self.timeframe,
+                         self.broker.last_error(), e)
+            return None
+
+        if bars_np_array is None or len(bars_np_array) == 0:
+            logger.error("Symbol %s don't exist ot something is missing", symbol)
+            return None
+        return bars_np_array
+
+    def _process_latest_bar(self, symbol: str, bars_np_array: np.ndarray | None) -> int | None:
+        """
+        Puts a DataEvent in the queue if the polled bar of a symbol is new.
+
+        Returns:
+            int | None: The opening time of the new bar, 0 if there is no new bar, or None if MT5 returned no data.
+        """
+        if bars_np_array is None:
+            return None
+
+        if bars_np_array['time'][0] <= self.last_bar_time[symbol]:
+            return 0
+
+        bars = bars_from_mt5_rates(bars_np_array)
+        bar_time = int(bars['time'][0])
+        self.last_bar_time[symbol] = bar_time
+        self._append_to_bar_buffer(symbol, bars)
+        if self.bar_store is not None:
+            self._store_bar(symbol, bars)
+        bar = bar_from_record(bars[0])
+        data_event = DataEvent(symbol=symbol, data=bar, timeframe=self.timeframe,
+                               trace=self._new_trace(bar_time, self.timeframe))
+        self.events_queue.put(data_event)
+        if self.bar_resampler is not None:
+            self._resample_bar(symbol, bar)
+        return bar_time
+
+    def _resample_bar(self, symbol: str, bar) -> None:
+        """
+        Adds a new M1 bar to the bars being resampled and puts a DataEvent in the queue for every bar (of any
+        resampled timeframe) that it closes. The M1 bars missed since the previous one (e.g. a late poll) are
+        recovered first, so the resampled bars cover all of them.
+        """
+        last_time = self.bar_resampler.last_time(symbol)
+        if last_time is None:
+            # Start the bars being formed from the M1 bars since the opening of the current bar of every timeframe
+            start = min(Utils.bar_open_time(bar.time, timeframe) for timeframe in self.bar_resampler.timeframes)
+            self.bar_resampler.seed(symbol, self._recover_m1_bars(symbol, start, bar.time))
+            missed = []
+        elif bar.time > Utils.next_bar_time(last_time, self.timeframe):
+            missed = [bar_from_record(record) for record in
+                      self._recover_m1_bars(symbol, Utils.next_bar_time(last_time, self.timeframe), bar.time)]
+        else:
+            missed = []
+
+        for m1_bar in missed + [bar]:
+            for timeframe, resampled_bar in self.bar_resampler.add_bar(symbol, m1_bar):
+                self._append_to_bar_buffer(symbol, np.array([resampled_bar], dtype=BAR_DTYPE), timeframe)
+                self.events_queue.put(DataEvent(symbol=symbol, data=resampled_bar, timeframe=timeframe,
+                                                trace=self._new_trace(resampled_bar.time, timeframe)))
+
+    def _recover_m1_bars(self, symbol: str, start: int, end: int) -> np.ndarray:
+        """
+        Recovers the closed M1 bars of a symbol opened between `start` (included) and `end` (excluded), from the
+        bar store if it has them, otherwise from MT5. The whole span is recovered, whatever the buffer capacity
+        (e.g. the bar being formed of a daily timeframe needs up to 1440 M1 bars, a monthly one up to 44640).
+        """
+        if start >= end:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        if self.bar_store is not None and (self.bar_store.last_time(symbol, self.timeframe) or 0) >= end:
+            history = self.bar_store.read(symbol, self.timeframe)
+        else:
+            # Positions 1 to num_bars cover the span even without gaps (the bar opened at `end` is position 1)
+            num_bars = (end - start) // Utils.TIMEFRAME_SECONDS[self.timeframe] + 1
+            history = self._fetch_closed_bars(symbol, self.timeframe, 1, num_bars)
+            if history is None:
+                logger.error("Can't recover the %s bars of %s to resample them - MT5 Error: %s", self.timeframe,
+                             symbol, self.broker.last_error())
+                return np.empty(0, dtype=BAR_DTYPE)
+
+        times = history['time']
+        return history[np.searchsorted(times, start, side='left'):np.searchsorted(times, end, side='left')]
+
+    def _stream_symbol(self, symbol: str) -> None:
+        """
+        Polls the latest tick of a symbol, adds it to the bars being formed and puts a DataEvent in the queue for
+        every bar (of any timeframe) that it closes.
+        """
+        self._process_tick(symbol, self._fetch_tick(symbol))
+
+    def _fetch_tick(self, symbol: str):
+        """
+        Recovers the latest tick of a symbol from MT5 (and the point size of the symbol the first time), or None if
+        MT5 returned no tick. This is the only part of a streaming poll that calls the broker.
+        """
+        try:
+            tick = self.broker.symbol_info_tick(symbol)
+        except Exception as e:
+            logger.error("Something went wrong while recovering last tick for %s. MT5 error: %s, exception: %s",
+                         symbol, self.broker.last_error(), e)
+            return None
+
+        if tick is None:
+            logger.error("Can't recover last tick for %s - MT5 error: %s", symbol, self.broker.last_error())
+            return None
+
+        if symbol not in self._points:
+            symbol_info = self.broker.symbol_info(symbol)
+            self._points[symbol] = symbol_info.point if symbol_info is not None and symbol_info.point > 0 else 0.0
+        return tick
+
+    def _process_tick(self, symbol: str, tick) -> int:
+        """
+        Adds a tick of a symbol to the bars being formed and puts a DataEvent in the queue for every bar (of any
+        timeframe) that it closes.
+
+        Returns:
+            int: The number of bars closed by the tick.
+        """
+        if tick is None:
+            return 0
+
+        point = self._points[symbol]
+        spread = int(round((tick.ask - tick.bid) / point)) if point > 0 else 0
+
+        closed_bars = self.tick_aggregator.add_tick(symbol, tick.time_msc, tick.bid, spread, int(tick.volume))
+        if not closed_bars:
+            return 0
+
+        offset = tick.time_msc / 1000 - time.time()
+        if self._server_offset is None or offset > self._server_offset:
+            self._server_offset = offset
+
+        # The tick also refreshes the rate used for the currency conversions of this symbol
+        Utils.get_currency_converter().update_from_tick(symbol, tick)
+        for timeframe, bar in closed_bars:
+            if timeframe == self.timeframe:
+                self.last_bar_time[symbol] = bar.time
+                bars = np.array([bar], dtype=BAR_DTYPE)
+                self._append_to_bar_buffer(symbol, bars)
+                if self.bar_store is not None:
+                    self._store_bar(symbol, bars)
+            self.events_queue.put(DataEvent(symbol=symbol, data=bar, timeframe=timeframe,
+                                            trace=self._new_trace(bar.time, timeframe)))
+        return len(closed_bars)
+
+    def _new_trace(self, bar_time: int, timeframe: str) -> TraceContext | None:
+        """
+        Starts the trace of a new bar, with its close time if the server clock offset is known.
+        """
+        if not is_event_tracing_enabled():
+            return None
+        offset = self.poll_scheduler.server_offset if self.poll_scheduler is not None else self._server_offset
+        if offset is None:
+            return new_trace()
+        return new_trace(since_bar_close=time.time() + offset - Utils.next_bar_time(bar_time, timeframe))
+
+    def _estimate_server_offset(self) -> None:
+        """
+        Seeds the server clock offset of the poll scheduler with the time of the last tick of every symbol.
+        """
+        for symbol in self.symbols:
+            try:
+                tick = self.broker.symbol_info_tick(symbol)
+            except Exception:
+                continue
+            if tick is not None and tick.time_msc > 0:
+                self.poll_scheduler.observe_server_time(tick.time_msc / 1000)
 
     def _map_timeframes(self, timeframe: str) -> int:
         timeframe_mapping = {
-            '1min': mt5.TIMEFRAME_M1,
-            '2min': mt5.TIMEFRAME_M2,
-            '3min': mt5.TIMEFRAME_M3,
-            '4min': mt5.TIMEFRAME_M4,
-            '5min': mt5.TIMEFRAME_M5,
-            '6min': mt5.TIMEFRAME_M6,
-            '10min': mt5.TIMEFRAME_M10,
-            '12min': mt5.TIMEFRAME_M12,
-            '15min': mt5.TIMEFRAME_M15,
-            '20min': mt5.TIMEFRAME_M20,
-            '30min': mt5.TIMEFRAME_M30,
-            '1h': mt5.TIMEFRAME_H1,
-            '2h': mt5.TIMEFRAME_H2,
-            '3h': mt5.TIMEFRAME_H3,
-            '4h': mt5.TIMEFRAME_H4,
-            '6h': mt5.TIMEFRAME_H6,
-            '8h': mt5.TIMEFRAME_H8,
-            '12h': mt5.TIMEFRAME_H12,
-            '1d': mt5.TIMEFRAME_D1,
-            '1w': mt5.TIMEFRAME_W1,
-            '1M': mt5.TIMEFRAME_MN1,
+            '1min': self.broker.TIMEFRAME_M1,
+            '2min': self.broker.TIMEFRAME_M2,
+            '3min': self.broker.TIMEFRAME_M3,
+            '4min': self.broker.TIMEFRAME_M4,
+            '5min': self.broker.TIMEFRAME_M5,
+            '6min': self.broker.TIMEFRAME_M6,
+            '10min': self.broker.TIMEFRAME_M10,
+            '12min': self.broker.TIMEFRAME_M12,
+            '15min': self.broker.TIMEFRAME_M15,
+            '20min': self.broker.TIMEFRAME_M20,
+            '30min': self.broker.TIMEFRAME_M30,
+            '1h': self.broker.TIMEFRAME_H1,
+            '2h': self.broker.TIMEFRAME_H2,
+            '3h': self.broker.TIMEFRAME_H3,
+            '4h': self.broker.TIMEFRAME_H4,
+            '6h': self.broker.TIMEFRAME_H6,
+            '8h': self.broker.TIMEFRAME_H8,
+            '12h': self.broker.TIMEFRAME_H12,
+            '1d': self.broker.TIMEFRAME_D1,
+            '1w': self.broker.TIMEFRAME_W1,
+            '1M': self.broker.TIMEFRAME_MN1,
         }
 
         try:
             return timeframe_mapping[timeframe]
         except:
-            print(f"Timeframe {timeframe} is not valid.")
+            logger.error("Timeframe %s is not valid.", timeframe)
 
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from datetime import datetime
+from queue import Queue
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from events.events import DataEvent, new_trace
+from utils.logger import get_logger
+from .interfaces.data_provider_interface import IDataProvider
+from .bar_store import BarStore
+from .bar_resampler import SOURCE_TIMEFRAME, closing_positions, resample_bars
+from .bar_buffer import BAR_COLUMNS, bar_from_record, bar_to_series, load_bar_history
+
+
+logger = get_logger("data_provider")
+
+
+class HistoricalDataProvider(IDataProvider):
+
+    def __init__(self, events_queue: Queue, symbol_list: list, timeframe: str, data_dir: str,
+                 start_date: datetime | None = None, end_date: datetime | None = None,
+                 symbol_points: Dict[str, float] | None = None, bar_store: BarStore | None = None,
+                 resample_timeframes: Iterable[str] | None = None):
+        """
+        Initializes a HistoricalDataProvider that replays bars from local CSV or Parquet files.
+
+        Each symbol is loaded from "{data_dir}/{symbol}_{timeframe}.parquet" or "{data_dir}/{symbol}_{timeframe}.csv".
+        The files must contain a 'time' column (epoch seconds or a parseable datetime) and the OHLC columns. The
+        MT5 column names 'tick_volume' and 'real_volume' are accepted as well as 'tickvol' and 'vol'.
+
+        Args:
+            events_queue (Queue): The queue where the DataEvents are put.
+            symbol_list (list): The symbols to replay.
+            timeframe (str): The timeframe of the replayed bars (e.g. '1min').
+            data_dir (str): The directory that contains the history files.
+            start_date (datetime | None): Bars opened before this date are skipped.
+            end_date (datetime | None): Bars opened after this date are skipped.
+            symbol_points (Dict[str, float] | None): Point size per symbol, used to rebuild the ask price from the
+                bar spread. If a symbol is missing, the ask is equal to the bid.
+            bar_store (BarStore | None): Local bar store. If given, the bars are read from it (memory mapped) and
+                the history files are only parsed, and imported into the store, the first time.
+            resample_timeframes (Iterable[str] | None): Timeframes built from the replayed M1 bars (see
+                resample_bars). The DataEvent of every resampled bar is put in the queue right after the one of the
+                M1 bar that closes it, as the live DataProvider does.
+        """
+        self.events_queue = events_queue
+        self.symbols: list = symbol_list
+        self.timeframe: str = timeframe
+        self.data_dir: str = data_dir
+        self.symbol_points: Dict[str, float] = symbol_points if symbol_points is not None else {}
+
+        # Backtest controller: becomes False once the whole history has been replayed
+        self.continue_backtest: bool = True
+
+        # Bars per symbol as BAR_DTYPE arrays (same layout as the live DataProvider buffers)
+        self._bars: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, pd.DatetimeIndex] = {}
+        for symbol in self.symbols:
+            if bar_store is not None:
+                self._bars[symbol] = bar_store.load(symbol, self.timeframe, self.data_dir, start_date, end_date)
+            else:
+                self._bars[symbol] = load_bar_history(self.data_dir, symbol, self.timeframe, start_date, end_date)
+            # The datetime index is built once so that every bars request only has to slice it
+            self._index[symbol] = pd.DatetimeIndex(self._bars[symbol]['time'].astype('datetime64[s]'), name='time')
+
+        # Resampled timeframes: the bars of every symbol are built at once, with the position of the M1 bar that
+        # closes each of them
+        self.resample_timeframes: list = []
+        if resample_timeframes is not None:
+            if self.timeframe != SOURCE_TIMEFRAME:
+                logger.error("The bars can only be resampled from %s bars, not from %s bars", SOURCE_TIMEFRAME,
+                             self.timeframe)
+                raise Exception(f"The bars can only be resampled from {SOURCE_TIMEFRAME} bars")
+            self.resample_timeframes = [timeframe for timeframe in resample_timeframes if timeframe != self.timeframe]
+        self._resampled: Dict[Tuple[str, str], np.ndarray] = {}
+        self._resampled_index: Dict[Tuple[str, str], pd.DatetimeIndex] = {}
+        self._closing_positions: Dict[Tuple[str, str], np.ndarray] = {}
+        for symbol in self.symbols:
+            for timeframe in self.resample_timeframes:
+                key = (symbol, timeframe)
+                self._resampled[key] = resample_bars(self._bars[symbol], timeframe)
+                self._resampled_index[key] = pd.DatetimeIndex(self._resampled[key]['time'].astype('datetime64[s]'), name='time')
+                self._closing_positions[key] = closing_positions(self._bars[symbol], timeframe)
+
+        # Common timeline of the replay (every bar opening time of every symbol, in chronological order)
+        all_times = [bars['time'] for bars in self._bars.values() if len(bars) > 0]
+        self._timeline: np.ndarray = np.unique(np.concatenate(all_times)) if all_times else np.empty(0, dtype=np.int64)
+        self._step: int = -1
+
+        # Number of bars of each symbol already replayed (the last one is the latest closed bar)
+        self._cursor: Dict[str, int] = {symbol: 0 for symbol in self.symbols}
+        self._resampled_cursor: Dict[Tuple[str, str], int] = {key: 0 for key in self._resampled}
+
+    def _check_timeframe(self, symbol: str, timeframe: str) -> bool:
+        if symbol not in self._cursor:
+            logger.warning("Symbol %s is not part of the backtest", symbol)
+            return False
+        if timeframe != self.timeframe and timeframe not in self.resample_timeframes:
+            logger.warning("Timeframe %s is not available in the backtest, only %s was loaded", timeframe,
+                           self.timeframe)
+            return False
+        return True
+
+    def _replayed_bars(self, symbol: str, timeframe: str) -> Tuple[np.ndarray, pd.DatetimeIndex, int]:
+        """
+        Returns the bars of a symbol in a loaded or resampled timeframe, their index and how many were replayed.
+        """
+        if timeframe == self.timeframe:
+            return self._bars[symbol], self._index[symbol], self._cursor[symbol]
+        key = (symbol, timeframe)
+        return self._resampled[key], self._resampled_index[key], self._resampled_cursor[key]
+
+    def get_latest_closed_bar(self, symbol: str, timeframe: str) -> pd.Series:
+        if not self._check_timeframe(symbol, timeframe):
+            return pd.Series()
+
+        bars, _, cursor = self._replayed_bars(symbol, timeframe)
+        if cursor == 0:
+            return pd.Series()
+
+        return bar_to_series(bars[cursor - 1])
+
+    def get_latest_closed_bars(self, symbol: str, timeframe: str, num_bars: int = 1) -> pd.DataFrame:
+        if not self._check_timeframe(symbol, timeframe):
+            return pd.DataFrame()
+
+        bars_count = num_bars if num_bars > 0 else 1
+        bars, index, cursor = self._replayed_bars(symbol, timeframe)
+        start = max(0, cursor - bars_count)
+
+        bars = bars[start:cursor]
+        return pd.DataFrame({column: bars[column] for column in BAR_COLUMNS}, index=index[start:cursor])
+
+    def get_latest_tick(self, symbol: str) -> dict:
+        """
+        Builds a tick from the latest replayed bar of the symbol: the bid is the close price and the ask is
+        rebuilt from the bar spread.
+        """
+        cursor = self._cursor.get(symbol, 0)
+        if cursor == 0:
+            logger.warning("Can't recover last tick for %s - No bars replayed yet", symbol)
+            return {}
+
+        bar = bar_from_record(self._bars[symbol][cursor - 1])
+        ask = bar.close + bar.spread * self.symbol_points.get(symbol, 0.0)
+
+        return {'time': bar.time, 'bid': bar.close, 'ask': ask, 'last': 0.0, 'volume': 0,
+                'time_msc': bar.time * 1000, 'flags': 0, 'volume_real': 0.0}
+
+    def seconds_until_next_check(self) -> float:
+        # The next bar can be replayed as soon as the previous one has been handled
+        return 0.0
+
+    def check_for_new_data(self) -> None:
+        """
+        Advances the replay to the next bar opening time of the timeline and puts a DataEvent in the queue for
+        every symbol that has a bar at that time. When the history is exhausted, continue_backtest is set to False.
+        """
+        self._step += 1
+        if self._step >= len(self._timeline):
+            self.continue_backtest = False
+            return
+
+        current_time = self._timeline[self._step]
+        for symbol in self.symbols:
+            cursor = self._cursor[symbol]
+            bars = self._bars[symbol]
+
+            if cursor < len(bars) and bars['time'][cursor] == current_time:
+                self._cursor[symbol] = cursor + 1
+                data_event = DataEvent(symbol=symbol, data=bar_from_record(bars[cursor]),
+                                       timeframe=self.timeframe, trace=new_trace())
+                self.events_queue.put(data_event)
+                if self.resample_timeframes:
+                    self._replay_resampled_bars(symbol, cursor)
+
+    def _replay_resampled_bars(self, symbol: str, position: int) -> None:
+        """
+        Puts a DataEvent in the queue for every resampled bar of a symbol closed by its M1 bar at `position`.
+        """
+        for timeframe in self.resample_timeframes:
+            key = (symbol, timeframe)
+            cursor = self._resampled_cursor[key]
+            positions = self._closing_positions[key]
+            while cursor < len(positions) and positions[cursor] == position:
+                data_event = DataEvent(symbol=symbol, data=bar_from_record(self._resampled[key][cursor]),
+                                       timeframe=timeframe, trace=new_trace())
+                self.events_queue.put(data_event)
+                cursor += 1
+            self._resampled_cursor[key] = cursor
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Protocol
+import pandas as pd
+
+
+class IDataProvider(Protocol):
+
+    def get_latest_closed_bar(self, symbol: str, timeframe: str) -> pd.Series:
+        ...
+
+    def get_latest_closed_bars(self, symbol: str, timeframe: str, num_bars: int = 1) -> pd.DataFrame:
+        ...
+
+    def get_latest_tick(self, symbol: str) -> dict:
+        ...
+
+    def check_for_new_data(self) -> None:
+        ...
+
+    def seconds_until_next_check(self) -> float:
+        ...
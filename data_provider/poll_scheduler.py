@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+from utils.utils import Utils
+
+
+class PollScheduler():
+
+    def __init__(self, symbol_list: list, timeframe: str, latency: float = 0.05, window: float = 5.0,
+                 lead: float = 0.25, max_backoff: float = 60.0, quiet_boundaries: int = 3,
+                 server_offset: float | None = None):
+        """
+        Decides when every symbol has to be polled for a new closed bar.
+
+        A bar closes when the next one opens, so once the latest closed bar of a symbol is known, the next close is
+        known too. The symbol is not polled until `lead` seconds before that point, then it is polled every
+        `latency` seconds during `window` seconds after the boundary. If no new bar shows up in the window (no ticks
+        yet), the polling interval grows exponentially up to `max_backoff` seconds, but a new window is opened at the
+        next boundary unless the symbol had no new bar during `quiet_boundaries` consecutive windows (closed market).
+        Symbols that return no data are always polled with the exponential back-off.
+
+        Bar times are MT5 server times, so the scheduler keeps an estimate of the offset between the server clock
+        and the local clock. Every observation (a server time, or a new bar detected right after a poll that found
+        nothing) raises its lower bound. Until the offset is known, every symbol is polled every `latency` seconds.
+
+        Args:
+            symbol_list (list): The polled symbols.
+            timeframe (str): The polled timeframe.
+            latency (float): The polling interval (seconds) after a bar boundary, i.e. the detection latency.
+            window (float): How long (seconds) after a boundary the symbol is polled every `latency` seconds.
+            lead (float): How long (seconds) before the expected boundary the polling starts.
+            max_backoff (float): The maximum polling interval (seconds) for closed or silent symbols.
+            quiet_boundaries (int): Consecutive boundaries without a new bar before backing off.
+            server_offset (float | None): Known offset (seconds) between the server clock and the local clock.
+        """
+        self.timeframe = timeframe
+        self.latency = latency
+        self.window = window
+        self.lead = lead
+        self.max_backoff = max_backoff
+        self.quiet_boundaries = quiet_boundaries
+        self.server_offset: float | None = server_offset
+
+        now = time.time()
+        self._next_check: Dict[str, float] = {symbol: now for symbol in symbol_list}
+        self._window_end: Dict[str, float] = {symbol: now for symbol in symbol_list}
+        self._next_close: Dict[str, int] = {}            # Server time when the bar being formed will close
+        self._misses: Dict[str, int] = {symbol: 0 for symbol in symbol_list}     # Polls without data or bar since the last window
+        self._quiet: Dict[str, int] = {symbol: 0 for symbol in symbol_list}      # Consecutive windows without a new bar
+        self._last_poll_missed: Dict[str, bool] = {symbol: False for symbol in symbol_list}
+
+    def observe_server_time(self, server_time: float, now: float | None = None) -> None:
+        """
+        Updates the server clock offset with a server time known to be in the past (e.g. the time of the last tick).
+        """
+        now = time.time() if now is None else now
+        offset = server_time - now
+        if self.server_offset is None or offset > self.server_offset:
+            self.server_offset = offset
+
+    def due_symbols(self, now: float | None = None) -> list:
+        """
+        Returns the symbols that have to be polled now.
+        """
+        now = time.time() if now is None else now
+        return [symbol for symbol, next_check in self._next_check.items() if next_check <= now]
+
+    def seconds_until_next_check(self, now: float | None = None) -> float:
+        """
+        Returns the time (seconds) until the next symbol has to be polled.
+        """
+        now = time.time() if now is None else now
+        return max(0.0, min(self._next_check.values(), default=now + self.max_backoff) - now)
+
+    def seconds_until_symbol_check(self, symbol: str, now: float | None = None) -> float:
+        """
+        Returns the time (seconds) until the given symbol has to be polled.
+        """
+        now = time.time() if now is None else now
+        return max(0.0, self._next_check[symbol] - now)
+
+    def record_poll(self, symbol: str, bar_time: int | None, now: float | None = None) -> None:
+        """
+        Records the result of a poll: the opening time of the new bar, 0 if there was no new bar, or None if the
+        poll returned no data.
+        """
+        if bar_time is None:
+            self.record_no_data(symbol, now)
+        elif bar_time == 0:
+            self.record_no_new_bar(symbol, now)
+        else:
+            self.record_new_bar(symbol, bar_time, now)
+
+    def record_new_bar(self, symbol: str, bar_time: int, now: float | None = None) -> None:
+        """
+        Records that a poll found a new closed bar (opened at `bar_time`) and schedules the next boundary.
+        """
+        now = time.time() if now is None else now
+        bar_close = Utils.next_bar_time(bar_time, self.timeframe)
+
+        # The bar was already closed on the server: the offset is at least bar_close - now. If the previous poll
+        # found nothing, the bar closed between both polls and the bound is tight
+        if self._last_poll_missed[symbol] or self.server_offset is not None:
+            self.observe_server_time(bar_close, now)
+
+        self._misses[symbol] = 0
+        self._quiet[symbol] = 0
+        self._last_poll_missed[symbol] = False
+        self._schedule_boundary(symbol, Utils.next_bar_time(bar_close, self.timeframe), now)
+
+    def record_no_new_bar(self, symbol: str, now: float | None = None) -> None:
+        """
+        Records that a poll did not find a new closed bar.
+        """
+        now = time.time() if now is None else now
+        self._last_poll_missed[symbol] = True
+
+        if self.server_offset is None or now < self._window_end[symbol]:
+            self._next_check[symbol] = now + self.latency
+            return
+
+        # No new bar during the whole window: no ticks since the boundary (quiet symbol or closed market).
+        # Keep polling with an exponential back-off, and while the symbol is not considered closed, open a new
+        # window at the next boundary
+        if self._misses[symbol] == 0:
+            self._quiet[symbol] += 1
+        self._back_off(symbol, now)
+
+        if self._quiet[symbol] < self.quiet_boundaries and symbol in self._next_close:
+            server_now = now + self.server_offset
+            next_close = self._next_close[symbol]
+            while next_close <= server_now:
+                next_close = Utils.next_bar_time(next_close, self.timeframe)
+            if next_close - self.server_offset - self.lead <= self._next_check[symbol]:
+                self._misses[symbol] = 0
+                self._schedule_boundary(symbol, next_close, now)
+
+    def record_no_data(self, symbol: str, now: float | None = None) -> None:
+        """
+        Records that a poll returned no data for the symbol (unknown symbol or broker error).
+        """
+        now = time.time() if now is None else now
+        self._last_poll_missed[symbol] = False
+        self._back_off(symbol, now)
+
+    def _schedule_boundary(self, symbol: str, next_close: int, now: float) -> None:
+        self._next_close[symbol] = next_close
+        if self.server_offset is None:
+            self._next_check[symbol] = now + self.latency
+            self._window_end[symbol] = now
+            return
+
+        local_close = next_close - self.server_offset
+        self._next_check[symbol] = max(now, local_close - self.lead)
+        self._window_end[symbol] = local_close + self.window
+
+    def _back_off(self, symbol: str, now: float) -> None:
+        self._misses[symbol] += 1
+        backoff = min(self.latency * 2 ** self._misses[symbol], self.max_backoff)
+        self._next_check[symbol] = now + backoff
+        self._window_end[symbol] = now
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+from events.events import Bar
+from utils.utils import Utils
+
+
+# Fields of the bar being formed (a list, updated in place on every tick)
+_TIME, _OPEN, _HIGH, _LOW, _CLOSE, _TICKVOL, _VOL, _SPREAD, _CLOSE_TIME, _COMPLETE = range(10)
+
+
+class TickBarAggregator():
+
+    def __init__(self, timeframes: Iterable[str]):
+        """
+        Builds the bars of several timeframes from a single tick feed, the same way MT5 builds them: OHLC of the bid,
+        tick volume (number of ticks), real volume and spread (minimum of the bar, in points).
+
+        A bar is closed by the first tick past its closing time, so the closed bars of every timeframe are known as
+        soon as that tick is seen. The first bar of every symbol and timeframe is incomplete (it started before the
+        first tick seen) and is never returned.
+
+        Args:
+            timeframes (Iterable[str]): The timeframes to build (e.g. '1min', '1h', '1M').
+        """
+        self.timeframes: List[str] = list(timeframes)
+
+        # symbol -> the bar being formed in every timeframe (in the order of self.timeframes)
+        self._bars: Dict[str, List[list]] = {}
+        self._last_tick_msc: Dict[str, int] = {}
+
+    def add_tick(self, symbol: str, time_msc: int, bid: float, spread: int, volume: int = 0) -> List[Tuple[str, Bar]]:
+        """
+        Adds a tick of a symbol. Ticks that are not newer than the last one of the symbol are ignored, so the
+        latest tick can be polled repeatedly.
+
+        Args:
+            symbol (str): The symbol of the tick.
+            time_msc (int): The time of the tick as epoch milliseconds (MT5 server time).
+            bid (float): The bid price.
+            spread (int): The spread in points.
+            volume (int): The volume of the tick.
+
+        Returns:
+            List[Tuple[str, Bar]]: The (timeframe, bar) closed by this tick, in the order of the timeframes.
+        """
+        if time_msc <= self._last_tick_msc.get(symbol, -1):
+            return []
+        self._last_tick_msc[symbol] = time_msc
+        tick_time = time_msc // 1000
+
+        bars = self._bars.get(symbol)
+        if bars is None:
+            self._bars[symbol] = [self._new_bar(timeframe, tick_time, bid, spread, volume, complete=False)
+                                  for timeframe in self.timeframes]
+            return []
+
+        closed = []
+        for i, bar in enumerate(bars):
+            if tick_time < bar[_CLOSE_TIME]:
+                if bid > bar[_HIGH]:
+                    bar[_HIGH] = bid
+                elif bid < bar[_LOW]:
+                    bar[_LOW] = bid
+                bar[_CLOSE] = bid
+                bar[_TICKVOL] += 1
+                bar[_VOL] += volume
+                if spread < bar[_SPREAD]:
+                    bar[_SPREAD] = spread
+                continue
+
+            timeframe = self.timeframes[i]
+            if bar[_COMPLETE]:
+                closed.append((timeframe, Bar(*bar[:_CLOSE_TIME])))
+            bars[i] = self._new_bar(timeframe, tick_time, bid, spread, volume, complete=True)
+        return closed
+
+    @staticmethod
+    def _new_bar(timeframe: str, tick_time: int, bid: float, spread: int, volume: int, complete: bool) -> list:
+        open_time = Utils.bar_open_time(tick_time, timeframe)
+        return [open_time, bid, bid, bid, bid, 1, volume, spread, Utils.next_bar_time(open_time, timeframe), complete]
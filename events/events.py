@@ -1,7 +1,9 @@
+import os
+import time
 from enum import Enum
-from pydantic import BaseModel
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional, get_type_hints
+
 
 class EventType(str, Enum):
     """
@@ -40,31 +42,245 @@ class OrderType(str, Enum):
     STOP = "STOP"
 
 
-class BaseEvent(BaseModel):
+class Bar(NamedTuple):
+    """
+    Represents a closed bar.
+
+    Attributes:
+        time (int): The opening time of the bar as epoch seconds (MT5 server time).
+        open (float): The open price.
+        high (float): The high price.
+        low (float): The low price.
+        close (float): The close price.
+        tickvol (int): The tick volume.
+        vol (int): The real volume.
+        spread (int): The spread in points.
+    """
+    time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    tickvol: int
+    vol: int
+    spread: int
+
+    @property
+    def datetime(self) -> datetime:
+        """
+        The opening time of the bar as a naive datetime (MT5 server time).
+        """
+        return datetime.fromtimestamp(self.time, tz=timezone.utc).replace(tzinfo=None)
+
+
+class TraceContext(NamedTuple):
+    """
+    Monotonic timestamps (time.perf_counter_ns) of the stages of the pipeline that led to an event. Every event
+    carries the trace of the event it comes from, with its own stage stamped. A stage that has not been reached (or
+    is unknown, e.g. the bar close in a backtest) is 0.
+
+    Attributes:
+        bar_close (int): When the bar closed (estimated from the broker server clock).
+        data (int): When the DataEvent was created.
+        signal (int): When the SignalEvent was created.
+        sizing (int): When the SizingEvent was created.
+        order (int): When the OrderEvent was created.
+        execution (int): When the ExecutionEvent (or PlacedPendingOrderEvent) was created.
+    """
+    bar_close: int = 0
+    data: int = 0
+    signal: int = 0
+    sizing: int = 0
+    order: int = 0
+    execution: int = 0
+
+
+# Tracing is on by default (a few hundred ns per event). It can be disabled for the whole process with the
+# TOROGOZ_TRACE_EVENTS environment variable or with set_event_tracing: the events are then created without trace.
+_TRACE_EVENTS: bool = os.getenv("TOROGOZ_TRACE_EVENTS", "1").lower() not in ("0", "false", "no")
+_tuple_new = tuple.__new__
+
+
+def set_event_tracing(enabled: bool) -> None:
+    """
+    Enables or disables the trace context of the events created from now on.
+
+    Args:
+        enabled (bool): True to trace the events.
+    """
+    global _TRACE_EVENTS
+    _TRACE_EVENTS = enabled
+
+
+def is_event_tracing_enabled() -> bool:
+    return _TRACE_EVENTS
+
+
+def new_trace(since_bar_close: Optional[float] = None) -> Optional[TraceContext]:
+    """
+    Starts the trace of a new bar (stamps the creation of its DataEvent).
+
+    Args:
+        since_bar_close (float | None): Seconds elapsed since the bar closed, if known.
+
+    Returns:
+        TraceContext | None: The trace, or None if tracing is disabled.
+    """
+    if not _TRACE_EVENTS:
+        return None
+    now = time.perf_counter_ns()
+    if since_bar_close is None:
+        return _tuple_new(TraceContext, (0, now, 0, 0, 0, 0))
+    return _tuple_new(TraceContext, (now - int(max(since_bar_close, 0.0) * 1e9), now, 0, 0, 0, 0))
+
+
+def stamp_trace(trace: Optional[TraceContext], stage: int) -> Optional[TraceContext]:
+    """
+    Returns the trace of an event created from another one: the trace of the original event with the stage of the
+    new event stamped now. Events without trace (tracing disabled) give no trace.
+
+    Args:
+        trace (TraceContext | None): The trace of the original event.
+        stage (int): The stage of the new event (its class trace_stage, e.g. SizingEvent.trace_stage).
+
+    Returns:
+        TraceContext | None: The trace of the new event.
+    """
+    if trace is None:
+        return None
+    return _tuple_new(TraceContext, trace[:stage] + (time.perf_counter_ns(),) + trace[stage + 1:])
+
+
+def with_trace(event, trace: Optional[TraceContext]):
+    """
+    Returns a copy of an event with another trace (the trace is the last field of every event).
+    """
+    return _tuple_new(type(event), event[:-1] + (trace,))
+
+
+# Event validation is off by default (events are created on the hot path). It can be enabled for the whole process
+# with the TOROGOZ_VALIDATE_EVENTS environment variable (debug mode) or with set_event_validation, and events coming
+# from outside the process can be validated explicitly with BaseEvent.validated.
+_VALIDATE_EVENTS: bool = os.getenv("TOROGOZ_VALIDATE_EVENTS", "").lower() in ("1", "true", "yes")
+_EVENT_CLASSES: list = []
+
+
+def set_event_validation(enabled: bool) -> None:
+    """
+    Enables or disables the validation of every event on creation.
+
+    Args:
+        enabled (bool): True to validate every event on creation.
+    """
+    global _VALIDATE_EVENTS
+    _VALIDATE_EVENTS = enabled
+    for event_class in _EVENT_CLASSES:
+        _set_event_constructor(event_class)
+
+
+def _set_event_constructor(event_class: type) -> None:
+    # Without validation the event uses the constructor of its NamedTuple directly (no extra call per event)
+    if "__new__" in event_class.__dict__:
+        delattr(event_class, "__new__")
+
+    if _VALIDATE_EVENTS:
+        fields_new = event_class.__new__
+
+        def __new__(cls, *args, **kwargs):
+            return fields_new(cls, *args, **kwargs).validated()
+
+        event_class.__new__ = staticmethod(__new__)
+
+
+class BaseEvent():
     """
     Base class for all events.
+
+    Events are immutable tuples with named fields (no per-instance dict). The event type is a class attribute, so it
+    does not take space in every event.
     """
+    __slots__ = ()
     event_type: EventType
+    trace_stage: int            # Index of the stage stamped by the event in its TraceContext
+    _field_types: dict
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_types = get_type_hints(next(base for base in cls.__bases__ if issubclass(base, tuple)))
+        _EVENT_CLASSES.append(cls)
+        _set_event_constructor(cls)
+
+    def validated(self):
+        """
+        Checks the type of every field, converting the values that can be converted without loss (str to the enum
+        fields, int to the float fields).
+
+        Returns:
+            The validated event (a new instance if some value was converted).
 
-    class Config:
-        arbitrary_types_allowed = True
+        Raises:
+            ValueError: If a field has a value of the wrong type.
+        """
+        changes = {}
+        for field_name, field_type in self._field_types.items():
+            value = getattr(self, field_name)
+            if value is None and self._field_defaults.get(field_name, 0) is None:
+                continue
+            if issubclass(field_type, Enum):
+                if not isinstance(value, field_type):
+                    try:
+                        changes[field_name] = field_type(value)
+                    except ValueError:
+                        raise ValueError(f"Invalid {field_name} for {type(self).__name__}: {value!r}")
+            elif field_type is float:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"Invalid {field_name} for {type(self).__name__}: {value!r}")
+                if not isinstance(value, float):
+                    changes[field_name] = float(value)
+            elif field_type is int:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise ValueError(f"Invalid {field_name} for {type(self).__name__}: {value!r}")
+            elif not isinstance(value, field_type):
+                raise ValueError(f"Invalid {field_name} for {type(self).__name__}: {value!r}")
 
+        return self._replace(**changes) if changes else self
 
-class DataEvent(BaseEvent):
+
+class _DataEventFields(NamedTuple):
+    symbol: str
+    data: Bar
+    timeframe: str = ""
+    trace: TraceContext = None
+
+
+class DataEvent(BaseEvent, _DataEventFields):
     """
     Represents an event that contains data for a specific symbol.
 
     Attributes:
         event_type (EventType): The type of the event (always EventType.DATA).
         symbol (str): The symbol associated with the data.
-        data (pd.Series): The data associated with the event.
+        data (Bar): The closed bar associated with the event.
+        timeframe (str): The timeframe of the bar (e.g. '1min').
+        trace (TraceContext | None): The timestamps of the pipeline stages (None if tracing is disabled).
     """
-    event_type: EventType = EventType.DATA
+    __slots__ = ()
+    event_type = EventType.DATA
+    trace_stage = 1
+
+
+class _SignalEventFields(NamedTuple):
     symbol: str
-    data: pd.Series
+    signal: SignalType
+    target_order: OrderType
+    target_price: float
+    magic_number: int
+    sl: float
+    tp: float
+    trace: TraceContext = None
 
 
-class SignalEvent(BaseEvent):
+class SignalEvent(BaseEvent, _SignalEventFields):
     """
     Represents a signal event in the trading system.
 
@@ -77,8 +293,14 @@ class SignalEvent(BaseEvent):
         magic_number (int): The magic number associated with the signal.
         sl (float): The stop loss level for the order.
         tp (float): The take profit level for the order.
+        trace (TraceContext | None): The timestamps of the pipeline stages (None if tracing is disabled).
     """
-    event_type: EventType = EventType.SIGNAL
+    __slots__ = ()
+    event_type = EventType.SIGNAL
+    trace_stage = 2
+
+
+class _SizingEventFields(NamedTuple):
     symbol: str
     signal: SignalType
     target_order: OrderType
@@ -86,9 +308,11 @@ class SignalEvent(BaseEvent):
     magic_number: int
     sl: float
     tp: float
+    volume: float
+    trace: TraceContext = None
 
 
-class SizingEvent(BaseEvent):
+class SizingEvent(BaseEvent, _SizingEventFields):
     """
     Represents a sizing event.
 
@@ -102,8 +326,14 @@ class SizingEvent(BaseEvent):
         sl (float): The stop loss value of the event.
         tp (float): The take profit value of the event.
         volume (float): The volume of the event.
+        trace (TraceContext | None): The timestamps of the pipeline stages (None if tracing is disabled).
     """
-    event_type: EventType = EventType.SIZING
+    __slots__ = ()
+    event_type = EventType.SIZING
+    trace_stage = 3
+
+
+class _OrderEventFields(NamedTuple):
     symbol: str
     signal: SignalType
     target_order: OrderType
@@ -112,9 +342,10 @@ class SizingEvent(BaseEvent):
     sl: float
     tp: float
     volume: float
+    trace: TraceContext = None
 
 
-class OrderEvent(BaseEvent):
+class OrderEvent(BaseEvent, _OrderEventFields):
     """
     Represents an order event.
 
@@ -128,19 +359,25 @@ class OrderEvent(BaseEvent):
         sl (float): The stop loss level of the order.
         tp (float): The take profit level of the order.
         volume (float): The volume of the order.
+        trace (TraceContext | None): The timestamps of the pipeline stages (None if tracing is disabled).
     """
-    event_type: EventType = EventType.ORDER
+    __slots__ = ()
+    event_type = EventType.ORDER
+    trace_stage = 4
+
+
+class _ExecutionEventFields(NamedTuple):
     symbol: str
     signal: SignalType
-    target_order: OrderType
-    target_price: float
-    magic_number: int
-    sl: float
-    tp: float
+    fill_price: float
+    fill_time: datetime
     volume: float
+    magic_number: int = 0
+    ticket: int = 0
+    trace: TraceContext = None
 
 
-class ExecutionEvent(BaseEvent):
+class ExecutionEvent(BaseEvent, _ExecutionEventFields):
     """
     Represents an execution event that occurs when a trade is executed.
 
@@ -151,16 +388,29 @@ class ExecutionEvent(BaseEvent):
         fill_price (float): The price at which the trade was executed.
         fill_time (datetime): The timestamp of the trade execution.
         volume (float): The volume of the executed trade.
+        magic_number (int): The magic number of the strategy that sent the order.
+        ticket (int): The ticket of the position opened, increased or reduced by the trade (0 if unknown: the
+            execution is then only picked up by the next reconcile of the portfolio).
+        trace (TraceContext | None): The timestamps of the pipeline stages (None if tracing is disabled).
     """
-    event_type: EventType = EventType.EXECUTION
+    __slots__ = ()
+    event_type = EventType.EXECUTION
+    trace_stage = 5
+
+
+class _PlacedPendingOrderEventFields(NamedTuple):
     symbol: str
     signal: SignalType
-    fill_price: float
-    fill_time: datetime
+    target_order: OrderType
+    target_price: float
+    magic_number: int
+    sl: float
+    tp: float
     volume: float
+    trace: TraceContext = None
 
 
-class PlacedPendingOrderEvent(BaseEvent):
+class PlacedPendingOrderEvent(BaseEvent, _PlacedPendingOrderEventFields):
     """
     Represents an event for a placed pending order.
 
@@ -174,13 +424,8 @@ class PlacedPendingOrderEvent(BaseEvent):
         sl (float): The stop loss level for the order.
         tp (float): The take profit level for the order.
         volume (float): The volume of the order.
+        trace (TraceContext | None): The timestamps of the pipeline stages (None if tracing is disabled).
     """
-    event_type: EventType = EventType.PENDING
-    symbol: str
-    signal: SignalType
-    target_order: OrderType
-    target_price: float
-    magic_number: int
-    sl: float
-    tp: float
-    volume: float
\ No newline at end of file
+    __slots__ = ()
+    event_type = EventType.PENDING
+    trace_stage = 5
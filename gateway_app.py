@@ -0,0 +1,27 @@
+from broker.broker import get_default_broker, set_default_broker
+from broker.broker_gateway import DEFAULT_GATEWAY_ADDRESS, BrokerGateway
+from broker.brokers.simulated_broker import SimulatedBroker
+from platform_connector.platform_connector import PlatformConnector
+from utils.logger import setup_logging
+
+if  __name__ == '__main__':
+    # Symbols added to the Market Watch on start (the strategy processes can request any symbol)
+    symbols = ["AUDCAD", "EURUSD", "USDCHF"]
+
+    # Simulated mode: serve a SimulatedBroker fed from history_dir instead of a MT5 terminal
+    simulated = False
+    history_dir = "history"
+    timeframe = "1min"
+
+    setup_logging()
+
+    if simulated:
+        set_default_broker(SimulatedBroker.from_history_files(data_dir=history_dir, symbol_list=symbols,
+                                                              timeframe=timeframe, speed=60.0))
+    else:
+        CONNECT = PlatformConnector(symbol_list=symbols)
+
+    # The strategy processes connect with a GatewayBroker (gateway_address in trading_app.py) and the key in
+    # MT5_GATEWAY_KEY
+    GATEWAY = BrokerGateway(broker=get_default_broker(), address=DEFAULT_GATEWAY_ADDRESS)
+    GATEWAY.serve_forever()
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_provider.bar_buffer import load_bar_history
+from data_provider.bar_store import BarStore
+from signal_generator.indicators.moving_averages import rolling_sum
+from signal_generator.properties.signal_generator_properties import BaseSignalProps, MACrossoverProps
+from signal_generator.signals.signal_ma_crossover import SignalMACrossover
+from utils.logger import get_logger
+
+
+logger = get_logger("optimizer")
+
+
+# Columns of the per-chunk statistics of one parameter set (see _chunk_stats and _merge_stats)
+_SUM, _SUM_SQ, _COUNT, _TRADES, _FIRST, _LAST, _TOTAL, _MAX_PREFIX, _MIN_PREFIX, _MAX_DD = range(10)
+_NUM_STATS = 10
+
+# Closes shared by the parent process, and the strategies of the sweep (one per parameter set), set in every worker
+_SHARED_MEMORY: shared_memory.SharedMemory | None = None
+_CLOSES: np.ndarray | None = None
+_STRATEGIES: List = []
+_WARMUP = 0
+
+
+def _create_strategy(props: BaseSignalProps):
+    """
+    Creates the signal method of a parameter set. It must provide the batch API (compute_signal_series) to be
+    optimized.
+
+    Raises:
+        Exception: If the properties are of an unknown type, or invalid (e.g. fast_period >= slow_period).
+    """
+    if isinstance(props, MACrossoverProps):
+        return SignalMACrossover(properties=props)
+
+    raise Exception(f"ERROR: Método de señal no optimizable: {props}")
+
+
+def _init_worker(shm_name: str, total_bars: int, props_list: List[BaseSignalProps]) -> None:
+    """
+    Initializer of the worker processes: attaches the shared closes and creates the strategies once.
+    """
+    global _SHARED_MEMORY, _CLOSES, _STRATEGIES, _WARMUP
+    try:
+        _SHARED_MEMORY = shared_memory.SharedMemory(name=shm_name, track=False)    # Python >= 3.13
+    except TypeError:
+        _SHARED_MEMORY = shared_memory.SharedMemory(name=shm_name)
+    _CLOSES = np.ndarray((total_bars,), dtype=np.float64, buffer=_SHARED_MEMORY.buf)
+    _STRATEGIES = [_create_strategy(props) for props in props_list]
+    _WARMUP = max(strategy.warmup_bars for strategy in _STRATEGIES)
+
+
+def _chunk_signals(closes: np.ndarray) -> List[np.ndarray]:
+    """
+    Signal series of every strategy over the closes of a chunk. The moving averages of the MA crossovers are
+    computed once per period and shared by every parameter set that uses them.
+    """
+    crossovers = [strategy for strategy in _STRATEGIES if isinstance(strategy, SignalMACrossover)]
+    moving_averages: Dict[int, np.ndarray] = {}
+    block = 0
+    if crossovers:
+        periods = {period for strategy in crossovers for period in (strategy.fast_period, strategy.slow_period)}
+        block = max(periods)
+        for period in periods:
+            ma = np.full(len(closes), np.nan)
+            ma[period - 1:] = rolling_sum(closes, period, block) / period
+            moving_averages[period] = ma
+
+    signals = []
+    for strategy in _STRATEGIES:
+        if isinstance(strategy, SignalMACrossover):
+            signals.append(strategy.signals_from_moving_averages(closes, moving_averages[strategy.fast_period],
+                                                                 moving_averages[strategy.slow_period], block))
+        else:
+            signals.append(strategy.compute_signal_series(closes)[2])
+    return signals
+
+
+def _chunk_stats(signals: np.ndarray, returns: np.ndarray) -> np.ndarray:
+    """
+    Mergeable statistics of one parameter set over a chunk: the position of bar i (its signal) earns the return
+    of the next bar.
+    """
+    stats = np.zeros(_NUM_STATS)
+    pnl = returns * signals
+    equity = np.cumsum(pnl)
+    peaks = np.maximum.accumulate(equity)
+    np.maximum(peaks, 0.0, out=peaks)
+
+    stats[_SUM] = equity[-1]
+    stats[_SUM_SQ] = np.dot(pnl, pnl)
+    stats[_COUNT] = len(pnl)
+    stats[_TRADES] = np.count_nonzero((signals[1:] != signals[:-1]) & (signals[1:] != 0))
+    stats[_FIRST] = signals[0]
+    stats[_LAST] = signals[-1]
+    stats[_TOTAL] = equity[-1]
+    stats[_MAX_PREFIX] = max(peaks[-1], 0.0)
+    stats[_MIN_PREFIX] = min(equity.min(), 0.0)
+    stats[_MAX_DD] = float(np.max(np.subtract(peaks, equity, out=peaks)))
+    return stats
+
+
+def _evaluate_chunk(offset: int, length: int, start: int, end: int) -> np.ndarray:
+    """
+    Evaluates every parameter set over the bars [start, end) of a symbol (stored at `offset` in the shared closes),
+    with enough previous bars to warm the indicators up.
+
+    Returns:
+        np.ndarray: The statistics, one row per parameter set.
+    """
+    warmup = min(start, _WARMUP)
+    closes = _CLOSES[offset + start - warmup: offset + end]
+    num_bars = end - start
+
+    # Return earned by the position of every bar of the chunk (the last bar of the history earns nothing)
+    returns = np.zeros(num_bars)
+    next_close = _CLOSES[offset + start + 1: offset + min(end + 1, length)]
+    returns[:len(next_close)] = next_close / closes[warmup: warmup + len(next_close)] - 1.0
+
+    stats = np.empty((len(_STRATEGIES), _NUM_STATS))
+    for i, signals in enumerate(_chunk_signals(closes)):
+        stats[i] = _chunk_stats(signals[warmup:], returns)
+    return stats
+
+
+def _merge_stats(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Merges the statistics of two consecutive chunks (one row per parameter set).
+    """
+    merged = np.empty_like(first)
+    merged[:, _SUM] = first[:, _SUM] + second[:, _SUM]
+    merged[:, _SUM_SQ] = first[:, _SUM_SQ] + second[:, _SUM_SQ]
+    merged[:, _COUNT] = first[:, _COUNT] + second[:, _COUNT]
+    # A new position opened on the first bar of the second chunk is a trade too
+    new_position = (second[:, _FIRST] != first[:, _LAST]) & (second[:, _FIRST] != 0)
+    merged[:, _TRADES] = first[:, _TRADES] + second[:, _TRADES] + new_position
+    merged[:, _FIRST] = first[:, _FIRST]
+    merged[:, _LAST] = second[:, _LAST]
+    merged[:, _TOTAL] = first[:, _TOTAL] + second[:, _TOTAL]
+    merged[:, _MAX_PREFIX] = np.maximum(first[:, _MAX_PREFIX], first[:, _TOTAL] + second[:, _MAX_PREFIX])
+    merged[:, _MIN_PREFIX] = np.minimum(first[:, _MIN_PREFIX], first[:, _TOTAL] + second[:, _MIN_PREFIX])
+    # The worst drawdown lies in one of the chunks, or goes from the peak of the first to the trough of the second
+    merged[:, _MAX_DD] = np.maximum(np.maximum(first[:, _MAX_DD], second[:, _MAX_DD]),
+                                    first[:, _MAX_PREFIX] - first[:, _TOTAL] - second[:, _MIN_PREFIX])
+    return merged
+
+
+class SignalOptimizer():
+
+    def __init__(self, symbol_list: List[str], timeframe: str, data_dir: str, start_date: datetime | None = None,
+                 end_date: datetime | None = None, max_workers: int | None = None, chunk_size: int = 100_000,
+                 bar_store: BarStore | None = None):
+        """
+        Parameter sweep of a signal method over the history files of several symbols (see load_bar_history).
+
+        The closes of every symbol are copied once to a shared memory block that the worker processes read
+        directly, and the histories are split into chunks of `chunk_size` bars, so the work is spread over every
+        core even with few symbols. Every task evaluates the whole grid on its chunk, and the statistics of the
+        chunks are merged in the parent process.
+
+        Args:
+            symbol_list (List[str]): The symbols to evaluate.
+            timeframe (str): The timeframe of the history files (e.g. '1min').
+            data_dir (str): The directory that contains the history files.
+            start_date (datetime | None): Bars opened before this date are skipped.
+            end_date (datetime | None): Bars opened after this date are skipped.
+            max_workers (int | None): Number of worker processes (all the cores if None).
+            chunk_size (int): Number of bars evaluated by each task.
+            bar_store (BarStore | None): Local bar store. If given, the closes are read from it (memory mapped,
+                copied straight to the shared memory block) and the history files are only parsed the first time.
+        """
+        self.symbol_list = symbol_list
+        self.timeframe = timeframe
+        self.data_dir = data_dir
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        self.bar_store = bar_store
+
+    def _load_closes(self) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+        """
+        Loads the closes of every symbol with history, and the number of bars per year of each one (used to
+        annualize the Sharpe ratio).
+        """
+        closes = {}
+        bars_per_year = {}
+        for symbol in self.symbol_list:
+            if self.bar_store is not None:
+                bars = self.bar_store.load(symbol, self.timeframe, self.data_dir, self.start_date, self.end_date)
+            else:
+                bars = load_bar_history(self.data_dir, symbol, self.timeframe, self.start_date, self.end_date)
+            if len(bars) < 2:
+                continue
+            # A view of the column: it is only copied once, to the shared memory block
+            closes[symbol] = bars['close']
+            years = (int(bars['time'][-1]) - int(bars['time'][0])) / (365.25 * 86400)
+            bars_per_year[symbol] = len(bars) / years if years > 0 else float(len(bars))
+        return closes, bars_per_year
+
+    def optimize(self, base_props: BaseSignalProps, param_grid: Dict[str, Iterable], sort_by: str = 'sharpe_ratio',
+                 by_symbol: bool = False) -> pd.DataFrame:
+        """
+        Evaluates every combination of the parameter grid and ranks them.
+
+        The strategy is always in the market on the side of its last signal and earns the simple return of the
+        next bar (no spreads or commissions). The returns are added, not compounded. Invalid combinations (e.g.
+        fast_period >= slow_period) are skipped.
+
+        Args:
+            base_props (BaseSignalProps): The properties of the signal method; the fields of the grid are replaced.
+            param_grid (Dict[str, Iterable]): The values of every field to sweep, e.g.
+                {'fast_period': range(2, 52), 'slow_period': range(3, 53)}.
+            sort_by (str): The column used to rank the results (max_drawdown is ranked ascending, the rest
+                descending).
+            by_symbol (bool): One row per symbol and parameter set instead of aggregating the symbols (mean return
+                and Sharpe ratio, worst drawdown, total trades).
+
+        Returns:
+            pd.DataFrame: The parameters, total_return, sharpe_ratio, max_drawdown and trades of every combination,
+            best first.
+        """
+        param_names = list(param_grid.keys())
+        combinations = []
+        props_list = []
+        for values in itertools.product(*param_grid.values()):
+            params = dict(zip(param_names, values))
+            try:
+                props = type(base_props)(**{**base_props.model_dump(), **params})
+                _create_strategy(props)
+            except Exception:
+                continue
+            combinations.append(params)
+            props_list.append(props)
+
+        columns = (['symbol'] if by_symbol else []) + param_names + ['total_return', 'sharpe_ratio', 'max_drawdown',
+                                                                    'trades']
+        closes, bars_per_year = self._load_closes()
+        if not combinations or not closes:
+            logger.error("Nothing to optimize (no valid parameter set or no history)")
+            return pd.DataFrame(columns=columns)
+
+        # Every symbol is stored contiguously in one shared block: offsets[symbol] = (offset, length)
+        offsets = {}
+        total_bars = 0
+        for symbol, symbol_closes in closes.items():
+            offsets[symbol] = (total_bars, len(symbol_closes))
+            total_bars += len(symbol_closes)
+
+        shm = shared_memory.SharedMemory(create=True, size=total_bars * np.dtype(np.float64).itemsize)
+        try:
+            shared_closes = np.ndarray((total_bars,), dtype=np.float64, buffer=shm.buf)
+            for symbol, (offset, length) in offsets.items():
+                shared_closes[offset: offset + length] = closes[symbol]
+            del shared_closes
+
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(shm.name, total_bars, props_list)) as executor:
+                futures = {}
+                for symbol, (offset, length) in offsets.items():
+                    futures[symbol] = [executor.submit(_evaluate_chunk, offset, length, start,
+                                                       min(start + self.chunk_size, length))
+                                       for start in range(0, length, self.chunk_size)]
+
+                symbol_stats = {}
+                for symbol, symbol_futures in futures.items():
+                    stats = symbol_futures[0].result()
+                    for future in symbol_futures[1:]:
+                        stats = _merge_stats(stats, future.result())
+                    symbol_stats[symbol] = stats
+        finally:
+            shm.close()
+            shm.unlink()
+
+        results = []
+        for symbol, stats in symbol_stats.items():
+            count = stats[:, _COUNT]
+            mean = stats[:, _SUM] / count
+            std = np.sqrt(np.maximum(stats[:, _SUM_SQ] / count - mean * mean, 0.0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sharpe = np.where(std > 0, mean / std * np.sqrt(bars_per_year[symbol]), 0.0)
+
+            symbol_results = pd.DataFrame(combinations)
+            symbol_results.insert(0, 'symbol', symbol)
+            symbol_results['total_return'] = stats[:, _TOTAL]
+            symbol_results['sharpe_ratio'] = sharpe
+            symbol_results['max_drawdown'] = stats[:, _MAX_DD]
+            symbol_results['trades'] = stats[:, _TRADES].astype(np.int64) + (stats[:, _FIRST] != 0)
+            results.append(symbol_results)
+        results = pd.concat(results, ignore_index=True)
+
+        if not by_symbol:
+            results = results.groupby(param_names, sort=False).agg(total_return=('total_return', 'mean'),
+                                                                   sharpe_ratio=('sharpe_ratio', 'mean'),
+                                                                   max_drawdown=('max_drawdown', 'max'),
+                                                                   trades=('trades', 'sum')).reset_index()
+
+        return results.sort_values(sort_by, ascending=(sort_by == 'max_drawdown'), kind='stable',
+                                   ignore_index=True)[columns]
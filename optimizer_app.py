@@ -0,0 +1,21 @@
+from data_provider.bar_store import BarStore
+from optimizer.optimizer import SignalOptimizer
+from signal_generator.properties.signal_generator_properties import MACrossoverProps
+
+if  __name__ == '__main__':
+    symbols = ["AUDCAD", "EURUSD", "USDCHF"]
+    timeframe = "1min"
+    history_dir = "history"
+    # The history files are parsed once into this memory-mapped store (None: parse them on every run)
+    bar_store_dir = "bar_store"
+
+    mac_props = MACrossoverProps(timeframe=timeframe,
+                                 fast_period=5,
+                                 slow_period=10)
+    param_grid = {'fast_period': range(2, 52),
+                  'slow_period': range(3, 53)}
+
+    BAR_STORE = BarStore(bar_store_dir) if bar_store_dir is not None else None
+    OPTIMIZER = SignalOptimizer(symbol_list=symbols, timeframe=timeframe, data_dir=history_dir, bar_store=BAR_STORE)
+    results = OPTIMIZER.optimize(base_props=mac_props, param_grid=param_grid, sort_by='sharpe_ratio')
+    print(results.head(20).to_string(index=False))
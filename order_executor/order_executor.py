@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from queue import Queue
+from typing import Deque, Dict, Tuple
+
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+from events.events import ExecutionEvent, OrderEvent, OrderType, PlacedPendingOrderEvent, SignalType, stamp_trace
+from utils.logger import get_logger
+from .rate_limiter import RateLimiter
+
+
+logger = get_logger("order_executor")
+
+
+class OrderExecutor():
+
+    def __init__(self, events_queue: Queue, broker: IBroker | None = None, workers: int = 32,
+                 max_orders_per_second: float | None = None, burst: int | None = None, deviation: int = 10,
+                 filling_mode: int | None = None, max_retries: int = 2, retry_delay: float = 0.05):
+        """
+        Turns the OrderEvents into trade requests to the broker without blocking the main loop.
+
+        execute_order only hands the order to a pool of `workers` threads, so a burst of orders of many symbols
+        (e.g. every symbol at the same bar close) is in flight at once instead of waiting for the round trip of
+        every previous order. The orders of one symbol are still sent one after another, in the order they
+        arrived. The confirmations are put in the events queue as they come back: an ExecutionEvent for a market
+        order filled (fully or partially), a PlacedPendingOrderEvent for a pending order placed.
+
+        The trade requests respect the rate limit of the broker (see RateLimiter) and are retried with a fresh
+        price on requotes, price changes and 'too many requests' answers.
+
+        Args:
+            events_queue (Queue): The queue where the confirmations are put (with the AsyncTradingDirector, they are
+                put from the event loop thread).
+            broker (IBroker | None): The broker (the default broker if None).
+            workers (int): The maximum number of orders in flight at once.
+            max_orders_per_second (float | None): The sustained trade requests per second allowed by the broker
+                (no limit if None).
+            burst (int | None): The trade requests that can be sent back to back (`workers` if None).
+            deviation (int): The maximum slippage (points) of the market orders.
+            filling_mode (int | None): The filling mode of the market orders (ORDER_FILLING_FOK if None).
+            max_retries (int): How many times a request is sent again after a retryable answer.
+            retry_delay (float): The delay (seconds) before the first retry, doubled on every retry.
+        """
+        self.events_queue = events_queue
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
+        self.workers = workers
+        self.deviation = deviation
+        self.filling_mode: int = filling_mode if filling_mode is not None else self.broker.ORDER_FILLING_FOK
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.rate_limiter: RateLimiter | None = None
+        if max_orders_per_second is not None:
+            self.rate_limiter = RateLimiter(rate=max_orders_per_second, burst=burst if burst is not None else workers)
+
+        self._retryable_codes = frozenset((self.broker.TRADE_RETCODE_REQUOTE, self.broker.TRADE_RETCODE_PRICE_CHANGED,
+                                           self.broker.TRADE_RETCODE_PRICE_OFF,
+                                           self.broker.TRADE_RETCODE_TOO_MANY_REQUESTS))
+        self._filled_codes = frozenset((self.broker.TRADE_RETCODE_DONE, self.broker.TRADE_RETCODE_DONE_PARTIAL))
+        self._pending_types = {
+            (SignalType.BUY, OrderType.LIMIT): self.broker.ORDER_TYPE_BUY_LIMIT,
+            (SignalType.SELL, OrderType.LIMIT): self.broker.ORDER_TYPE_SELL_LIMIT,
+            (SignalType.BUY, OrderType.STOP): self.broker.ORDER_TYPE_BUY_STOP,
+            (SignalType.SELL, OrderType.STOP): self.broker.ORDER_TYPE_SELL_STOP,
+        }
+
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+        # Whether the account nets the positions of a symbol (None until its account info is read, see
+        # _position_ticket)
+        self._netting: bool | None = None
+
+        # Orders waiting for the previous order of their symbol, by symbol (a symbol is in the dict while one of its
+        # orders is in flight), with the event loop where their confirmation is published (if any)
+        self._symbol_backlogs: Dict[str, Deque[Tuple[OrderEvent, asyncio.AbstractEventLoop | None]]] = {}
+
+        # Orders received and not confirmed yet
+        self.pending_orders: int = 0
+
+        # Orders, trade requests and their outcome since the creation of the executor
+        self.stats: Dict[str, int] = {'orders': 0, 'requests': 0, 'retries': 0, 'executed': 0, 'placed': 0,
+                                      'rejected': 0}
+
+    def execute_order(self, order_event: OrderEvent) -> None:
+        """
+        Sends the order to the broker in the background (see the class documentation). It returns immediately.
+
+        Args:
+            order_event (OrderEvent): The order event.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self._lock:
+            self.stats['orders'] += 1
+            self.pending_orders += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="OrderExecutor")
+            backlog = self._symbol_backlogs.get(order_event.symbol)
+            if backlog is not None:
+                # The thread that sends the order in flight of the symbol sends this one after it
+                backlog.append((order_event, loop))
+                return
+            self._symbol_backlogs[order_event.symbol] = deque()
+        self._executor.submit(self._execute_symbol_orders, order_event, loop)
+
+    def _execute_symbol_orders(self, order_event: OrderEvent, loop: asyncio.AbstractEventLoop | None) -> None:
+        symbol = order_event.symbol
+        while True:
+            try:
+                self._send_order(order_event, loop)
+            except Exception as e:
+                logger.error("The %s order of %s in %s failed: %r", order_event.signal, order_event.volume, symbol, e)
+            finally:
+                with self._lock:
+                    self.pending_orders -= 1
+
+            with self._lock:
+                backlog = self._symbol_backlogs[symbol]
+                if not backlog:
+                    del self._symbol_backlogs[symbol]
+                    return
+                order_event, loop = backlog.popleft()
+
+    def _build_request(self, order_event: OrderEvent) -> dict | None:
+        request = {
+            'symbol': order_event.symbol,
+            'volume': order_event.volume,
+            'sl': order_event.sl,
+            'tp': order_event.tp,
+            'magic': order_event.magic_number,
+            'type_time': self.broker.ORDER_TIME_GTC,
+        }
+        if order_event.target_order == OrderType.MARKET:
+            request.update(action=self.broker.TRADE_ACTION_DEAL, deviation=self.deviation,
+                           type=self.broker.ORDER_TYPE_BUY if order_event.signal == SignalType.BUY
+                           else self.broker.ORDER_TYPE_SELL, type_filling=self.filling_mode)
+            return request
+
+        order_type = self._pending_types.get((order_event.signal, order_event.target_order))
+        if order_type is None:
+            logger.error("Unknown order type %s for %s in %s", order_event.target_order, order_event.signal,
+                         order_event.symbol)
+            return None
+        request.update(action=self.broker.TRADE_ACTION_PENDING, type=order_type, price=order_event.target_price,
+                       type_filling=self.broker.ORDER_FILLING_RETURN)
+        return request
+
+    def _send_order(self, order_event: OrderEvent, loop: asyncio.AbstractEventLoop | None) -> None:
+        request = self._build_request(order_event)
+        if request is None:
+            self._count('rejected')
+            return
+        market = request['action'] == self.broker.TRADE_ACTION_DEAL
+
+        fill_time = None
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            # The market orders are priced right before they are sent (and again on every retry)
+            if market:
+                tick = self.broker.symbol_info_tick(order_event.symbol)
+                if tick is None:
+                    logger.error("Could not retrieve the last tick of %s: %s", order_event.symbol,
+                                 self.broker.last_error())
+                    self._count('rejected')
+                    return
+                request['price'] = tick.ask if order_event.signal == SignalType.BUY else tick.bid
+                fill_time = tick.time
+
+            result = self.broker.order_send(request)
+            self._count('requests')
+            if result is None:
+                logger.error("The %s order in %s could not be sent: %s", order_event.signal, order_event.symbol,
+                             self.broker.last_error())
+                self._count('rejected')
+                return
+            if result.retcode not in self._retryable_codes or attempt == self.max_retries:
+                break
+            self._count('retries')
+            time.sleep(self.retry_delay * 2 ** attempt)
+
+        if market and result.retcode in self._filled_codes:
+            self._count('executed')
+            # The fill time is the server time of the quote the order was sent with
+            fill_time = datetime.fromtimestamp(fill_time, tz=timezone.utc).replace(tzinfo=None)
+            self._publish(ExecutionEvent(symbol=order_event.symbol, signal=order_event.signal,
+                                         fill_price=result.price, fill_time=fill_time, volume=result.volume,
+                                         magic_number=order_event.magic_number,
+                                         ticket=self._position_ticket(order_event.symbol, result),
+                                         trace=stamp_trace(order_event.trace, ExecutionEvent.trace_stage)), loop)
+
+        elif not market and result.retcode in (self.broker.TRADE_RETCODE_PLACED, self.broker.TRADE_RETCODE_DONE):
+            self._count('placed')
+            self._publish(PlacedPendingOrderEvent(symbol=order_event.symbol, signal=order_event.signal,
+                                                  target_order=order_event.target_order,
+                                                  target_price=order_event.target_price,
+                                                  magic_number=order_event.magic_number, sl=order_event.sl,
+                                                  tp=order_event.tp, volume=order_event.volume,
+                                                  trace=stamp_trace(order_event.trace,
+                                                                    PlacedPendingOrderEvent.trace_stage)), loop)
+
+        else:
+            self._count('rejected')
+            logger.error("The %s %s order of %s in %s was rejected: %s - %s", order_event.signal,
+                         order_event.target_order, order_event.volume, order_event.symbol, result.retcode,
+                         result.comment)
+
+    def _position_ticket(self, symbol: str, result) -> int:
+        """
+        Returns the ticket of the position of a filled market order. On a hedging account it is the ticket of the
+        order, but on a netting account the deal joins (or reduces) the position of the symbol, which was opened by
+        another order: its ticket is the position of the deal, or the position of the symbol if the deal can't be
+        read. 0 if it is unknown (e.g. the deal closed the position).
+        """
+        if self._netting is None:
+            account_info = self.broker.account_info()
+            if account_info is not None:
+                self._netting = account_info.margin_mode != self.broker.ACCOUNT_MARGIN_MODE_RETAIL_HEDGING
+        if self._netting is False:
+            return result.order
+
+        deals = self.broker.history_deals_get(ticket=result.deal) if result.deal else None
+        if deals:
+            return deals[0].position_id
+        logger.warning("Can't read the deal %s of the order %s in %s: %s", result.deal, result.order, symbol,
+                       self.broker.last_error())
+        positions = self.broker.positions_get(symbol=symbol)
+        return positions[0].ticket if positions is not None and len(positions) == 1 else 0
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _publish(self, event, loop: asyncio.AbstractEventLoop | None) -> None:
+        # An asyncio queue can only be used from the thread of its event loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.events_queue.put_nowait, event)
+        else:
+            self.events_queue.put(event)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker threads, by default once the orders in flight have been confirmed.
+
+        Args:
+            wait (bool): True to wait for the orders in flight.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+class RateLimiter():
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Token bucket shared by the threads that send requests to the broker: up to `burst` requests go out at once,
+        then one more every 1 / `rate` seconds.
+
+        Every acquire reserves the next free slot and sleeps until it (outside the lock), so the waiting threads are
+        released in the order they arrived, without polling.
+
+        Args:
+            rate (float): The sustained number of requests per second.
+            burst (int): The number of requests that can be sent back to back.
+        """
+        if rate <= 0.0 or burst < 1:
+            raise Exception(f"ERROR: Invalid rate limit: {rate} requests per second, burst of {burst}")
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens: float = float(burst)
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Takes a token (the balance goes negative when the slot is in the future) and returns how long to wait
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            return -self._tokens / self.rate if self._tokens < 0.0 else 0.0
+
+    def acquire(self) -> float:
+        """
+        Waits until a request can be sent.
+
+        Returns:
+            float: How long (seconds) the caller waited.
+        """
+        delay = self._reserve()
+        if delay > 0.0:
+            time.sleep(delay)
+        return delay
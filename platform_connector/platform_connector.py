@@ -1,9 +1,19 @@
-import MetaTrader5 as mt5
+from __future__ import annotations
+
 import os
 from dotenv import load_dotenv, find_dotenv
 
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+from utils.logger import get_logger
+
+
+logger = get_logger("platform_connector")
+
+
 class PlatformConnector():
-    def __init__(self, symbol_list: list):
+    def __init__(self, symbol_list: list, broker: IBroker | None = None):
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
         load_dotenv(find_dotenv())
         self._initialize_platform()
         self._live_account_warning()
@@ -16,7 +26,7 @@ class PlatformConnector():
 
         :return:
         """
-        if mt5.initialize(
+        if self.broker.initialize(
             path=os.getenv("MT5_PATH"),
             login=int(os.getenv("MT5_LOGIN")),
             password=os.getenv("MT5_PASSWORD"),
@@ -24,45 +34,45 @@ class PlatformConnector():
             timeout=int(os.getenv("MT5_TIMEOUT")),
             portable=eval(os.getenv("MT5_PORTABLE"))
         ):
-            print("Working Fine")
+            logger.info("Working Fine")
         else:
-            raise Exception("Not Working", mt5.last_error())
+            raise Exception("Not Working", self.broker.last_error())
 
     def _live_account_warning(self) -> None:
 
-        if mt5.account_info().trade_mode == mt5.ACCOUNT_TRADE_MODE_DEMO:
-            print("Using Demo Account")
-        elif mt5.account_info().trade_mode == mt5.ACCOUNT_TRADE_MODE_REAL:
+        if self.broker.account_info().trade_mode == self.broker.ACCOUNT_TRADE_MODE_DEMO:
+            logger.info("Using Demo Account")
+        elif self.broker.account_info().trade_mode == self.broker.ACCOUNT_TRADE_MODE_REAL:
             if not input("Using REAL Account, Confirm to continue (y/n): ").lower() == "y":
-                mt5.shutdown()
+                self.broker.shutdown()
                 raise Exception("Shutting Down")
         else:
-            print("Using not consider Real - Demo account")
+            logger.warning("Using not consider Real - Demo account")
 
     def _check_algo_trading_enable(self) -> None:
-        if not mt5.terminal_info().trade_allowed:
+        if not self.broker.terminal_info().trade_allowed:
             raise Exception("Algorithmic trading not enable, active first to use")
 
     def _add_symbols_to_marketwatch(self, symbols: list) -> None:
         for symbol in symbols:
-            if mt5.symbol_info(symbol) is None:
-                print("Cannot add Symbol", symbol, "to Market Watch", mt5.last_error())
+            if self.broker.symbol_info(symbol) is None:
+                logger.error("Cannot add Symbol %s to Market Watch %s", symbol, self.broker.last_error())
                 continue
-            if not mt5.symbol_info(symbol).visible:
-                if not mt5.symbol_select(symbol, True):
-                    print("Cannot add Symbol", symbol, "to Market Watch", mt5.last_error())
+            if not self.broker.symbol_info(symbol).visible:
+                if not self.broker.symbol_select(symbol, True):
+                    logger.error("Cannot add Symbol %s to Market Watch %s", symbol, self.broker.last_error())
                 else:
-                    print("Symbol", symbol, "added successfully")
+                    logger.info("Symbol %s added successfully", symbol)
             else:
-                print("Symbol already added to Market Watch")
+                logger.info("Symbol %s already added to Market Watch", symbol)
 
     def _print_account_info(self):
-        account_info = mt5.account_info()._asdict()
-        print("+----------------- Account Info -----------------+")
-        print(f"Account ID: {account_info['login']}")
-        print(f"Name Trader: {account_info['name']}")
-        print(f"Broker: {account_info['company']}")
-        print(f"Server: {account_info['server']}")
-        print(f"Leverage: {account_info['leverage']}")
-        print(f"Currency: {account_info['currency']}")
-        print(f"Balance: {account_info['balance']}")
\ No newline at end of file
+        account_info = self.broker.account_info()._asdict()
+        logger.info("+----------------- Account Info -----------------+")
+        logger.info("Account ID: %s", account_info['login'])
+        logger.info("Name Trader: %s", account_info['name'])
+        logger.info("Broker: %s", account_info['company'])
+        logger.info("Server: %s", account_info['server'])
+        logger.info("Leverage: %s", account_info['leverage'])
+        logger.info("Currency: %s", account_info['currency'])
+        logger.info("Balance: %s", account_info['balance'])
\ No newline at end of file
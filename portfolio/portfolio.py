@@ -1,25 +1,172 @@
-import MetaTrader5 as mt5
-from typing import Dict
+from __future__ import annotations
+
+import time
+from typing import Dict, NamedTuple, Tuple
+
+from broker.broker import get_default_broker
+from broker.broker_constants import BrokerConstants
+from broker.interfaces.broker_interface import IBroker
+from events.events import ExecutionEvent, SignalType
+from utils.logger import get_logger
+
+
+logger = get_logger("portfolio")
+
+
+class BookPosition(NamedTuple):
+    """
+    Open position kept in the position book (same field names as the positions returned by positions_get).
+
+    Attributes:
+        ticket (int): The ticket of the position.
+        symbol (str): The symbol of the position.
+        magic (int): The magic number of the strategy that opened the position.
+        type (int): POSITION_TYPE_BUY for long positions, POSITION_TYPE_SELL for short positions.
+        volume (float): The open volume of the position.
+        price_open (float): The opening price of the position.
+    """
+    ticket: int
+    symbol: str
+    magic: int
+    type: int
+    volume: float
+    price_open: float
+
 
 class Portfolio():
 
-    def __init__(self, magic_number: int):
+    def __init__(self, magic_number: int, reconcile_interval: float = 60.0, broker: IBroker | None = None):
         """
         Initializes a new instance of the Portfolio class.
 
+        The open positions are kept in an in-memory position book indexed by (magic, symbol, side), which is updated
+        with every ExecutionEvent (on_execution), so the position queries do not scan the positions of the
+        platform. The book is rebuilt from the platform every `reconcile_interval` seconds to pick up the changes
+        that do not produce an ExecutionEvent (SL/TP hits, manual trades, stop outs).
+
         Args:
             magic_number (int): The magic number associated with the portfolio.
+            reconcile_interval (float): How often (seconds) the book is reconciled with the platform positions.
+            broker (IBroker | None): The broker (the default broker if None).
         """
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
         self.magic = magic_number
+        self.reconcile_interval = reconcile_interval
+
+        # Position book: every open position by ticket, the positions by (magic, symbol, side), the number and
+        # volume of the positions of all the strategies by (symbol, side) and the number of positions by magic
+        self._positions: Dict[int, BookPosition] = {}
+        self._tickets: Dict[Tuple[int, str, str], Dict[int, BookPosition]] = {}
+        self._symbol_counts: Dict[Tuple[str, str], int] = {}
+        self._magic_counts: Dict[int, int] = {}
+        self._symbol_volumes: Dict[Tuple[str, str], float] = {}
+        self._last_reconcile: float | None = None
+
+    @staticmethod
+    def _side(position_type: int) -> str:
+        return "LONG" if position_type == BrokerConstants.POSITION_TYPE_BUY else "SHORT"
+
+    def _add_to_book(self, position: BookPosition) -> None:
+        # Replacing a position (new volume or price) must not count it twice
+        self._remove_from_book(position.ticket)
+
+        side = self._side(position.type)
+        self._positions[position.ticket] = position
+        self._tickets.setdefault((position.magic, position.symbol, side), {})[position.ticket] = position
+        symbol_key = (position.symbol, side)
+        self._symbol_counts[symbol_key] = self._symbol_counts.get(symbol_key, 0) + 1
+        self._symbol_volumes[symbol_key] = round(self._symbol_volumes.get(symbol_key, 0.0) + position.volume, 8)
+        self._magic_counts[position.magic] = self._magic_counts.get(position.magic, 0) + 1
+
+    def _remove_from_book(self, ticket: int) -> None:
+        position = self._positions.pop(ticket, None)
+        if position is None:
+            return
+
+        side = self._side(position.type)
+        key = (position.magic, position.symbol, side)
+        tickets = self._tickets[key]
+        del tickets[ticket]
+        if not tickets:
+            del self._tickets[key]
+        symbol_key = (position.symbol, side)
+        self._symbol_counts[symbol_key] -= 1
+        self._symbol_volumes[symbol_key] = round(self._symbol_volumes[symbol_key] - position.volume, 8)
+        self._magic_counts[position.magic] -= 1
+
+    def reconcile(self) -> None:
+        """
+        Rebuilds the position book from the open positions of the platform.
+        """
+        positions = self.broker.positions_get()
+        if positions is None:
+            logger.error("Could not retrieve the open positions to reconcile the portfolio. MT5 error: %s",
+                         self.broker.last_error())
+            return
+
+        self._positions.clear()
+        self._tickets.clear()
+        self._symbol_counts.clear()
+        self._symbol_volumes.clear()
+        self._magic_counts.clear()
+        for position in positions:
+            self._add_to_book(BookPosition(ticket=position.ticket, symbol=position.symbol, magic=position.magic,
+                                           type=position.type, volume=position.volume,
+                                           price_open=position.price_open))
+        self._last_reconcile = time.monotonic()
+
+    def _reconcile_if_due(self) -> None:
+        if self._last_reconcile is None or time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+            self.reconcile()
+
+    def on_execution(self, event: ExecutionEvent) -> None:
+        """
+        Updates the position book with an execution: a trade in the direction of the position with the same ticket
+        (or with a new ticket) opens or increases it, and a trade in the opposite direction reduces or closes it.
+
+        An execution without ticket can not be matched with a position, so it is not booked: the book is reconciled
+        with the platform on the next query instead.
+
+        Args:
+            event (ExecutionEvent): The execution event (its ticket is the ticket of the affected position).
+        """
+        if not event.ticket:
+            logger.warning("Execution of %s %s without position ticket (magic %s): the portfolio will be reconciled "
+                           "with the platform", event.volume, event.symbol, event.magic_number)
+            self._last_reconcile = None
+            return
+
+        trade_type = BrokerConstants.POSITION_TYPE_BUY if event.signal == SignalType.BUY else BrokerConstants.POSITION_TYPE_SELL
+        position = self._positions.get(event.ticket)
+
+        if position is None:
+            self._add_to_book(BookPosition(ticket=event.ticket, symbol=event.symbol, magic=event.magic_number,
+                                           type=trade_type, volume=event.volume, price_open=event.fill_price))
+
+        elif position.type == trade_type:
+            volume = position.volume + event.volume
+            price_open = (position.price_open * position.volume + event.fill_price * event.volume) / volume
+            self._add_to_book(position._replace(volume=volume, price_open=price_open))
+
+        else:
+            volume = round(position.volume - event.volume, 8)
+            if volume > 0.0:
+                self._add_to_book(position._replace(volume=volume))
+            elif volume == 0.0:
+                self._remove_from_book(position.ticket)
+            else:
+                # Netting accounts: the trade reverses the position
+                self._add_to_book(position._replace(type=trade_type, volume=-volume, price_open=event.fill_price))
 
     def get_open_positions(self) -> tuple:
         """
-        Retrieves the open positions from the MetaTrader 5 platform.
+        Retrieves the open positions of the position book.
 
         Returns:
             tuple: A tuple containing the open positions.
         """
-        return mt5.positions_get()
+        self._reconcile_if_due()
+        return tuple(self._positions.values())
 
     def get_strategy_open_positions(self) -> tuple:
         """
@@ -28,12 +175,9 @@ class Portfolio():
         Returns:
             tuple: A tuple containing the open positions for the strategy.
         """
-        positions = []
-        for position in mt5.positions_get():
-            if position.magic == self.magic:
-                positions.append(position)
-        
-        return tuple(positions)
+        self._reconcile_if_due()
+        return tuple(position for (magic, _, _), tickets in self._tickets.items() if magic == self.magic
+                     for position in tickets.values())
 
     def get_number_of_open_positions_by_symbol(self, symbol: str) -> Dict[str, int]:
         """
@@ -46,14 +190,10 @@ class Portfolio():
             Dict[str, int]: A dictionary containing the count of long positions, short positions, and total positions.
 
         """
-        longs = 0
-        shorts = 0
-        for position in mt5.positions_get(symbol=symbol):
-            if position.type == mt5.ORDER_TYPE_BUY:
-                longs += 1
-            else:
-                shorts += 1
-        
+        self._reconcile_if_due()
+        longs = self._symbol_counts.get((symbol, "LONG"), 0)
+        shorts = self._symbol_counts.get((symbol, "SHORT"), 0)
+
         return {"LONG": longs, "SHORT": shorts, "TOTAL": longs + shorts}
 
     def get_number_of_strategy_open_positions_by_symbol(self, symbol: str) -> Dict[str, int]:
@@ -67,14 +207,37 @@ class Portfolio():
             Dict[str, int]: A dictionary containing the count of long positions, short positions, and the total count.
 
         """
-        longs = 0
-        shorts = 0
+        self._reconcile_if_due()
+        longs = len(self._tickets.get((self.magic, symbol, "LONG"), ()))
+        shorts = len(self._tickets.get((self.magic, symbol, "SHORT"), ()))
+
+        return {"LONG": longs, "SHORT": shorts, "TOTAL": longs + shorts}
+
+    def get_open_volume_by_symbol(self, symbol: str) -> Dict[str, float]:
+        """
+        Get the open volume of all the strategies for a given symbol.
 
-        for position in mt5.positions_get(symbol=symbol):
-            if position.magic == self.magic:
-                if position.type == mt5.ORDER_TYPE_BUY:
-                    longs += 1
-                else:
-                    shorts += 1
-        
-        return {"LONG": longs, "SHORT": shorts, "TOTAL": longs + shorts}
\ No newline at end of file
+        Args:
+            symbol (str): The symbol for which to retrieve the open volume.
+
+        Returns:
+            Dict[str, float]: A dictionary containing the long volume, the short volume and the net volume (long - short).
+        """
+        self._reconcile_if_due()
+        longs = self._symbol_volumes.get((symbol, "LONG"), 0.0)
+        shorts = self._symbol_volumes.get((symbol, "SHORT"), 0.0)
+
+        return {"LONG": longs, "SHORT": shorts, "NET": round(longs - shorts, 8)}
+
+    def get_number_of_open_positions_by_magic(self, magic: int) -> int:
+        """
+        Get the number of open positions of a strategy, in all the symbols.
+
+        Args:
+            magic (int): The magic number of the strategy.
+
+        Returns:
+            int: The number of open positions.
+        """
+        self._reconcile_if_due()
+        return self._magic_counts.get(magic, 0)
@@ -1,18 +1,24 @@
-from utils.utils import Utils
+from __future__ import annotations
+
+from utils.logger import get_logger
+from utils.broker_metadata_cache import BrokerMetadataCache
 from data_provider.data_provider import DataProvider
-from events.events import SignalEvent, SizingEvent
+from events.events import SignalEvent, SizingEvent, stamp_trace
 from .interfaces.position_sizer_interface import IPositionSizer
 from .properties.position_sizer_properties import BaseSizerProps, MinSizingProps, FixedSizingProps, RiskPctSizingProps
 from .position_sizers.min_size_position_sizer import MinSizePositionSizer
 from .position_sizers.fixed_size_position_sizer import FixedSizePositionSizer
 from .position_sizers.risk_pct_position_sizer import RiskPctPositionSizer
-import MetaTrader5 as mt5
 from queue import Queue
 
 
+logger = get_logger("position_sizer")
+
+
 class PositionSizer(IPositionSizer):
 
-    def __init__(self, events_queue: Queue, data_provider: DataProvider, sizing_properties: BaseSizerProps):
+    def __init__(self, events_queue: Queue, data_provider: DataProvider, sizing_properties: BaseSizerProps,
+                 metadata_cache: BrokerMetadataCache | None = None):
         """
         Initialize the PositionSizer object.
 
@@ -20,12 +26,15 @@ class PositionSizer(IPositionSizer):
             events_queue (Queue): The queue for receiving events.
             data_provider (DataProvider): The data provider object.
             sizing_properties (BaseSizerProps): The sizing properties object.
+            metadata_cache (BrokerMetadataCache | None): The cache of the broker symbol and account info, shared with
+                the sizing method (a new one is created if None).
 
         Returns:
             None
         """
         self.events_queue = events_queue
         self.DATA_PROVIDER = data_provider
+        self.metadata_cache = metadata_cache if metadata_cache is not None else BrokerMetadataCache()
         self.position_sizing_method = self._get_position_sizing_method(sizing_properties)
 
     def _get_position_sizing_method(self, sizing_props: BaseSizerProps) -> IPositionSizer:
@@ -42,13 +51,13 @@ class PositionSizer(IPositionSizer):
             Exception: If the sizing method is unknown or not supported.
         """
         if isinstance(sizing_props, MinSizingProps):
-            return MinSizePositionSizer()
+            return MinSizePositionSizer(metadata_cache=self.metadata_cache)
 
         elif isinstance(sizing_props, FixedSizingProps):
             return FixedSizePositionSizer(properties=sizing_props)
 
         elif isinstance(sizing_props, RiskPctSizingProps):
-            return RiskPctPositionSizer(properties=sizing_props)
+            return RiskPctPositionSizer(properties=sizing_props, metadata_cache=self.metadata_cache)
 
         else:
             raise Exception(f"ERROR: Unknown sizing method: {sizing_props}")
@@ -72,7 +81,8 @@ class PositionSizer(IPositionSizer):
                                    magic_number=signal_event.magic_number,
                                    sl=signal_event.sl,
                                    tp=signal_event.tp,
-                                   volume=volume)
+                                   volume=volume,
+                                   trace=stamp_trace(signal_event.trace, SizingEvent.trace_stage))
 
         # Put the sizing event into the events queue
         self.events_queue.put(sizing_event)
@@ -91,9 +101,14 @@ class PositionSizer(IPositionSizer):
         volume = self.position_sizing_method.size_signal(signal_event, self.DATA_PROVIDER)
 
         # Safety control
-        if volume < mt5.symbol_info(signal_event.symbol).volume_min:
-            print(
-                f"{Utils.dateprint()} - ERROR: The volume {volume} is less than the minimum volume allowed by the symbol {signal_event.symbol}")
+        symbol_info = self.metadata_cache.get_symbol_info(signal_event.symbol)
+        if symbol_info is None:
+            logger.error("Could not retrieve the symbol info for %s", signal_event.symbol)
+            return
+
+        if volume < symbol_info.volume_min:
+            logger.error("The volume %s is less than the minimum volume allowed by the symbol %s", volume,
+                         signal_event.symbol)
             return
 
         # Create the event and put it in the queue
@@ -1,19 +1,31 @@
-from utils.utils import Utils
+from utils.broker_metadata_cache import BrokerMetadataCache
 from data_provider.data_provider import DataProvider
 from events.events import SignalEvent
+from utils.logger import get_logger
 from ..interfaces.position_sizer_interface import IPositionSizer
-import MetaTrader5 as mt5
+
+
+logger = get_logger("position_sizer")
 
 
 class MinSizePositionSizer(IPositionSizer):
 
+    def __init__(self, metadata_cache: BrokerMetadataCache):
+        """
+        Initializes a MinSizePositionSizer object.
+
+        Args:
+            metadata_cache (BrokerMetadataCache): The cache used to retrieve the symbol info.
+        """
+        self.metadata_cache = metadata_cache
+
     def size_signal(self, signal_event: SignalEvent, data_provider: DataProvider) -> float:
 
-        volume = mt5.symbol_info(signal_event.symbol).volume_min
+        symbol_info = self.metadata_cache.get_symbol_info(signal_event.symbol)
+        volume = symbol_info.volume_min if symbol_info is not None else None
 
         if volume is not None:
             return volume
         else:
-            print(
-                f"{Utils.dateprint()} - ERROR (MinSizePositionSizer): Could not determine the minimum volume for {signal_event.symbol}")
+            logger.error("MinSizePositionSizer: Could not determine the minimum volume for %s", signal_event.symbol)
             return 0.0
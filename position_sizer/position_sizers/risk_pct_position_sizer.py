@@ -3,19 +3,25 @@ from events.events import SignalEvent
 from ..interfaces.position_sizer_interface import IPositionSizer
 from ..properties.position_sizer_properties import RiskPctSizingProps
 from utils.utils import Utils
-import MetaTrader5 as mt5
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.logger import get_logger
+
+
+logger = get_logger("position_sizer")
 
 
 class RiskPctPositionSizer(IPositionSizer):
 
-    def __init__(self, properties: RiskPctSizingProps):
+    def __init__(self, properties: RiskPctSizingProps, metadata_cache: BrokerMetadataCache):
         """
         Initializes a RiskPctPositionSizer object.
 
         Args:
             properties (RiskPctSizingProps): An object containing the properties for risk percentage position sizing.
+            metadata_cache (BrokerMetadataCache): The cache used to retrieve the account and symbol info.
         """
         self.risk_pct = properties.risk_pct
+        self.metadata_cache = metadata_cache
 
     def size_signal(self, signal_event: SignalEvent, data_provider: DataProvider) -> float:
         """
@@ -33,20 +39,24 @@ class RiskPctPositionSizer(IPositionSizer):
         """
         # Check that the risk is positive
         if self.risk_pct <= 0.0:
-            print(
-                f"{Utils.dateprint()} - ERROR (RiskPctPositionSizer): The entered risk percentage: {self.risk_pct} is not valid.")
+            logger.error("RiskPctPositionSizer: The entered risk percentage: %s is not valid.", self.risk_pct)
             return 0.0
 
         # Check that sl != 0
         if signal_event.sl <= 0.0:
-            print(f"{Utils.dateprint()} - ERROR (RiskPctPositionSizer): The SL value: {signal_event.sl} is not valid.")
+            logger.error("RiskPctPositionSizer: The SL value: %s is not valid.", signal_event.sl)
             return 0.0
 
         # Access account information (to obtain account currency)
-        account_info = mt5.account_info()
+        account_info = self.metadata_cache.get_account_info()
 
         # Access symbol information (to calculate risk)
-        symbol_info = mt5.symbol_info(signal_event.symbol)
+        symbol_info = self.metadata_cache.get_symbol_info(signal_event.symbol)
+
+        if account_info is None or symbol_info is None:
+            logger.error("RiskPctPositionSizer: Could not retrieve the account or symbol info for %s",
+                         signal_event.symbol)
+            return 0.0
 
         # Retrieve the estimated entry price:
         # If it is a market order
@@ -83,7 +93,7 @@ class RiskPctPositionSizer(IPositionSizer):
             volume = round(volume / volume_step) * volume_step
 
         except Exception as e:
-            print(f"{Utils.dateprint()} - ERROR: Problem calculating the position size based on risk. Exception: {e}")
+            logger.error("Problem calculating the position size based on risk. Exception: %s", e)
             return 0.0
 
         else:
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from typing import Protocol
+from events.events import ExecutionEvent, PlacedPendingOrderEvent, SizingEvent
+
+
+class IRiskManager(Protocol):
+
+    def assess_order(self, sizing_event: SizingEvent) -> float | None:
+        ...
+
+    def on_execution(self, execution_event: ExecutionEvent) -> None:
+        ...
+
+    def on_pending_order(self, pending_order_event: PlacedPendingOrderEvent) -> None:
+        ...
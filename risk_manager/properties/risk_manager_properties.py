@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+
+
+class BaseRiskProps(BaseModel):
+    pass
+
+
+class ExposureRiskProps(BaseRiskProps):
+    """
+    Account-wide limits checked before every order. A limit set to None is not checked.
+
+    Attributes:
+        max_leverage_factor (float | None): Maximum notional value of all the open positions over the equity.
+        max_gross_exposure (float | None): Maximum gross exposure to any currency (longs plus shorts), in account
+            currency.
+        max_net_exposure (float | None): Maximum net exposure to any currency (longs minus shorts, in absolute
+            value), in account currency.
+        max_positions_per_symbol (int | None): Maximum open positions in a symbol (all the strategies).
+        max_positions_per_magic (int | None): Maximum open positions of a strategy (all the symbols).
+        max_margin_usage (float | None): Maximum used margin over the equity (e.g. 0.5 for 50%).
+    """
+    max_leverage_factor: float | None = None
+    max_gross_exposure: float | None = None
+    max_net_exposure: float | None = None
+    max_positions_per_symbol: int | None = None
+    max_positions_per_magic: int | None = None
+    max_margin_usage: float | None = None
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from queue import Queue
+
+from events.events import ExecutionEvent, OrderEvent, PlacedPendingOrderEvent, SizingEvent, stamp_trace
+from portfolio.portfolio import Portfolio
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.currency_converter import CurrencyConverter
+from utils.logger import get_logger
+from .interfaces.risk_manager_interface import IRiskManager
+from .properties.risk_manager_properties import BaseRiskProps, ExposureRiskProps
+from .risk_managers.exposure_risk_manager import ExposureRiskManager
+
+
+logger = get_logger("risk_manager")
+
+
+class RiskManager(IRiskManager):
+
+    def __init__(self, events_queue: Queue, portfolio: Portfolio, risk_properties: BaseRiskProps,
+                 metadata_cache: BrokerMetadataCache | None = None,
+                 currency_converter: CurrencyConverter | None = None):
+        """
+        Initialize the RiskManager object. It sits between the SIZING and ORDER events: every sized order is checked
+        against the account-wide limits and only the approved ones become OrderEvents.
+
+        Args:
+            events_queue (Queue): The queue where the OrderEvents are put.
+            portfolio (Portfolio): The portfolio with the open positions of the account.
+            risk_properties (BaseRiskProps): The risk properties object.
+            metadata_cache (BrokerMetadataCache | None): The cache of the broker symbol and account info, shared with
+                the position sizer (a new one is created if None).
+            currency_converter (CurrencyConverter | None): The currency converter (the shared one if None).
+        """
+        self.events_queue = events_queue
+        self.PORTFOLIO = portfolio
+        self.metadata_cache = metadata_cache if metadata_cache is not None else BrokerMetadataCache()
+        self.currency_converter = currency_converter
+        self.risk_management_method = self._get_risk_management_method(risk_properties)
+
+    def _get_risk_management_method(self, risk_props: BaseRiskProps) -> IRiskManager:
+        """
+        Returns the appropriate risk manager based on the given risk properties.
+
+        Args:
+            risk_props (BaseRiskProps): The risk properties used to determine the risk manager.
+
+        Returns:
+            IRiskManager: An instance of the appropriate risk manager based on the risk properties.
+
+        Raises:
+            Exception: If the risk management method is unknown or not supported.
+        """
+        if isinstance(risk_props, ExposureRiskProps):
+            return ExposureRiskManager(properties=risk_props, portfolio=self.PORTFOLIO,
+                                       metadata_cache=self.metadata_cache,
+                                       currency_converter=self.currency_converter)
+
+        else:
+            raise Exception(f"ERROR: Unknown risk management method: {risk_props}")
+
+    def _create_and_put_order_event(self, sizing_event: SizingEvent, volume: float) -> None:
+        """
+        Creates an order event from the sizing event and the approved volume, and puts it into the events queue.
+
+        Args:
+            sizing_event (SizingEvent): The sizing event to create the order event from.
+            volume (float): The approved volume.
+
+        Returns:
+            None
+        """
+        order_event = OrderEvent(symbol=sizing_event.symbol,
+                                 signal=sizing_event.signal,
+                                 target_order=sizing_event.target_order,
+                                 target_price=sizing_event.target_price,
+                                 magic_number=sizing_event.magic_number,
+                                 sl=sizing_event.sl,
+                                 tp=sizing_event.tp,
+                                 volume=volume,
+                                 trace=stamp_trace(sizing_event.trace, OrderEvent.trace_stage))
+
+        self.events_queue.put(order_event)
+
+    def assess_order(self, sizing_event: SizingEvent) -> float | None:
+        """
+        Checks the sized order against the risk limits and puts an OrderEvent in the queue if it is approved.
+
+        Args:
+            sizing_event (SizingEvent): The sizing event.
+
+        Returns:
+            float | None: The approved volume, or None if the order was rejected.
+        """
+        volume = self.risk_management_method.assess_order(sizing_event)
+        if volume is not None and volume > 0.0:
+            self._create_and_put_order_event(sizing_event, volume)
+            return volume
+        return None
+
+    def on_execution(self, execution_event: ExecutionEvent) -> None:
+        """
+        Updates the risk state with an execution (the portfolio must already include it).
+
+        Args:
+            execution_event (ExecutionEvent): The execution event.
+        """
+        self.risk_management_method.on_execution(execution_event)
+
+    def on_pending_order(self, pending_order_event: PlacedPendingOrderEvent) -> None:
+        """
+        Updates the risk state with a pending order placed in the broker.
+
+        Args:
+            pending_order_event (PlacedPendingOrderEvent): The placed pending order event.
+        """
+        self.risk_management_method.on_pending_order(pending_order_event)
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import numpy as np
+
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+from events.events import ExecutionEvent, PlacedPendingOrderEvent, SignalType, SizingEvent
+from portfolio.portfolio import Portfolio
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.currency_converter import CurrencyConverter
+from utils.logger import get_logger
+from utils.utils import Utils
+from ..interfaces.risk_manager_interface import IRiskManager
+from ..properties.risk_manager_properties import ExposureRiskProps
+
+
+logger = get_logger("risk_manager")
+
+
+class ExposureRiskManager(IRiskManager):
+
+    def __init__(self, properties: ExposureRiskProps, portfolio: Portfolio, metadata_cache: BrokerMetadataCache,
+                 currency_converter: CurrencyConverter | None = None, resync_interval: float = 60.0,
+                 pending_ttl: float = 10.0, rate_ttl: float = 60.0, broker: IBroker | None = None):
+        """
+        Checks every order against the account-wide limits of the properties (currency exposures, leverage, number
+        of positions and margin usage) with an exposure book kept as NumPy arrays.
+
+        Every symbol has a row with the currency amounts of 1 lot long: +contract size in the base currency and
+        -contract size * price in the profit currency for a currency pair, +contract size * price in the profit
+        currency for anything else (CFDs, stocks). The net and gross exposure by currency are the open volumes of
+        every symbol times its row, and they are updated incrementally (one row) when the volumes of a symbol change,
+        so checking an order is a few operations over the currency vectors, without asking the platform for the
+        positions nor converting the currencies one by one. The currency vectors are converted to the account
+        currency with a vector of rates, refreshed every `rate_ttl` seconds.
+
+        The volumes come from the portfolio, which is updated with every execution. The orders approved and not
+        filled yet are counted as if they were open (for `pending_ttl` seconds at most, e.g. if the order is
+        rejected by the broker), so a burst of orders can not exceed a limit that every order alone respects. A
+        pending order placed in the broker is counted as open for as long as the broker lists it. The whole book is
+        rebuilt from the portfolio and the pending orders of the broker every `resync_interval` seconds, to pick up
+        the positions and orders that change without an event (SL/TP hits, triggered or cancelled pending orders,
+        manual trades).
+
+        The leverage and the margin usage only grow with the orders that increase the net volume of their symbol:
+        an order against the open positions (closing or hedging them) does not add notional.
+
+        Args:
+            properties (ExposureRiskProps): The limits.
+            portfolio (Portfolio): The portfolio with the open positions of the account.
+            metadata_cache (BrokerMetadataCache): The cache of the symbol and account info.
+            currency_converter (CurrencyConverter | None): The converter of the rates to the account currency (the
+                shared one if None).
+            resync_interval (float): How often (seconds) the book is rebuilt from the portfolio.
+            pending_ttl (float): How long (seconds) an approved order is counted until its execution (or the
+                placement of the pending order) arrives.
+            rate_ttl (float): How long (seconds) the conversion rates to the account currency are reused.
+            broker (IBroker | None): The broker whose pending orders are counted (the default broker if None).
+        """
+        self.properties = properties
+        self.portfolio = portfolio
+        self.metadata_cache = metadata_cache
+        self.currency_converter = (currency_converter if currency_converter is not None
+                                   else Utils.get_currency_converter())
+        self.resync_interval = resync_interval
+        self.pending_ttl = pending_ttl
+        self.rate_ttl = rate_ttl
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
+
+        self._symbols: Dict[str, int] = {}
+        self._currencies: Dict[str, int] = {}
+
+        # By symbol: the currency amounts of 1 lot long are fixed + price * per_price (symbol x currency), and the
+        # value of 1 lot in its profit currency is contract * price
+        self._fixed_legs = np.zeros((0, 0))
+        self._price_legs = np.zeros((0, 0))
+        self._contract = np.zeros(0)
+        self._profit_ccy = np.zeros(0, dtype=np.intp)
+        self._prices = np.zeros(0)              # Reference price (latest fill or order price)
+        self._long = np.zeros(0)                # Open volumes of the portfolio
+        self._short = np.zeros(0)
+        self._pending_long = np.zeros(0)        # Volumes of the approved and the placed orders not filled yet
+        self._pending_short = np.zeros(0)
+        self._pending_count = np.zeros(0, dtype=np.int64)
+        self._applied = np.zeros((0, 3))        # (long, short, price) included in the currency vectors
+
+        # Approved orders not filled yet, by symbol: (approval time, magic, side (+1 long, -1 short), volume)
+        self._reservations: Dict[int, Deque[Tuple[float, int, int, float]]] = {}
+        # Pending orders placed in the broker, by symbol: (magic, side, volume)
+        self._placed: Dict[int, List[Tuple[int, int, float]]] = {}
+        self._pending_magic: Dict[int, int] = {}
+
+        # By currency: net and gross exposure (in every currency), value of the positions by profit currency and the
+        # rate of every currency to the account currency
+        self._net = np.zeros(0)
+        self._gross = np.zeros(0)
+        self._notional = np.zeros(0)
+        self._rates = np.zeros(0)
+        self._rates_time: float | None = None
+        self._account_ccy: str | None = None
+
+        self._last_resync: float | None = None
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Exposure book
+    # ------------------------------------------------------------------------------------------------------------
+    def _currency_index(self, currency: str) -> int:
+        index = self._currencies.get(currency)
+        if index is None:
+            index = self._currencies[currency] = len(self._currencies)
+            self._fixed_legs = np.pad(self._fixed_legs, ((0, 0), (0, 1)))
+            self._price_legs = np.pad(self._price_legs, ((0, 0), (0, 1)))
+            self._net = np.append(self._net, 0.0)
+            self._gross = np.append(self._gross, 0.0)
+            self._notional = np.append(self._notional, 0.0)
+            self._rates = np.append(self._rates, 0.0)
+            self._rates_time = None
+        return index
+
+    def _symbol_index(self, symbol: str) -> int | None:
+        index = self._symbols.get(symbol)
+        if index is not None:
+            return index
+
+        symbol_info = self.metadata_cache.get_symbol_info(symbol)
+        if symbol_info is None:
+            logger.error("Could not retrieve the symbol info of %s for the risk checks", symbol)
+            return None
+
+        base = self._currency_index(symbol_info.currency_base.upper())
+        profit = self._currency_index(symbol_info.currency_profit.upper())
+        contract = float(symbol_info.trade_contract_size)
+        fixed = np.zeros(len(self._currencies))
+        per_price = np.zeros(len(self._currencies))
+        if base != profit:
+            fixed[base] = contract
+            per_price[profit] = -contract
+        else:
+            per_price[profit] = contract
+
+        index = self._symbols[symbol] = len(self._symbols)
+        self._fixed_legs = np.vstack((self._fixed_legs, fixed))
+        self._price_legs = np.vstack((self._price_legs, per_price))
+        self._contract = np.append(self._contract, contract)
+        self._profit_ccy = np.append(self._profit_ccy, profit)
+        for name in ('_prices', '_long', '_short', '_pending_long', '_pending_short', '_pending_count'):
+            setattr(self, name, np.append(getattr(self, name), 0))
+        self._applied = np.vstack((self._applied, np.zeros(3)))
+        self._reservations[index] = deque()
+        self._placed[index] = []
+        return index
+
+    def _add_symbol_exposure(self, index: int, sign: float) -> None:
+        # Adds (sign 1) or removes (sign -1) the applied volumes of a symbol from the currency vectors
+        long, short, price = self._applied[index]
+        if long == 0.0 and short == 0.0:
+            return
+        legs = self._fixed_legs[index] + price * self._price_legs[index]
+        self._net += sign * (long - short) * legs
+        self._gross += sign * (long + short) * np.abs(legs)
+        self._notional[self._profit_ccy[index]] += sign * abs(long - short) * self._contract[index] * price
+
+    def _update_symbol(self, index: int) -> None:
+        self._add_symbol_exposure(index, -1.0)
+        self._applied[index] = (self._long[index] + self._pending_long[index],
+                                self._short[index] + self._pending_short[index], self._prices[index])
+        self._add_symbol_exposure(index, 1.0)
+
+    def _read_portfolio_volumes(self, symbol: str, index: int) -> None:
+        volumes = self.portfolio.get_open_volume_by_symbol(symbol)
+        self._long[index] = volumes["LONG"]
+        self._short[index] = volumes["SHORT"]
+
+    def _read_placed_orders(self) -> None:
+        orders = self.broker.orders_get()
+        if orders is None:
+            logger.error("Could not retrieve the pending orders for the risk checks. MT5 error: %s",
+                         self.broker.last_error())
+            return
+        for placed in self._placed.values():
+            placed.clear()
+        buy_types = (self.broker.ORDER_TYPE_BUY_LIMIT, self.broker.ORDER_TYPE_BUY_STOP)
+        for order in orders:
+            index = self._symbol_index(order.symbol)
+            if index is None:
+                continue
+            if self._prices[index] == 0.0:
+                self._prices[index] = order.price_open
+            side = 1 if order.type in buy_types else -1
+            self._placed[index].append((order.magic, side, order.volume_current))
+
+    def resync(self) -> None:
+        """
+        Rebuilds the exposure book from the open positions of the portfolio and the pending orders of the broker
+        (including the symbols traded by other strategies or by hand).
+        """
+        for position in self.portfolio.get_open_positions():
+            index = self._symbol_index(position.symbol)
+            if index is not None and self._prices[index] == 0.0:
+                self._prices[index] = position.price_open
+        self._read_placed_orders()
+
+        now = time.monotonic()
+        for index in self._symbols.values():
+            self._expire_reservations(index, now)
+        # The pending volumes are counted again from the approved orders and the placed ones
+        self._pending_long[:] = 0.0
+        self._pending_short[:] = 0.0
+        self._pending_count[:] = 0
+        self._pending_magic.clear()
+        for symbol, index in self._symbols.items():
+            self._read_portfolio_volumes(symbol, index)
+            for _, magic, side, volume in self._reservations[index]:
+                self._change_pending(index, magic, side, volume, 1)
+            for magic, side, volume in self._placed[index]:
+                self._change_pending(index, magic, side, volume, 1)
+
+        longs = self._long + self._pending_long
+        shorts = self._short + self._pending_short
+        legs = self._fixed_legs + self._prices[:, None] * self._price_legs
+        self._net = (longs - shorts) @ legs
+        self._gross = (longs + shorts) @ np.abs(legs)
+        self._notional = np.bincount(self._profit_ccy, weights=np.abs(longs - shorts) * self._contract * self._prices,
+                                     minlength=len(self._currencies)).astype(float)
+        self._applied = np.column_stack((longs, shorts, self._prices)) if len(self._symbols) else np.zeros((0, 3))
+        self._last_resync = now
+
+    def _resync_if_due(self) -> None:
+        if self._last_resync is None or time.monotonic() - self._last_resync >= self.resync_interval:
+            self.resync()
+
+    def _get_rates(self, account_ccy: str) -> np.ndarray:
+        now = time.monotonic()
+        if self._rates_time is None or account_ccy != self._account_ccy or now - self._rates_time >= self.rate_ttl:
+            for currency, index in self._currencies.items():
+                self._rates[index] = self.currency_converter.convert(1.0, currency, account_ccy)
+                if self._rates[index] == 0.0:
+                    logger.warning("Could not convert %s to %s: its exposure is not checked", currency, account_ccy)
+            self._account_ccy = account_ccy
+            self._rates_time = now
+        return self._rates
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Approved orders not filled yet
+    # ------------------------------------------------------------------------------------------------------------
+    def _change_pending(self, index: int, magic: int, side: int, volume: float, count: int) -> None:
+        if side > 0:
+            self._pending_long[index] = max(self._pending_long[index] + volume, 0.0)
+        else:
+            self._pending_short[index] = max(self._pending_short[index] + volume, 0.0)
+        self._pending_count[index] += count
+        self._pending_magic[magic] = self._pending_magic.get(magic, 0) + count
+
+    def _expire_reservations(self, index: int, now: float) -> bool:
+        reservations = self._reservations[index]
+        expired = False
+        while reservations and now - reservations[0][0] >= self.pending_ttl:
+            _, magic, side, volume = reservations.popleft()
+            self._change_pending(index, magic, side, -volume, -1)
+            expired = True
+        return expired
+
+    def _release_reservation(self, index: int, magic: int, side: int) -> None:
+        reservations = self._reservations[index]
+        for reservation in reservations:
+            if reservation[1] == magic and reservation[2] == side:
+                reservations.remove(reservation)
+                self._change_pending(index, magic, side, -reservation[3], -1)
+                return
+
+    # ------------------------------------------------------------------------------------------------------------
+    # Risk checks
+    # ------------------------------------------------------------------------------------------------------------
+    def _get_order_price(self, sizing_event: SizingEvent, index: int) -> float:
+        if sizing_event.target_price > 0.0:
+            return sizing_event.target_price
+        # Market orders: the latest bid (cached by the converter, refreshed with the ticks received)
+        price = self.currency_converter.get_rate(sizing_event.symbol)
+        return price if price is not None else float(self._prices[index])
+
+    def _check_limits(self, sizing_event: SizingEvent, index: int, price: float, account_info) -> str | None:
+        """
+        Returns the limit that the order would exceed, or None if it can be sent.
+        """
+        props = self.properties
+        if props.max_positions_per_symbol is not None:
+            positions = (self.portfolio.get_number_of_open_positions_by_symbol(sizing_event.symbol)["TOTAL"] +
+                         int(self._pending_count[index]))
+            if positions >= props.max_positions_per_symbol:
+                return f"{positions} positions in {sizing_event.symbol} (max {props.max_positions_per_symbol})"
+
+        if props.max_positions_per_magic is not None:
+            magic = sizing_event.magic_number
+            positions = (self.portfolio.get_number_of_open_positions_by_magic(magic) +
+                         self._pending_magic.get(magic, 0))
+            if positions >= props.max_positions_per_magic:
+                return f"{positions} positions of the strategy {magic} (max {props.max_positions_per_magic})"
+
+        rates = self._get_rates(account_info.currency.upper())
+        legs = (self._fixed_legs[index] + price * self._price_legs[index]) * sizing_event.volume
+        side = 1.0 if sizing_event.signal == SignalType.BUY else -1.0
+
+        if props.max_net_exposure is not None:
+            before = np.abs(self._net * rates)
+            after = np.abs((self._net + side * legs) * rates)
+            exceeded = (after > props.max_net_exposure) & (after > before)
+            if exceeded.any():
+                return self._currency_limit_message("net", after, exceeded, props.max_net_exposure)
+
+        if props.max_gross_exposure is not None:
+            after = (self._gross + np.abs(legs)) * rates
+            exceeded = (after > props.max_gross_exposure) & (legs != 0.0)
+            if exceeded.any():
+                return self._currency_limit_message("gross", after, exceeded, props.max_gross_exposure)
+
+        if props.max_leverage_factor is None and props.max_margin_usage is None:
+            return None
+
+        # The notional added by the order: the change of the net volume of the symbol (an order against the open
+        # positions reduces it)
+        net_volume = self._applied[index, 0] - self._applied[index, 1]
+        added_volume = abs(net_volume + side * sizing_event.volume) - abs(net_volume)
+        if added_volume <= 0.0:
+            return None
+        order_notional = added_volume * self._contract[index] * price * rates[self._profit_ccy[index]]
+
+        equity = account_info.equity
+        if equity <= 0.0:
+            return f"equity of {equity}"
+
+        if props.max_leverage_factor is not None:
+            leverage = (self._notional @ rates + order_notional) / equity
+            if leverage > props.max_leverage_factor:
+                return f"leverage factor of {leverage:.2f} (max {props.max_leverage_factor})"
+
+        if props.max_margin_usage is not None and account_info.leverage > 0:
+            # The margin of the open positions is in the account info: the pending orders add the net volume they
+            # would open
+            pending_volume = np.maximum(np.abs(self._long + self._pending_long - self._short - self._pending_short) -
+                                        np.abs(self._long - self._short), 0.0)
+            pending_notional = (pending_volume * self._contract * self._prices) @ rates[self._profit_ccy]
+            margin = account_info.margin + (pending_notional + order_notional) / account_info.leverage
+            if margin / equity > props.max_margin_usage:
+                return f"margin usage of {margin / equity:.1%} (max {props.max_margin_usage:.1%})"
+
+        return None
+
+    def _currency_limit_message(self, kind: str, exposures: np.ndarray, exceeded: np.ndarray, limit: float) -> str:
+        currencies = list(self._currencies)
+        exposures = ", ".join(f"{kind} exposure to {currencies[i]} of {exposures[i]:.2f}"
+                              for i in np.flatnonzero(exceeded))
+        return f"{exposures} (max {limit})"
+
+    def assess_order(self, sizing_event: SizingEvent) -> float | None:
+        """
+        Checks the order against the limits. An approved order is counted as open until its execution arrives.
+
+        Args:
+            sizing_event (SizingEvent): The sized order.
+
+        Returns:
+            float | None: The volume of the order if it can be sent, None if it exceeds a limit.
+        """
+        index = self._symbol_index(sizing_event.symbol)
+        if index is None:
+            return None
+        self._resync_if_due()
+
+        account_info = self.metadata_cache.get_account_info()
+        if account_info is None:
+            logger.error("Could not retrieve the account info to check the order in %s", sizing_event.symbol)
+            return None
+
+        price = self._get_order_price(sizing_event, index)
+        if price <= 0.0:
+            logger.error("There is no price of %s to check the order", sizing_event.symbol)
+            return None
+
+        now = time.monotonic()
+        if self._expire_reservations(index, now) or self._prices[index] == 0.0:
+            self._prices[index] = price
+            self._update_symbol(index)
+
+        exceeded = self._check_limits(sizing_event, index, price, account_info)
+        if exceeded is not None:
+            logger.warning("Order %s of %s in %s rejected: %s", sizing_event.signal, sizing_event.volume,
+                           sizing_event.symbol, exceeded,
+                           extra={'event': "SIZING", 'symbol': sizing_event.symbol, 'signal': sizing_event.signal,
+                                  'volume': sizing_event.volume})
+            return None
+
+        side = 1 if sizing_event.signal == SignalType.BUY else -1
+        self._reservations[index].append((now, sizing_event.magic_number, side, sizing_event.volume))
+        self._change_pending(index, sizing_event.magic_number, side, sizing_event.volume, 1)
+        self._update_symbol(index)
+        return sizing_event.volume
+
+    def on_execution(self, execution_event: ExecutionEvent) -> None:
+        """
+        Updates the exposure of the symbol with the volumes of the portfolio (already updated with the execution)
+        and releases the approved order it fills.
+
+        Args:
+            execution_event (ExecutionEvent): The execution event.
+        """
+        index = self._symbol_index(execution_event.symbol)
+        if index is None:
+            return
+        side = 1 if execution_event.signal == SignalType.BUY else -1
+        self._release_reservation(index, execution_event.magic_number, side)
+        self._read_portfolio_volumes(execution_event.symbol, index)
+        self._prices[index] = execution_event.fill_price
+        self._update_symbol(index)
+
+    def on_pending_order(self, pending_order_event: PlacedPendingOrderEvent) -> None:
+        """
+        Keeps the approved order as a pending order placed in the broker: it is counted as open until the broker
+        does not list it anymore (see resync), instead of for `pending_ttl` seconds.
+
+        Args:
+            pending_order_event (PlacedPendingOrderEvent): The placed pending order event.
+        """
+        index = self._symbol_index(pending_order_event.symbol)
+        if index is None:
+            return
+        magic = pending_order_event.magic_number
+        side = 1 if pending_order_event.signal == SignalType.BUY else -1
+        self._release_reservation(index, magic, side)
+        self._placed[index].append((magic, side, pending_order_event.volume))
+        self._change_pending(index, magic, side, pending_order_event.volume, 1)
+        if self._prices[index] == 0.0:
+            self._prices[index] = pending_order_event.target_price
+        self._update_symbol(index)
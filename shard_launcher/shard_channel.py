@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import struct
+import threading
+from multiprocessing.connection import Connection, wait
+from queue import Queue
+from typing import Callable, Dict, List
+
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+from events.events import OrderType, SignalEvent, SignalType, TraceContext
+from utils.logger import get_logger
+from utils.utils import Utils
+
+
+logger = get_logger("shard_launcher")
+
+
+# A SignalEvent on the wire: symbol (index in the symbol list of the deployment), signal, target order, whether it
+# has a trace, magic number, target price, SL, TP and the 6 stamps of the trace
+_SIGNAL_RECORD = struct.Struct("<HBBBqddd6q")
+_NO_TRACE = (0, 0, 0, 0, 0, 0)
+
+_SIGNAL_TYPES = list(SignalType)
+_ORDER_TYPES = list(OrderType)
+_SIGNAL_CODES = {signal: code for code, signal in enumerate(_SIGNAL_TYPES)}
+_ORDER_CODES = {order_type: code for code, order_type in enumerate(_ORDER_TYPES)}
+
+# Message sent by a shard that stops on its own (e.g. its backtest has finished), as opposed to a shard that dies
+SHARD_FINISHED = b""
+
+
+def encode_signal_event(event: SignalEvent, symbol_index: int) -> bytes:
+    """
+    Packs a SignalEvent in a fixed size binary record (no pickling). The trace stamps are monotonic clock values,
+    which are comparable between the processes of the same machine.
+
+    Args:
+        event (SignalEvent): The signal event.
+        symbol_index (int): The position of its symbol in the symbol list of the deployment.
+
+    Returns:
+        bytes: The record.
+    """
+    trace = event.trace
+    return _SIGNAL_RECORD.pack(symbol_index, _SIGNAL_CODES[event.signal], _ORDER_CODES[event.target_order],
+                               trace is not None, event.magic_number, event.target_price, event.sl, event.tp,
+                               *(trace if trace is not None else _NO_TRACE))
+
+
+def decode_signal_events(data: bytes, symbol_list: List[str]) -> List[SignalEvent]:
+    """
+    Unpacks the SignalEvents of one or more records built with encode_signal_event.
+
+    Args:
+        data (bytes): The records.
+        symbol_list (List[str]): The symbol list of the deployment.
+
+    Returns:
+        List[SignalEvent]: The signal events.
+    """
+    events = []
+    for record in _SIGNAL_RECORD.iter_unpack(data):
+        symbol_index, signal, target_order, has_trace, magic_number, target_price, sl, tp = record[:8]
+        events.append(SignalEvent(symbol=symbol_list[symbol_index], signal=_SIGNAL_TYPES[signal],
+                                  target_order=_ORDER_TYPES[target_order], target_price=target_price,
+                                  magic_number=magic_number, sl=sl, tp=tp,
+                                  trace=TraceContext(*record[8:]) if has_trace else None))
+    return events
+
+
+class ShardEventReceiver():
+
+    def __init__(self, events_queue: Queue, symbol_list: List[str], connections: Dict[int, Connection],
+                 on_shards_stopped: Callable[[], None] | None = None, idle_interval: float = 1.0,
+                 broker: IBroker | None = None):
+        """
+        Receives the SignalEvents of the shards of a sharded deployment (one pipe per shard) in a background thread
+        and puts them in the events queue of the coordinator, so its TradingDirector wakes up as soon as a signal
+        arrives. It is also the data provider of that TradingDirector and of its position sizer: the coordinator
+        polls no data, it only asks the broker for the latest tick of the symbols it sizes.
+
+        Args:
+            events_queue (Queue): The events queue of the coordinator.
+            symbol_list (List[str]): The symbol list of the deployment.
+            connections (Dict[int, Connection]): The receiving end of the pipe of every shard, by shard number.
+            on_shards_stopped (Callable[[], None] | None): Called once every shard has finished, or as soon as one
+                shard dies (its pipe is closed without the SHARD_FINISHED message).
+            idle_interval (float): How long (seconds) the coordinator blocks on its queue when there are no events.
+            broker (IBroker | None): The broker of the latest ticks (the default broker if None).
+        """
+        self.events_queue = events_queue
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
+        self.symbols: List[str] = list(symbol_list)
+        self.connections: Dict[int, Connection] = dict(connections)
+        self.on_shards_stopped = on_shards_stopped
+        self.idle_interval: float = idle_interval
+
+        # Signals received from every shard
+        self.received: Dict[int, int] = {shard: 0 for shard in self.connections}
+
+        self._running: bool = False
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._receive_forever, name="ShardEventReceiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _receive_forever(self) -> None:
+        shards = {connection: shard for shard, connection in self.connections.items()}
+        while self._running and shards:
+            for connection in wait(list(shards), timeout=0.1):
+                shard = shards[connection]
+                try:
+                    data = connection.recv_bytes()
+                except (EOFError, OSError):
+                    logger.error("Shard %s stopped unexpectedly. Terminating Framework execution", shard)
+                    del shards[connection]
+                    self._notify_stopped()
+                    return
+
+                if data == SHARD_FINISHED:
+                    logger.info("Shard %s finished", shard)
+                    del shards[connection]
+                    continue
+
+                events = decode_signal_events(data, self.symbols)
+                self.received[shard] += len(events)
+                for event in events:
+                    self.events_queue.put(event)
+
+        if not shards:
+            self._notify_stopped()
+
+    def _notify_stopped(self) -> None:
+        if self.on_shards_stopped is not None:
+            self.on_shards_stopped()
+
+    def check_for_new_data(self) -> None:
+        """
+        The events of the coordinator arrive through the receiver thread: there is nothing to poll.
+        """
+        pass
+
+    def seconds_until_next_check(self) -> float:
+        return self.idle_interval
+
+    def get_latest_tick(self, symbol: str) -> dict:
+        """
+        Returns the latest tick of a symbol from the broker (as DataProvider.get_latest_tick), empty if MT5 could not
+        provide it.
+        """
+        tick = self.broker.symbol_info_tick(symbol)
+        if tick is None:
+            logger.error("Can't recover last tick for %s - MT5 error: %s", symbol, self.broker.last_error())
+            return {}
+        # The tick also refreshes the rate used for the currency conversions of this symbol
+        Utils.get_currency_converter().update_from_tick(symbol, tick)
+        return tick._asdict()
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, List, Optional, Tuple
+
+from data_provider.interfaces.data_provider_interface import IDataProvider
+from events.events import ExecutionEvent, SignalEvent
+from order_executor.order_executor import OrderExecutor
+from portfolio.portfolio import Portfolio
+from position_sizer.position_sizer import PositionSizer
+from risk_manager.risk_manager import RiskManager
+from signal_generator.interfaces.signal_generator_interface import ISignalGenerator
+from trading_director.trading_director import TradingDirector
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.logger import get_logger, setup_logging
+from utils.metrics import MetricsRegistry
+from .shard_channel import SHARD_FINISHED, ShardEventReceiver, encode_signal_event
+from .shared_exposure import SharedExposure
+
+
+logger = get_logger("shard_launcher")
+
+
+# Builds the pipeline of a shard in its process: (events queue, symbols of the shard, global exposure view) ->
+# (data provider, signal generator). It must be a module level function (or a functools.partial of one), and it
+# connects the shard to the broker (e.g. with a PlatformConnector).
+PipelineFactory = Callable[[queue.Queue, List[str], SharedExposure], Tuple[IDataProvider, ISignalGenerator]]
+
+
+def partition_symbols(symbol_list: List[str], num_shards: int) -> List[List[str]]:
+    """
+    Splits the symbols in `num_shards` groups whose sizes differ by one at most (round robin, so the order of the
+    list does not concentrate the most active symbols in one shard). Empty groups are left out.
+
+    Args:
+        symbol_list (List[str]): The symbols.
+        num_shards (int): The number of groups.
+
+    Returns:
+        List[List[str]]: The symbols of every shard.
+    """
+    num_shards = max(1, num_shards)
+    shards = [symbol_list[i::num_shards] for i in range(num_shards)]
+    return [shard for shard in shards if shard]
+
+
+class ShardDirector(TradingDirector):
+
+    def __init__(self, events_queue: queue.Queue, data_provider: IDataProvider, signal_generator: ISignalGenerator,
+                 connection: Connection, symbol_list: List[str], latency_report_interval: Optional[float] = 60.0):
+        """
+        TradingDirector of a shard process: it polls the data and generates the signals of its symbols like a
+        TradingDirector, and sends every SignalEvent to the coordinator (see encode_signal_event) instead of
+        handling it. The shard places no orders.
+
+        Args:
+            events_queue (queue.Queue): The queue to receive events.
+            data_provider (IDataProvider): The data provider of the symbols of the shard.
+            signal_generator (ISignalGenerator): The signal generator object.
+            connection (Connection): The sending end of the pipe to the coordinator.
+            symbol_list (List[str]): The symbol list of the whole deployment (the symbols are sent as indexes).
+            latency_report_interval (Optional[float]): How often (seconds) the pipeline latencies are logged.
+        """
+        super().__init__(events_queue=events_queue, data_provider=data_provider, signal_generator=signal_generator,
+                         latency_report_interval=latency_report_interval)
+        self.connection = connection
+        self._symbol_index: Dict[str, int] = {symbol: i for i, symbol in enumerate(symbol_list)}
+        self.event_handler["SIGNAL"] = self._forward_signal_event
+
+    def _forward_signal_event(self, event: SignalEvent) -> None:
+        self.connection.send_bytes(encode_signal_event(event, self._symbol_index[event.symbol]))
+
+
+class ShardCoordinator(TradingDirector):
+
+    def __init__(self, events_queue: queue.Queue, receiver: ShardEventReceiver, exposure: SharedExposure,
+                 metadata_cache: Optional[BrokerMetadataCache] = None, portfolio: Optional[Portfolio] = None,
+                 latency_report_interval: Optional[float] = 60.0, metrics: Optional[MetricsRegistry] = None,
+                 exposure_interval: float = 1.0, order_executor: Optional[OrderExecutor] = None,
+                 risk_manager: Optional[RiskManager] = None, position_sizer: Optional[PositionSizer] = None):
+        """
+        TradingDirector of the coordinator of a sharded deployment: it handles the SignalEvents of every shard
+        (sizing, orders and executions go through it, so it owns the order submission and the global portfolio),
+        and publishes the exposure of the portfolio to the shards (see SharedExposure).
+
+        Args:
+            events_queue (queue.Queue): The queue to receive events (fed by the receiver).
+            receiver (ShardEventReceiver): The receiver of the signals of the shards.
+            exposure (SharedExposure): The exposure view shared with the shards.
+            metadata_cache (Optional[BrokerMetadataCache]): The broker metadata cache shared with the position sizer.
+            portfolio (Optional[Portfolio]): The global portfolio.
+            latency_report_interval (Optional[float]): How often (seconds) the pipeline latencies are logged.
+            metrics (Optional[MetricsRegistry]): The registry where the main loop metrics are kept.
+            exposure_interval (float): How often (seconds) the exposure of every symbol is published when idle, to
+                pick up the changes without an execution (SL/TP hits, manual trades).
+            order_executor (Optional[OrderExecutor]): The order executor of the deployment.
+            risk_manager (Optional[RiskManager]): The risk manager of the deployment (account-wide limits).
+            position_sizer (Optional[PositionSizer]): The position sizer of the signals of every shard.
+        """
+        super().__init__(events_queue=events_queue, data_provider=receiver, signal_generator=None,
+                         metadata_cache=metadata_cache, portfolio=portfolio,
+                         latency_report_interval=latency_report_interval, metrics=metrics,
+                         order_executor=order_executor, risk_manager=risk_manager, position_sizer=position_sizer)
+        self.exposure = exposure
+        self.exposure_interval: float = exposure_interval
+        self._next_exposure_publish: float = 0.0
+
+    def _handle_execution_event(self, event: ExecutionEvent):
+        super()._handle_execution_event(event)
+        if self.PORTFOLIO is not None:
+            self.exposure.publish(event.symbol, self.PORTFOLIO)
+
+    def _report_latencies_if_due(self) -> None:
+        # Idle housekeeping: the latency report and the periodic publication of the exposure
+        super()._report_latencies_if_due()
+        if self.PORTFOLIO is None:
+            return
+        now = time.monotonic()
+        if now >= self._next_exposure_publish:
+            self._next_exposure_publish = now + self.exposure_interval
+            self.exposure.publish_all(self.PORTFOLIO)
+
+
+def _run_shard(shard: int, symbols: List[str], symbol_list: List[str], pipeline_factory: PipelineFactory,
+               connection: Connection, stop_event, exposure_name: str, log_level: str | int | None,
+               log_json: bool | None) -> None:
+    """
+    Entry point of a shard process: builds its pipeline and runs its ShardDirector until the launcher stops it (or
+    its data provider finishes, in backtests).
+    """
+    setup_logging(level=log_level, json_format=log_json)
+    exposure = SharedExposure(symbol_list, name=exposure_name)
+    events_queue = queue.Queue()
+    try:
+        data_provider, signal_generator = pipeline_factory(events_queue, symbols, exposure)
+        director = ShardDirector(events_queue=events_queue, data_provider=data_provider,
+                                 signal_generator=signal_generator, connection=connection, symbol_list=symbol_list)
+
+        def stop_when_requested():
+            stop_event.wait()
+            director.continue_trading = False
+
+        threading.Thread(target=stop_when_requested, name="ShardStop", daemon=True).start()
+        logger.info("Shard %s started with %s symbols (pid %s)", shard, len(symbols), os.getpid())
+        director.execute()
+        connection.send_bytes(SHARD_FINISHED)
+    finally:
+        connection.close()
+        exposure.close()
+
+
+class ShardLauncher():
+
+    def __init__(self, symbol_list: List[str], pipeline_factory: PipelineFactory, num_shards: int | None = None,
+                 metadata_cache: Optional[BrokerMetadataCache] = None, portfolio: Optional[Portfolio] = None,
+                 metrics: Optional[MetricsRegistry] = None, log_level: str | int | None = None,
+                 log_json: bool | None = None,
+                 order_executor_factory: Optional[Callable[[queue.Queue], OrderExecutor]] = None,
+                 risk_manager_factory: Optional[Callable[[queue.Queue], RiskManager]] = None,
+                 position_sizer_factory: Optional[Callable[[queue.Queue, IDataProvider], PositionSizer]] = None):
+        """
+        Runs the framework over many symbols in several processes: the symbols are split in `num_shards` shards
+        (see partition_symbols), and every shard process polls the data and generates the signals of its symbols
+        with its own pipeline (built by `pipeline_factory`), so the polling and the signal generation of the
+        shards run in parallel on different cores.
+
+        The process that runs the launcher is the coordinator: it receives the signals of every shard through a
+        pipe (fixed size binary records, see encode_signal_event), handles them in its own TradingDirector, and is
+        the only process that submits orders and updates the global portfolio. The exposure of the portfolio is
+        published to the shards in shared memory (see SharedExposure).
+
+        The shards are started with the 'spawn' method (the only one available with MT5), so the factory must be
+        a module level function and the script must create the launcher under `if __name__ == '__main__'`.
+
+        Args:
+            symbol_list (List[str]): The symbols of the deployment.
+            pipeline_factory (PipelineFactory): Builds the data provider and signal generator of a shard.
+            num_shards (int | None): The number of shard processes (one per core if None).
+            metadata_cache (Optional[BrokerMetadataCache]): The broker metadata cache of the coordinator.
+            portfolio (Optional[Portfolio]): The global portfolio, kept by the coordinator.
+            metrics (Optional[MetricsRegistry]): The registry where the coordinator metrics are kept.
+            log_level (str | int | None): The logging level of the shard processes (see setup_logging).
+            log_json (bool | None): Whether the shard processes log JSON lines (see setup_logging).
+            order_executor_factory (Optional[Callable[[queue.Queue], OrderExecutor]]): Creates the order executor
+                of the coordinator from its events queue (e.g. OrderExecutor). The orders are only logged if None.
+            risk_manager_factory (Optional[Callable[[queue.Queue], RiskManager]]): Creates the risk manager of the
+                coordinator from its events queue. The sizing events are only logged if None.
+            position_sizer_factory (Optional[Callable[[queue.Queue, IDataProvider], PositionSizer]]): Creates the
+                position sizer of the coordinator from its events queue and its data provider (the receiver of the
+                signals, which gives the latest ticks of the broker). The signals are only logged if None.
+        """
+        self.symbols: List[str] = list(symbol_list)
+        self.pipeline_factory = pipeline_factory
+        self.num_shards: int = num_shards if num_shards is not None else (os.cpu_count() or 1)
+        self.shards: List[List[str]] = partition_symbols(self.symbols, self.num_shards)
+        self.metadata_cache = metadata_cache
+        self.portfolio = portfolio
+        self.metrics = metrics
+        self.log_level = log_level
+        self.log_json = log_json
+        self.order_executor_factory = order_executor_factory
+        self.risk_manager_factory = risk_manager_factory
+        self.position_sizer_factory = position_sizer_factory
+
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes: List[multiprocessing.Process] = []
+        self.exposure: SharedExposure | None = None
+        self.receiver: ShardEventReceiver | None = None
+        self.coordinator: ShardCoordinator | None = None
+
+    def start(self) -> None:
+        """
+        Starts the shard processes and prepares the coordinator (run starts them if they are not running yet).
+        """
+        self.exposure = SharedExposure(self.symbols)
+        if self.portfolio is not None:
+            self.exposure.publish_all(self.portfolio)
+
+        connections: Dict[int, Connection] = {}
+        for shard, symbols in enumerate(self.shards):
+            receiving, sending = self._context.Pipe(duplex=False)
+            process = self._context.Process(target=_run_shard, name=f"Shard-{shard}",
+                                            args=(shard, symbols, self.symbols, self.pipeline_factory, sending,
+                                                  self._stop_event, self.exposure.name, self.log_level,
+                                                  self.log_json))
+            process.start()
+            # Only the shard keeps the sending end: the pipe is closed (EOF) as soon as the shard dies
+            sending.close()
+            connections[shard] = receiving
+            self._processes.append(process)
+
+        events_queue = queue.Queue()
+        order_executor = self.order_executor_factory(events_queue) if self.order_executor_factory is not None else None
+        risk_manager = self.risk_manager_factory(events_queue) if self.risk_manager_factory is not None else None
+        self.receiver = ShardEventReceiver(events_queue, self.symbols, connections, on_shards_stopped=self.stop)
+        position_sizer = (self.position_sizer_factory(events_queue, self.receiver)
+                          if self.position_sizer_factory is not None else None)
+        self.coordinator = ShardCoordinator(events_queue=events_queue, receiver=self.receiver, exposure=self.exposure,
+                                            metadata_cache=self.metadata_cache, portfolio=self.portfolio,
+                                            metrics=self.metrics, order_executor=order_executor,
+                                            risk_manager=risk_manager, position_sizer=position_sizer)
+        self.receiver.start()
+        logger.info("Started %s shards for %s symbols", len(self.shards), len(self.symbols))
+
+    def run(self) -> None:
+        """
+        Runs the coordinator until the launcher is stopped or the shards stop, then stops the shard processes.
+        """
+        if self.coordinator is None:
+            self.start()
+        try:
+            self.coordinator.execute()
+        finally:
+            self._shutdown()
+
+    def stop(self) -> None:
+        """
+        Stops the coordinator and the shards. It can be called from any thread.
+        """
+        self._stop_event.set()
+        if self.coordinator is not None:
+            self.coordinator.continue_trading = False
+
+    def _shutdown(self, timeout: float = 10.0) -> None:
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning("Shard process %s did not stop in %ss: terminating it", process.name, timeout)
+                process.terminate()
+                process.join()
+        self.receiver.stop()
+        for connection in self.receiver.connections.values():
+            connection.close()
+        self.exposure.close()
+        self._processes.clear()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List
+
+import numpy as np
+
+from portfolio.portfolio import Portfolio
+from utils.logger import get_logger
+
+
+logger = get_logger("shard_launcher")
+
+
+class SharedExposure():
+
+    # Columns of the row of every symbol
+    LONG_POSITIONS, SHORT_POSITIONS, LONG_VOLUME, SHORT_VOLUME = range(4)
+
+    # Attempts to read a row before giving up (a write takes microseconds: only a writer that died in the middle of
+    # one leaves the version odd for good)
+    MAX_READ_ATTEMPTS = 10_000
+
+    def __init__(self, symbol_list: List[str], name: str | None = None):
+        """
+        Global exposure view (open positions and volume of every symbol, all the strategies) kept in shared memory:
+        the coordinator of a sharded deployment publishes it from its portfolio, and every shard process reads it
+        without any message or copy of the portfolio.
+
+        The memory holds a version counter followed by one row of float64 per symbol. The writer makes the version
+        odd while it updates a row, and the readers retry (yielding the CPU to the writer in between) until they
+        read a row with the same even version before and after it, so a row is never read half written.
+
+        Args:
+            symbol_list (List[str]): The symbols, in the same order in every process.
+            name (str | None): The name of the shared memory to attach to (None: create it).
+        """
+        self.symbols: List[str] = list(symbol_list)
+        self._index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._owner: bool = name is None
+
+        size = 8 + len(self.symbols) * 4 * 8
+        self._memory = SharedMemory(name=name, create=self._owner, size=size if self._owner else 0)
+
+        self._version = np.ndarray((1,), dtype=np.int64, buffer=self._memory.buf, offset=0)
+        self._rows = np.ndarray((len(self.symbols), 4), dtype=np.float64, buffer=self._memory.buf, offset=8)
+        if self._owner:
+            self._version[0] = 0
+            self._rows[:] = 0.0
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def publish(self, symbol: str, portfolio: Portfolio) -> None:
+        """
+        Writes the exposure of a symbol from the portfolio (only in the process that created the memory).
+        """
+        index = self._index.get(symbol)
+        if index is None:
+            return
+
+        positions = portfolio.get_number_of_open_positions_by_symbol(symbol)
+        volumes = portfolio.get_open_volume_by_symbol(symbol)
+        self._version[0] += 1
+        self._rows[index] = (positions["LONG"], positions["SHORT"], volumes["LONG"], volumes["SHORT"])
+        self._version[0] += 1
+
+    def publish_all(self, portfolio: Portfolio) -> None:
+        """
+        Writes the exposure of every symbol from the portfolio.
+        """
+        for symbol in self.symbols:
+            self.publish(symbol, portfolio)
+
+    def _read_row(self, symbol: str) -> np.ndarray:
+        index = self._index[symbol]
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            version = int(self._version[0])
+            if version % 2 == 0:
+                row = self._rows[index].copy()
+                if int(self._version[0]) == version:
+                    return row
+            # A write is in progress: let the writer finish it
+            time.sleep(0)
+
+        logger.error("Can't read the shared exposure of %s: the writer did not finish its update", symbol)
+        raise Exception(f"ERROR: Can't read the shared exposure of {symbol}")
+
+    def get_number_of_open_positions_by_symbol(self, symbol: str) -> Dict[str, int]:
+        """
+        Returns the number of open positions of a symbol (same result as the Portfolio method of the coordinator).
+        """
+        row = self._read_row(symbol)
+        longs = int(row[self.LONG_POSITIONS])
+        shorts = int(row[self.SHORT_POSITIONS])
+        return {"LONG": longs, "SHORT": shorts, "TOTAL": longs + shorts}
+
+    def get_open_volume_by_symbol(self, symbol: str) -> Dict[str, float]:
+        """
+        Returns the open volume of a symbol (same result as the Portfolio method of the coordinator).
+        """
+        row = self._read_row(symbol)
+        longs = float(row[self.LONG_VOLUME])
+        shorts = float(row[self.SHORT_VOLUME])
+        return {"LONG": longs, "SHORT": shorts, "NET": round(longs - shorts, 8)}
+
+    def close(self) -> None:
+        """
+        Detaches the shared memory from this process, and removes it if this process created it.
+        """
+        # The views must be released before the memory can be closed
+        self._version = None
+        self._rows = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Set, Tuple
+
+import numpy as np
+
+from events.events import DataEvent
+from data_provider.data_provider import DataProvider
+from utils.utils import Utils
+from .rolling_window import RollingWindow
+
+
+class IndicatorCache():
+
+    def __init__(self):
+        """
+        Indicator state shared by the strategies of a SignalGenerator.
+
+        Every (symbol, timeframe) has a single RollingWindow with the running sums of all the periods registered by
+        the strategies, so a DataEvent updates the window once (and the bars are recovered from the data provider
+        once when it has to be seeded) however many strategies use it. The exact means computed for a bar are
+        memoized until the next bar.
+        """
+        self._periods: Dict[str, Set[int]] = {}                            # timeframe -> registered periods
+        self._windows: Dict[Tuple[str, str], RollingWindow] = {}           # (symbol, timeframe) -> window
+        self._exact_means: Dict[Tuple[str, str], Dict[int, float]] = {}    # (symbol, timeframe) -> period -> mean
+        self._last_events: Dict[Tuple[str, str], DataEvent] = {}           # (symbol, timeframe) -> last event applied
+
+    def register(self, timeframe: str, periods: Iterable[int]) -> None:
+        """
+        Registers the moving average periods that a strategy needs in a timeframe. The windows of the timeframe are
+        re-seeded on their next update if a new period is registered.
+
+        Args:
+            timeframe (str): The timeframe of the strategy.
+            periods (Iterable[int]): The periods of its moving averages.
+        """
+        registered = self._periods.setdefault(timeframe, set())
+        new_periods = set(periods) - registered
+        if not new_periods:
+            return
+
+        registered.update(new_periods)
+        for key in [key for key in self._windows if key[1] == timeframe]:
+            del self._windows[key]
+            self._exact_means.pop(key, None)
+            self._last_events.pop(key, None)
+
+    def _seed_window(self, symbol: str, timeframe: str, data_provider: DataProvider) -> RollingWindow | None:
+        """
+        Seeds (or re-seeds after a gap) the window of a symbol with the latest closed bars.
+        """
+        key = (symbol, timeframe)
+        periods = self._periods.get(timeframe, set())
+        size = max(periods, default=1)
+
+        bars = data_provider.get_latest_closed_bars(symbol, timeframe, size)
+        if bars is None or bars.empty:
+            self._windows.pop(key, None)
+            return None
+
+        window = RollingWindow(size=size, periods=periods)
+        window.seed(bars['close'].to_numpy(dtype=np.float64), int(bars.index[-1].timestamp()))
+        self._windows[key] = window
+        return window
+
+    def update(self, data_event: DataEvent, timeframe: str, data_provider: DataProvider) -> RollingWindow | None:
+        """
+        Brings the window of the symbol of the event up to its bar: the bar is appended in O(1), or the window is
+        seeded from the data provider at start-up or after a gap. The other strategies that receive the same event
+        get the window already updated. Any other event whose bar is not newer than the last bar applied (a
+        repeated or late DataEvent) gets None, so the strategies do not emit the signal of that bar again.
+
+        Args:
+            data_event (DataEvent): The data event with the new closed bar.
+            timeframe (str): The timeframe of the bar.
+            data_provider (DataProvider): The data provider used to seed the window.
+
+        Returns:
+            RollingWindow | None: The window, or None if no bars could be recovered or the bar is not new.
+        """
+        key = (data_event.symbol, timeframe)
+        bar = data_event.data
+        bar_time = bar.time
+
+        window = self._windows.get(key)
+        if window is not None and window.last_time is not None and bar_time <= window.last_time:
+            return window if self._last_events.get(key) is data_event else None
+
+        self._last_events[key] = data_event
+        if window is None or window.last_time is None or bar_time > Utils.next_bar_time(window.last_time, timeframe):
+            window = self._seed_window(data_event.symbol, timeframe, data_provider)
+            self._exact_means[key] = {}
+        elif bar_time == Utils.next_bar_time(window.last_time, timeframe):
+            window.append(bar.close, bar_time)
+            self._exact_means[key] = {}
+        return window
+
+    def exact_mean(self, symbol: str, timeframe: str, period: int) -> float:
+        """
+        Exact moving average (see RollingWindow.exact_mean) of the latest bar of a symbol, computed once per bar.
+        The window must have been updated with update.
+        """
+        key = (symbol, timeframe)
+        means = self._exact_means.setdefault(key, {})
+        mean = means.get(period)
+        if mean is None:
+            mean = self._windows[key].exact_mean(period)
+            means[period] = mean
+        return mean
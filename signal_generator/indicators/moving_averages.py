@@ -0,0 +1,106 @@
+import numpy as np
+
+
+# Machine epsilon of float64, used to bound the rounding error of the rolling sums
+EPS = np.finfo(np.float64).eps
+
+
+def window_mean(values: np.ndarray) -> float:
+    """
+    Reference mean of a window of values. It is the same reduction that the event-driven path performs over the
+    latest closed bars, so every vectorized result that is too close to call is re-evaluated with it.
+
+    Args:
+        values (np.ndarray): The window of values.
+
+    Returns:
+        float: The mean of the window.
+    """
+    return float(np.mean(values))
+
+
+def window_means(windows: np.ndarray) -> np.ndarray:
+    """
+    Row-wise version of window_mean: every row is copied to a contiguous buffer so that it is reduced exactly like
+    a single window.
+
+    Args:
+        windows (np.ndarray): 2-D array with one window per row.
+
+    Returns:
+        np.ndarray: The mean of every row.
+    """
+    return np.ascontiguousarray(windows, dtype=np.float64).mean(axis=1)
+
+
+def rolling_sum(values: np.ndarray, period: int, block: int) -> np.ndarray:
+    """
+    Computes the sum of every window of `period` consecutive values using cumulative sums.
+
+    The cumulative sums are restarted every `block` values, so the rounding error of each window sum is bounded by
+    rolling_sum_error_bound(block, scale) instead of growing with the length of the whole history.
+
+    Args:
+        values (np.ndarray): The values (1-D float64 array).
+        period (int): The window length.
+        block (int): The length of the blocks where the cumulative sums are restarted. Must be >= period.
+
+    Returns:
+        np.ndarray: An array of len(values) - period + 1 sums, the i-th one for the window ending at i + period - 1.
+    """
+    n = len(values)
+    if n < period:
+        return np.empty(0, dtype=np.float64)
+
+    num_blocks = -(-n // block)
+    padded = np.zeros(num_blocks * block, dtype=np.float64)
+    padded[:n] = values
+
+    # Inclusive prefix sums inside every block and the total of every block
+    prefix = np.cumsum(padded.reshape(num_blocks, block), axis=1).ravel()
+    block_totals = prefix[block - 1::block]
+
+    ends = np.arange(period - 1, n)
+    starts = ends - period + 1
+
+    # Sum of the values of the start block that lie before the window
+    before_start = np.where(starts % block > 0, prefix[starts - 1], 0.0)
+
+    # A window spans at most two blocks because period <= block
+    crosses_block = (starts // block) != (ends // block)
+    return np.where(crosses_block,
+                    block_totals[starts // block] - before_start + prefix[ends],
+                    prefix[ends] - before_start)
+
+
+def rolling_sum_error_bound(block: int, scale: float) -> float:
+    """
+    Upper bound of the absolute rounding error of a window sum returned by rolling_sum.
+
+    Args:
+        block (int): The block length used by rolling_sum.
+        scale (float): The maximum absolute value of the summed values.
+
+    Returns:
+        float: The error bound (three in-block prefix sums of at most `block` terms are combined).
+    """
+    return 3.0 * block * block * EPS * scale
+
+
+def rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Simple moving average aligned with the input: the i-th value is the mean of values[i - period + 1: i + 1] and
+    the first period - 1 values are NaN.
+
+    Args:
+        values (np.ndarray): The values.
+        period (int): The window length.
+
+    Returns:
+        np.ndarray: The moving average, same length as values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    means = np.full(len(values), np.nan)
+    if len(values) >= period:
+        means[period - 1:] = rolling_sum(values, period, period) / period
+    return means
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+from .moving_averages import rolling_sum_error_bound, window_mean
+
+
+class RollingWindow():
+
+    def __init__(self, size: int, periods: Iterable[int]):
+        """
+        Fixed-size window with the latest values of a series (e.g. the closes of a symbol) that keeps a running sum
+        for each of the given periods, so every moving average is updated in constant time per new value.
+
+        Args:
+            size (int): The number of values kept in the window (the longest period).
+            periods (Iterable[int]): The periods of the running sums (each one <= size).
+        """
+        self.size = size
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count: int = 0             # Number of valid values in the window (<= size)
+        self.position: int = 0          # Index where the next value is written
+        self.last_time: int | None = None
+
+        self._sums: Dict[int, float] = {period: 0.0 for period in periods}
+        self._appends_since_resync: int = 0
+        self._scale: float = 0.0        # Max absolute value that took part in the running sums since the last resync
+
+    def seed(self, values: np.ndarray, last_time: int) -> None:
+        """
+        Resets the window with a full history (oldest first). Only the latest `size` values are kept.
+
+        Args:
+            values (np.ndarray): The values to seed the window with.
+            last_time (int): The time of the latest value as epoch seconds.
+        """
+        values = np.asarray(values, dtype=np.float64)[-self.size:]
+        self.count = len(values)
+        self.values[:self.count] = values
+        self.position = self.count % self.size
+        self.last_time = last_time
+        self._resync()
+
+    def append(self, value: float, time: int) -> None:
+        """
+        Adds a new value to the window and updates every running sum in O(1).
+
+        Args:
+            value (float): The new value.
+            time (int): The time of the new value as epoch seconds.
+        """
+        for period in self._sums:
+            if self.count >= period:
+                # The value that leaves the window of this period is the period-th most recent one
+                self._sums[period] += value - self.values[(self.position - period) % self.size]
+            else:
+                self._sums[period] += value
+
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.last_time = time
+        self._scale = max(self._scale, abs(value))
+
+        # Recompute the sums from scratch every `size` appends (amortized O(1)) to keep the rounding error bounded
+        self._appends_since_resync += 1
+        if self._appends_since_resync >= self.size:
+            self._resync()
+
+    def is_ready(self, period: int) -> bool:
+        return self.count >= period
+
+    def mean(self, period: int) -> float:
+        """
+        Moving average of the latest `period` values from the running sum.
+        """
+        return self._sums[period] / period
+
+    def exact_mean(self, period: int) -> float:
+        """
+        Moving average of the latest `period` values computed with the same reduction as the event-driven path.
+        """
+        return window_mean(self.latest(period))
+
+    def tolerance(self, period: int) -> float:
+        """
+        Upper bound of the rounding error of mean(period) with respect to exact_mean(period).
+        """
+        return rolling_sum_error_bound(self.size, self._scale) / period + 2 * period * np.finfo(np.float64).eps * self._scale
+
+    def latest(self, num_values: int) -> np.ndarray:
+        """
+        Returns the latest `num_values` values in chronological order (contiguous copy).
+        """
+        num_values = min(num_values, self.count)
+        indexes = (self.position - num_values + np.arange(num_values)) % self.size
+        return self.values[indexes]
+
+    def _resync(self) -> None:
+        window = self.latest(self.count)
+        for period in self._sums:
+            self._sums[period] = float(np.sum(window[-period:]))
+        self._scale = float(np.max(np.abs(window))) if self.count > 0 else 0.0
+        self._appends_since_resync = 0
@@ -1,7 +1,13 @@
 from pydantic import BaseModel
 
 class BaseSignalProps(BaseModel):
-    pass
+    """
+    Represents the properties shared by every signal generator.
+
+    Attributes:
+        magic_number (int): The magic number of the signals (identifies the strategy in the orders and positions).
+    """
+    magic_number: int = 1
 
 class MACrossoverProps(BaseSignalProps):
     """
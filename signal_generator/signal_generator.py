@@ -1,32 +1,60 @@
-from events.events import DataEvent
+from __future__ import annotations
+
+from typing import Dict, List
+
+from events.events import DataEvent, SignalEvent, stamp_trace, with_trace
+from .indicators.indicator_cache import IndicatorCache
 from .interfaces.signal_generator_interface import ISignalGenerator
 from .properties.signal_generator_properties import BaseSignalProps, MACrossoverProps, RSIProps
 from .signals.signal_ma_crossover import SignalMACrossover
 #from .signals.signal_rsi_mr import SignalRSI
 from data_provider.data_provider import DataProvider
-#from portfolio.portfolio import Portfolio
+from portfolio.portfolio import Portfolio
 #from order_executor.order_executor import OrderExecutor
 from queue import Queue
 
 class SignalGenerator(ISignalGenerator):
 
-    def __init__(self, events_queue: Queue, data_provider: DataProvider, signal_properties: BaseSignalProps):
+    def __init__(self, events_queue: Queue, data_provider: DataProvider,
+                 signal_properties: BaseSignalProps | List[BaseSignalProps], portfolio: Portfolio | None = None,
+                 max_positions_per_symbol: int | None = None):
         """
         Initialize the SignalGenerator object.
 
+        Several strategies (different properties, timeframes and magic numbers) can run over the same symbols:
+        they share an IndicatorCache, so the bars and indicators that several of them need are recovered and
+        computed once per DataEvent.
+
         Args:
             events_queue (Queue): The queue for receiving events.
             data_provider (DataProvider): The data provider for accessing market data.
-            portfolio (Portfolio): The portfolio for managing positions and balances.
-            order_executor (OrderExecutor): The order executor for executing trading orders.
-            signal_properties (BaseSignalProps): The signal properties for generating trading signals.
+            signal_properties (BaseSignalProps | List[BaseSignalProps]): The signal properties of every strategy.
+            portfolio (Portfolio | None): The open positions of the account, used with max_positions_per_symbol (in
+                a shard, the SharedExposure published by the coordinator).
+            max_positions_per_symbol (int | None): The signals of a symbol that already has this many open
+                positions (all the strategies) are dropped, as the risk manager would reject their orders (None: the
+                signals are not filtered).
         """
         self.events_queue = events_queue
         self.DATA_PROVIDER = data_provider
-        #self.PORTFOLIO = portfolio
+        self.PORTFOLIO = portfolio
+        self.max_positions_per_symbol = max_positions_per_symbol if portfolio is not None else None
         #self.ORDER_EXECUTOR = order_executor
 
-        self.signal_generator_method = self._get_signal_generator_method(signal_properties)
+        if isinstance(signal_properties, BaseSignalProps):
+            signal_properties = [signal_properties]
+
+        self.indicator_cache = IndicatorCache()
+        self.signal_generator_methods: List[ISignalGenerator] = []
+
+        # Strategies by timeframe, so a DataEvent only reaches the strategies of its timeframe
+        self._methods_by_timeframe: Dict[str, List[ISignalGenerator]] = {}
+        for signal_props in signal_properties:
+            method = self._get_signal_generator_method(signal_props)
+            if method is None:
+                continue
+            self.signal_generator_methods.append(method)
+            self._methods_by_timeframe.setdefault(signal_props.timeframe, []).append(method)
 
     def _get_signal_generator_method(self, signal_props: BaseSignalProps) -> ISignalGenerator:
         """
@@ -42,7 +70,7 @@ class SignalGenerator(ISignalGenerator):
             Exception: If the signal properties are of an unknown type.
         """
         if isinstance(signal_props, MACrossoverProps):
-            return SignalMACrossover(properties=signal_props)
+            return SignalMACrossover(properties=signal_props, indicator_cache=self.indicator_cache)
         
         elif isinstance(signal_props, RSIProps):
             #return SignalRSI(properties=signal_props)
@@ -61,9 +89,26 @@ class SignalGenerator(ISignalGenerator):
         Returns:
             None
         """
-        # Recuperamos el SignalEvent usando la lógica de entrada adecuada
-        signal_event = self.signal_generator_method.generate_signal(data_event, self.DATA_PROVIDER)
+        # Events without timeframe reach every strategy
+        if data_event.timeframe:
+            methods = self._methods_by_timeframe.get(data_event.timeframe, [])
+        else:
+            methods = self.signal_generator_methods
+
+        for method in methods:
+            # Recuperamos el SignalEvent usando la lógica de entrada adecuada
+            signal_event = method.generate_signal(data_event, self.DATA_PROVIDER)
+
+            # Comprobamos que SignalEvent no sea None y colocamos el evento a la cola (con la traza de la barra)
+            if signal_event is not None and not self._symbol_is_full(signal_event.symbol):
+                if data_event.trace is not None:
+                    signal_event = with_trace(signal_event, stamp_trace(data_event.trace, SignalEvent.trace_stage))
+                self.events_queue.put(signal_event)
 
-        # Comprobamos que SignalEvent no sea None y colocamos el evento a la cola
-        if signal_event is not None:
-            self.events_queue.put(signal_event)
\ No newline at end of file
+    def _symbol_is_full(self, symbol: str) -> bool:
+        """
+        Returns True if the symbol already has the maximum number of open positions.
+        """
+        if self.max_positions_per_symbol is None:
+            return False
+        return self.PORTFOLIO.get_number_of_open_positions_by_symbol(symbol)["TOTAL"] >= self.max_positions_per_symbol
@@ -1,25 +1,42 @@
-from events.events import DataEvent, SignalEvent
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from events.events import DataEvent, SignalEvent, SignalType, OrderType
 from data_provider.data_provider import DataProvider
 from ..interfaces.signal_generator_interface import ISignalGenerator
 from ..properties.signal_generator_properties import MACrossoverProps
+from ..indicators.moving_averages import EPS, rolling_sum, rolling_sum_error_bound, window_means
+from ..indicators.indicator_cache import IndicatorCache
 #from portfolio.portfolio import Portfolio
 #from order_executor.order_executor import OrderExecutor
 
 
 class SignalMACrossover(ISignalGenerator):
 
-    def __init__(self, properties: MACrossoverProps):
+    # Values of the signal series returned by the batch API
+    NO_SIGNAL = 0
+    BUY_SIGNAL = 1
+    SELL_SIGNAL = -1
+
+    def __init__(self, properties: MACrossoverProps, indicator_cache: IndicatorCache | None = None):
         """
         Initializes the MACrossover object.
 
         Args:
             properties (MACrossoverProps): The properties object containing the parameters for the moving average crossover.
+            indicator_cache (IndicatorCache | None): The indicator state shared with other strategies (a private
+                one if None).
 
         Raises:
             Exception: If the fast period is greater than or equal to the slow period.
 
         """
         self.timeframe = properties.timeframe
+        self.magic_number = properties.magic_number
         self.fast_period = properties.fast_period if properties.fast_period > 1 else 2
         self.slow_period = properties.slow_period if properties.slow_period > 2 else 3
 
@@ -27,6 +44,10 @@ class SignalMACrossover(ISignalGenerator):
             raise Exception(
                 f"ERROR: el periodo rápido ({self.fast_period}) es mayor o igual al periodo lento ({self.slow_period}) para el cálculo de las medias móviles")
 
+        # Estado incremental de las medias por símbolo (últimos cierres y sumas acumuladas), compartido entre estrategias
+        self.indicator_cache = indicator_cache if indicator_cache is not None else IndicatorCache()
+        self.indicator_cache.register(self.timeframe, (self.fast_period, self.slow_period))
+
     def generate_signal(self, data_event: DataEvent, data_provider: DataProvider) -> SignalEvent:
         """
         Generates a signal based on the moving average crossover strategy.
@@ -43,44 +64,144 @@ class SignalMACrossover(ISignalGenerator):
         # Cogemos el símbolo del evento
         symbol = data_event.symbol
 
-        # Recuperamos los datos necesarios para calcular las medias móviles
-        bars = data_provider.get_latest_closed_bars(symbol, self.timeframe, self.slow_period)
+        # Actualizamos el estado de las medias del símbolo con la barra del evento (O(1)), o lo recalculamos
+        # desde el data provider en el arranque o si detectamos un hueco en las barras. Si otra estrategia ya lo
+        # ha hecho para esta barra, no se repite
+        window = self.indicator_cache.update(data_event, self.timeframe, data_provider)
+
+        # Sin historia suficiente para la media lenta no hay señal (igual que en la API vectorizada)
+        if window is None or not window.is_ready(self.slow_period):
+            return None
 
         # Recuperamos las posiciones abiertas por esta estrategia en el símbolo donde hemos tenido el Data Event
         #open_positions = portfolio.get_number_of_strategy_open_positions_by_symbol(symbol)
 
-        # Calculamos el valor de los indicadores
-        fast_ma = bars['close'][-self.fast_period:].mean()
-        slow_ma = bars['close'].mean()
+        # Calculamos el valor de los indicadores a partir de las sumas acumuladas. Si las medias están más cerca
+        # que el error de redondeo, las recalculamos sobre la ventana completa
+        fast_ma = window.mean(self.fast_period)
+        slow_ma = window.mean(self.slow_period)
+        if abs(fast_ma - slow_ma) <= window.tolerance(self.fast_period) + window.tolerance(self.slow_period):
+            fast_ma = self.indicator_cache.exact_mean(symbol, self.timeframe, self.fast_period)
+            slow_ma = self.indicator_cache.exact_mean(symbol, self.timeframe, self.slow_period)
 
         # Detectar una señal de compra
         if fast_ma > slow_ma:
-            signal = "BUY"
+            signal = SignalType.BUY
 
         # Señal de venta
         elif slow_ma > fast_ma:
-            signal = "SELL"
+            signal = SignalType.SELL
 
         else:
-            signal = ""
+            signal = None
 
         # Si tenemos señal, generamos SignalEvent y lo colocamos en la cola de Eventos
-        if signal != "":
+        if signal is not None:
             signal_event = SignalEvent(symbol=symbol,
                                        signal=signal,
-                                       target_order="MARKET",
+                                       target_order=OrderType.MARKET,
                                        target_price=0.0,
-                                       magic_number=1,
+                                       magic_number=self.magic_number,
                                        sl=0.0,
                                        tp=0.0)
 
             return signal_event
 
+    def compute_signal_series(self, close_prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluates the moving average crossover over a whole close-price history in one vectorized pass.
 
+        The i-th values correspond to the DataEvent of the i-th bar in generate_signal: the moving averages of the
+        closes up to and including bar i. The moving averages come from cumulative sums; the few bars where the
+        fast and slow averages are closer than the rounding error bound are re-evaluated with the same reduction
+        as generate_signal, so the signal series matches the event-driven path exactly on the same data.
 
+        Args:
+            close_prices (np.ndarray): The close prices of one symbol, oldest first.
 
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The fast moving average, the slow moving average (NaN
+            until a full slow window is available) and the signal series as int8 (BUY_SIGNAL, SELL_SIGNAL or
+            NO_SIGNAL).
+        """
+        closes = np.ascontiguousarray(close_prices, dtype=np.float64)
+        n = len(closes)
+        fast_ma = np.full(n, np.nan)
+        slow_ma = np.full(n, np.nan)
 
+        if n < self.slow_period:
+            return fast_ma, slow_ma, np.zeros(n, dtype=np.int8)
 
+        # The cumulative sums are restarted every slow_period bars to keep the rounding error bounded
+        block = self.slow_period
+        fast_ma[self.fast_period - 1:] = rolling_sum(closes, self.fast_period, block) / self.fast_period
+        slow_ma[self.slow_period - 1:] = rolling_sum(closes, self.slow_period, block) / self.slow_period
+        signals = self.signals_from_moving_averages(closes, fast_ma, slow_ma, block)
 
+        return fast_ma, slow_ma, signals
 
+    @property
+    def warmup_bars(self) -> int:
+        """
+        Number of bars needed before the first one that can have a signal.
+        """
+        return self.slow_period - 1
 
+    def signals_from_moving_averages(self, closes: np.ndarray, fast_ma: np.ndarray, slow_ma: np.ndarray,
+                                     block: int) -> np.ndarray:
+        """
+        Builds the signal series from moving averages computed with rolling_sum. The bars where the averages are
+        closer than the rounding error bound are re-evaluated exactly, and their exact averages are written back
+        into fast_ma and slow_ma.
+
+        The moving averages can be shared between several parameter sets (see the optimizer): the signals are
+        exact as long as both averages were computed with a rolling_sum block of at most `block` bars.
+
+        Args:
+            closes (np.ndarray): The close prices, oldest first (contiguous float64).
+            fast_ma (np.ndarray): The fast moving average aligned with the closes.
+            slow_ma (np.ndarray): The slow moving average aligned with the closes.
+            block (int): The (largest) rolling_sum block used for the averages.
+
+        Returns:
+            np.ndarray: The signal series as int8 (NO_SIGNAL until a full slow window is available).
+        """
+        n = len(closes)
+        signals = np.zeros(n, dtype=np.int8)
+        if n < self.slow_period:
+            return signals
+
+        valid = slice(self.slow_period - 1, n)
+        fast, slow = fast_ma[valid], slow_ma[valid]
+        # BUY_SIGNAL, SELL_SIGNAL and NO_SIGNAL are the signs of fast - slow
+        difference = fast - slow
+        signals[valid] = np.sign(difference)
+
+        # Bars too close to call: rounding error of both vectorized averages plus the one of the reference mean
+        scale = float(np.max(np.abs(closes)))
+        error_bound = rolling_sum_error_bound(block, scale)
+        tolerance = error_bound / self.fast_period + error_bound / self.slow_period + 2 * self.slow_period * EPS * scale
+        ambiguous = np.flatnonzero(np.abs(difference) <= tolerance)
+        if len(ambiguous) > 0:
+            windows = sliding_window_view(closes, self.slow_period)[ambiguous]
+            exact_fast = window_means(windows[:, -self.fast_period:])
+            exact_slow = window_means(windows)
+            fast[ambiguous] = exact_fast
+            slow[ambiguous] = exact_slow
+            signals[ambiguous + self.slow_period - 1] = np.where(
+                exact_fast > exact_slow, self.BUY_SIGNAL,
+                np.where(exact_slow > exact_fast, self.SELL_SIGNAL, self.NO_SIGNAL))
+
+        return signals
+
+    def generate_signals(self, close_prices: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Batch version of generate_signal: evaluates the whole close-price history of every symbol at once.
+
+        Args:
+            close_prices (Dict[str, np.ndarray]): The close prices of every symbol, oldest first.
+
+        Returns:
+            Dict[str, np.ndarray]: The signal series of every symbol (see compute_signal_series).
+        """
+        return {symbol: self.compute_signal_series(closes)[2] for symbol, closes in close_prices.items()}
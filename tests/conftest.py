@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pytest
+
+from data_provider.bar_buffer import BAR_DTYPE
+from utils.logger import setup_logging
+
+
+# The framework logs every event: keep the test output clean
+setup_logging(level="ERROR", stream=io.StringIO())
+
+
+@pytest.fixture
+def make_bars():
+    """
+    Returns a function that builds a BAR_DTYPE array of consecutive bars.
+
+    The bars open every `step` seconds from `start`. The close prices are `prices` (a flat price of 1.0 if it is
+    an int with the number of bars), the open is the previous close and the high/low are 0.0001 away.
+    """
+    def _make_bars(prices, start: int = 1_700_000_040, step: int = 60, spread: int = 2) -> np.ndarray:
+        closes = np.full(prices, 1.0) if isinstance(prices, int) else np.asarray(prices, dtype=np.float64)
+        bars = np.zeros(len(closes), dtype=BAR_DTYPE)
+        bars['time'] = start + step * np.arange(len(closes))
+        bars['close'] = closes
+        bars['open'] = np.concatenate(([closes[0]], closes[:-1])) if len(closes) else closes
+        bars['high'] = np.maximum(bars['open'], closes) + 0.0001
+        bars['low'] = np.minimum(bars['open'], closes) - 0.0001
+        bars['tickvol'] = 10
+        bars['spread'] = spread
+        return bars
+
+    return _make_bars
+
+
+@pytest.fixture
+def write_history(tmp_path):
+    """
+    Returns a function that writes a BAR_DTYPE array as "{tmp_path}/{symbol}_{timeframe}.csv" with the MT5 column
+    names, and returns the directory.
+    """
+    def _write_history(symbol: str, bars: np.ndarray, timeframe: str = "1min") -> str:
+        with open(tmp_path / f"{symbol}_{timeframe}.csv", "w") as file:
+            file.write("time,open,high,low,close,tick_volume,spread,real_volume\n")
+            for bar in bars:
+                file.write(f"{bar['time']},{float(bar['open'])!r},{float(bar['high'])!r},{float(bar['low'])!r},"
+                           f"{float(bar['close'])!r},{bar['tickvol']},{bar['spread']},{bar['vol']}\n")
+        return str(tmp_path)
+
+    return _write_history
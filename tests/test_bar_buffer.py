@@ -0,0 +1,57 @@
+from queue import Queue
+
+import numpy as np
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from data_provider.bar_buffer import BarBuffer
+from data_provider.data_provider import DataProvider
+
+
+def test_append_keeps_the_latest_bars_contiguous(make_bars):
+    bars = make_bars(np.arange(1.0, 51.0))
+    buffer = BarBuffer(capacity=8)
+    for i in range(len(bars)):
+        buffer.append(bars[i:i + 1])
+        latest = buffer.latest(8)
+        assert np.array_equal(latest, bars[max(0, i - 7):i + 1])
+        assert np.shares_memory(latest, buffer._data)
+
+    assert len(buffer) == 8
+    assert buffer.first_time == bars['time'][-8]
+    assert buffer.last_time == bars['time'][-1]
+
+    buffer.append(make_bars(20, start=int(bars['time'][-1]) + 60))
+    assert len(buffer) == 8
+
+
+def test_prepend_fills_the_free_capacity_only(make_bars):
+    bars = make_bars(np.arange(1.0, 11.0))
+    buffer = BarBuffer(capacity=6)
+    buffer.append(bars[-2:])
+    buffer.prepend(bars[:-2])
+    assert np.array_equal(buffer.latest(10), bars[-6:])
+
+    buffer.prepend(bars[:2])
+    assert len(buffer) == 6
+
+
+def test_data_provider_serves_overlapping_windows_from_the_cache(make_bars):
+    closes = np.linspace(1.0, 2.0, 300)
+    broker = SimulatedBroker({"EURUSD": make_bars(closes)}, "1min", start_time=1_700_000_040 + 60 * 100)
+    data_provider = DataProvider(Queue(), ["EURUSD"], "1min", buffer_capacity=50, broker=broker)
+
+    data_provider.check_for_new_data()
+    first = data_provider.get_latest_closed_bars("EURUSD", "1min", 30)
+    assert np.array_equal(first['close'].to_numpy(), closes[70:100])
+
+    broker.step()
+    data_provider.check_for_new_data()
+    calls = broker.call_counts['copy_rates_from_pos']
+    second = data_provider.get_latest_closed_bars("EURUSD", "1min", 20)
+    assert broker.call_counts['copy_rates_from_pos'] == calls
+    assert np.array_equal(second['close'].to_numpy(), closes[81:101])
+
+    # More bars than cached: only the older ones are recovered
+    third = data_provider.get_latest_closed_bars("EURUSD", "1min", 45)
+    assert broker.call_counts['copy_rates_from_pos'] == calls + 1
+    assert np.array_equal(third['close'].to_numpy(), closes[56:101])
@@ -0,0 +1,81 @@
+from queue import Queue
+
+import numpy as np
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from data_provider.bar_buffer import BAR_DTYPE, bar_from_record
+from data_provider.bar_resampler import BarResampler, closing_positions, resample_bars
+from data_provider.data_provider import DataProvider
+
+
+DAY = 1_699_920_000     # 2023-11-14 00:00 (a Tuesday)
+TIMEFRAMES = ['5min', '1h', '4h', '1d', '1w', '1M']
+
+
+@pytest.fixture
+def m1_bars(make_bars):
+    # Three weeks of M1 bars with missing minutes (no ticks) and a missing weekend, across a month change
+    rng = np.random.default_rng(7)
+    bars = make_bars(1.1 + np.cumsum(rng.normal(0, 0.0002, 3 * 7 * 1440)), start=DAY)
+    bars['tickvol'] = rng.integers(1, 50, len(bars))
+    bars['spread'] = rng.integers(1, 20, len(bars))
+    weekday = ((bars['time'] // 86400) + 4) % 7
+    keep = (rng.random(len(bars)) > 0.1) & (weekday != 6)
+    return bars[keep]
+
+
+def records(bars):
+    return [tuple(bar_from_record(record)) for record in bars]
+
+
+def test_vectorized_and_incremental_resampling_match(m1_bars):
+    resampler = BarResampler(TIMEFRAMES)
+    closed = {timeframe: [] for timeframe in TIMEFRAMES}
+    for position, record in enumerate(m1_bars):
+        for timeframe, bar in resampler.add_bar("EURUSD", bar_from_record(record)):
+            closed[timeframe].append((position, tuple(bar)))
+
+    for timeframe in TIMEFRAMES:
+        assert [bar for _, bar in closed[timeframe]] == records(resample_bars(m1_bars, timeframe)), timeframe
+        assert [position for position, _ in closed[timeframe]] == list(closing_positions(m1_bars, timeframe))
+
+        partial = resample_bars(m1_bars, timeframe, include_partial=True)
+        if len(partial) > len(closed[timeframe]):
+            assert tuple(resampler.partial_bar("EURUSD", timeframe)) == records(partial[-1:])[0]
+
+
+def test_seeding_continues_like_adding_every_bar(m1_bars):
+    split = len(m1_bars) // 2
+    full = BarResampler(TIMEFRAMES)
+    for record in m1_bars[:split]:
+        full.add_bar("EURUSD", bar_from_record(record))
+    seeded = BarResampler(TIMEFRAMES)
+    seeded.seed("EURUSD", m1_bars[:split])
+
+    assert seeded.last_time("EURUSD") == full.last_time("EURUSD")
+    for record in m1_bars[split:]:
+        bar = bar_from_record(record)
+        assert seeded.add_bar("EURUSD", bar) == full.add_bar("EURUSD", bar)
+
+
+def test_the_first_daily_bar_covers_the_whole_day_with_a_small_buffer(make_bars):
+    rng = np.random.default_rng(3)
+    bars = make_bars(1.1 + np.cumsum(rng.normal(0, 0.0002, 1440 + 10)), start=DAY)
+    # The framework starts late in the day: the daily bar being formed already has 1200 M1 bars
+    broker = SimulatedBroker({"EURUSD": bars}, "1min", start_time=DAY + 1201 * 60)
+    events_queue = Queue()
+    data_provider = DataProvider(events_queue, ["EURUSD"], "1min", broker=broker, buffer_capacity=100,
+                                 resample_timeframes=['1d'])
+
+    daily = []
+    while broker.server_time <= DAY + 1441 * 60:
+        data_provider.check_for_new_data()
+        while not events_queue.empty():
+            event = events_queue.get()
+            if event.timeframe == '1d':
+                daily.append(tuple(event.data))
+        broker.step()
+
+    assert daily == records(resample_bars(bars[:1440], '1d'))
+    assert np.array(daily, dtype=BAR_DTYPE)['tickvol'][0] == 1440 * 10
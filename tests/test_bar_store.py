@@ -0,0 +1,101 @@
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from data_provider.bar_store import BarStore
+
+
+T0 = 1_700_000_040
+
+
+class ClosingBarBroker:
+    """
+    Broker that closes a new bar after every copy_rates_from_pos call, so the positions shift between the chunks
+    of a backfill.
+    """
+
+    def __init__(self, broker: SimulatedBroker):
+        self.broker = broker
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.broker, name)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        rates = self.broker.copy_rates_from_pos(symbol, timeframe, start_pos, count)
+        self.calls += 1
+        self.broker.step()
+        return rates
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path))
+
+
+def test_append_and_read(store, make_bars):
+    bars = make_bars(np.linspace(1.1, 1.2, 10))
+    assert store.append("EURUSD", "1min", bars[:6]) == 6
+    # The bars that are not newer than the latest stored one are skipped
+    assert store.append("EURUSD", "1min", bars[4:]) == 4
+
+    stored = store.read("EURUSD", "1min")
+    assert isinstance(stored, np.memmap)
+    np.testing.assert_array_equal(stored, bars)
+    assert store.count("EURUSD", "1min") == 10
+    assert store.last_time("EURUSD", "1min") == T0 + 9 * 60
+
+    start = datetime.fromtimestamp(T0 + 2 * 60, tz=timezone.utc)
+    end = datetime.fromtimestamp(T0 + 4 * 60, tz=timezone.utc)
+    np.testing.assert_array_equal(store.read("EURUSD", "1min", start, end), bars[2:5])
+    assert len(store.read("GBPUSD", "1min")) == 0
+
+
+def test_a_partial_record_is_dropped_on_the_next_append(store, make_bars):
+    bars = make_bars(3)
+    store.append("EURUSD", "1min", bars[:2])
+    with open(store.path("EURUSD", "1min"), "ab") as file:
+        file.write(b"\0" * 5)
+
+    store.append("EURUSD", "1min", bars[2:])
+    np.testing.assert_array_equal(BarStore(store.root_dir).read("EURUSD", "1min"), bars)
+
+
+def test_the_layout_is_checked(tmp_path):
+    BarStore(str(tmp_path))
+    with open(os.path.join(tmp_path, "bar_store.json"), "w") as file:
+        file.write('{"version": 0}')
+    with pytest.raises(Exception):
+        BarStore(str(tmp_path))
+
+
+def test_is_contiguous(store, make_bars):
+    assert store.is_contiguous("EURUSD", "1min", T0)
+    store.append("EURUSD", "1min", make_bars(2))
+    assert store.is_contiguous("EURUSD", "1min", T0 + 2 * 60)
+    assert not store.is_contiguous("EURUSD", "1min", T0 + 3 * 60)
+
+
+def test_backfill_of_an_empty_store(store, make_bars):
+    bars = make_bars(50)
+    broker = SimulatedBroker({"EURUSD": bars}, "1min", start_time=T0 + 30 * 60)
+
+    assert store.backfill(broker, "EURUSD", "1min", num_bars=20) == 20
+    np.testing.assert_array_equal(store.read("EURUSD", "1min"), bars[10:30])
+
+
+def test_backfill_with_overlapping_chunks_stores_every_bar_once(store, make_bars):
+    bars = make_bars(np.linspace(1.1, 1.2, 400))
+    store.append("EURUSD", "1min", bars[:10])
+    broker = ClosingBarBroker(SimulatedBroker({"EURUSD": bars}, "1min", start_time=T0 + 200 * 60))
+
+    written = store.backfill(broker, "EURUSD", "1min", chunk_size=64)
+
+    assert broker.calls > 2
+    stored = store.read("EURUSD", "1min")
+    assert np.all(np.diff(stored['time']) > 0)
+    np.testing.assert_array_equal(stored, bars[:10 + written])
+    assert stored['time'][-1] >= T0 + 199 * 60
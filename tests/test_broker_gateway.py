@@ -0,0 +1,99 @@
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+import broker.broker_gateway as broker_gateway
+from broker.broker_gateway import BrokerGateway, gateway_authkey
+from broker.brokers.gateway_broker import GatewayBroker
+from broker.brokers.simulated_broker import SimulatedBroker
+
+
+T0 = 1_700_000_040
+KEY = b"test-gateway-key"
+
+
+@pytest.fixture
+def simulated_broker(make_bars):
+    return SimulatedBroker({"EURUSD": make_bars(10)}, "1min", start_time=T0 + 5 * 60,
+                           latency={'symbol_info': 0.3})
+
+
+@pytest.fixture
+def gateway(simulated_broker):
+    gateway = BrokerGateway(simulated_broker, address=("127.0.0.1", 0), authkey=KEY, workers=2)
+    gateway.start()
+    yield gateway
+    gateway.stop()
+
+
+@pytest.fixture
+def client(gateway):
+    client = GatewayBroker(address=gateway.address, authkey=KEY, timeout=5.0)
+    yield client
+    client.shutdown()
+
+
+@pytest.fixture
+def dotenv(tmp_path, monkeypatch):
+    # The key is only in the .env file given, and the environment is restored after the test
+    monkeypatch.setenv("MT5_GATEWAY_KEY", "")
+    monkeypatch.delenv("MT5_GATEWAY_KEY")
+    path = tmp_path / ".env"
+    monkeypatch.setattr(broker_gateway, "find_dotenv", lambda: str(path))
+    return path
+
+
+def test_the_key_is_read_from_the_dotenv_file(dotenv):
+    dotenv.write_text("MT5_GATEWAY_KEY=from-dotenv\n")
+    assert gateway_authkey() == b"from-dotenv"
+
+
+def test_there_is_no_default_key(dotenv):
+    dotenv.write_text("MT5_LOGIN=1\n")
+    with pytest.raises(Exception, match="MT5_GATEWAY_KEY"):
+        gateway_authkey()
+
+
+def test_clients_with_another_key_are_rejected(gateway):
+    with pytest.raises(AuthenticationError):
+        Client(gateway.address, authkey=b"another-key")
+
+
+def test_calls_go_through_the_gateway(client, simulated_broker):
+    assert client.initialize()
+    rates = client.copy_rates_from_pos("EURUSD", client.TIMEFRAME_M1, 1, 2)
+    assert list(rates['time']) == [T0 + 3 * 60, T0 + 4 * 60]
+
+    result = client.order_send({'action': client.TRADE_ACTION_DEAL, 'symbol': "EURUSD",
+                                'type': client.ORDER_TYPE_BUY, 'volume': 0.1, 'magic': 3})
+    assert result.retcode == client.TRADE_RETCODE_DONE
+    assert [position.ticket for position in client.positions_get(symbol="EURUSD")] == [result.order]
+    assert simulated_broker.call_counts['order_send'] == 1
+
+    assert client.symbols_info(["EURUSD", "XXXYYY"])["XXXYYY"] is None
+
+
+def test_a_call_without_reply_in_time_fails(gateway):
+    client = GatewayBroker(address=gateway.address, authkey=KEY, timeout=0.05)
+    try:
+        assert client.symbol_info("EURUSD") is None
+        assert client.last_error() == (-10005, "Gateway: timeout")
+        assert client._pending == {}
+
+        # The late reply is dropped and the next calls get their own replies
+        assert client.symbol_info_tick("EURUSD") is not None
+        assert client.last_error() == (1, "Success")
+    finally:
+        client.shutdown()
+
+
+def test_the_calls_of_other_threads_wait_only_for_their_own_reply(client):
+    ticks = []
+    slow = threading.Thread(target=lambda: client.symbol_info("EURUSD"))
+    slow.start()
+    ticks.append(client.symbol_info_tick("EURUSD"))
+    assert slow.is_alive()
+    slow.join()
+    assert ticks[0] is not None
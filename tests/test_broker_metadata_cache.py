@@ -0,0 +1,46 @@
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from utils.broker_metadata_cache import BrokerMetadataCache
+
+
+@pytest.fixture
+def broker(make_bars):
+    return SimulatedBroker({"EURUSD": make_bars(10), "USDJPY": make_bars(10)}, "1min", start_time=1_700_000_100)
+
+
+def test_symbol_info_is_fetched_once_per_session(broker):
+    cache = BrokerMetadataCache(broker=broker)
+    for _ in range(5):
+        assert cache.get_symbol_info("EURUSD").trade_contract_size == 100000.0
+    assert cache.get_symbol_info("USDJPY").digits == 3
+    assert broker.call_counts['symbol_info'] == 2
+
+    cache.invalidate("EURUSD")
+    cache.get_symbol_info("EURUSD")
+    cache.get_symbol_info("USDJPY")
+    assert broker.call_counts['symbol_info'] == 3
+
+    # Unknown symbols are not cached
+    assert cache.get_symbol_info("XXXYYY") is None
+    assert cache.get_symbol_info("XXXYYY") is None
+    assert broker.call_counts['symbol_info'] == 5
+
+
+def test_account_info_expires_and_is_invalidated(broker, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.broker_metadata_cache.time.monotonic", lambda: now[0])
+    cache = BrokerMetadataCache(account_ttl=1.0, broker=broker)
+
+    cache.get_account_info()
+    now[0] += 0.5
+    assert cache.get_account_info().balance == 10000.0
+    assert broker.call_counts['account_info'] == 1
+
+    now[0] += 0.6
+    cache.get_account_info()
+    assert broker.call_counts['account_info'] == 2
+
+    cache.invalidate_account()
+    cache.get_account_info()
+    assert broker.call_counts['account_info'] == 3
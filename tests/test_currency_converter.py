@@ -0,0 +1,72 @@
+from collections import namedtuple
+
+import pytest
+
+from utils.currency_converter import CurrencyConverter
+
+
+SymbolInfo = namedtuple('SymbolInfo', 'name visible currency_base currency_profit')
+Tick = namedtuple('Tick', 'bid')
+
+
+class QuoteBroker():
+    """
+    Broker stub with a fixed bid per symbol. The symbols missing from `visible` are hidden from the Market Watch.
+    """
+    def __init__(self, bids: dict, visible: set | None = None):
+        self.bids = bids
+        self.visible = set(bids) if visible is None else visible
+        self.tick_calls = 0
+
+    def symbols_get(self):
+        return tuple(SymbolInfo(symbol, symbol in self.visible, symbol[:3], symbol[3:]) for symbol in self.bids)
+
+    def symbol_info_tick(self, symbol):
+        self.tick_calls += 1
+        return Tick(self.bids[symbol]) if symbol in self.bids else None
+
+    def last_error(self):
+        return (1, "Success")
+
+
+BIDS = {"EURUSD": 1.10, "USDJPY": 150.0, "GBPUSD": 1.25, "EURGBP": 0.88, "AUDNZD": 1.08}
+
+
+def test_routes_use_the_fewest_conversions_through_the_hubs():
+    converter = CurrencyConverter(broker=QuoteBroker(BIDS))
+
+    assert converter.get_route("EUR", "USD") == [("EURUSD", False)]
+    assert converter.get_route("usd", "eur") == [("EURUSD", True)]
+    assert converter.get_route("GBP", "JPY") == [("GBPUSD", False), ("USDJPY", False)]
+    assert converter.get_route("EUR", "EUR") == []
+    assert converter.get_route("EUR", "AUD") is None
+
+
+def test_convert_multiplies_or_divides_along_the_route():
+    converter = CurrencyConverter(broker=QuoteBroker(BIDS))
+
+    assert converter.convert(100.0, "EUR", "JPY") == pytest.approx(100.0 * 1.10 * 150.0)
+    assert converter.convert(150.0, "JPY", "USD") == pytest.approx(1.0)
+    assert converter.convert(100.0, "EUR", "AUD") == 0.0
+
+
+def test_rates_are_cached_and_refreshed_from_ticks():
+    broker = QuoteBroker(BIDS)
+    converter = CurrencyConverter(broker=broker, rate_ttl=60.0)
+
+    converter.convert(1.0, "EUR", "USD")
+    converter.convert(1.0, "EUR", "USD")
+    assert broker.tick_calls == 1
+
+    converter.update_from_tick("EURUSD", {'bid': 1.2})
+    assert converter.convert(1.0, "EUR", "USD") == pytest.approx(1.2)
+    assert broker.tick_calls == 1
+
+
+def test_symbols_hidden_from_the_market_watch_are_not_used():
+    broker = QuoteBroker(BIDS, visible=set(BIDS) - {"EURGBP"})
+    converter = CurrencyConverter(broker=broker)
+
+    # EURGBP would be the direct route, but its prices are not kept up to date by the terminal
+    assert converter.get_route("EUR", "GBP") == [("EURUSD", False), ("GBPUSD", True)]
+    assert converter.convert(1.0, "EUR", "GBP") == pytest.approx(1.10 / 1.25)
@@ -0,0 +1,29 @@
+from queue import Queue
+
+import numpy as np
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from data_provider.data_provider import DataProvider
+from events.events import DataEvent
+
+
+def test_only_new_bars_produce_data_events(make_bars):
+    bars = make_bars(np.linspace(1.0, 1.1, 10))
+    broker = SimulatedBroker({"EURUSD": bars, "USDCHF": bars}, "1min", start_time=int(bars['time'][3]))
+    events_queue = Queue()
+    data_provider = DataProvider(events_queue, ["EURUSD", "USDCHF"], "1min", broker=broker)
+
+    data_provider.check_for_new_data()
+    data_provider.check_for_new_data()
+    events = [events_queue.get() for _ in range(events_queue.qsize())]
+    assert [event.symbol for event in events] == ["EURUSD", "USDCHF"]
+    assert all(isinstance(event, DataEvent) and event.data.time == bars['time'][2] for event in events)
+    assert data_provider.last_bar_time == {"EURUSD": bars['time'][2], "USDCHF": bars['time'][2]}
+
+    broker.step()
+    data_provider.check_for_new_data()
+    event = events_queue.get()
+    assert event.data.time == bars['time'][3]
+    assert event.data.close == bars['close'][3]
+    assert events_queue.get().symbol == "USDCHF"
+    assert events_queue.empty()
@@ -0,0 +1,64 @@
+import pytest
+
+from events.events import (DataEvent, EventType, OrderType, SignalEvent, SignalType, SizingEvent, TraceContext,
+                           is_event_tracing_enabled, new_trace, set_event_validation, stamp_trace, with_trace)
+
+
+@pytest.fixture
+def event_validation():
+    set_event_validation(True)
+    yield
+    set_event_validation(False)
+
+
+def signal_event(**changes) -> SignalEvent:
+    fields = dict(symbol="EURUSD", signal=SignalType.BUY, target_order=OrderType.MARKET, target_price=0.0,
+                  magic_number=1, sl=0.0, tp=0.0)
+    fields.update(changes)
+    return SignalEvent(**fields)
+
+
+def test_events_are_immutable_tuples_with_a_class_event_type():
+    event = signal_event()
+    assert event.event_type == EventType.SIGNAL
+    assert not hasattr(event, "__dict__")
+    with pytest.raises(AttributeError):
+        event.volume = 1.0
+    assert event._replace(symbol="USDCHF").symbol == "USDCHF"
+
+
+def test_validation_converts_lossless_values_and_rejects_the_rest(event_validation):
+    event = signal_event(signal="SELL", target_price=1)
+    assert event.signal is SignalType.SELL
+    assert isinstance(event.target_price, float)
+
+    with pytest.raises(ValueError):
+        signal_event(signal="HOLD")
+    with pytest.raises(ValueError):
+        signal_event(magic_number=1.5)
+    with pytest.raises(ValueError):
+        signal_event(sl="0.0")
+
+
+def test_validation_is_off_by_default():
+    assert signal_event(signal="HOLD").signal == "HOLD"
+    with pytest.raises(ValueError):
+        signal_event(signal="HOLD").validated()
+
+
+def test_traces_are_stamped_stage_by_stage():
+    if not is_event_tracing_enabled():
+        pytest.skip("event tracing is disabled")
+
+    trace = new_trace(since_bar_close=0.5)
+    assert trace.data > 0 and trace.data - trace.bar_close == pytest.approx(5e8, rel=1e-3)
+
+    sizing_trace = stamp_trace(stamp_trace(trace, SignalEvent.trace_stage), SizingEvent.trace_stage)
+    assert sizing_trace.data == trace.data
+    assert sizing_trace.data <= sizing_trace.signal <= sizing_trace.sizing
+    assert sizing_trace.order == 0
+    assert stamp_trace(None, SignalEvent.trace_stage) is None
+
+    event = with_trace(signal_event(), sizing_trace)
+    assert isinstance(event, SignalEvent) and event.trace == sizing_trace
+    assert isinstance(DataEvent("EURUSD", None, "1min", TraceContext()).trace, TraceContext)
@@ -0,0 +1,114 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from events.events import ExecutionEvent, OrderType, PlacedPendingOrderEvent, SignalType, SizingEvent
+from portfolio.portfolio import Portfolio
+from risk_manager.properties.risk_manager_properties import ExposureRiskProps
+from risk_manager.risk_managers.exposure_risk_manager import ExposureRiskManager
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.currency_converter import CurrencyConverter
+
+
+T0 = 1_700_000_040
+MAGIC = 5
+
+
+@pytest.fixture
+def broker(make_bars):
+    # EURUSD at 1.0: 1 lot is 100000 USD, 10 times the equity of the account
+    return SimulatedBroker({"EURUSD": make_bars(20)}, "1min", start_time=T0 + 10 * 60)
+
+
+@pytest.fixture
+def make_manager(broker):
+    def _make_manager(**limits) -> ExposureRiskManager:
+        portfolio = Portfolio(magic_number=MAGIC, reconcile_interval=3600.0, broker=broker)
+        portfolio.reconcile()
+        return ExposureRiskManager(properties=ExposureRiskProps(**limits), portfolio=portfolio,
+                                   metadata_cache=BrokerMetadataCache(broker=broker),
+                                   currency_converter=CurrencyConverter(fx_symbols=["EURUSD"], broker=broker),
+                                   pending_ttl=0.05, broker=broker)
+
+    return _make_manager
+
+
+def sizing(signal=SignalType.BUY, volume=0.1, target_order=OrderType.MARKET, target_price=0.0) -> SizingEvent:
+    return SizingEvent(symbol="EURUSD", signal=signal, target_order=target_order, target_price=target_price,
+                       magic_number=MAGIC, sl=0.0, tp=0.0, volume=volume)
+
+
+def place_buy_limit(broker, manager, volume=0.1, price=0.99) -> int:
+    result = broker.order_send({'action': broker.TRADE_ACTION_PENDING, 'symbol': "EURUSD", 'volume': volume,
+                                'type': broker.ORDER_TYPE_BUY_LIMIT, 'price': price, 'magic': MAGIC})
+    manager.on_pending_order(PlacedPendingOrderEvent(symbol="EURUSD", signal=SignalType.BUY,
+                                                     target_order=OrderType.LIMIT, target_price=price,
+                                                     magic_number=MAGIC, sl=0.0, tp=0.0, volume=volume))
+    return result.order
+
+
+def execute(manager, signal=SignalType.BUY, volume=0.1, ticket=100) -> None:
+    event = ExecutionEvent(symbol="EURUSD", signal=signal, fill_price=1.0, fill_time=datetime(2024, 1, 1),
+                           volume=volume, magic_number=MAGIC, ticket=ticket)
+    manager.portfolio.on_execution(event)
+    manager.on_execution(event)
+
+
+def test_an_execution_releases_the_reservation_of_its_order(make_manager):
+    manager = make_manager(max_positions_per_symbol=2)
+    assert manager.assess_order(sizing()) == 0.1
+
+    execute(manager)
+
+    # The position and the reservation are not counted twice: one more order fits
+    assert manager.assess_order(sizing()) == 0.1
+    assert manager.assess_order(sizing()) is None
+
+
+def test_an_order_not_confirmed_is_only_counted_for_the_pending_ttl(make_manager):
+    manager = make_manager(max_positions_per_symbol=1)
+    assert manager.assess_order(sizing(target_order=OrderType.LIMIT, target_price=0.99)) == 0.1
+    assert manager.assess_order(sizing()) is None
+
+    time.sleep(0.06)
+    assert manager.assess_order(sizing()) == 0.1
+
+
+def test_a_placed_pending_order_is_counted_until_the_broker_drops_it(broker, make_manager):
+    manager = make_manager(max_positions_per_symbol=1)
+    assert manager.assess_order(sizing(target_order=OrderType.LIMIT, target_price=0.99)) == 0.1
+    ticket = place_buy_limit(broker, manager)
+
+    # The pending order outlives the reservation of the approved order, and a resync finds it in the broker
+    time.sleep(0.06)
+    assert manager.assess_order(sizing()) is None
+    manager.resync()
+    assert manager.assess_order(sizing()) is None
+
+    broker.order_send({'action': broker.TRADE_ACTION_REMOVE, 'order': ticket})
+    manager.resync()
+    assert manager.assess_order(sizing()) == 0.1
+
+
+def test_the_pending_orders_of_the_broker_are_counted_after_a_resync(broker, make_manager):
+    manager = make_manager(max_leverage_factor=12.0)
+    broker.order_send({'action': broker.TRADE_ACTION_PENDING, 'symbol': "EURUSD", 'volume': 1.0,
+                       'type': broker.ORDER_TYPE_SELL_STOP, 'price': 0.98, 'magic': 7})
+    manager.resync()
+
+    # 1 lot short pending (10x): a short of 0.3 lots more would be 13x, a long of 1 lot closes it
+    assert manager.assess_order(sizing(SignalType.SELL, volume=0.3)) is None
+    assert manager.assess_order(sizing(SignalType.BUY, volume=1.0)) == 1.0
+
+
+def test_orders_against_the_open_position_do_not_add_leverage(make_manager):
+    manager = make_manager(max_leverage_factor=12.0, max_margin_usage=0.12)
+    execute(manager, volume=1.0)
+
+    # 1 lot long (10x, margin of 10% of the equity): more longs exceed the limits, the sells reduce the position
+    assert manager.assess_order(sizing(SignalType.BUY, volume=0.3)) is None
+    assert manager.assess_order(sizing(SignalType.SELL, volume=1.0)) == 1.0
+    assert manager.assess_order(sizing(SignalType.SELL, volume=1.1)) == 1.1
+    assert manager.assess_order(sizing(SignalType.SELL, volume=1.2)) is None
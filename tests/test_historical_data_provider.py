@@ -0,0 +1,68 @@
+from queue import Queue
+
+import numpy as np
+import pytest
+
+from data_provider.historical_data_provider import HistoricalDataProvider
+from events.events import DataEvent
+
+
+def replay(provider: HistoricalDataProvider, events_queue: Queue) -> list:
+    events = []
+    while True:
+        provider.check_for_new_data()
+        if not provider.continue_backtest:
+            return events
+        while not events_queue.empty():
+            events.append(events_queue.get())
+
+
+@pytest.fixture
+def provider(make_bars, write_history):
+    # EURUSD has a gap of one bar that USDCHF does not have
+    eurusd = make_bars(np.linspace(1.1, 1.2, 10))
+    eurusd = np.delete(eurusd, 4)
+    data_dir = write_history("EURUSD", eurusd)
+    write_history("USDCHF", make_bars(np.linspace(0.9, 0.8, 10)))
+    events_queue = Queue()
+    return HistoricalDataProvider(events_queue, ["EURUSD", "USDCHF"], "1min", data_dir,
+                                  symbol_points={"EURUSD": 0.00001}), events_queue
+
+
+def test_replays_the_common_timeline_in_order(provider):
+    provider, events_queue = provider
+    events = replay(provider, events_queue)
+
+    assert all(isinstance(event, DataEvent) for event in events)
+    assert [event.symbol for event in events].count("EURUSD") == 9
+    assert [event.symbol for event in events].count("USDCHF") == 10
+    times = [event.data.time for event in events]
+    assert times == sorted(times)
+
+
+def test_latest_closed_bars_never_look_ahead(provider, make_bars):
+    provider, events_queue = provider
+    for _ in range(3):
+        provider.check_for_new_data()
+
+    bars = provider.get_latest_closed_bars("USDCHF", "1min", 10)
+    assert len(bars) == 3
+    assert bars['close'].iloc[-1] == pytest.approx(np.linspace(0.9, 0.8, 10)[2])
+    assert provider.get_latest_closed_bar("USDCHF", "1min").name == bars.index[-1]
+
+
+def test_latest_tick_rebuilds_the_ask_from_the_spread(provider):
+    provider, events_queue = provider
+    assert provider.get_latest_tick("EURUSD") == {}
+
+    provider.check_for_new_data()
+    tick = provider.get_latest_tick("EURUSD")
+    assert tick['bid'] == pytest.approx(1.1)
+    assert tick['ask'] == pytest.approx(1.1 + 2 * 0.00001)
+
+
+def test_unknown_timeframe_returns_empty(provider):
+    provider, events_queue = provider
+    provider.check_for_new_data()
+    assert provider.get_latest_closed_bars("EURUSD", "1h", 5).empty
+    assert provider.get_latest_closed_bar("GBPUSD", "1min").empty
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from events.events import ExecutionEvent, SignalEvent, SignalType, OrderType, TraceContext
+from utils.latency_tracker import LatencyHistogram, LatencyTracker
+
+
+def test_percentiles_are_within_the_bucket_resolution():
+    values = np.random.default_rng(19).lognormal(mean=11.0, sigma=1.5, size=20000).astype(np.int64)
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(int(value))
+
+    assert histogram.count == len(values)
+    assert histogram.max == values.max()
+    for percentile in (1, 50, 90, 99, 99.9, 100):
+        expected = np.percentile(values, percentile, method='inverted_cdf')
+        estimate = histogram.percentile(percentile)
+        # The estimate is the upper bound of the bucket of the value: never below it, at most 1/16 above
+        assert expected <= estimate <= expected * (1 + 1 / LatencyHistogram.SUB_BUCKETS)
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    for value in (0, 3, 3, 7, 15):
+        histogram.record(value)
+    assert [histogram.percentile(p) for p in (20, 60, 80, 100)] == [0.0, 3.0, 7.0, 15.0]
+
+
+def test_tracker_records_stage_queue_and_total_latencies(monkeypatch):
+    now = [0]
+    monkeypatch.setattr("utils.latency_tracker.time.perf_counter_ns", lambda: now[0])
+    tracker = LatencyTracker()
+
+    signal = SignalEvent("EURUSD", SignalType.BUY, OrderType.MARKET, 0.0, 1, 0.0, 0.0,
+                         trace=TraceContext(bar_close=0, data=1_000, signal=6_000))
+    now[0] = 9_000
+    tracker.record_event(signal)
+
+    execution = ExecutionEvent("EURUSD", SignalType.BUY, 1.1, datetime(2024, 1, 1), 0.1, 1, 10,
+                               trace=TraceContext(bar_close=500, data=1_000, signal=6_000, sizing=7_000,
+                                                  order=8_000, execution=58_000))
+    now[0] = 60_000
+    tracker.record_event(execution)
+
+    stages = tracker.snapshot()["EURUSD"]
+    assert stages["data->signal"]["p50_us"] == pytest.approx(5.0, rel=1 / 16)
+    assert stages["queue:signal"]["p50_us"] == pytest.approx(3.0, rel=1 / 16)
+    assert stages["order->execution"]["max_us"] == 50.0
+    assert stages["queue:execution"]["count"] == 1
+    assert stages["total"]["max_us"] == 57.5
+    assert "LATENCY EURUSD total: n=1" in tracker.report()
+
+    tracker.record_event(signal._replace(trace=None))
+    tracker.reset()
+    assert tracker.snapshot() == {}
@@ -0,0 +1,40 @@
+import io
+import json
+import re
+
+import pytest
+
+from utils.logger import get_logger, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    yield stream
+    setup_logging(level="ERROR", stream=io.StringIO())
+
+
+def test_text_format(log_stream):
+    setup_logging(level="INFO", json_format=False, stream=log_stream)
+    logger = get_logger("test")
+    logger.info("Order sent for %s", "EURUSD")
+    logger.warning("Slow broker")
+    logger.debug("Not written")
+    shutdown_logging()
+
+    lines = log_stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert re.fullmatch(r"\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}\.\d{3} - Order sent for EURUSD", lines[0])
+    assert lines[1].endswith(" - WARNING: Slow broker")
+
+
+def test_json_format_carries_the_extra_fields(log_stream):
+    setup_logging(level="DEBUG", json_format=True, stream=log_stream)
+    get_logger("test").info("Received SIGNAL EVENT %s", "BUY", extra={'symbol': "EURUSD", 'volume': 0.1})
+    shutdown_logging()
+
+    entry = json.loads(log_stream.getvalue())
+    assert entry['message'] == "Received SIGNAL EVENT BUY"
+    assert (entry['level'], entry['logger']) == ("INFO", "torogoz.test")
+    assert (entry['symbol'], entry['volume']) == ("EURUSD", 0.1)
+    assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}[+-]\d{4}", entry['time'])
@@ -0,0 +1,74 @@
+import urllib.request
+
+import pytest
+
+from broker.brokers.instrumented_broker import InstrumentedBroker
+from broker.brokers.simulated_broker import SimulatedBroker
+from utils.metrics import MetricsRegistry, MetricsServer
+
+
+def test_metrics_are_created_once_per_name_and_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("orders_total", "Orders.", labels={'symbol': "EURUSD"})
+    assert registry.counter("orders_total", labels={'symbol': "EURUSD"}) is counter
+    assert registry.counter("orders_total", labels={'symbol': "USDCHF"}) is not counter
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry(prefix="test")
+    registry.counter("orders_total", "Orders sent.", labels={'symbol': "EURUSD"}).inc(3)
+    registry.gauge("queue_depth", "Events waiting.", function=lambda: 7)
+    timer = registry.timer("handler_duration_seconds", labels={'event': "DATA"})
+    timer.observe(0.25)
+    timer.observe(0.5)
+
+    text = registry.render_prometheus()
+    assert "# HELP test_orders_total Orders sent.\n# TYPE test_orders_total counter\n" in text
+    assert 'test_orders_total{symbol="EURUSD"} 3\n' in text
+    assert "test_queue_depth 7.0\n" in text
+    assert "# TYPE test_handler_duration_seconds summary\n" in text
+    assert 'test_handler_duration_seconds_count{event="DATA"} 2\n' in text
+    assert 'test_handler_duration_seconds_sum{event="DATA"} 0.75\n' in text
+
+
+def test_snapshot_rates_since_the_previous_snapshot(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("utils.metrics.time.monotonic", lambda: now[0])
+    registry = MetricsRegistry(prefix="test")
+    counter = registry.counter("loop_iterations_total")
+
+    counter.inc(50)
+    now[0] += 2.0
+    assert registry.snapshot()['rates']["test_loop_iterations_total"] == pytest.approx(25.0)
+    counter.inc(10)
+    now[0] += 1.0
+    snapshot = registry.snapshot()
+    assert snapshot['values']["test_loop_iterations_total"] == 60
+    assert snapshot['rates']["test_loop_iterations_total"] == pytest.approx(10.0)
+
+
+def test_instrumented_broker_times_every_call(make_bars):
+    registry = MetricsRegistry(prefix="test")
+    simulated = SimulatedBroker({"EURUSD": make_bars(10)}, "1min", start_time=1_700_000_100)
+    broker = InstrumentedBroker(simulated, registry)
+
+    broker.symbol_info_tick("EURUSD")
+    broker.symbol_info_tick("EURUSD")
+    broker.copy_rates_from_pos("EURUSD", broker.TIMEFRAME_M1, 1, 1)
+    broker.step()
+
+    values = registry.snapshot()['values']
+    assert values['test_broker_call_duration_seconds_count{function="symbol_info_tick"}'] == 2
+    assert values['test_broker_call_duration_seconds_count{function="copy_rates_from_pos"}'] == 1
+
+
+def test_metrics_server_serves_the_registry():
+    registry = MetricsRegistry(prefix="test")
+    registry.counter("orders_total").inc()
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            assert "test_orders_total 1" in response.read().decode()
+    finally:
+        server.stop()
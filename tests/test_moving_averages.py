@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from signal_generator.indicators.moving_averages import rolling_mean, rolling_sum, rolling_sum_error_bound
+from signal_generator.properties.signal_generator_properties import MACrossoverProps
+from signal_generator.signals.signal_ma_crossover import SignalMACrossover
+
+
+def reference_signals(closes: np.ndarray, fast_period: int, slow_period: int) -> np.ndarray:
+    # Same reduction as the event-driven path, one bar at a time
+    signals = np.zeros(len(closes), dtype=np.int8)
+    for i in range(slow_period - 1, len(closes)):
+        fast_ma = np.mean(closes[i - fast_period + 1:i + 1])
+        slow_ma = np.mean(closes[i - slow_period + 1:i + 1])
+        signals[i] = 1 if fast_ma > slow_ma else -1 if slow_ma > fast_ma else 0
+    return signals
+
+
+@pytest.mark.parametrize("period, block", [(1, 1), (5, 5), (5, 7), (20, 64)])
+def test_rolling_sum_matches_the_window_sums(period, block):
+    values = np.random.default_rng(0).normal(1.1, 0.01, 500)
+    expected = np.array([values[i:i + period].sum() for i in range(len(values) - period + 1)])
+
+    sums = rolling_sum(values, period, block)
+    assert sums.shape == expected.shape
+    assert np.all(np.abs(sums - expected) <= rolling_sum_error_bound(block, np.max(np.abs(values))))
+
+
+def test_rolling_mean_is_aligned_with_the_input():
+    means = rolling_mean(np.arange(10, dtype=np.float64), 4)
+    assert np.isnan(means[:3]).all()
+    assert means[3:] == pytest.approx(np.arange(1.5, 8.5))
+    assert np.isnan(rolling_mean(np.arange(3.0), 4)).all()
+
+
+@pytest.mark.parametrize("fast_period, slow_period", [(2, 3), (5, 20), (12, 50)])
+def test_signal_series_matches_the_event_path(fast_period, slow_period):
+    strategy = SignalMACrossover(MACrossoverProps(timeframe="1min", fast_period=fast_period,
+                                                  slow_period=slow_period))
+    rng = np.random.default_rng(fast_period)
+    random_walk = 1.1 + np.cumsum(rng.normal(0, 1e-4, 5000))
+    # A piecewise flat series has many bars where both averages are equal (or nearly so after rounding)
+    flat = np.repeat(rng.choice([1.1, 1.1001, 1.1002], 250), 20)
+
+    for closes in (random_walk, flat):
+        fast_ma, slow_ma, signals = strategy.compute_signal_series(closes)
+        assert np.array_equal(signals, reference_signals(closes, fast_period, slow_period))
+        assert np.isnan(slow_ma[:slow_period - 1]).all()
+        assert not np.isnan(slow_ma[slow_period - 1:]).any()
+
+
+def test_short_history_has_no_signals():
+    strategy = SignalMACrossover(MACrossoverProps(timeframe="1min", fast_period=5, slow_period=20))
+    fast_ma, slow_ma, signals = strategy.compute_signal_series(np.ones(10))
+    assert not signals.any()
+    assert strategy.generate_signals({"EURUSD": np.ones(10)})["EURUSD"].shape == (10,)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimizer.optimizer import SignalOptimizer
+from signal_generator.properties.signal_generator_properties import MACrossoverProps
+from signal_generator.signals.signal_ma_crossover import SignalMACrossover
+
+
+GRID = {'fast_period': [2, 3, 5], 'slow_period': [3, 8, 13]}
+
+
+@pytest.fixture
+def history(make_bars, write_history):
+    rng = np.random.default_rng(11)
+    for symbol in ("EURUSD", "USDCHF"):
+        data_dir = write_history(symbol, make_bars(1.0 + np.cumsum(rng.normal(0, 1e-3, 700))))
+    return data_dir
+
+
+def reference(closes: np.ndarray, fast_period: int, slow_period: int) -> dict:
+    strategy = SignalMACrossover(MACrossoverProps(timeframe="1min", fast_period=fast_period, slow_period=slow_period))
+    signals = strategy.compute_signal_series(closes)[2]
+    pnl = np.append(closes[1:] / closes[:-1] - 1.0, 0.0) * signals
+    equity = np.cumsum(pnl)
+    drawdown = np.max(np.maximum.accumulate(np.maximum(equity, 0.0)) - equity)
+    trades = np.count_nonzero((signals[1:] != signals[:-1]) & (signals[1:] != 0)) + (signals[0] != 0)
+    return {'total_return': equity[-1], 'max_drawdown': drawdown, 'trades': trades}
+
+
+def optimize(data_dir: str, chunk_size: int) -> pd.DataFrame:
+    optimizer = SignalOptimizer(["EURUSD", "USDCHF"], "1min", data_dir, max_workers=2, chunk_size=chunk_size)
+    props = MACrossoverProps(timeframe="1min", fast_period=5, slow_period=10)
+    return optimizer.optimize(props, GRID, by_symbol=True).sort_values(['symbol', 'fast_period', 'slow_period'],
+                                                                       ignore_index=True)
+
+
+def test_invalid_combinations_are_skipped(history):
+    results = optimize(history, chunk_size=100_000)
+    assert len(results) == 2 * 7
+    assert (results['fast_period'] < results['slow_period']).all()
+
+
+def test_chunked_statistics_match_a_single_pass(history):
+    single = optimize(history, chunk_size=100_000)
+    chunked = optimize(history, chunk_size=64)
+
+    pd.testing.assert_frame_equal(single[['symbol', 'fast_period', 'slow_period', 'trades']],
+                                  chunked[['symbol', 'fast_period', 'slow_period', 'trades']])
+    for column in ('total_return', 'sharpe_ratio', 'max_drawdown'):
+        assert chunked[column].to_numpy() == pytest.approx(single[column].to_numpy(), abs=1e-12)
+
+    closes = pd.read_csv(f"{history}/EURUSD_1min.csv")['close'].to_numpy()
+    for row in chunked[chunked['symbol'] == "EURUSD"].itertuples():
+        expected = reference(closes, row.fast_period, row.slow_period)
+        assert row.total_return == pytest.approx(expected['total_return'], abs=1e-12)
+        assert row.max_drawdown == pytest.approx(expected['max_drawdown'], abs=1e-12)
+        assert row.trades == expected['trades']
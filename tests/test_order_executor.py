@@ -0,0 +1,161 @@
+import asyncio
+from queue import Queue
+
+import numpy as np
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from data_provider.async_data_provider import AsyncDataProvider
+from events.events import ExecutionEvent, OrderEvent, OrderType, PlacedPendingOrderEvent, SignalType
+from order_executor.order_executor import OrderExecutor
+from trading_director.async_trading_director import AsyncEventQueue, AsyncTradingDirector
+from trading_director.trading_director import TradingDirector
+
+
+T0 = 1_700_000_040
+
+
+class NettingBroker(SimulatedBroker):
+    """
+    SimulatedBroker with a netting account: a market order in a symbol with a position joins it.
+    """
+
+    def _account_info(self):
+        return super()._account_info()._replace(margin_mode=self.ACCOUNT_MARGIN_MODE_RETAIL_NETTING)
+
+    def _process_request(self, request: dict):
+        position = next((position for position in self._positions.values()
+                         if position.symbol == request.get('symbol')), None)
+        if position is None or request.get('action') != self.TRADE_ACTION_DEAL:
+            return super()._process_request(request)
+        order = self._new_ticket()
+        volume = request['volume']
+        self._positions[position.ticket] = position._replace(volume=round(position.volume + volume, 8))
+        deal = self._new_deal(order, position, True, volume, request['price'])
+        return self._result(request, self.TRADE_RETCODE_DONE, "Request executed", deal=deal, order=order,
+                            volume=volume, price=request['price'])
+
+
+class RequoteBroker(SimulatedBroker):
+    """
+    SimulatedBroker that requotes the first market order.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requotes = 1
+
+    def _process_request(self, request: dict):
+        if self.requotes:
+            self.requotes -= 1
+            return self._result(request, self.TRADE_RETCODE_REQUOTE, "Requote")
+        return super()._process_request(request)
+
+
+class ExecutionBook:
+
+    def __init__(self):
+        self.executions = []
+
+    def on_execution(self, event):
+        self.executions.append(event)
+
+
+def order(signal=SignalType.BUY, target_order=OrderType.MARKET, target_price=0.0, volume=0.1, symbol="EURUSD"):
+    return OrderEvent(symbol=symbol, signal=signal, target_order=target_order, target_price=target_price,
+                      magic_number=5, sl=0.0, tp=0.0, volume=volume)
+
+
+def drain(events_queue):
+    return [events_queue.get() for _ in range(events_queue.qsize())]
+
+
+@pytest.fixture
+def bars(make_bars):
+    return make_bars(np.linspace(1.1, 1.2, 10), spread=10)
+
+
+def execute(broker, *orders, **kwargs):
+    events_queue = Queue()
+    executor = OrderExecutor(events_queue, broker=broker, **kwargs)
+    for order_event in orders:
+        executor.execute_order(order_event)
+    executor.shutdown(wait=True)
+    return executor, drain(events_queue)
+
+
+def test_market_orders_are_confirmed_with_their_position(bars):
+    broker = SimulatedBroker({"EURUSD": bars, "GBPUSD": bars}, "1min", start_time=T0 + 5 * 60)
+    executor, events = execute(broker, order(), order(signal=SignalType.SELL), order(symbol="GBPUSD"))
+
+    assert all(isinstance(event, ExecutionEvent) for event in events)
+    positions = {position.ticket: position for position in broker.positions_get()}
+    assert sorted(event.ticket for event in events) == sorted(positions)
+    for event in events:
+        assert (positions[event.ticket].symbol, positions[event.ticket].magic) == (event.symbol, 5)
+    assert executor.stats['executed'] == 3 and executor.pending_orders == 0
+    # On a hedging account the position is the order: no deal is read
+    assert 'history_deals_get' not in broker.call_counts
+
+
+def test_netting_fills_are_booked_on_the_position_of_the_symbol(bars):
+    broker = NettingBroker({"EURUSD": bars}, "1min", start_time=T0 + 5 * 60)
+    _, events = execute(broker, order(), order(volume=0.2))
+
+    position, = broker.positions_get()
+    assert [event.ticket for event in events] == [position.ticket, position.ticket]
+    assert position.volume == pytest.approx(0.3)
+
+
+def test_netting_fills_without_deal_use_the_position_of_the_symbol(bars, monkeypatch):
+    broker = NettingBroker({"EURUSD": bars}, "1min", start_time=T0 + 5 * 60)
+    monkeypatch.setattr(broker, "history_deals_get", lambda ticket=None, position=None: None)
+    _, events = execute(broker, order(), order())
+
+    position, = broker.positions_get()
+    assert [event.ticket for event in events] == [position.ticket, position.ticket]
+
+
+def test_pending_orders_and_retries(bars):
+    broker = RequoteBroker({"EURUSD": bars}, "1min", start_time=T0 + 5 * 60)
+    executor, events = execute(broker, order(), order(target_order=OrderType.LIMIT, target_price=1.0),
+                               retry_delay=0.001)
+
+    assert [type(event) for event in events] == [ExecutionEvent, PlacedPendingOrderEvent]
+    assert executor.stats == {'orders': 2, 'requests': 3, 'retries': 1, 'executed': 1, 'placed': 1,
+                              'rejected': 0}
+    assert broker.orders_get()[0].price_open == 1.0
+
+
+def test_the_confirmations_in_flight_are_booked_before_stopping(bars):
+    broker = SimulatedBroker({"EURUSD": bars}, "1min", start_time=T0 + 5 * 60, latency={'order_send': 0.1})
+    events_queue = Queue()
+    book = ExecutionBook()
+    director = TradingDirector(events_queue, data_provider=None, signal_generator=None, portfolio=book,
+                               latency_report_interval=None, order_executor=OrderExecutor(events_queue, broker=broker))
+    events_queue.put(order())
+    events_queue.put(None)
+
+    director.execute()
+
+    assert [event.symbol for event in book.executions] == ["EURUSD"]
+    assert events_queue.empty()
+
+
+def test_the_confirmations_in_flight_are_booked_before_stopping_the_event_loop(bars):
+    broker = SimulatedBroker({"EURUSD": bars}, "1min", start_time=T0 + 5 * 60, latency={'order_send': 0.1})
+    book = ExecutionBook()
+
+    async def run():
+        events_queue = AsyncEventQueue()
+        data_provider = AsyncDataProvider(events_queue, ["EURUSD"], "1min", broker=broker, poll_interval=10.0)
+        director = AsyncTradingDirector(events_queue, data_provider, signal_generator=None, portfolio=book,
+                                        latency_report_interval=None,
+                                        order_executor=OrderExecutor(events_queue, broker=broker))
+        events_queue.put(order())
+        events_queue.put(None)
+        await director.run()
+
+    asyncio.run(run())
+
+    assert [event.symbol for event in book.executions] == ["EURUSD"]
@@ -0,0 +1,59 @@
+import pytest
+
+from data_provider.poll_scheduler import PollScheduler
+
+
+T0 = 1_700_000_040    # Opening time of a M1 bar
+
+
+@pytest.fixture
+def scheduler():
+    return PollScheduler(["EURUSD"], "1min", latency=0.05, window=5.0, lead=0.25, max_backoff=2.0,
+                         server_offset=0.0)
+
+
+def test_waits_until_the_next_bar_boundary(scheduler):
+    scheduler.record_poll("EURUSD", T0, now=T0 + 60.1)
+
+    assert scheduler.due_symbols(now=T0 + 100) == []
+    assert scheduler.seconds_until_next_check(now=T0 + 100) == pytest.approx(19.75)
+    assert scheduler.due_symbols(now=T0 + 119.75) == ["EURUSD"]
+
+
+def test_polls_at_latency_inside_the_window_then_backs_off(scheduler):
+    scheduler.record_poll("EURUSD", T0, now=T0 + 60.1)
+
+    scheduler.record_poll("EURUSD", 0, now=T0 + 120.1)
+    assert scheduler.seconds_until_symbol_check("EURUSD", now=T0 + 120.1) == pytest.approx(0.05)
+
+    # Past the window without a new bar (no ticks): exponential back-off
+    scheduler.record_poll("EURUSD", 0, now=T0 + 126.0)
+    assert scheduler.seconds_until_symbol_check("EURUSD", now=T0 + 126.0) == pytest.approx(0.1)
+    scheduler.record_poll("EURUSD", 0, now=T0 + 126.1)
+    assert scheduler.seconds_until_symbol_check("EURUSD", now=T0 + 126.1) == pytest.approx(0.2)
+
+    # A new bar resets the back-off and schedules the next boundary
+    scheduler.record_poll("EURUSD", T0 + 120, now=T0 + 180.05)
+    assert scheduler.due_symbols(now=T0 + 200) == []
+
+
+def test_no_data_backs_off_up_to_the_maximum(scheduler):
+    for i in range(10):
+        scheduler.record_poll("EURUSD", None, now=T0)
+    assert scheduler.seconds_until_symbol_check("EURUSD", now=T0) == pytest.approx(2.0)
+
+
+def test_server_offset_is_estimated_from_the_polls():
+    scheduler = PollScheduler(["EURUSD"], "1min", latency=0.05)
+    assert scheduler.server_offset is None
+
+    # Without the offset the symbol is polled at latency; a bar found right after an empty poll bounds the offset
+    scheduler.record_poll("EURUSD", 0, now=1000.0)
+    assert scheduler.seconds_until_symbol_check("EURUSD", now=1000.0) == pytest.approx(0.05)
+    scheduler.record_poll("EURUSD", T0, now=1000.05)
+    assert scheduler.server_offset == pytest.approx(T0 + 60 - 1000.05)
+
+    scheduler.observe_server_time(T0 + 61, now=1000.05)
+    assert scheduler.server_offset == pytest.approx(T0 + 61 - 1000.05)
+    scheduler.observe_server_time(T0, now=1000.05)
+    assert scheduler.server_offset == pytest.approx(T0 + 61 - 1000.05)
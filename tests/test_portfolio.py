@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+from broker.broker_constants import BrokerConstants
+from events.events import ExecutionEvent, SignalType
+from portfolio.portfolio import BookPosition, Portfolio
+
+
+class PositionsBroker():
+    """
+    Broker stub that only lists a fixed set of open positions.
+    """
+    def __init__(self, positions=()):
+        self.positions = tuple(positions)
+        self.calls = 0
+
+    def positions_get(self):
+        self.calls += 1
+        return self.positions
+
+    def last_error(self):
+        return (1, "Success")
+
+
+def execution(signal: SignalType, volume: float, ticket: int, symbol: str = "EURUSD", magic: int = 1,
+              price: float = 1.1) -> ExecutionEvent:
+    return ExecutionEvent(symbol=symbol, signal=signal, fill_price=price, fill_time=datetime(2024, 1, 1),
+                          volume=volume, magic_number=magic, ticket=ticket)
+
+
+@pytest.fixture
+def portfolio():
+    portfolio = Portfolio(magic_number=1, reconcile_interval=3600.0, broker=PositionsBroker())
+    portfolio.reconcile()
+    return portfolio
+
+
+def test_executions_open_increase_and_close_positions(portfolio):
+    portfolio.on_execution(execution(SignalType.BUY, 0.1, ticket=10, price=1.10))
+    portfolio.on_execution(execution(SignalType.BUY, 0.3, ticket=10, price=1.12))
+    portfolio.on_execution(execution(SignalType.SELL, 0.5, ticket=11, magic=2))
+
+    position, = [position for position in portfolio.get_open_positions() if position.ticket == 10]
+    assert position.volume == pytest.approx(0.4)
+    assert position.price_open == pytest.approx(1.115)
+    assert portfolio.get_number_of_open_positions_by_symbol("EURUSD") == {"LONG": 1, "SHORT": 1, "TOTAL": 2}
+    assert portfolio.get_number_of_strategy_open_positions_by_symbol("EURUSD") == {"LONG": 1, "SHORT": 0, "TOTAL": 1}
+    assert portfolio.get_open_volume_by_symbol("EURUSD") == {"LONG": 0.4, "SHORT": 0.5, "NET": -0.1}
+    assert portfolio.get_number_of_open_positions_by_magic(2) == 1
+
+    portfolio.on_execution(execution(SignalType.SELL, 0.1, ticket=10))
+    assert portfolio.get_open_volume_by_symbol("EURUSD")["LONG"] == pytest.approx(0.3)
+    portfolio.on_execution(execution(SignalType.SELL, 0.3, ticket=10))
+    portfolio.on_execution(execution(SignalType.BUY, 0.5, ticket=11, magic=2))
+    assert portfolio.get_open_positions() == ()
+    assert portfolio.get_number_of_open_positions_by_magic(1) == 0
+
+
+def test_netting_trade_larger_than_the_position_reverses_it(portfolio):
+    portfolio.on_execution(execution(SignalType.BUY, 0.2, ticket=10, price=1.10))
+    portfolio.on_execution(execution(SignalType.SELL, 0.5, ticket=10, price=1.12))
+
+    position, = portfolio.get_open_positions()
+    assert position.type == BrokerConstants.POSITION_TYPE_SELL
+    assert position.volume == pytest.approx(0.3)
+    assert position.price_open == pytest.approx(1.12)
+    assert portfolio.get_open_volume_by_symbol("EURUSD") == {"LONG": 0.0, "SHORT": 0.3, "NET": -0.3}
+
+
+def test_executions_without_ticket_are_left_to_the_reconcile(portfolio):
+    portfolio.on_execution(execution(SignalType.BUY, 0.1, ticket=10))
+    # Executions of different symbols without ticket must not be merged into a single position
+    portfolio.broker.positions = portfolio.get_open_positions()
+    portfolio.on_execution(execution(SignalType.BUY, 0.2, ticket=0, symbol="USDCHF"))
+    portfolio.on_execution(execution(SignalType.SELL, 0.2, ticket=0, symbol="EURUSD", magic=2))
+    calls = portfolio.broker.calls
+
+    assert portfolio.get_open_volume_by_symbol("USDCHF") == {"LONG": 0.0, "SHORT": 0.0, "NET": 0.0}
+    assert portfolio.get_open_volume_by_symbol("EURUSD") == {"LONG": 0.1, "SHORT": 0.0, "NET": 0.1}
+    assert portfolio.broker.calls == calls + 1
+
+
+def test_reconcile_rebuilds_the_book_from_the_platform(portfolio):
+    portfolio.on_execution(execution(SignalType.BUY, 0.1, ticket=10))
+    portfolio.broker.positions = (BookPosition(ticket=20, symbol="USDCHF", magic=3,
+                                               type=BrokerConstants.POSITION_TYPE_SELL, volume=1.0, price_open=0.9),)
+
+    portfolio.reconcile()
+    assert [position.ticket for position in portfolio.get_open_positions()] == [20]
+    assert portfolio.get_open_volume_by_symbol("EURUSD")["LONG"] == 0.0
+    assert portfolio.get_number_of_open_positions_by_magic(3) == 1
@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+from order_executor.rate_limiter import RateLimiter
+
+
+def test_the_burst_goes_out_at_once_and_then_the_rate_applies():
+    limiter = RateLimiter(rate=20.0, burst=3)
+    start = time.monotonic()
+    waits = [limiter.acquire() for _ in range(6)]
+
+    # Every acquire past the burst waits for the next slot
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3:] == pytest.approx([0.05, 0.05, 0.05], abs=0.02)
+    assert time.monotonic() - start == pytest.approx(0.15, abs=0.05)
+
+
+def test_the_tokens_come_back_while_idle():
+    limiter = RateLimiter(rate=10.0, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+    # 1.2 tokens later
+    time.sleep(0.12)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() > 0.0
+
+
+def test_threads_share_the_limit():
+    limiter = RateLimiter(rate=100.0, burst=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One request at once, then one every 10 ms whatever the thread
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.parametrize("rate, burst", [(0.0, 1), (-1.0, 1), (10.0, 0)])
+def test_invalid_limits_are_rejected(rate, burst):
+    with pytest.raises(Exception):
+        RateLimiter(rate=rate, burst=burst)
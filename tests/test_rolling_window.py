@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from queue import Queue
+
+import numpy as np
+import pytest
+
+from data_provider.historical_data_provider import HistoricalDataProvider
+from events.events import SignalType
+from signal_generator.indicators.rolling_window import RollingWindow
+from signal_generator.properties.signal_generator_properties import MACrossoverProps
+from signal_generator.signals.signal_ma_crossover import SignalMACrossover
+from utils.utils import Utils
+
+
+def test_running_sums_follow_the_latest_values():
+    values = np.random.default_rng(3).normal(1.1, 0.01, 200)
+    window = RollingWindow(size=20, periods=[5, 20])
+    window.seed(values[:7], last_time=7)
+    assert not window.is_ready(20)
+
+    for i in range(7, len(values)):
+        window.append(values[i], time=i + 1)
+        latest = values[max(0, i - 19):i + 1]
+        assert np.array_equal(window.latest(20), latest)
+        for period in (5, 20):
+            if window.is_ready(period):
+                assert abs(window.mean(period) - np.mean(latest[-period:])) <= window.tolerance(period)
+                assert window.exact_mean(period) == np.mean(latest[-period:])
+    assert window.last_time == len(values)
+
+
+def test_seed_keeps_the_latest_values_only():
+    window = RollingWindow(size=3, periods=[2, 3])
+    window.seed(np.arange(10.0), last_time=10)
+    assert np.array_equal(window.latest(3), [7.0, 8.0, 9.0])
+    assert window.mean(2) == pytest.approx(8.5)
+
+
+def test_next_bar_time():
+    assert Utils.next_bar_time(1_700_000_040, '1min') == 1_700_000_100
+    december = int(datetime(2023, 12, 1, tzinfo=timezone.utc).timestamp())
+    assert Utils.next_bar_time(december, '1M') == int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def test_event_path_matches_the_batch_api_across_a_gap(make_bars, write_history):
+    closes = 1.1 + np.cumsum(np.random.default_rng(5).normal(0, 1e-4, 400))
+    bars = make_bars(closes)
+    # Two missing bars force the window to be re-seeded from the data provider
+    bars = np.delete(bars, [200, 201])
+    events_queue = Queue()
+    provider = HistoricalDataProvider(events_queue, ["EURUSD"], "1min", write_history("EURUSD", bars))
+    strategy = SignalMACrossover(MACrossoverProps(timeframe="1min", fast_period=5, slow_period=20))
+
+    expected = strategy.compute_signal_series(bars['close'])[2]
+    signals = []
+    while True:
+        provider.check_for_new_data()
+        if not provider.continue_backtest:
+            break
+        signal_event = strategy.generate_signal(events_queue.get(), provider)
+        signals.append(0 if signal_event is None else 1 if signal_event.signal == SignalType.BUY else -1)
+
+    assert np.array_equal(signals, expected)
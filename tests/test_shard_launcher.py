@@ -0,0 +1,116 @@
+import threading
+from queue import Queue
+
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from events.events import OrderType, SignalEvent, SignalType, TraceContext
+from position_sizer.position_sizer import PositionSizer
+from position_sizer.properties.position_sizer_properties import RiskPctSizingProps
+from shard_launcher.shard_channel import ShardEventReceiver, decode_signal_events, encode_signal_event
+from shard_launcher.shard_launcher import partition_symbols
+from shard_launcher.shared_exposure import SharedExposure
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.currency_converter import CurrencyConverter
+from utils.utils import Utils
+
+
+class ExposureBook:
+    """
+    The open positions and volume of every symbol, as the Portfolio methods that SharedExposure publishes.
+    """
+
+    def __init__(self):
+        self.positions = {}
+
+    def get_number_of_open_positions_by_symbol(self, symbol):
+        longs, shorts = self.positions.get(symbol, (0, 0))
+        return {"LONG": longs, "SHORT": shorts, "TOTAL": longs + shorts}
+
+    def get_open_volume_by_symbol(self, symbol):
+        longs, shorts = self.positions.get(symbol, (0, 0))
+        return {"LONG": longs * 0.1, "SHORT": shorts * 0.1, "NET": round((longs - shorts) * 0.1, 8)}
+
+
+@pytest.fixture
+def exposure():
+    exposure = SharedExposure(["EURUSD", "GBPUSD"])
+    yield exposure
+    exposure.close()
+
+
+def test_partition_symbols_round_robin():
+    symbols = ["A", "B", "C", "D", "E"]
+    assert partition_symbols(symbols, 2) == [["A", "C", "E"], ["B", "D"]]
+    assert partition_symbols(symbols, 8) == [["A"], ["B"], ["C"], ["D"], ["E"]]
+    assert partition_symbols(symbols, 0) == [symbols]
+
+
+def test_signal_events_survive_the_wire():
+    symbols = ["EURUSD", "GBPUSD", "USDJPY"]
+    events = [SignalEvent(symbol="USDJPY", signal=SignalType.SELL, target_order=OrderType.LIMIT, target_price=150.25,
+                          magic_number=42, sl=151.0, tp=149.0, trace=TraceContext(1, 2, 3, 0, 0, 0)),
+              SignalEvent(symbol="EURUSD", signal=SignalType.BUY, target_order=OrderType.MARKET, target_price=0.0,
+                          magic_number=7, sl=0.0, tp=0.0, trace=None)]
+    data = b"".join(encode_signal_event(event, symbols.index(event.symbol)) for event in events)
+    assert decode_signal_events(data, symbols) == events
+
+
+def test_readers_attached_by_name_see_the_published_exposure(exposure):
+    book = ExposureBook()
+    book.positions = {"EURUSD": (2, 1)}
+    exposure.publish_all(book)
+
+    reader = SharedExposure(exposure.symbols, name=exposure.name)
+    try:
+        assert reader.get_number_of_open_positions_by_symbol("EURUSD") == {"LONG": 2, "SHORT": 1, "TOTAL": 3}
+        assert reader.get_open_volume_by_symbol("EURUSD") == {"LONG": pytest.approx(0.2),
+                                                              "SHORT": pytest.approx(0.1), "NET": 0.1}
+        assert reader.get_number_of_open_positions_by_symbol("GBPUSD")["TOTAL"] == 0
+    finally:
+        reader.close()
+
+
+def test_rows_are_never_read_half_written(exposure):
+    book = ExposureBook()
+    stop = threading.Event()
+
+    def write():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            book.positions["EURUSD"] = (n, n)
+            exposure.publish("EURUSD", book)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(20_000):
+            positions = exposure.get_number_of_open_positions_by_symbol("EURUSD")
+            assert positions["LONG"] == positions["SHORT"]
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_a_write_that_never_finishes_makes_the_read_fail(exposure):
+    exposure.MAX_READ_ATTEMPTS = 50
+    # The writer died in the middle of an update: the version stays odd
+    exposure._version[0] += 1
+    with pytest.raises(Exception, match="shared exposure of EURUSD"):
+        exposure.get_number_of_open_positions_by_symbol("EURUSD")
+
+
+def test_the_coordinator_sizes_market_signals_with_the_ticks_of_the_receiver(make_bars, monkeypatch):
+    broker = SimulatedBroker({"EURUSD": make_bars(5)}, "1min", start_time=1_700_000_040 + 3 * 60)
+    monkeypatch.setattr(Utils, "_currency_converter", CurrencyConverter(fx_symbols=["EURUSD"], broker=broker))
+    events_queue = Queue()
+    receiver = ShardEventReceiver(events_queue, ["EURUSD"], {}, broker=broker)
+    position_sizer = PositionSizer(events_queue, receiver, RiskPctSizingProps(risk_pct=0.01),
+                                   metadata_cache=BrokerMetadataCache(broker=broker))
+
+    assert receiver.get_latest_tick("EURUSD")['bid'] == 1.0
+    position_sizer.size_signal(SignalEvent(symbol="EURUSD", signal=SignalType.BUY, target_order=OrderType.MARKET,
+                                           target_price=0.0, magic_number=5, sl=0.99, tp=0.0))
+    # 1% of 10000 USD at risk over 0.01 (about 1000 USD per lot)
+    assert events_queue.get_nowait().volume == pytest.approx(0.1, abs=0.01)
@@ -0,0 +1,116 @@
+from queue import Queue
+
+import numpy as np
+import pytest
+
+from data_provider.historical_data_provider import HistoricalDataProvider
+from events.events import DataEvent
+from signal_generator.indicators.indicator_cache import IndicatorCache
+from signal_generator.properties.signal_generator_properties import MACrossoverProps
+from signal_generator.signal_generator import SignalGenerator
+
+
+class CountingDataProvider(HistoricalDataProvider):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bars_requests = 0
+
+    def get_latest_closed_bars(self, symbol: str, timeframe: str, num_bars: int = 1):
+        self.bars_requests += 1
+        return super().get_latest_closed_bars(symbol, timeframe, num_bars)
+
+
+@pytest.fixture
+def setup(make_bars, write_history):
+    closes = 1.1 + np.cumsum(np.random.default_rng(13).normal(0, 1e-4, 60))
+    events_queue = Queue()
+    data_provider = CountingDataProvider(events_queue, ["EURUSD"], "1min",
+                                         write_history("EURUSD", make_bars(closes)))
+    strategies = [MACrossoverProps(timeframe="1min", fast_period=3, slow_period=10, magic_number=1),
+                  MACrossoverProps(timeframe="1min", fast_period=5, slow_period=20, magic_number=2),
+                  MACrossoverProps(timeframe="1h", fast_period=5, slow_period=20, magic_number=3)]
+    return events_queue, data_provider, SignalGenerator(events_queue, data_provider, strategies)
+
+
+def next_data_event(events_queue: Queue, data_provider: HistoricalDataProvider) -> DataEvent:
+    data_provider.check_for_new_data()
+    return events_queue.get()
+
+
+def drain(events_queue: Queue) -> list:
+    return [events_queue.get() for _ in range(events_queue.qsize())]
+
+
+def test_strategies_share_one_window_per_symbol_and_timeframe(setup):
+    events_queue, data_provider, signal_generator = setup
+    for _ in range(30):
+        signal_generator.generate_signal(next_data_event(events_queue, data_provider))
+        signals = drain(events_queue)
+        assert len(signals) == len({signal.magic_number for signal in signals})
+        assert all(signal.magic_number in (1, 2) for signal in signals)
+
+    # Both strategies of the timeframe emit on every bar once their slow window is full
+    assert {signal.magic_number for signal in signals} == {1, 2}
+    # The window was only seeded once for both strategies
+    assert data_provider.bars_requests == 1
+
+
+def test_repeated_or_late_data_events_emit_no_signal(setup):
+    events_queue, data_provider, signal_generator = setup
+    data_events = []
+    for _ in range(25):
+        data_events.append(next_data_event(events_queue, data_provider))
+        signal_generator.generate_signal(data_events[-1])
+        signals = drain(events_queue)
+    assert len(signals) == 2
+
+    # The same bar delivered again (a new event), or an older bar, is not new
+    signal_generator.generate_signal(data_events[-1]._replace(trace=None))
+    signal_generator.generate_signal(data_events[-5])
+    assert drain(events_queue) == []
+
+    signal_generator.generate_signal(next_data_event(events_queue, data_provider))
+    assert len(drain(events_queue)) == 2
+
+
+def test_new_periods_reseed_the_windows_of_their_timeframe(setup):
+    events_queue, data_provider, signal_generator = setup
+    cache = IndicatorCache()
+    cache.register("1min", [3, 10])
+    window = cache.update(next_data_event(events_queue, data_provider), "1min", data_provider)
+    assert window is not None and window.size == 10
+
+    cache.register("1min", [5, 20])
+    window = cache.update(next_data_event(events_queue, data_provider), "1min", data_provider)
+    assert window.size == 20
+
+
+def test_signals_of_full_symbols_are_dropped(make_bars, write_history):
+    closes = 1.1 + 1e-4 * np.arange(30)
+    events_queue = Queue()
+    data_provider = HistoricalDataProvider(events_queue, ["EURUSD"], "1min",
+                                           write_history("EURUSD", make_bars(closes)))
+    portfolio = OpenPositions()
+    signal_generator = SignalGenerator(events_queue, data_provider,
+                                       MACrossoverProps(timeframe="1min", fast_period=3, slow_period=10,
+                                                        magic_number=1),
+                                       portfolio=portfolio, max_positions_per_symbol=2)
+
+    emitted = []
+    for bar in range(20):
+        portfolio.total = 2 if bar < 15 else 1
+        signal_generator.generate_signal(next_data_event(events_queue, data_provider))
+        emitted.append(len(drain(events_queue)))
+
+    # The rising closes give a BUY on every bar once the slow window is full, but only below the limit
+    assert emitted == [0] * 15 + [1] * 5
+
+
+class OpenPositions:
+
+    def __init__(self):
+        self.total = 0
+
+    def get_number_of_open_positions_by_symbol(self, symbol):
+        return {"LONG": self.total, "SHORT": 0, "TOTAL": self.total}
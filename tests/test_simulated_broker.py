@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+
+
+T0 = 1_700_000_040
+
+
+@pytest.fixture
+def broker(make_bars):
+    closes = np.array([1.1000, 1.1010, 1.1020, 1.0990, 1.0950, 1.1050, 1.1100, 1.1000])
+    return SimulatedBroker({"EURUSD": make_bars(closes, spread=10)}, "1min", start_time=T0 + 2 * 60,
+                           balance=10000.0)
+
+
+def market_order(broker, order_type, volume, **fields):
+    request = {'action': broker.TRADE_ACTION_DEAL, 'symbol': "EURUSD", 'type': order_type, 'volume': volume,
+               'magic': 7}
+    request.update(fields)
+    return broker.order_send(request)
+
+
+def test_rates_stop_at_the_server_time(broker):
+    rates = broker.copy_rates_from_pos("EURUSD", broker.TIMEFRAME_M1, 1, 10)
+    assert list(rates['time']) == [T0, T0 + 60]
+
+    broker.step()
+    assert broker.copy_rates_from_pos("EURUSD", broker.TIMEFRAME_M1, 1, 1)['time'][0] == T0 + 120
+    assert broker.copy_rates_from_pos("EURUSD", broker.TIMEFRAME_M5, 1, 1) is None
+
+
+def test_market_orders_fill_at_the_bid_and_ask(broker):
+    tick = broker.symbol_info_tick("EURUSD")
+    assert tick.ask == pytest.approx(tick.bid + 10 * 0.00001)
+
+    buy = market_order(broker, broker.ORDER_TYPE_BUY, 0.1)
+    assert buy.retcode == broker.TRADE_RETCODE_DONE
+    assert buy.price == tick.ask
+    position, = broker.positions_get()
+    assert (position.ticket, position.magic, position.volume) == (buy.order, 7, 0.1)
+
+    close = market_order(broker, broker.ORDER_TYPE_SELL, 0.1, position=buy.order)
+    assert close.retcode == broker.TRADE_RETCODE_DONE
+    assert close.price == tick.bid
+    assert broker.positions_get() == ()
+    assert broker.account_info().balance == pytest.approx(10000.0 - 0.1 * 100000 * 10 * 0.00001)
+
+
+def test_invalid_orders_are_rejected(broker):
+    assert market_order(broker, broker.ORDER_TYPE_BUY, 0.015).retcode == broker.TRADE_RETCODE_INVALID_VOLUME
+    assert market_order(broker, broker.ORDER_TYPE_BUY, 100.0).retcode == broker.TRADE_RETCODE_NO_MONEY
+    assert market_order(broker, broker.ORDER_TYPE_SELL, 0.1, position=99).retcode == \
+        broker.TRADE_RETCODE_POSITION_CLOSED
+
+
+def test_order_send_is_a_single_broker_call(make_bars):
+    # The margin check must not go through account_info: one call, one latency per order
+    broker = SimulatedBroker({"EURUSD": make_bars(10)}, "1min", start_time=T0 + 120,
+                             latency={'order_send': 0.05, 'account_info': 0.5})
+
+    start = time.perf_counter()
+    result = market_order(broker, broker.ORDER_TYPE_BUY, 0.1)
+    elapsed = time.perf_counter() - start
+
+    assert result.retcode == broker.TRADE_RETCODE_DONE
+    assert broker.call_counts == {'order_send': 1}
+    assert 0.05 <= elapsed < 0.4
+
+
+def test_pending_orders_and_stops_trigger_on_the_closed_bars(broker):
+    placed = broker.order_send({'action': broker.TRADE_ACTION_PENDING, 'symbol': "EURUSD",
+                                'type': broker.ORDER_TYPE_BUY_LIMIT, 'volume': 0.2, 'price': 1.0960,
+                                'sl': 1.0900, 'tp': 1.1080, 'magic': 3})
+    assert placed.retcode == broker.TRADE_RETCODE_PLACED
+    assert len(broker.orders_get()) == 1
+
+    # The bar that opens at 1.0990 and closes at 1.0950 reaches the limit price
+    broker.set_time(T0 + 5 * 60)
+    assert broker.orders_get() == ()
+    position, = broker.positions_get()
+    assert (position.magic, position.volume, position.price_open) == (3, 0.2, 1.0960)
+
+    # The take profit is reached two bars later
+    broker.step()
+    assert len(broker.positions_get()) == 1
+    broker.step()
+    assert broker.positions_get() == ()
+    assert broker.account_info().balance == pytest.approx(10000.0 + 0.2 * 100000 * (1.1080 - 1.0960))
+
+
+def test_every_fill_is_a_deal_of_its_position(broker):
+    buy = market_order(broker, broker.ORDER_TYPE_BUY, 0.1)
+    close = market_order(broker, broker.ORDER_TYPE_SELL, 0.1, position=buy.order)
+
+    opening, = broker.history_deals_get(ticket=buy.deal)
+    closing, = broker.history_deals_get(ticket=close.deal)
+    assert (opening.position_id, opening.type, opening.volume) == (buy.order, broker.DEAL_TYPE_BUY, 0.1)
+    assert (closing.position_id, closing.type, closing.price) == (buy.order, broker.DEAL_TYPE_SELL, close.price)
+    assert broker.history_deals_get(position=buy.order) == (opening, closing)
+    assert broker.account_info().margin_mode == broker.ACCOUNT_MARGIN_MODE_RETAIL_HEDGING
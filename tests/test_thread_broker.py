@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+import pytest
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from broker.brokers.thread_broker import ThreadBroker
+from data_provider.async_data_provider import AsyncDataProvider
+from data_provider.bar_store import BarStore
+from events.events import OrderEvent, OrderType, SignalType
+from order_executor.order_executor import OrderExecutor
+
+
+T0 = 1_700_000_040
+
+
+class RecordingBroker(SimulatedBroker):
+    """
+    SimulatedBroker that records the thread of every broker call and how many run at the same time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+        self.max_concurrent = 0
+        self._running = 0
+        self._count_lock = threading.Lock()
+
+    def _call(self, method: str) -> None:
+        self.threads.add(threading.get_ident())
+        with self._count_lock:
+            self._running += 1
+            self.max_concurrent = max(self.max_concurrent, self._running)
+        try:
+            super()._call(method)
+        finally:
+            with self._count_lock:
+                self._running -= 1
+
+
+@pytest.fixture
+def recording_broker(make_bars):
+    bars = make_bars(20)
+    return RecordingBroker({"EURUSD": bars, "GBPUSD": bars}, "1min", start_time=T0 + 5 * 60, latency=0.005)
+
+
+def test_every_call_runs_on_the_broker_thread(recording_broker):
+    broker = ThreadBroker(recording_broker)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ticks = list(pool.map(lambda _: broker.symbol_info_tick("EURUSD"), range(16)))
+
+    assert all(tick is not None for tick in ticks)
+    assert recording_broker.threads == {broker._thread_id}
+    assert recording_broker.max_concurrent == 1
+    assert broker.last_error() == recording_broker.last_error()
+
+
+def test_calls_from_the_broker_thread_go_straight_to_the_broker(recording_broker):
+    broker = ThreadBroker(recording_broker)
+    # A function run in the broker thread that calls the broker again must not wait for itself
+    rates = broker.executor.submit(broker.copy_rates_from_pos, "EURUSD", broker.TIMEFRAME_M1, 1, 3).result(timeout=5)
+
+    assert list(rates['time']) == [T0 + 2 * 60, T0 + 3 * 60, T0 + 4 * 60]
+    assert broker.server_time == recording_broker.server_time
+
+
+def test_broker_exceptions_reach_the_caller():
+    class FailingBroker:
+        def symbol_info(self, symbol):
+            raise ConnectionError(f"No connection to get {symbol}")
+
+    with pytest.raises(ConnectionError):
+        ThreadBroker(FailingBroker()).symbol_info("EURUSD")
+
+
+def test_async_polls_and_bar_store_share_the_broker_thread(recording_broker, tmp_path):
+    broker = ThreadBroker(recording_broker)
+    events = Queue()
+    data_provider = AsyncDataProvider(events_queue=events, symbol_list=["EURUSD", "GBPUSD"], timeframe="1min",
+                                      broker=broker, bar_store=BarStore(str(tmp_path)), poll_interval=0.001)
+    assert data_provider.broker_workers == 1
+
+    async def poll_one_bar():
+        task = asyncio.create_task(data_provider.run())
+        await asyncio.sleep(0.1)
+        recording_broker.step()
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(poll_one_bar())
+
+    new_bars = {(event.symbol, event.data.time) for event in list(events.queue)}
+    assert new_bars == {("EURUSD", T0 + 4 * 60), ("GBPUSD", T0 + 4 * 60),
+                        ("EURUSD", T0 + 5 * 60), ("GBPUSD", T0 + 5 * 60)}
+    assert recording_broker.threads == {broker._thread_id}
+    assert recording_broker.max_concurrent == 1
+    # The new bar was written to the bar store (from the broker thread) after the warm-up backfill
+    assert data_provider.bar_store.last_time("EURUSD", "1min") == T0 + 5 * 60
+
+
+def test_order_threads_and_the_main_loop_share_the_broker_thread(recording_broker):
+    broker = ThreadBroker(recording_broker)
+    events = Queue()
+    executor = OrderExecutor(events, broker=broker, workers=8)
+    for number in range(16):
+        executor.execute_order(OrderEvent(symbol=("EURUSD", "GBPUSD")[number % 2], signal=SignalType.BUY,
+                                          target_order=OrderType.MARKET, target_price=0.0, magic_number=5, sl=0.0,
+                                          tp=0.0, volume=0.01))
+    # The main loop keeps polling while the orders are in flight
+    for _ in range(8):
+        broker.copy_rates_from_pos("EURUSD", broker.TIMEFRAME_M1, 1, 1)
+    executor.shutdown(wait=True)
+
+    assert [event.event_type for event in list(events.queue)] == ["EXECUTION"] * 16
+    assert recording_broker.threads == {broker._thread_id}
+    assert recording_broker.max_concurrent == 1
@@ -0,0 +1,54 @@
+import numpy as np
+
+from data_provider.tick_bar_aggregator import TickBarAggregator
+from events.events import Bar
+
+
+T0 = 1_700_000_040    # Opening time of a M1 bar (and of a M5 bar + 4 minutes)
+
+
+def test_bars_are_built_like_the_terminal_bars():
+    rng = np.random.default_rng(17)
+    times = np.unique(rng.integers(T0 * 1000 + 1, (T0 + 1200) * 1000, 2000))
+    bids = 1.1 + np.cumsum(rng.normal(0, 1e-5, len(times)))
+    spreads = rng.integers(5, 15, len(times))
+
+    aggregator = TickBarAggregator(["1min", "5min"])
+    closed = []
+    for time_msc, bid, spread in zip(times, bids, spreads):
+        closed.extend(aggregator.add_tick("EURUSD", int(time_msc), float(bid), int(spread), volume=2))
+
+    # Every M1 bar after the first (incomplete) one, up to the one being formed
+    minutes = (times // 1000 - T0) // 60
+    m1_bars = [bar for timeframe, bar in closed if timeframe == "1min"]
+    assert [bar.time for bar in m1_bars] == [T0 + 60 * minute for minute in range(1, minutes[-1])]
+    for bar in m1_bars:
+        in_bar = minutes == (bar.time - T0) // 60
+        assert bar == Bar(time=bar.time, open=bids[in_bar][0], high=bids[in_bar].max(), low=bids[in_bar].min(),
+                          close=bids[in_bar][-1], tickvol=int(in_bar.sum()), vol=2 * int(in_bar.sum()),
+                          spread=int(spreads[in_bar].min()))
+
+    # The M5 bars are aligned to their own boundaries (T0 is 4 minutes into a M5 bar)
+    m5_bars = [bar for timeframe, bar in closed if timeframe == "5min"]
+    assert [bar.time for bar in m5_bars] == [T0 + 60, T0 + 360, T0 + 660]
+    assert m5_bars[0].high == bids[(minutes >= 1) & (minutes < 6)].max()
+
+
+def test_one_tick_closes_every_timeframe_at_once():
+    aggregator = TickBarAggregator(["1min", "5min"])
+    aggregator.add_tick("EURUSD", (T0 - 240) * 1000 - 500, 1.0, 10)      # Incomplete bars
+    aggregator.add_tick("EURUSD", (T0 - 240) * 1000, 1.1, 10)
+    aggregator.add_tick("EURUSD", (T0 - 180) * 1000, 1.2, 10)            # Closes the first complete M1 bar
+    closed = aggregator.add_tick("EURUSD", (T0 + 60) * 1000, 1.3, 10)
+    assert [(timeframe, bar.time) for timeframe, bar in closed] == [("1min", T0 - 180), ("5min", T0 - 240)]
+    assert closed[1][1].open == 1.1 and closed[1][1].close == 1.2
+
+
+def test_repeated_ticks_are_ignored():
+    aggregator = TickBarAggregator(["1min"])
+    aggregator.add_tick("EURUSD", T0 * 1000, 1.0, 10)
+    aggregator.add_tick("EURUSD", (T0 + 60) * 1000, 1.0, 10)
+    for _ in range(3):
+        aggregator.add_tick("EURUSD", (T0 + 61) * 1000, 1.1, 10)
+    bar = aggregator.add_tick("EURUSD", (T0 + 120) * 1000, 1.2, 10)[0][1]
+    assert bar.tickvol == 2
@@ -0,0 +1,99 @@
+import threading
+import time
+from queue import Queue
+
+import numpy as np
+
+from broker.brokers.simulated_broker import SimulatedBroker
+from data_provider.historical_data_provider import HistoricalDataProvider
+from events.events import OrderType, PlacedPendingOrderEvent, SignalEvent, SignalType
+from position_sizer.position_sizer import PositionSizer
+from position_sizer.properties.position_sizer_properties import FixedSizingProps
+from signal_generator.properties.signal_generator_properties import MACrossoverProps
+from signal_generator.signal_generator import SignalGenerator
+from signal_generator.signals.signal_ma_crossover import SignalMACrossover
+from trading_director.trading_director import TradingDirector
+from utils.broker_metadata_cache import BrokerMetadataCache
+
+
+class ScheduledDataProvider():
+    """
+    Live-like data provider without new bars, whose next check is always `interval` seconds away.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.checks = 0
+
+    def check_for_new_data(self) -> None:
+        self.checks += 1
+
+    def seconds_until_next_check(self) -> float:
+        return self.interval
+
+
+class RecordingRiskManager():
+    """
+    Risk manager stub that records the events it receives.
+    """
+    def __init__(self):
+        self.events = []
+
+    def assess_order(self, sizing_event):
+        self.events.append(sizing_event)
+
+    def on_pending_order(self, pending_order_event):
+        self.events.append(pending_order_event)
+
+
+def test_backtest_replays_every_bar_and_stops(make_bars, write_history):
+    closes = 1.1 + np.cumsum(np.random.default_rng(7).normal(0, 1e-4, 300))
+    events_queue = Queue()
+    data_provider = HistoricalDataProvider(events_queue, ["EURUSD"], "1min",
+                                           write_history("EURUSD", make_bars(closes)))
+    props = MACrossoverProps(timeframe="1min", fast_period=5, slow_period=20)
+    director = TradingDirector(events_queue, data_provider, SignalGenerator(events_queue, data_provider, props),
+                               latency_report_interval=None)
+    signals = []
+    director.event_handler["SIGNAL"] = signals.append
+
+    director.execute()
+
+    assert not director.continue_trading
+    expected = SignalMACrossover(props).compute_signal_series(closes)[2]
+    assert len(signals) == np.count_nonzero(expected)
+
+
+def test_idle_loop_blocks_on_the_queue_until_an_event_arrives():
+    events_queue = Queue()
+    data_provider = ScheduledDataProvider(interval=10.0)
+    director = TradingDirector(events_queue, data_provider, signal_generator=None, latency_report_interval=None)
+
+    threading.Timer(0.2, events_queue.put, args=(None,)).start()
+    start = time.monotonic()
+    director.execute()
+
+    # The None event stops the loop as soon as it is put, and the loop did not spin while waiting for it
+    assert time.monotonic() - start < 2.0
+    assert data_provider.checks == 1
+
+
+def test_signals_are_sized_and_pending_orders_reach_the_risk_manager(make_bars):
+    events_queue = Queue()
+    broker = SimulatedBroker({"EURUSD": make_bars(5)}, "1min", start_time=1_700_000_040 + 3 * 60)
+    position_sizer = PositionSizer(events_queue, data_provider=None, sizing_properties=FixedSizingProps(volume=0.2),
+                                   metadata_cache=BrokerMetadataCache(broker=broker))
+    risk_manager = RecordingRiskManager()
+    director = TradingDirector(events_queue, ScheduledDataProvider(interval=10.0), signal_generator=None,
+                               latency_report_interval=None, risk_manager=risk_manager,
+                               position_sizer=position_sizer)
+
+    director._dispatch_event(SignalEvent(symbol="EURUSD", signal=SignalType.BUY, target_order=OrderType.LIMIT,
+                                         target_price=0.99, magic_number=5, sl=0.0, tp=0.0))
+    sizing_event = events_queue.get_nowait()
+    assert (sizing_event.event_type, sizing_event.volume) == ("SIZING", 0.2)
+
+    director._dispatch_event(sizing_event)
+    pending_order = PlacedPendingOrderEvent(symbol="EURUSD", signal=SignalType.BUY, target_order=OrderType.LIMIT,
+                                            target_price=0.99, magic_number=5, sl=0.0, tp=0.0, volume=0.2)
+    director._dispatch_event(pending_order)
+    assert risk_manager.events == [sizing_event, pending_order]
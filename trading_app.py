@@ -1,27 +1,181 @@
+import functools
 from queue import Queue
 
+from broker.broker import get_default_broker, set_default_broker
+from broker.brokers.gateway_broker import GatewayBroker
+from broker.brokers.instrumented_broker import InstrumentedBroker
+from broker.brokers.simulated_broker import SimulatedBroker
+from broker.brokers.thread_broker import ThreadBroker
+from data_provider.async_data_provider import AsyncDataProvider
+from data_provider.bar_store import BarStore
 from data_provider.data_provider import DataProvider
+from data_provider.historical_data_provider import HistoricalDataProvider
+from data_provider.poll_scheduler import PollScheduler
+from order_executor.order_executor import OrderExecutor
 from platform_connector.platform_connector import PlatformConnector
+from portfolio.portfolio import Portfolio
+from position_sizer.position_sizer import PositionSizer
+from position_sizer.properties.position_sizer_properties import MinSizingProps
+from risk_manager.properties.risk_manager_properties import ExposureRiskProps
+from risk_manager.risk_manager import RiskManager
+from shard_launcher.shard_launcher import ShardLauncher
 from signal_generator.properties.signal_generator_properties import MACrossoverProps
 from signal_generator.signal_generator import SignalGenerator
 from signal_generator.signals.signal_ma_crossover import SignalMACrossover
+from trading_director.async_trading_director import AsyncEventQueue, AsyncTradingDirector
 from trading_director.trading_director import TradingDirector
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.logger import setup_logging
+from utils.metrics import MetricsRegistry, MetricsServer
+
+def build_shard_pipeline(events_queue, symbols, exposure, timeframe, signal_properties, simulated, history_dir,
+                         resample_timeframes, gateway_address, max_positions_per_symbol):
+    # Pipeline of a shard process (sharded mode): every shard polls its own symbols, through the broker gateway if
+    # there is one, otherwise with its own connection to the platform. The signals of the symbols that are full in
+    # the exposure published by the coordinator are dropped in the shard
+    if gateway_address is not None:
+        set_default_broker(GatewayBroker(address=gateway_address))
+    elif simulated:
+        set_default_broker(SimulatedBroker.from_history_files(data_dir=history_dir, symbol_list=symbols,
+                                                              timeframe=timeframe, speed=60.0))
+    else:
+        PlatformConnector(symbol_list=symbols)
+    data_provider = DataProvider(events_queue=events_queue, symbol_list=symbols, timeframe=timeframe,
+                                 poll_scheduler=PollScheduler(symbol_list=symbols, timeframe=timeframe),
+                                 resample_timeframes=resample_timeframes)
+    signal_generator = SignalGenerator(events_queue=events_queue, data_provider=data_provider,
+                                       signal_properties=signal_properties, portfolio=exposure,
+                                       max_positions_per_symbol=max_positions_per_symbol)
+    return data_provider, signal_generator
+
 
 if  __name__ == '__main__':
     symbols = ["AUDCAD", "EURUSD", "USDCHF"]
     timeframe = "1min"
     magic_number = 12345
 
+    # Backtest mode: replay the bars stored in history_dir instead of connecting to MT5
+    backtest = False
+    history_dir = "history"
+
+    # Local bar store (memory-mapped bars kept across runs, filled incrementally) in this directory (None: off)
+    bar_store_dir = None
+
+    # Timeframes built from the M1 bars (e.g. ["5min", "1h"]), so the strategies of several timeframes share one M1
+    # fetch per symbol (None: every timeframe is requested from MT5 on its own)
+    resample_timeframes = None
+
+    # Simulated mode: run the live pipeline against a SimulatedBroker fed from history_dir (no MT5 terminal needed)
+    simulated = False
+
+    # Streaming mode: build the bars of every timeframe from the ticks instead of polling the closed bars
+    stream_ticks = False
+
+    # Asyncio mode: every symbol is polled in its own task and the broker calls are made from one broker thread, so
+    # a slow broker call does not block the event loop
+    use_asyncio = False
+
+    # Sharded mode: the symbols are split across this many processes that poll and generate the signals, and this
+    # process places the orders and keeps the portfolio (None: a single process)
+    num_shards = None
+
+    # Broker gateway (see gateway_app.py) that owns the terminal connection: the broker calls of this process (and of
+    # its shards) go through it (None: connect to the platform directly)
+    gateway_address = None
+
+    # Order execution: the orders of different symbols are sent in parallel by this many threads, within the rate
+    # limit of the broker (trade requests per second, None: no limit)
+    order_workers = 32
+    max_orders_per_second = None
+
+    # Position sizing of the signals
+    sizing_props = MinSizingProps()
+
+    # Account-wide risk limits checked before every order (exposures in account currency)
+    risk_props = ExposureRiskProps(max_leverage_factor=5.0, max_positions_per_symbol=5, max_margin_usage=0.5)
+
+    # Runtime metrics (main loop and broker calls) served in the Prometheus format on this local port (None: off)
+    metrics_port = 9108
+
+    # Logging: the per-bar DATA messages are only logged at DEBUG level, JSON lines for the log pipeline
+    log_level = "INFO"
+    log_json = False
+    setup_logging(level=log_level, json_format=log_json)
+
     mac_props = MACrossoverProps(timeframe=timeframe,
                                  fast_period=5,
-                                 slow_period=10)
-    events_deque = Queue()
-    CONNECT = PlatformConnector(symbol_list=symbols)
-    DATA_PROVIDER = DataProvider(events_queue=events_deque, symbol_list=symbols, timeframe=timeframe)
+                                 slow_period=10,
+                                 magic_number=magic_number)
+    events_deque = AsyncEventQueue() if use_asyncio and not backtest else Queue()
+    METADATA_CACHE = None
+    PORTFOLIO = None
+    ORDER_EXECUTOR = None
+    RISK_MANAGER = None
+    POSITION_SIZER = None
+    METRICS = MetricsRegistry() if metrics_port is not None else None
+    BAR_STORE = BarStore(bar_store_dir) if bar_store_dir is not None else None
+    if backtest:
+        DATA_PROVIDER = HistoricalDataProvider(events_queue=events_deque, symbol_list=symbols, timeframe=timeframe,
+                                               data_dir=history_dir, bar_store=BAR_STORE,
+                                               resample_timeframes=resample_timeframes)
+    else:
+        if gateway_address is not None:
+            set_default_broker(GatewayBroker(address=gateway_address))
+        elif simulated:
+            set_default_broker(SimulatedBroker.from_history_files(data_dir=history_dir, symbol_list=symbols,
+                                                                  timeframe=timeframe, speed=60.0))
+        if METRICS is not None:
+            set_default_broker(InstrumentedBroker(get_default_broker(), METRICS))
+        if gateway_address is None:
+            # The main loop (or the polling tasks), the handlers and the order threads call the MT5 API from one
+            # broker thread (the gateway already makes every call from its own thread)
+            set_default_broker(ThreadBroker(get_default_broker()))
+        if not simulated and gateway_address is None:
+            CONNECT = PlatformConnector(symbol_list=symbols)
+        METADATA_CACHE = BrokerMetadataCache()
+        PORTFOLIO = Portfolio(magic_number=magic_number)
+        if num_shards is not None:
+            # The shards poll the data and generate the signals, this process runs the coordinator
+            LAUNCHER = ShardLauncher(symbol_list=symbols, num_shards=num_shards, metadata_cache=METADATA_CACHE,
+                                     portfolio=PORTFOLIO, metrics=METRICS, log_level=log_level, log_json=log_json,
+                                     order_executor_factory=functools.partial(
+                                         OrderExecutor, workers=order_workers,
+                                         max_orders_per_second=max_orders_per_second),
+                                     risk_manager_factory=functools.partial(
+                                         RiskManager, portfolio=PORTFOLIO, risk_properties=risk_props,
+                                         metadata_cache=METADATA_CACHE),
+                                     position_sizer_factory=functools.partial(
+                                         PositionSizer, sizing_properties=sizing_props,
+                                         metadata_cache=METADATA_CACHE),
+                                     pipeline_factory=functools.partial(
+                                         build_shard_pipeline, timeframe=timeframe, signal_properties=mac_props,
+                                         simulated=simulated, history_dir=history_dir,
+                                         resample_timeframes=resample_timeframes, gateway_address=gateway_address,
+                                         max_positions_per_symbol=risk_props.max_positions_per_symbol))
+            if METRICS is not None:
+                MetricsServer(METRICS, port=metrics_port).start()
+            LAUNCHER.run()
+            raise SystemExit
+        ORDER_EXECUTOR = OrderExecutor(events_queue=events_deque, workers=order_workers,
+                                       max_orders_per_second=max_orders_per_second)
+        RISK_MANAGER = RiskManager(events_queue=events_deque, portfolio=PORTFOLIO, risk_properties=risk_props,
+                                   metadata_cache=METADATA_CACHE)
+        data_provider_class = AsyncDataProvider if use_asyncio else DataProvider
+        DATA_PROVIDER = data_provider_class(events_queue=events_deque, symbol_list=symbols, timeframe=timeframe,
+                                            poll_scheduler=PollScheduler(symbol_list=symbols, timeframe=timeframe),
+                                            stream_ticks=stream_ticks, bar_store=BAR_STORE,
+                                            resample_timeframes=resample_timeframes)
+        POSITION_SIZER = PositionSizer(events_queue=events_deque, data_provider=DATA_PROVIDER,
+                                       sizing_properties=sizing_props, metadata_cache=METADATA_CACHE)
     SIGNAL_GENERATOR = SignalGenerator(events_queue=events_deque,
                                        data_provider=DATA_PROVIDER,
                                        signal_properties=mac_props)
 
-    TRADING_DIRECTOR = TradingDirector(events_queue=events_deque, data_provider=DATA_PROVIDER,
-                                       signal_generator=SIGNAL_GENERATOR)
+    trading_director_class = AsyncTradingDirector if isinstance(DATA_PROVIDER, AsyncDataProvider) else TradingDirector
+    TRADING_DIRECTOR = trading_director_class(events_queue=events_deque, data_provider=DATA_PROVIDER,
+                                              signal_generator=SIGNAL_GENERATOR, metadata_cache=METADATA_CACHE,
+                                              portfolio=PORTFOLIO, metrics=METRICS, order_executor=ORDER_EXECUTOR,
+                                              risk_manager=RISK_MANAGER, position_sizer=POSITION_SIZER)
+    if METRICS is not None:
+        MetricsServer(METRICS, port=metrics_port).start()
     TRADING_DIRECTOR.execute()
\ No newline at end of file
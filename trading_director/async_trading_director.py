@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from data_provider.async_data_provider import AsyncDataProvider
+from order_executor.order_executor import OrderExecutor
+from portfolio.portfolio import Portfolio
+from position_sizer.position_sizer import PositionSizer
+from risk_manager.risk_manager import RiskManager
+from signal_generator.interfaces.signal_generator_interface import ISignalGenerator
+from utils.broker_metadata_cache import BrokerMetadataCache
+from utils.logger import get_logger
+from utils.metrics import MetricsRegistry
+from .trading_director import TradingDirector
+
+
+logger = get_logger("trading_director")
+
+
+class AsyncEventQueue(asyncio.Queue):
+    """
+    Unbounded asyncio queue of events that the synchronous modules can use as a queue.Queue: put() adds the event
+    without waiting (await put_nowait in async code instead of put).
+    """
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> None:
+        self.put_nowait(item)
+
+
+class AsyncTradingDirector(TradingDirector):
+
+    def __init__(self, events_queue: AsyncEventQueue, data_provider: AsyncDataProvider,
+                 signal_generator: ISignalGenerator, metadata_cache: Optional[BrokerMetadataCache] = None,
+                 portfolio: Optional[Portfolio] = None, latency_report_interval: Optional[float] = 60.0,
+                 metrics: Optional[MetricsRegistry] = None, order_executor: Optional[OrderExecutor] = None,
+                 risk_manager: Optional[RiskManager] = None, position_sizer: Optional[PositionSizer] = None):
+        """
+        TradingDirector for the asyncio mode: the polling of every symbol (see AsyncDataProvider) and the handling
+        of the events run as tasks of one event loop, and the main loop awaits the events queue instead of
+        sleeping between checks for new data.
+
+        The event handlers are the same as in the TradingDirector and run on the event loop. Asynchronous side
+        effects (e.g. notifications) are added with add_event_listener and run as tasks, without threads and
+        without delaying the handling of the next events.
+
+        Args:
+            events_queue (AsyncEventQueue): The queue to receive events.
+            data_provider (AsyncDataProvider): The data provider.
+            signal_generator (ISignalGenerator): The signal generator object.
+            metadata_cache (Optional[BrokerMetadataCache]): The broker metadata cache shared with the position sizer.
+            portfolio (Optional[Portfolio]): The portfolio whose position book is updated with every execution.
+            latency_report_interval (Optional[float]): How often (seconds) the pipeline latencies are logged
+                (never if None).
+            metrics (Optional[MetricsRegistry]): The registry where the main loop metrics are kept (None: no
+                metrics).
+            order_executor (Optional[OrderExecutor]): The order executor (see TradingDirector). Its confirmations
+                are put in the queue from the event loop thread.
+            risk_manager (Optional[RiskManager]): The risk manager (see TradingDirector).
+            position_sizer (Optional[PositionSizer]): The position sizer (see TradingDirector).
+        """
+        if not isinstance(data_provider, AsyncDataProvider):
+            logger.error("The asyncio mode needs an AsyncDataProvider")
+            raise Exception("The asyncio mode needs an AsyncDataProvider")
+
+        super().__init__(events_queue=events_queue, data_provider=data_provider, signal_generator=signal_generator,
+                         metadata_cache=metadata_cache, portfolio=portfolio,
+                         latency_report_interval=latency_report_interval, metrics=metrics,
+                         order_executor=order_executor, risk_manager=risk_manager,
+                         position_sizer=position_sizer)
+
+        # Coroutine functions awaited (as tasks) with every event of a type, after its handler
+        self.event_listeners: Dict[str, List[Callable[[object], Awaitable[None]]]] = {}
+        self._listener_tasks: Set[asyncio.Task] = set()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._main_task: Optional[asyncio.Task] = None
+
+    def _create_metrics(self) -> None:
+        super()._create_metrics()
+        # The checks for new data are the polls of the symbol tasks
+        self.DATA_PROVIDER.poll_counters = (self._data_checks, self._empty_polls)
+
+    def add_event_listener(self, event_type: str, listener: Callable[[object], Awaitable[None]]) -> None:
+        """
+        Adds a coroutine function that is called with every event of the given type once it has been handled
+        (e.g. add_event_listener("EXECUTION", notifier.send)). The listener runs as a task: its errors are logged
+        and do not stop the Framework.
+
+        Args:
+            event_type (str): The event type (e.g. "EXECUTION").
+            listener (Callable[[object], Awaitable[None]]): The coroutine function.
+        """
+        self.event_listeners.setdefault(event_type, []).append(listener)
+
+    def _notify_listeners(self, event) -> None:
+        listeners = self.event_listeners.get(event.event_type)
+        if not listeners:
+            return
+        for listener in listeners:
+            task = asyncio.create_task(listener(event))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._on_listener_done)
+
+    def _on_listener_done(self, task: asyncio.Task) -> None:
+        self._listener_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Event listener failed: %r", task.exception())
+
+    async def _report_latencies_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.latency_report_interval)
+            self._log_latency_report()
+
+    def stop(self) -> None:
+        """
+        Stops the main loop. It can be called from any thread.
+        """
+        self.continue_trading = False
+        if self._loop is not None and self._main_task is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+
+    def execute(self) -> None:
+        """
+        Runs the main loop (run) in a new event loop until the Framework stops.
+        """
+        asyncio.run(self.run())
+
+    async def run(self) -> None:
+        """
+        Main trading loop of the asyncio mode.
+
+        The data provider polls every symbol in its own task and puts the DataEvents in the queue. This loop awaits
+        the next event and handles it, so it only wakes up when there is an event, and a symbol whose broker call
+        is slow does not delay the others. The loop continues until the `continue_trading` flag is set to False
+        (or stop is called).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        background = [asyncio.create_task(self.DATA_PROVIDER.run(), name="data-provider")]
+        if self.latency_tracker is not None and self.latency_report_interval is not None:
+            background.append(asyncio.create_task(self._report_latencies_forever(), name="latency-report"))
+
+        # The data provider must not stop silently: if it fails the Framework stops
+        background[0].add_done_callback(self._on_data_provider_done)
+
+        metrics = self.metrics
+        try:
+            while self.continue_trading:
+                event = await self.events_queue.get()
+                if metrics is not None:
+                    self._iterations.value += 1
+                self._dispatch_event(event)
+                if event is not None:
+                    self._notify_listeners(event)
+        except asyncio.CancelledError:
+            if self.continue_trading:
+                raise
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            if self._listener_tasks:
+                # Let the pending side effects (e.g. notifications) finish
+                await asyncio.gather(*self._listener_tasks, return_exceptions=True)
+            if self.ORDER_EXECUTOR is not None:
+                self._wait_for_orders()
+                # The confirmations are put in the queue by callbacks of this loop: let them run first
+                await asyncio.sleep(0)
+                self._handle_confirmations()
+            self._main_task = None
+            self._loop = None
+
+        logger.info("END")
+
+    def _on_data_provider_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error("The data provider stopped: %r. Terminating Framework execution", error)
+            self.stop()
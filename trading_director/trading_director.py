@@ -1,35 +1,63 @@
 # QUANTDEMY - https://quantdemy.com - Trading with Python and MetaTrader 5: Create your Own Framework
 import signal_generator
 from data_provider.data_provider import DataProvider
+from data_provider.historical_data_provider import HistoricalDataProvider
+from data_provider.interfaces.data_provider_interface import IDataProvider
 from signal_generator.interfaces.signal_generator_interface import ISignalGenerator
 
 """from signal_generator.interfaces.signal_generator_interface import ISignalGenerator
+from notifications.notifications import NotificationService"""
 from position_sizer.position_sizer import PositionSizer
-from risk_manager.risk_manager import RiskManager
 from order_executor.order_executor import OrderExecutor
-from notifications.notifications import NotificationService"""
-from events.events import DataEvent, SignalEvent, SizingEvent, OrderEvent, ExecutionEvent, PlacedPendingOrderEvent
+from risk_manager.risk_manager import RiskManager
+from utils.broker_metadata_cache import BrokerMetadataCache
+from portfolio.portfolio import Portfolio
+from events.events import DataEvent, SignalEvent, SizingEvent, OrderEvent, ExecutionEvent, PlacedPendingOrderEvent, is_event_tracing_enabled
+from utils.latency_tracker import LatencyTracker
+from utils.metrics import MetricsRegistry
+from utils.logger import get_logger
 from utils.utils import Utils
-from typing import Dict, Callable
+from typing import Dict, Callable, Optional
+import logging
 import queue
 import time
 
 
+logger = get_logger("trading_director")
+
+
 class TradingDirector():
     # def __init__(self, events_queue: queue.Queue, data_provider: DataProvider, signal_generator: ISignalGenerator,
     #                  position_sizer: PositionSizer, risk_manager: RiskManager, order_executor: OrderExecutor,
     #                  notification_service: NotificationService):
-    def __init__(self, events_queue: queue.Queue, data_provider: DataProvider, signal_generator: ISignalGenerator):
+    def __init__(self, events_queue: queue.Queue, data_provider: IDataProvider, signal_generator: ISignalGenerator,
+                 metadata_cache: Optional[BrokerMetadataCache] = None, portfolio: Optional[Portfolio] = None,
+                 latency_report_interval: Optional[float] = 60.0, metrics: Optional[MetricsRegistry] = None,
+                 order_executor: Optional[OrderExecutor] = None, risk_manager: Optional[RiskManager] = None,
+                 position_sizer: Optional[PositionSizer] = None):
         """
         Initializes the TradingDirector object.
 
         Args:
             events_queue (queue.Queue): The queue to receive events.
-            data_provider (DataProvider): The data provider object.
+            data_provider (IDataProvider): The data provider object (live DataProvider or HistoricalDataProvider).
             signal_generator (ISignalGenerator): The signal generator object.
-            position_sizer (PositionSizer): The position sizer object.
-            risk_manager (RiskManager): The risk manager object.
-            order_executor (OrderExecutor): The order executor object.
+            metadata_cache (Optional[BrokerMetadataCache]): The broker metadata cache shared with the position sizer.
+                Its account info is invalidated on every execution.
+            portfolio (Optional[Portfolio]): The portfolio whose position book is updated with every execution.
+            latency_report_interval (Optional[float]): How often (seconds) the pipeline latencies are logged when
+                the loop is idle (never if None). The latencies are only tracked if event tracing is enabled.
+            metrics (Optional[MetricsRegistry]): The registry where the main loop metrics are kept (loop
+                iterations, data checks, empty polls, queue depth, calls and time of every event handler). No
+                metrics are kept if None.
+            order_executor (Optional[OrderExecutor]): The order executor that sends the OrderEvents to the broker
+                in the background. Its confirmations come back as EXECUTION and PENDING events. The orders are only
+                logged if None.
+            risk_manager (Optional[RiskManager]): The risk manager that turns the SizingEvents within the risk limits
+                into OrderEvents. It is updated with every execution, after the portfolio, and with every pending
+                order placed. The sizing events are only logged if None.
+            position_sizer (Optional[PositionSizer]): The position sizer that turns the SignalEvents into
+                SizingEvents. The signals are only logged if None.
             notification_service (NotificationService): The notification service object.
         """
         self.events_queue = events_queue
@@ -37,14 +65,27 @@ class TradingDirector():
         # Reference to the different modules
         self.DATA_PROVIDER = data_provider
         self.SIGNAL_GENERATOR = signal_generator
-        #self.POSITION_SIZER = position_sizer
-        #self.RISK_MANAGER = risk_manager
-        #self.ORDER_EXECUTOR = order_executor
+        self.METADATA_CACHE = metadata_cache
+        self.PORTFOLIO = portfolio
+        self.POSITION_SIZER = position_sizer
+        self.RISK_MANAGER = risk_manager
+        self.ORDER_EXECUTOR = order_executor
         #self.NOTIFICATIONS = notification_service
 
         # Trading controller
         self.continue_trading: bool = True
 
+        # In backtest mode the bars are replayed as fast as possible (no waiting between iterations)
+        self.backtest_mode: bool = isinstance(data_provider, HistoricalDataProvider)
+
+        # Maximum time (seconds) blocked waiting for events when the data provider has no polling schedule
+        self.poll_interval: float = 0.01
+
+        # Latency histograms per symbol and pipeline stage, fed with the trace of every dispatched event
+        self.latency_tracker: Optional[LatencyTracker] = LatencyTracker() if is_event_tracing_enabled() else None
+        self.latency_report_interval: Optional[float] = latency_report_interval
+        self._next_latency_report: float = time.monotonic() + (latency_report_interval or 0.0)
+
         # Creation of the event handler
         self.event_handler: Dict[str, Callable] = {
             "DATA": self._handle_data_event,
@@ -55,6 +96,25 @@ class TradingDirector():
             "PENDING": self._handle_pending_order_event
         }
 
+        # Main loop metrics (see _create_metrics)
+        self.metrics: Optional[MetricsRegistry] = metrics
+        if self.metrics is not None:
+            self._create_metrics()
+
+    def _create_metrics(self) -> None:
+        """
+        Creates the metrics of the main loop. The ratio of empty polls is empty_polls_total / data_checks_total,
+        and the loop saturation shows as a high rate of iterations with a growing queue depth.
+        """
+        self._iterations = self.metrics.counter("loop_iterations_total", "Iterations of the main loop.")
+        self._data_checks = self.metrics.counter("data_checks_total", "Checks for new data.")
+        self._empty_polls = self.metrics.counter("empty_polls_total", "Checks for new data that produced no event.")
+        self.metrics.gauge("queue_depth", "Events waiting in the events queue.", function=self.events_queue.qsize)
+        self._handler_timers = {event_type: self.metrics.timer("handler_duration_seconds",
+                                                               "Calls to every event handler and time spent in them.",
+                                                               labels={'event': event_type})
+                                for event_type in self.event_handler}
+
     def _handle_data_event(self, event: DataEvent):
         """
         Handle the data event.
@@ -66,11 +126,13 @@ class TradingDirector():
             None
         """
         # Here we handle events of type DataEvent
-        print(
-            f"{Utils.dateprint()} - Received DATA EVENT from {event.symbol} - Last closing price: {event.data.close}")
+        # One message per bar and symbol: only logged at DEBUG level
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received DATA EVENT from %s - Last closing price: %s", event.symbol, event.data.close,
+                         extra={'event': "DATA", 'symbol': event.symbol, 'price': event.data.close})
         self.SIGNAL_GENERATOR.generate_signal(event)
 
-    def _handle_signal_event(self, event: DataEvent):
+    def _handle_signal_event(self, event: SignalEvent):
         """
         Handle the signal event.
 
@@ -81,8 +143,10 @@ class TradingDirector():
             None
         """
         # We process the signal event
-        print(f"{Utils.dateprint()} - Received SIGNAL EVENT {event.signal} for {event.symbol}")
-        #self.SIGNAL_GENERATOR.generate_signal(event, self.DATA_PROVIDER)
+        logger.info("Received SIGNAL EVENT %s for %s", event.signal, event.symbol,
+                    extra={'event': "SIGNAL", 'symbol': event.symbol, 'signal': event.signal})
+        if self.POSITION_SIZER is not None:
+            self.POSITION_SIZER.size_signal(event)
 
     def _handle_sizing_event(self, event: SizingEvent):
         """
@@ -94,9 +158,10 @@ class TradingDirector():
         Returns:
             None
         """
-        print(
-            f"{Utils.dateprint()} - Received SIZING EVENT with volume {event.volume} for {event.signal} in {event.symbol}")
-        #self.RISK_MANAGER.assess_order(event)
+        logger.info("Received SIZING EVENT with volume %s for %s in %s", event.volume, event.signal, event.symbol,
+                    extra={'event': "SIZING", 'symbol': event.symbol, 'signal': event.signal, 'volume': event.volume})
+        if self.RISK_MANAGER is not None:
+            self.RISK_MANAGER.assess_order(event)
 
     def _handle_order_event(self, event: OrderEvent):
         """
@@ -108,9 +173,10 @@ class TradingDirector():
         Returns:
             None
         """
-        print(
-            f"{Utils.dateprint()} - Received ORDER EVENT with volume {event.volume} for {event.signal} in {event.symbol}")
-        #self.ORDER_EXECUTOR.execute_order(event)
+        logger.info("Received ORDER EVENT with volume %s for %s in %s", event.volume, event.signal, event.symbol,
+                    extra={'event': "ORDER", 'symbol': event.symbol, 'signal': event.signal, 'volume': event.volume})
+        if self.ORDER_EXECUTOR is not None:
+            self.ORDER_EXECUTOR.execute_order(event)
 
     def _handle_execution_event(self, event: ExecutionEvent):
         """
@@ -122,8 +188,17 @@ class TradingDirector():
         Returns:
             None
         """
-        print(
-            f"{Utils.dateprint()} - Received EXECUTION EVENT {event.signal} in {event.symbol} with volume {event.volume} at price {event.fill_price}")
+        logger.info("Received EXECUTION EVENT %s in %s with volume %s at price %s", event.signal, event.symbol,
+                    event.volume, event.fill_price,
+                    extra={'event': "EXECUTION", 'symbol': event.symbol, 'signal': event.signal,
+                           'volume': event.volume, 'price': event.fill_price})
+        # The equity and margin have changed: the next sizing has to read the account info again
+        if self.METADATA_CACHE is not None:
+            self.METADATA_CACHE.invalidate_account()
+        if self.PORTFOLIO is not None:
+            self.PORTFOLIO.on_execution(event)
+        if self.RISK_MANAGER is not None:
+            self.RISK_MANAGER.on_execution(event)
         #self._process_execution_or_pending_events(event)
 
     def _handle_pending_order_event(self, event: PlacedPendingOrderEvent):
@@ -136,8 +211,12 @@ class TradingDirector():
         Returns:
             None
         """
-        print(
-            f"{Utils.dateprint()} - Received PLACED PENDING ORDER EVENT with volume {event.volume} for {event.signal} {event.target_order} in {event.symbol} at price {event.target_price}")
+        logger.info("Received PLACED PENDING ORDER EVENT with volume %s for %s %s in %s at price %s", event.volume,
+                    event.signal, event.target_order, event.symbol, event.target_price,
+                    extra={'event': "PENDING", 'symbol': event.symbol, 'signal': event.signal,
+                           'volume': event.volume, 'price': event.target_price})
+        if self.RISK_MANAGER is not None:
+            self.RISK_MANAGER.on_pending_order(event)
         #self._process_execution_or_pending_events(event)
 
     """def _process_execution_or_pending_events(self,
@@ -164,35 +243,94 @@ class TradingDirector():
         """
         Handles the case when a None event is received.
 
-        Prints an error message and sets `continue_trading` flag to False, terminating the execution of the Framework.
+        Logs an error message and sets `continue_trading` flag to False, terminating the execution of the Framework.
 
         Args:
             event: The None event received.
         """
-        print(f"{Utils.dateprint()} - ERROR: Received null event. Terminating Framework execution")
+        logger.error("Received null event. Terminating Framework execution")
         self.continue_trading = False
 
     def _handle_unknown_event(self, event):
         """
         Handles the case when an Unknown event is received.
 
-        Prints an error message and sets `continue_trading` flag to False, terminating the execution of the Framework.
+        Logs an error message and sets `continue_trading` flag to False, terminating the execution of the Framework.
 
         Args:
             event: The Unknown event received.
         """
-        print(
-            f"{Utils.dateprint()} - ERROR: Received unknown event. Terminating Framework execution. Event: {event}")
+        logger.error("Received unknown event. Terminating Framework execution. Event: %s", event)
         self.continue_trading = False
 
+    def _dispatch_event(self, event) -> None:
+        """
+        Sends the event to its handler (None and unknown events stop the Framework).
+        """
+        if event is not None:
+            if self.latency_tracker is not None and event.trace is not None:
+                self.latency_tracker.record_event(event)
+            handler = self.event_handler.get(event.event_type, self._handle_unknown_event)
+            if self.metrics is None:
+                handler(event)
+            else:
+                start = time.perf_counter()
+                handler(event)
+                timer = self._handler_timers.get(event.event_type)
+                if timer is not None:
+                    timer.observe(time.perf_counter() - start)
+        else:
+            self._handle_none_event(event)
+
+    def get_latency_snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Returns the pipeline latencies measured so far (see LatencyTracker.snapshot), empty if tracing is disabled.
+        """
+        if self.latency_tracker is None:
+            return {}
+        return self.latency_tracker.snapshot()
+
+    def _report_latencies_if_due(self) -> None:
+        """
+        Logs the pipeline latencies every latency_report_interval seconds.
+        """
+        if self.latency_tracker is None or self.latency_report_interval is None:
+            return
+        now = time.monotonic()
+        if now >= self._next_latency_report:
+            self._next_latency_report = now + self.latency_report_interval
+            self._log_latency_report()
+
+    def _log_latency_report(self) -> None:
+        """
+        Logs the pipeline latencies, one line per symbol and stage.
+        """
+        for line in self.latency_tracker.report().splitlines():
+            logger.info(line)
+
+    def _get_idle_timeout(self) -> float:
+        """
+        Returns how long the main loop can block waiting for an event before checking for new data again: until the
+        next scheduled check of the data provider, or the default polling interval if it has no schedule.
+        """
+        timeout = self.DATA_PROVIDER.seconds_until_next_check()
+        return timeout if timeout > 0.0 else self.poll_interval
+
     def execute(self) -> None:
         """
         Executes the main trading loop.
 
         This method continuously checks for events in the events queue and handles them accordingly.
-        If no events are available, it checks for new data from the data provider.
+        Pending events are handled back to back without sleeping. If no events are available, it checks for new
+        data from the data provider and then blocks on the queue until an event arrives or the next data check is
+        due, so chained events (DATA -> SIGNAL -> SIZING -> ORDER) do not wait between them and the loop does not
+        spin while idle.
         The loop continues until the `continue_trading` flag is set to False.
 
+        In backtest mode (HistoricalDataProvider) there is no sleep between iterations: the next bar is only
+        replayed once every event generated by the previous one has been handled, and the loop ends when the
+        history is exhausted.
+
         Note:
         - The events are processed by the corresponding event handlers.
         - If an unknown event is encountered, it is handled by the `_handle_unknown_event` method.
@@ -202,20 +340,70 @@ class TradingDirector():
         None
         """
         # Definition of the main loop
+        metrics = self.metrics
         while self.continue_trading:
+            if metrics is not None:
+                self._iterations.value += 1
             try:
                 event = self.events_queue.get(block=False)  # Remember it is a FIFO queue
 
             except queue.Empty:
+                if self.backtest_mode:
+                    if not self.DATA_PROVIDER.continue_backtest:
+                        logger.info("Backtest finished: all the historical bars have been replayed")
+                        self.continue_trading = False
+                        if self.latency_tracker is not None and self.latency_report_interval is not None:
+                            self._log_latency_report()
+                    else:
+                        self.DATA_PROVIDER.check_for_new_data()
+                        if metrics is not None:
+                            self._data_checks.value += 1
+                            if self.events_queue.empty():
+                                self._empty_polls.value += 1
+                    continue
+
+                # Idle: check for new data and block on the queue until an event arrives or the next check is due
+                self._report_latencies_if_due()
                 self.DATA_PROVIDER.check_for_new_data()
+                if metrics is not None:
+                    self._data_checks.value += 1
+                try:
+                    event = self.events_queue.get(timeout=self._get_idle_timeout())
+                except queue.Empty:
+                    if metrics is not None:
+                        self._empty_polls.value += 1
+                    continue
+
+            # Pending events are handled back to back, without sleeping between them
+            self._dispatch_event(event)
+
+        self._stop_order_executor()
+        logger.info("END")
+
+    def _stop_order_executor(self) -> None:
+        """
+        Waits for the orders already sent to the broker before the Framework stops, and handles their confirmations
+        so the portfolio and the risk manager book them (see _handle_confirmations).
+        """
+        if self.ORDER_EXECUTOR is None:
+            return
+        self._wait_for_orders()
+        self._handle_confirmations()
 
-            else:
-                if event is not None:
-                    handler = self.event_handler.get(event.event_type, self._handle_unknown_event)
-                    handler(event)
-                else:
-                    self._handle_none_event(event)
-
-            time.sleep(0.01)
+    def _wait_for_orders(self) -> None:
+        """
+        Waits until the orders in flight have been confirmed and stops the order executor.
+        """
+        if self.ORDER_EXECUTOR.pending_orders:
+            logger.info("Waiting for %s orders in flight", self.ORDER_EXECUTOR.pending_orders)
+        self.ORDER_EXECUTOR.shutdown(wait=True)
 
-        print(f"{Utils.dateprint()} - END")
+    def _handle_confirmations(self) -> None:
+        """
+        Handles the EXECUTION and PENDING events left in the queue. The other events are dropped: the Framework is
+        stopping and no new orders are sent.
+        """
+        while not self.events_queue.empty():
+            event = self.events_queue.get_nowait()
+            if event is not None and event.event_type in ("EXECUTION", "PENDING"):
+                self._dispatch_event(event)
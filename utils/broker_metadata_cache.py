@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Tuple
+
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+
+
+class BrokerMetadataCache():
+
+    def __init__(self, account_ttl: float = 1.0, symbol_ttl: float | None = None, broker: IBroker | None = None):
+        """
+        Caches the symbol and account information returned by MT5, so sizing a burst of signals does not hit the
+        broker for every one of them.
+
+        The specifications of a symbol (contract size, tick size, volume limits, currencies) do not change during a
+        session, so by default they are kept until they are invalidated. Only those fields should be read from the
+        cached symbol info: the price fields it also carries (bid, ask, spread...) are stale. The account info
+        (equity, balance, margin) is refreshed every `account_ttl` seconds, and should be invalidated when an
+        execution arrives.
+
+        Args:
+            account_ttl (float): How long (seconds) the account info is reused.
+            symbol_ttl (float | None): How long (seconds) the symbol info is reused (None: the whole session).
+            broker (IBroker | None): The broker (the default broker if None).
+        """
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
+        self.account_ttl = account_ttl
+        self.symbol_ttl = symbol_ttl
+
+        self._symbol_info: Dict[str, Tuple[float, object]] = {}     # symbol -> (fetch time, mt5.SymbolInfo)
+        self._account_info: Tuple[float, object] | None = None      # (fetch time, mt5.AccountInfo)
+
+    def get_symbol_info(self, symbol: str):
+        """
+        Returns the symbol info (mt5.SymbolInfo) of the symbol, from the cache if it has not expired.
+
+        Args:
+            symbol (str): The symbol.
+
+        Returns:
+            mt5.SymbolInfo | None: The symbol info, or None if MT5 could not provide it (not cached).
+        """
+        cached = self._symbol_info.get(symbol)
+        now = time.monotonic()
+        if cached is not None and (self.symbol_ttl is None or now - cached[0] < self.symbol_ttl):
+            return cached[1]
+
+        symbol_info = self.broker.symbol_info(symbol)
+        if symbol_info is not None:
+            self._symbol_info[symbol] = (now, symbol_info)
+        return symbol_info
+
+    def get_account_info(self):
+        """
+        Returns the account info (mt5.AccountInfo), from the cache if it has not expired.
+
+        Returns:
+            mt5.AccountInfo | None: The account info, or None if MT5 could not provide it (not cached).
+        """
+        now = time.monotonic()
+        if self._account_info is not None and now - self._account_info[0] < self.account_ttl:
+            return self._account_info[1]
+
+        account_info = self.broker.account_info()
+        self._account_info = (now, account_info) if account_info is not None else None
+        return account_info
+
+    def invalidate(self, symbol: str | None = None) -> None:
+        """
+        Forgets the cached symbol info of a symbol, or of every symbol if no symbol is given.
+        """
+        if symbol is None:
+            self._symbol_info.clear()
+        else:
+            self._symbol_info.pop(symbol, None)
+
+    def invalidate_account(self) -> None:
+        """
+        Forgets the cached account info (e.g. after an execution, since the equity and margin have changed).
+        """
+        self._account_info = None
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from broker.broker import get_default_broker
+from broker.interfaces.broker_interface import IBroker
+from utils.logger import get_logger
+
+
+logger = get_logger("currency_converter")
+
+
+# Forex symbols used to build the currency graph when MT5 can not list the symbols of the broker
+DEFAULT_FX_SYMBOLS = (
+    "AUDCAD", "AUDCHF", "AUDJPY", "AUDNZD", "AUDUSD", "CADCHF", "CADJPY", "CHFJPY", "EURAUD", "EURCAD",
+    "EURCHF", "EURGBP", "EURJPY", "EURNZD", "EURUSD", "GBPAUD", "GBPCAD", "GBPCHF", "GBPJPY", "GBPNZD",
+    "GBPUSD", "NZDCAD", "NZDCHF", "NZDJPY", "NZDUSD", "USDCAD", "USDCHF", "USDJPY", "USDSEK", "USDNOK")
+
+
+class CurrencyConverter():
+
+    def __init__(self, fx_symbols: Iterable[str] | None = None, rate_ttl: float = 1.0,
+                 hub_currencies: Tuple[str, ...] = ("USD", "EUR"), broker: IBroker | None = None):
+        """
+        Converts amounts between currencies through the symbols available in the platform.
+
+        The symbols form a graph where every currency is a node and every symbol an edge between its base and profit
+        currencies. The route between two currencies is the shortest path in the graph (a direct symbol, or a
+        triangulation preferably through the hub currencies) and it is computed once per currency pair. The rates
+        are kept for `rate_ttl` seconds, and they can be refreshed for free with the ticks that are already being
+        received (update_from_tick), so a conversion only asks MT5 for a tick when the cached rate has expired.
+
+        Args:
+            fx_symbols (Iterable[str] | None): The 6-letter symbols used to build the graph (base currency followed
+                by the profit currency). If None, the graph is built from the symbols of the broker that are in
+                the Market Watch (the terminal only keeps the prices of those symbols up to date).
+            rate_ttl (float): How long (seconds) a rate is reused before asking MT5 for a new tick.
+            hub_currencies (Tuple[str, ...]): The currencies preferred for triangulations, in order of preference.
+            broker (IBroker | None): The broker (the default broker if None).
+        """
+        self.broker: IBroker = broker if broker is not None else get_default_broker()
+        self.rate_ttl = rate_ttl
+        self.hub_currencies = tuple(ccy.upper() for ccy in hub_currencies)
+
+        # Currency graph: currency -> {neighbour currency: (symbol, inverse)}. The rate of an edge is the bid of
+        # the symbol, or its inverse if the symbol is quoted the other way round
+        self._graph: Dict[str, Dict[str, Tuple[str, bool]]] | None = None
+        self._fx_symbols = tuple(fx_symbols) if fx_symbols is not None else None
+
+        self._routes: Dict[Tuple[str, str], List[Tuple[str, bool]] | None] = {}
+        self._rates: Dict[str, Tuple[float, float]] = {}     # symbol -> (update time, bid)
+
+    def _build_graph(self) -> Dict[str, Dict[str, Tuple[str, bool]]]:
+        """
+        Builds the currency graph from the configured symbols, or from the symbols of the broker in the Market
+        Watch. The symbols hidden from the Market Watch are skipped: their ticks are missing or stale.
+        """
+        fx_symbols = self._fx_symbols
+        edges = []
+        if fx_symbols is None:
+            symbols = self.broker.symbols_get()
+            symbols = [info for info in symbols if info.visible] if symbols else []
+            if symbols:
+                edges = [(info.name, info.currency_base.upper(), info.currency_profit.upper()) for info in symbols
+                         if info.currency_base and info.currency_profit and info.currency_base != info.currency_profit]
+            else:
+                logger.warning("Could not retrieve the symbols from MT5 (MT5 error: %s). Using the default forex "
+                               "symbols for the currency conversions", self.broker.last_error())
+                fx_symbols = DEFAULT_FX_SYMBOLS
+
+        if fx_symbols is not None:
+            edges = [(symbol, symbol[:3].upper(), symbol[3:6].upper()) for symbol in fx_symbols]
+
+        graph: Dict[str, Dict[str, Tuple[str, bool]]] = {}
+        for symbol, base_ccy, profit_ccy in edges:
+            # Keep the first symbol found for every pair of currencies
+            graph.setdefault(base_ccy, {}).setdefault(profit_ccy, (symbol, False))
+            graph.setdefault(profit_ccy, {}).setdefault(base_ccy, (symbol, True))
+        return graph
+
+    def get_route(self, from_ccy: str, to_ccy: str) -> List[Tuple[str, bool]] | None:
+        """
+        Returns the conversion route between two currencies (computed once per currency pair).
+
+        Args:
+            from_ccy (str): The currency code of the source currency.
+            to_ccy (str): The currency code of the target currency.
+
+        Returns:
+            List[Tuple[str, bool]] | None: The symbols to go through, each one with a flag that tells whether its
+            rate has to be inverted, or None if the currencies are not connected.
+        """
+        from_ccy, to_ccy = from_ccy.upper(), to_ccy.upper()
+        key = (from_ccy, to_ccy)
+        if key in self._routes:
+            return self._routes[key]
+
+        if self._graph is None:
+            self._graph = self._build_graph()
+
+        route = self._find_route(from_ccy, to_ccy)
+        self._routes[key] = route
+        return route
+
+    def _find_route(self, from_ccy: str, to_ccy: str) -> List[Tuple[str, bool]] | None:
+        # Breadth-first search (fewest conversions). The hub currencies are explored first, so among the routes
+        # with the same number of conversions the one through the hubs is chosen
+        if from_ccy == to_ccy:
+            return []
+        if from_ccy not in self._graph or to_ccy not in self._graph:
+            return None
+
+        previous: Dict[str, str | None] = {from_ccy: None}
+        pending = deque([from_ccy])
+        while pending:
+            currency = pending.popleft()
+            if currency == to_ccy:
+                break
+            neighbours = sorted(self._graph[currency],
+                                key=lambda ccy: self.hub_currencies.index(ccy) if ccy in self.hub_currencies
+                                else len(self.hub_currencies))
+            for neighbour in neighbours:
+                if neighbour not in previous:
+                    previous[neighbour] = currency
+                    pending.append(neighbour)
+
+        if to_ccy not in previous:
+            return None
+
+        route = []
+        currency = to_ccy
+        while previous[currency] is not None:
+            route.append(self._graph[previous[currency]][currency])
+            currency = previous[currency]
+        return route[::-1]
+
+    def update_from_tick(self, symbol: str, tick) -> None:
+        """
+        Refreshes the cached rate of a symbol with a tick that has already been received.
+
+        Args:
+            symbol (str): The symbol of the tick.
+            tick: The tick (mt5.Tick or its dict version).
+        """
+        bid = tick['bid'] if isinstance(tick, dict) else tick.bid
+        if bid > 0.0:
+            self._rates[symbol] = (time.monotonic(), bid)
+
+    def get_rate(self, symbol: str) -> float | None:
+        """
+        Returns the bid of a symbol, from the cache if it has not expired.
+
+        Args:
+            symbol (str): The symbol.
+
+        Returns:
+            float | None: The bid, or None if MT5 could not provide it.
+        """
+        cached = self._rates.get(symbol)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.rate_ttl:
+            return cached[1]
+
+        try:
+            tick = self.broker.symbol_info_tick(symbol)
+            if tick is None or tick.bid <= 0.0:
+                raise Exception(
+                    f"The symbol {symbol} is not available on the MT5 platform. Please check the available symbols from your broker.")
+
+        except Exception as e:
+            logger.error("Could not retrieve the last tick for symbol %s. MT5 error: %s, Exception: %s", symbol,
+                         self.broker.last_error(), e)
+            return None
+
+        self._rates[symbol] = (now, tick.bid)
+        return tick.bid
+
+    def convert(self, amount: float, from_ccy: str, to_ccy: str) -> float:
+        """
+        Converts the given amount from one currency to another.
+
+        Args:
+            amount (float): The amount to be converted.
+            from_ccy (str): The currency code of the source currency.
+            to_ccy (str): The currency code of the target currency.
+
+        Returns:
+            float: The converted amount, or 0.0 if there is no conversion route or a rate is not available.
+        """
+        if from_ccy.upper() == to_ccy.upper():
+            return amount
+
+        route = self.get_route(from_ccy, to_ccy)
+        if route is None:
+            logger.error("There is no conversion route from %s to %s with the available symbols", from_ccy, to_ccy)
+            return 0.0
+
+        for symbol, inverse in route:
+            rate = self.get_rate(symbol)
+            if rate is None:
+                return 0.0
+            amount = amount / rate if inverse else amount * rate
+
+        return amount
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, List
+
+from events.events import ExecutionEvent, TraceContext
+
+
+class LatencyHistogram():
+
+    # Buckets per power of two: the percentiles are accurate to 1/16 (~6%)
+    SUB_BUCKETS = 16
+    _SUB_BITS = 4
+
+    def __init__(self):
+        """
+        Log-scale histogram of latencies in nanoseconds: recording a value is O(1) and takes no memory per value.
+        """
+        self.counts: List[int] = [0] * (64 * self.SUB_BUCKETS)
+        self.count: int = 0
+        self.max: int = 0
+
+    def record(self, value_ns: int) -> None:
+        if value_ns < self.SUB_BUCKETS:
+            index = value_ns if value_ns > 0 else 0
+        else:
+            # The 5 most significant bits select the bucket inside the power of two
+            shift = value_ns.bit_length() - self._SUB_BITS - 1
+            index = (shift << self._SUB_BITS) + (value_ns >> shift)
+        self.counts[index] += 1
+        self.count += 1
+        if value_ns > self.max:
+            self.max = value_ns
+
+    def _bucket_upper_bound(self, index: int) -> int:
+        if index < self.SUB_BUCKETS:
+            return index
+        shift = (index >> self._SUB_BITS) - 1
+        return ((index - (shift << self._SUB_BITS) + 1) << shift) - 1
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns the given percentile (0-100) in nanoseconds (upper bound of its bucket, capped by the maximum).
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, -(-self.count * percentile // 100))
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return float(min(self._bucket_upper_bound(index), self.max))
+        return float(self.max)
+
+
+class LatencyTracker():
+
+    def __init__(self):
+        """
+        Latency histograms per symbol and pipeline stage, fed with the trace context of the dispatched events.
+
+        For every event the tracker records the latency of the stage that created it (time since the previous stage
+        of its trace, e.g. 'data->signal') and the time it waited in the queue before being handled (e.g.
+        'queue:signal'). Executions also record the end-to-end latency ('total', from the bar close if known,
+        otherwise from the DataEvent).
+        """
+        stages = TraceContext._fields
+        num_stages = len(stages)
+
+        # Every recorded latency has an index in the per-symbol list of histograms: the queue time of every stage,
+        # every (previous stage, stage) pair and the total
+        self._names: List[str] = [f"queue:{stage}" for stage in stages]
+        self._names += [f"{stages[previous]}->{stages[stage]}" for previous in range(num_stages)
+                        for stage in range(num_stages)]
+        self._names.append("total")
+        self._num_stages = num_stages
+        self._total = len(self._names) - 1
+
+        self.histograms: Dict[str, List[LatencyHistogram | None]] = {}
+
+    def _record(self, histograms: List[LatencyHistogram | None], index: int, value_ns: int) -> None:
+        histogram = histograms[index]
+        if histogram is None:
+            histogram = histograms[index] = LatencyHistogram()
+        histogram.record(value_ns)
+
+    def record_event(self, event) -> None:
+        """
+        Records the latencies of an event about to be handled (events without trace are ignored).
+        """
+        trace = event.trace
+        if trace is None:
+            return
+        now = time.perf_counter_ns()
+        stage = event.trace_stage
+        stamp = trace[stage]
+        if stamp == 0:
+            return
+
+        histograms = self.histograms.get(event.symbol)
+        if histograms is None:
+            histograms = self.histograms[event.symbol] = [None] * len(self._names)
+
+        self._record(histograms, stage, now - stamp)
+        for previous in range(stage - 1, -1, -1):
+            if trace[previous] != 0:
+                self._record(histograms, self._num_stages * (1 + previous) + stage, stamp - trace[previous])
+                break
+
+        if stage == ExecutionEvent.trace_stage:
+            start = trace[0] if trace[0] != 0 else trace[1]
+            if start != 0:
+                self._record(histograms, self._total, stamp - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Returns the count, p50, p99 and max (microseconds) of every stage of every symbol.
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, float]]]: symbol -> stage -> {'count', 'p50_us', 'p99_us', 'max_us'}.
+        """
+        snapshot: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for symbol in sorted(self.histograms):
+            for name, histogram in zip(self._names, self.histograms[symbol]):
+                if histogram is None:
+                    continue
+                snapshot.setdefault(symbol, {})[name] = {
+                    'count': histogram.count,
+                    'p50_us': histogram.percentile(50) / 1e3,
+                    'p99_us': histogram.percentile(99) / 1e3,
+                    'max_us': histogram.max / 1e3,
+                }
+        return snapshot
+
+    def reset(self) -> None:
+        self.histograms.clear()
+
+    def report(self) -> str:
+        """
+        Returns the snapshot as text, one line per symbol and stage.
+        """
+        lines = []
+        for symbol, stages in self.snapshot().items():
+            for name, stats in stages.items():
+                lines.append(f"LATENCY {symbol} {name}: n={stats['count']} "
+                             f"p50={stats['p50_us']:.1f}us p99={stats['p99_us']:.1f}us max={stats['max_us']:.1f}us")
+        return "\n".join(lines)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, List, Optional
+
+from utils.utils import Utils
+
+
+# Name of the logger of the framework: every module logs to a child of it (e.g. 'torogoz.trading_director')
+ROOT_LOGGER_NAME = "torogoz"
+
+# Attributes of every LogRecord: anything else was passed with `extra` and is written as a field in JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class _TimestampCache():
+    """
+    Formats the record times in the framework timezone. The date and time down to the second are only formatted
+    once per second, the milliseconds are inserted between them and the suffix (e.g. the UTC offset).
+    """
+
+    def __init__(self, pattern: str, suffix_pattern: str = ""):
+        self.pattern = pattern
+        self.suffix_pattern = suffix_pattern
+        self._second: int = -1
+        self._prefix: str = ""
+        self._suffix: str = ""
+
+    def format(self, created: float) -> str:
+        second = int(created)
+        if second != self._second:
+            moment = datetime.fromtimestamp(second, tz=Utils.TIMEZONE)
+            self._second = second
+            self._prefix = moment.strftime(self.pattern)
+            self._suffix = moment.strftime(self.suffix_pattern)
+        return f"{self._prefix}.{int((created - second) * 1000):03d}{self._suffix}"
+
+
+class TextFormatter(logging.Formatter):
+
+    def __init__(self):
+        """
+        Human readable format of the framework: "dd/mm/yyyy HH:MM:SS.sss - message", with the level before the
+        message if it is not INFO (e.g. "dd/mm/yyyy HH:MM:SS.sss - ERROR: message").
+        """
+        super().__init__()
+        self._timestamps = _TimestampCache("%d/%m/%Y %H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.levelno != logging.INFO:
+            message = f"{record.levelname}: {message}"
+        text = f"{self._timestamps.format(record.created)} - {message}"
+        if record.exc_info:
+            text = f"{text}\n{self.formatException(record.exc_info)}"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+
+    def __init__(self):
+        """
+        One JSON object per line with the time (ISO 8601 in the framework timezone), level, logger and message, plus
+        every field passed with `extra` (e.g. logger.info("...", extra={'symbol': 'EURUSD'})).
+        """
+        super().__init__()
+        self._timestamps = _TimestampCache("%Y-%m-%dT%H:%M:%S", "%z")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self._timestamps.format(record.created),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that puts the records in the queue as they are: the message is formatted with its arguments by
+    the listener thread, not by the thread that logs (the queue never leaves the process).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def setup_logging(level: str | int | None = None, json_format: bool | None = None, stream: IO | None = None,
+                  filename: str | None = None) -> None:
+    """
+    Configures the logger of the framework: the records are put in a queue by the thread that logs, and are
+    formatted and written by a background thread, so logging never blocks the trading loop on the console or on
+    disk. Calling it again replaces the previous configuration.
+
+    The records of the whole process stop carrying the caller, thread and process information (the
+    optimizations of the logging documentation), none of which is written by the formatters of the framework.
+
+    The defaults come from the environment: TOROGOZ_LOG_LEVEL (INFO) and TOROGOZ_LOG_JSON (0). The per-bar
+    messages (DATA events) are logged with DEBUG level, so they are disabled at INFO level.
+
+    Args:
+        level (str | int | None): The minimum level logged (e.g. 'DEBUG', 'INFO', 'WARNING').
+        json_format (bool | None): Write one JSON object per line instead of the text format.
+        stream (IO | None): The stream written (stdout by default, unless a file is given).
+        filename (str | None): A file where the records are appended (in addition to the stream, if given).
+    """
+    global _listener
+
+    if level is None:
+        level = os.getenv("TOROGOZ_LOG_LEVEL", "INFO").upper()
+    if json_format is None:
+        json_format = os.getenv("TOROGOZ_LOG_JSON", "0").lower() in ("1", "true", "yes")
+
+    formatter = JsonFormatter() if json_format else TextFormatter()
+    handlers: List[logging.Handler] = []
+    if stream is not None or filename is None:
+        handlers.append(logging.StreamHandler(stream if stream is not None else sys.stdout))
+    if filename is not None:
+        handlers.append(logging.FileHandler(filename, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # The records only carry what the formatters write: finding the caller frame and reading the thread and process
+    # of every record is most of the cost of logging a message in the trading thread
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    with _lock:
+        shutdown_logging()
+        records = queue.SimpleQueue()
+        logger = logging.getLogger(ROOT_LOGGER_NAME)
+        logger.handlers.clear()
+        logger.addHandler(_DeferredQueueHandler(records))
+        logger.setLevel(level)
+        logger.propagate = False
+
+        _listener = QueueListener(records, *handlers, respect_handler_level=False)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Writes the records still queued and stops the background thread (called at exit).
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
+        logging.getLogger(ROOT_LOGGER_NAME).handlers.clear()
+
+
+def _restart_after_fork() -> None:
+    # A forked process (e.g. a worker of the optimizer) does not inherit the background thread: it gets its own
+    # queue and thread writing to the same handlers
+    global _listener
+    if _listener is not None:
+        records = queue.SimpleQueue()
+        for handler in logging.getLogger(ROOT_LOGGER_NAME).handlers:
+            if isinstance(handler, _DeferredQueueHandler):
+                handler.queue = records
+        _listener = QueueListener(records, *_listener.handlers, respect_handler_level=False)
+        _listener.start()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns the logger of a module of the framework, configuring the logging with the defaults on first use.
+
+    Args:
+        name (str): The name of the module (e.g. 'trading_director').
+
+    Returns:
+        logging.Logger: The logger 'torogoz.<name>'.
+    """
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
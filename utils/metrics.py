@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+
+class Counter():
+    """
+    Monotonically increasing value (e.g. number of calls).
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge():
+    """
+    Value that goes up and down (e.g. queue depth). If it has a function, the value is read from it when the
+    metrics are collected, so it costs nothing on the hot path.
+    """
+    __slots__ = ("value", "function")
+
+    def __init__(self, function: Callable[[], float] | None = None):
+        self.value: float = 0
+        self.function = function
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Timer():
+    """
+    Number of observations and their cumulative duration in seconds (a Prometheus summary without quantiles).
+    """
+    __slots__ = ("count", "sum")
+
+    def __init__(self):
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+
+
+# (metric name, sorted label items)
+_MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class MetricsRegistry():
+
+    def __init__(self, prefix: str = "torogoz"):
+        """
+        In-process registry of counters, gauges and timers. The metrics are plain objects updated by the modules
+        (an attribute increment, no lock), and are read by snapshot or exported in the Prometheus text format by a
+        MetricsServer.
+
+        Args:
+            prefix (str): The prefix of every metric name.
+        """
+        self.prefix = prefix
+        self._metrics: Dict[_MetricKey, Counter | Gauge | Timer] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}      # name -> (type, help)
+        self._lock = threading.Lock()
+
+        # Previous snapshot of the counters, to compute rates
+        self._last_snapshot_time: float = time.monotonic()
+        self._last_counts: Dict[str, float] = {}
+
+    def _get_or_create(self, kind: str, metric_class: type, name: str, help_text: str, labels: Dict[str, str] | None,
+                       **kwargs):
+        full_name = f"{self.prefix}_{name}"
+        key = (full_name, tuple(sorted((labels or {}).items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = metric_class(**kwargs)
+                    self._metrics[key] = metric
+                    self._help.setdefault(full_name, (kind, help_text))
+        return metric
+
+    def counter(self, name: str, help_text: str = "", labels: Dict[str, str] | None = None) -> Counter:
+        """
+        Returns the counter with the given name and labels, creating it on first use.
+        """
+        return self._get_or_create("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = "", labels: Dict[str, str] | None = None,
+              function: Callable[[], float] | None = None) -> Gauge:
+        """
+        Returns the gauge with the given name and labels, creating it on first use (with the given function).
+        """
+        return self._get_or_create("gauge", Gauge, name, help_text, labels, function=function)
+
+    def timer(self, name: str, help_text: str = "", labels: Dict[str, str] | None = None) -> Timer:
+        """
+        Returns the timer with the given name and labels, creating it on first use.
+        """
+        return self._get_or_create("summary", Timer, name, help_text, labels)
+
+    @staticmethod
+    def _series_name(name: str, labels: Tuple[Tuple[str, str], ...], suffix: str = "") -> str:
+        if not labels:
+            return f"{name}{suffix}"
+        label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+        return f"{name}{suffix}{{{label_text}}}"
+
+    def _values(self) -> List[Tuple[str, str, float]]:
+        # (metric name, series name, value) of every series, timers as their _count and _sum series
+        with self._lock:
+            metrics = list(self._metrics.items())
+
+        values = []
+        for (name, labels), metric in metrics:
+            if isinstance(metric, Timer):
+                values.append((name, self._series_name(name, labels, "_count"), metric.count))
+                values.append((name, self._series_name(name, labels, "_sum"), metric.sum))
+            elif isinstance(metric, Gauge):
+                try:
+                    values.append((name, self._series_name(name, labels), float(metric.get())))
+                except Exception:
+                    continue
+            else:
+                values.append((name, self._series_name(name, labels), metric.value))
+        return values
+
+    def render_prometheus(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        current_name = None
+        for name, series, value in sorted(self._values(), key=lambda item: item[0]):
+            if name != current_name:
+                current_name = name
+                kind, help_text = self._help[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{series} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the value of every series, and the rate per second of the counters (and timer counts) since the
+        previous snapshot.
+
+        Returns:
+            Dict[str, Dict[str, float]]: {'values': series -> value, 'rates': series -> per second}.
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_snapshot_time
+        values = {series: value for _, series, value in self._values()}
+
+        rates = {}
+        counts = {}
+        for (name, labels), metric in list(self._metrics.items()):
+            if isinstance(metric, (Counter, Timer)):
+                series = self._series_name(name, labels, "_count" if isinstance(metric, Timer) else "")
+                count = values[series]
+                counts[series] = count
+                if elapsed > 0:
+                    rates[series] = (count - self._last_counts.get(series, 0)) / elapsed
+
+        self._last_snapshot_time = now
+        self._last_counts = counts
+        return {'values': values, 'rates': rates}
+
+
+class MetricsServer():
+
+    def __init__(self, registry: MetricsRegistry, port: int = 9108, host: str = "127.0.0.1"):
+        """
+        Local HTTP endpoint that serves the metrics of a registry in the Prometheus text format (GET /metrics),
+        from a daemon thread.
+
+        Args:
+            registry (MetricsRegistry): The registry to serve.
+            port (int): The port (0 to pick a free one).
+            host (str): The interface to listen on (local only by default).
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        registry = self.registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
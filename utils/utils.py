@@ -1,70 +1,63 @@
-import MetaTrader5 as mt5
 from datetime import datetime, timezone
-from backports.zoneinfo import ZoneInfo
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:     # Python < 3.9
+    from backports.zoneinfo import ZoneInfo
 
 
 # Create a static method to convert one currency to another
 class Utils():
 
+    # Timezone of the timestamps printed by the framework (created once: building a ZoneInfo is not free)
+    TIMEZONE = ZoneInfo("Asia/Nicosia")
+
+    # Duration in seconds of the fixed-length timeframes (monthly bars have a variable length)
+    TIMEFRAME_SECONDS = {
+        '1min': 60, '2min': 120, '3min': 180, '4min': 240, '5min': 300, '6min': 360, '10min': 600, '12min': 720,
+        '15min': 900, '20min': 1200, '30min': 1800, '1h': 3600, '2h': 7200, '3h': 10800, '4h': 14400,
+        '6h': 21600, '8h': 28800, '12h': 43200, '1d': 86400, '1w': 604800,
+    }
+
     def __init__(self):
         """
         Initializes the object.
         """
         pass
 
+    # Shared currency conversion service (created on first use)
+    _currency_converter = None
+
+    @staticmethod
+    def get_currency_converter():
+        """
+        Returns the CurrencyConverter shared by the whole framework, creating it on first use.
+
+        Returns:
+            CurrencyConverter: The shared currency converter.
+        """
+        if Utils._currency_converter is None:
+            from .currency_converter import CurrencyConverter
+            Utils._currency_converter = CurrencyConverter()
+        return Utils._currency_converter
+
     # We create our static method with the @staticmethod decorator
     @staticmethod
     def convert_currency_amount_to_another_currency(amount: float, from_ccy: str, to_ccy: str) -> float:
         """
         Converts the given amount from one currency to another.
 
+        The conversion goes through the shared CurrencyConverter: the route between both currencies (direct or
+        triangulated) is computed once and the rates are cached for a short time.
+
         Args:
             amount (float): The amount to be converted.
             from_ccy (str): The currency code of the source currency.
             to_ccy (str): The currency code of the target currency.
 
         Returns:
-            float: The converted amount.
-
-        Raises:
-            Exception: If the symbol is not available in the MT5 platform.
+            float: The converted amount, or 0.0 if the currencies can not be converted with the available symbols.
         """
-        # Check if both currencies for conversion are the same
-        if from_ccy == to_ccy:
-            return amount
-
-        all_fx_symbol = (
-        "AUDCAD", "AUDCHF", "AUDJPY", "AUDNZD", "AUDUSD", "CADCHF", "CADJPY", "CHFJPY", "EURAUD", "EURCAD",
-        "EURCHF", "EURGBP", "EURJPY", "EURNZD", "EURUSD", "GBPAUD", "GBPCAD", "GBPCHF", "GBPJPY", "GBPNZD",
-        "GBPUSD", "NZDCAD", "NZDCHF", "NZDJPY", "NZDUSD", "USDCAD", "USDCHF", "USDJPY", "USDSEK", "USDNOK")
-
-        # Convert currencies to uppercase
-        from_ccy = from_ccy.upper()
-        to_ccy = to_ccy.upper()
-
-        # Find the symbol that relates our source currency to our target currency (list comprehension)
-        fx_symbol = [symbol for symbol in all_fx_symbol if from_ccy in symbol and to_ccy in symbol][0]
-        fx_symbol_base = fx_symbol[:3]
-
-        # Retrieve the latest available data for fx_symbol
-        try:
-            tick = mt5.symbol_info_tick(fx_symbol)
-            if tick is None:
-                raise Exception(
-                    f"The symbol {fx_symbol} is not available on the MT5 platform. Please check the available symbols from your broker.")
-
-        except Exception as e:
-            print(
-                f"ERROR: Could not retrieve the last tick for symbol {fx_symbol}. MT5 error: {mt5.last_error()}, Exception: {e}")
-            return 0.0
-
-        else:
-            # Retrieve the last available price for the symbol
-            last_price = tick.bid
-
-            # Convert the amount from the source currency to the target currency
-            converted_amount = amount / last_price if fx_symbol_base == to_ccy else amount * last_price
-            return converted_amount
+        return Utils.get_currency_converter().convert(amount, from_ccy, to_ccy)
 
     @staticmethod
     def dateprint() -> str:
@@ -72,4 +65,46 @@ class Utils():
         Returns the current date and time in the format "dd/mm/yyyy HH:MM:SS.sss".
         The timezone used is "Asia/Nicosia".
         """
-        return datetime.now(ZoneInfo("Asia/Nicosia")).strftime("%d/%m/%Y %H:%M:%S.%f")[:-3]
+        return datetime.now(Utils.TIMEZONE).strftime("%d/%m/%Y %H:%M:%S.%f")[:-3]
+
+    @staticmethod
+    def next_bar_time(bar_time: int, timeframe: str) -> int:
+        """
+        Returns the opening time of the bar that follows the given one, assuming there is no gap between them.
+
+        Args:
+            bar_time (int): The opening time of a bar as epoch seconds (MT5 server time).
+            timeframe (str): The timeframe of the bar (e.g. '1min', '1h', '1M').
+
+        Returns:
+            int: The opening time of the next bar as epoch seconds.
+        """
+        if timeframe == '1M':
+            bar_datetime = datetime.fromtimestamp(bar_time, tz=timezone.utc)
+            year, month = (bar_datetime.year + 1, 1) if bar_datetime.month == 12 else (bar_datetime.year, bar_datetime.month + 1)
+            return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+        return bar_time + Utils.TIMEFRAME_SECONDS[timeframe]
+
+    @staticmethod
+    def bar_open_time(server_time: int, timeframe: str) -> int:
+        """
+        Returns the opening time of the bar that contains the given time, with the MT5 bar alignment (weekly bars
+        open on Sunday, monthly bars on the first day of the month).
+
+        Args:
+            server_time (int): A time as epoch seconds (MT5 server time).
+            timeframe (str): The timeframe of the bar (e.g. '1min', '1h', '1M').
+
+        Returns:
+            int: The opening time of the bar as epoch seconds.
+        """
+        if timeframe == '1M':
+            bar_datetime = datetime.fromtimestamp(server_time, tz=timezone.utc)
+            return int(datetime(bar_datetime.year, bar_datetime.month, 1, tzinfo=timezone.utc).timestamp())
+
+        if timeframe == '1w':
+            # The epoch is a Thursday: the first Sunday is 3 days later
+            return server_time - (server_time - 3 * 86400) % Utils.TIMEFRAME_SECONDS['1w']
+
+        return server_time - server_time % Utils.TIMEFRAME_SECONDS[timeframe]